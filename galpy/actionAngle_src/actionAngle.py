@@ -1,4 +1,11 @@
+import os
 import math as m
+import shutil
+import hashlib
+import tempfile
+import warnings
+import numpy
+from galpy.util import galpyWarning
 class actionAngle:
     """Top-level class for actionAngle classes"""
     def __init__(self,*args,**kwargs):
@@ -144,3 +151,93 @@ class UnboundError(Exception): #pragma: no cover
         self.value = value
     def __str__(self):
         return repr(self.value)
+
+# Version of the on-disk format of the grid caches; increase when the content
+# of the tables changes, such that old cache directories are no longer used
+_GRIDCACHE_VERSION= 1
+class _actionAngleGridCache:
+    """Class that holds the tables of a grid-based actionAngle object, loaded from and saved to an on-disk cache (if cachedir is set); each table is stored as a .npy file, such that it can be memory-mapped"""
+    def __init__(self,name,keylist,cachedir,mmap_mode=None):
+        from galpy.potential_src.interpRZPotential import _cache_signature, \
+            _UncacheableError
+        self._tables= {}
+        self._new= set()
+        if cachedir is None:
+            self._dirname= None
+            return None
+        try:
+            key= _cache_signature([_GRIDCACHE_VERSION]+keylist)
+        except _UncacheableError, e:
+            warnings.warn("Not caching the %s tables: %s" % (name,e),
+                          galpyWarning)
+            self._dirname= None
+            return None
+        self._dirname= os.path.join(cachedir,'%s-%s' \
+                                        % (name,hashlib.sha1(key).hexdigest()))
+        if os.path.isdir(self._dirname):
+            try:
+                for filename in os.listdir(self._dirname):
+                    if not filename.endswith('.npy'): continue
+                    self._tables[filename[:-4]]= \
+                        numpy.load(os.path.join(self._dirname,filename),
+                                   mmap_mode=mmap_mode)
+            except (IOError,ValueError): #pragma: no cover
+                warnings.warn("Could not read %s cache %s; recomputing the tables" % (name,self._dirname),galpyWarning)
+                self._tables= {}
+        return None
+
+    def __contains__(self,name):
+        return name in self._tables
+
+    def __getitem__(self,name):
+        return self._tables[name]
+
+    def __setitem__(self,name,table):
+        self._tables[name]= numpy.array(table)
+        self._new.add(name)
+        return None
+
+    def save(self):
+        """Write the tables that were computed to the cache directory; tables computed for an existing cache (e.g., ones only needed by the C code) are added to it"""
+        if self._dirname is None or not self._new: return None
+        if os.path.isdir(self._dirname):
+            self._add_to_cache()
+            return None
+        cachedir= os.path.dirname(self._dirname)
+        if not os.path.exists(cachedir):
+            try:
+                os.makedirs(cachedir)
+            except OSError: #pragma: no cover
+                pass #created by another process in the meantime
+        #Write to a temporary directory first and rename, such that other 
+        #processes never see a partially-written cache
+        tmpdirname= tempfile.mkdtemp(dir=cachedir)
+        try:
+            for name in self._tables:
+                numpy.save(os.path.join(tmpdirname,'%s.npy' % name),
+                           self._tables[name])
+            os.rename(tmpdirname,self._dirname)
+        except OSError: #pragma: no cover
+            #Written by another process in the meantime
+            shutil.rmtree(tmpdirname,ignore_errors=True)
+        except: #pragma: no cover
+            shutil.rmtree(tmpdirname,ignore_errors=True)
+            raise
+        self._new= set()
+        return None
+
+    def _add_to_cache(self):
+        """Add the computed tables to an existing cache directory, each written to a temporary file first and renamed"""
+        for name in self._new:
+            fd, tmpfilename= tempfile.mkstemp(dir=self._dirname,
+                                              suffix='.tmp')
+            try:
+                with os.fdopen(fd,'wb') as tmpfile:
+                    numpy.save(tmpfile,self._tables[name])
+                os.rename(tmpfilename,
+                          os.path.join(self._dirname,'%s.npy' % name))
+            except: #pragma: no cover
+                if os.path.exists(tmpfilename): os.remove(tmpfilename)
+                raise
+        self._new= set()
+        return None
@@ -14,7 +14,8 @@ import math
 import numpy
 from scipy import interpolate
 from actionAngleAdiabatic import actionAngleAdiabatic
-from galpy.actionAngle_src.actionAngle import actionAngle, UnboundError
+from galpy.actionAngle_src.actionAngle import actionAngle, UnboundError, \
+    _actionAngleGridCache
 import galpy.potential
 from galpy.util import multi
 _PRINTOUTSIDEGRID= False
@@ -22,6 +23,7 @@ class actionAngleAdiabaticGrid():
     """Action-angle formalism for axisymmetric potentials using the adiabatic approximation, grid-based interpolation"""
     def __init__(self,pot=None,zmax=1.,gamma=1.,Rmax=5.,
                  nR=16,nEz=16,nEr=31,nLz=31,numcores=1,
+                 cachedir=None,mmap_mode=None,
                  **kwargs):
         """
         NAME:
@@ -44,6 +46,10 @@ class actionAngleAdiabaticGrid():
 
            c= if True, use C to calculate actions
 
+           cachedir= (None) if set, directory in which the tables of the actions are cached, in a directory whose name is a hash of the potential, gamma, zmax, the grid specification, and the integration keywords; later instances with the same potential and grid (in any process) load the tables from this cache rather than computing them
+
+           mmap_mode= (None) if set, memory-map the tables loaded from the cache with this mode (e.g., 'r'; see numpy.load)
+
            +scipy.integrate.quad keywords
         OUTPUT:
         HISTORY:
@@ -65,16 +71,79 @@ class actionAngleAdiabaticGrid():
         #Set up the actionAngleAdiabatic object that we will use to interpolate
         self._aA= actionAngleAdiabatic(pot=self._pot,gamma=self._gamma,
                                        c=self._c)
-        #Build grid for Ez, first calculate Ez(zmax;R) function
         self._Rs= numpy.linspace(self._Rmin,self._Rmax,nR)
-        self._EzZmaxs= galpy.potential.evaluatePotentials(self._Rs,self._zmax*numpy.ones(nR),self._pot)\
-            -galpy.potential.evaluatePotentials(self._Rs,numpy.zeros(nR),self._pot)
+        self._Lzmin= 0.01
+        self._Lzs= numpy.linspace(self._Lzmin,
+                                  self._Rmax\
+                                      *galpy.potential.vcirc(self._pot,
+                                                             self._Rmax),
+                                  nLz)
+        self._Lzmax= self._Lzs[-1]
+        self._Ramax= 99.
+        #Load the tables from the cache, or calculate them
+        cache= _actionAngleGridCache('actionAngleAdiabaticGrid',
+                                     [self._pot,float(self._gamma),
+                                      float(self._zmax),float(self._Rmax),
+                                      nR,nEz,nEr,nLz,kwargs],
+                                     cachedir,mmap_mode=mmap_mode)
+        if not 'jr' in cache:
+            self._calc_grid(cache,nEz,nEr,numcores,**kwargs)
+            cache.save()
+        self._EzZmaxs= cache['EzZmaxs']
+        self._jz= cache['jz']
+        self._RL= cache['RL']
+        self._ERRL= cache['ERRL']
+        self._ERRa= cache['ERRa']
+        self._jr= cache['jr']
+        #Set up the interpolations; first Ez(zmax;R)
         self._EzZmaxsInterp= interpolate.InterpolatedUnivariateSpline(self._Rs,numpy.log(self._EzZmaxs),k=3)
+        #First interpolate Ez=Ezmax
+        self._jzEzmaxInterp= interpolate.InterpolatedUnivariateSpline(self._Rs,numpy.log(cache['jzEzzmax']+10.**-5.),k=3)
+        self._jzInterp= interpolate.RectBivariateSpline(self._Rs,
+                                                        numpy.linspace(0.,1.,nEz),
+                                                        self._jz,
+                                                        kx=3,ky=3,s=0.)
+        #JR grid
+        self._RLInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
+                                                                 self._RL,k=3)
+        self._ERRLmax= numpy.amax(self._ERRL)+1.
+        self._ERRLInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
+                                                                   numpy.log(-(self._ERRL-self._ERRLmax)),k=3)
+        self._ERRamax= numpy.amax(self._ERRa)+1.
+        self._ERRaInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
+                                                                   numpy.log(-(self._ERRa-self._ERRamax)),k=3)
+        self._jrERRaInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
+                                                                     numpy.log(cache['jrERRa']+10.**-5.),k=3)
+        self._jrInterp= interpolate.RectBivariateSpline(self._Lzs,
+                                                        numpy.linspace(0.,1.,nEr),
+                                                        self._jr,
+                                                        kx=3,ky=3,s=0.)
+        return None
+
+    def _calc_grid(self,cache,nEz,nEr,numcores,**kwargs):
+        """
+        NAME:
+           _calc_grid
+        PURPOSE:
+           calculate the tables of Jz on the (R,Ez) grid and of JR on the (Lz,ER) grid
+        INPUT:
+           cache - _actionAngleGridCache instance to store the tables in
+           nEz, nEr - grid size
+           numcores - number of cpus to use to parallellize
+           +scipy.integrate.quad keywords
+        OUTPUT:
+           (none; tables are stored in cache)
+        """
+        nR= len(self._Rs)
+        nLz= len(self._Lzs)
+        #Build grid for Ez, first calculate Ez(zmax;R) function
+        EzZmaxs= galpy.potential.evaluatePotentials(self._Rs,self._zmax*numpy.ones(nR),self._pot)\
+            -galpy.potential.evaluatePotentials(self._Rs,numpy.zeros(nR),self._pot)
         y= numpy.linspace(0.,1.,nEz)
         jz= numpy.zeros((nR,nEz))
         jzEzzmax= numpy.zeros(nR)
         thisRs= (numpy.tile(self._Rs,(nEz,1)).T).flatten()
-        thisEzZmaxs= (numpy.tile(self._EzZmaxs,(nEz,1)).T).flatten()
+        thisEzZmaxs= (numpy.tile(EzZmaxs,(nEz,1)).T).flatten()
         thisy= (numpy.tile(y,(nR,1))).flatten()
         if self._c:
             jz= self._aA(thisRs,
@@ -99,46 +168,25 @@ class actionAngleAdiabaticGrid():
                     for jj in range(nEz):
                         #Calculate Jz
                         jz[ii,jj]= self._aA(self._Rs[ii],0.,1.,#these two r dummies
-                                            0.,numpy.sqrt(2.*y[jj]*self._EzZmaxs[ii]),
+                                            0.,numpy.sqrt(2.*y[jj]*EzZmaxs[ii]),
                                             _justjz=True,**kwargs)[2]
                         if jj == nEz-1: 
                             jzEzzmax[ii]= jz[ii,jj]
         for ii in range(nR): jz[ii,:]/= jzEzzmax[ii]
-        #First interpolate Ez=Ezmax
-        self._jzEzmaxInterp= interpolate.InterpolatedUnivariateSpline(self._Rs,numpy.log(jzEzzmax+10.**-5.),k=3)
-        self._jz= jz
-        self._jzInterp= interpolate.RectBivariateSpline(self._Rs,
-                                                        y,
-                                                        jz,
-                                                        kx=3,ky=3,s=0.)
-        #JR grid
-        self._Lzmin= 0.01
-        self._Lzs= numpy.linspace(self._Lzmin,
-                                  self._Rmax\
-                                      *galpy.potential.vcirc(self._pot,
-                                                             self._Rmax),
-                                  nLz)
-        self._Lzmax= self._Lzs[-1]
-        #Calculate ER(vr=0,R=RL)
-        self._RL= numpy.array([galpy.potential.rl(self._pot,l) for l in self._Lzs])
-        self._RLInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
-                                                                 self._RL,k=3)
-        self._ERRL= galpy.potential.evaluatePotentials(self._RL,numpy.zeros(nLz),self._pot) +self._Lzs**2./2./self._RL**2.
-        self._ERRLmax= numpy.amax(self._ERRL)+1.
-        self._ERRLInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
-                                                                   numpy.log(-(self._ERRL-self._ERRLmax)),k=3)
-        self._Ramax= 99.
-        self._ERRa= galpy.potential.evaluatePotentials(self._Ramax,0.,self._pot) +self._Lzs**2./2./self._Ramax**2.
-        self._ERRamax= numpy.amax(self._ERRa)+1.
-        self._ERRaInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
-                                                                   numpy.log(-(self._ERRa-self._ERRamax)),k=3)
+        cache['EzZmaxs']= EzZmaxs
+        cache['jz']= jz
+        cache['jzEzzmax']= jzEzzmax
+        #JR grid, calculate ER(vr=0,R=RL)
+        RL= galpy.potential.rl(self._pot,self._Lzs)
+        ERRL= galpy.potential.evaluatePotentials(RL,numpy.zeros(nLz),self._pot) +self._Lzs**2./2./RL**2.
+        ERRa= galpy.potential.evaluatePotentials(self._Ramax,0.,self._pot) +self._Lzs**2./2./self._Ramax**2.
         y= numpy.linspace(0.,1.,nEr)
         jr= numpy.zeros((nLz,nEr))
         jrERRa= numpy.zeros(nLz)
-        thisRL= (numpy.tile(self._RL,(nEr-1,1)).T).flatten()
+        thisRL= (numpy.tile(RL,(nEr-1,1)).T).flatten()
         thisLzs= (numpy.tile(self._Lzs,(nEr-1,1)).T).flatten()
-        thisERRL= (numpy.tile(self._ERRL,(nEr-1,1)).T).flatten()
-        thisERRa= (numpy.tile(self._ERRa,(nEr-1,1)).T).flatten()
+        thisERRL= (numpy.tile(ERRL,(nEr-1,1)).T).flatten()
+        thisERRa= (numpy.tile(ERRa,(nEr-1,1)).T).flatten()
         thisy= (numpy.tile(y[0:-1],(nLz,1))).flatten()
         if self._c:
             mjr= self._aA(thisRL,
@@ -165,9 +213,9 @@ class actionAngleAdiabaticGrid():
                 for ii in range(nLz):
                     for jj in range(nEr-1): #Last one is zero by construction
                         try:
-                            jr[ii,jj]= self._aA(self._RL[ii],
-                                                numpy.sqrt(2.*(self._ERRa[ii]+y[jj]*(self._ERRL[ii]-self._ERRa[ii])-galpy.potential.evaluatePotentials(self._RL[ii],0.,self._pot))-self._Lzs[ii]**2./self._RL[ii]**2.),
-                                                self._Lzs[ii]/self._RL[ii],
+                            jr[ii,jj]= self._aA(RL[ii],
+                                                numpy.sqrt(2.*(ERRa[ii]+y[jj]*(ERRL[ii]-ERRa[ii])-galpy.potential.evaluatePotentials(RL[ii],0.,self._pot))-self._Lzs[ii]**2./RL[ii]**2.),
+                                                self._Lzs[ii]/RL[ii],
                                                 0.,0.,
                                                 _justjr=True,
                                                    **kwargs)[0]
@@ -176,14 +224,11 @@ class actionAngleAdiabaticGrid():
                         if jj == 0: 
                             jrERRa[ii]= jr[ii,jj]
         for ii in range(nLz): jr[ii,:]/= jrERRa[ii]
-        #First interpolate Ez=Ezmax
-        self._jr= jr
-        self._jrERRaInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
-                                                                     numpy.log(jrERRa+10.**-5.),k=3)
-        self._jrInterp= interpolate.RectBivariateSpline(self._Lzs,
-                                                        y,
-                                                        jr,
-                                                        kx=3,ky=3,s=0.)
+        cache['RL']= RL
+        cache['ERRL']= ERRL
+        cache['ERRa']= ERRa
+        cache['jr']= jr
+        cache['jrERRa']= jrERRa
         return None
 
     def __call__(self,*args,**kwargs):
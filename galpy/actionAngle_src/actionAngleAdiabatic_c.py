@@ -6,7 +6,8 @@ import ctypes.util
 import numpy
 from numpy.ctypeslib import ndpointer
 from galpy.util import galpyWarning
-from galpy.orbit_src.integrateFullOrbit import _parse_pot
+from galpy.actionAngle_src.actionAngleStaeckel_c import _pot_handle_c, \
+    _free_pot_c
 #Find and load the library
 _lib= None
 outerr= None
@@ -47,8 +48,8 @@ def actionAngleAdiabatic_c(pot,gamma,R,vR,vT,z,vz):
     HISTORY:
        2012-12-10 - Written - Bovy (IAS)
     """
-    #Parse the potential
-    npot, pot_type, pot_args= _parse_pot(pot,potforactions=True)
+    #Set up the potential in C, re-using that of a compiledPotential
+    handle, npot, owned= _pot_handle_c(pot)
 
     #Set up result arrays
     jr= numpy.empty(len(R))
@@ -65,8 +66,7 @@ def actionAngleAdiabatic_c(pot,gamma,R,vR,vT,z,vz):
                                                 ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                                 ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                                 ctypes.c_int,
-                                                ndpointer(dtype=numpy.int32,flags=ndarrayFlags),
-                                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                                                ctypes.c_void_p,
                                                 ctypes.c_double,
                                                 ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                                 ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
@@ -94,12 +94,12 @@ def actionAngleAdiabatic_c(pot,gamma,R,vR,vT,z,vz):
                                      z,
                                      vz,
                                      ctypes.c_int(npot),
-                                     pot_type,
-                                     pot_args,
+                                     handle,
                                      ctypes.c_double(gamma),
                                      jr,
                                      jz,
                                      ctypes.byref(err))
+    if owned: _free_pot_c(handle,npot)
 
     #Reset input arrays
     if f_cont[0]: R= numpy.asfortranarray(R)
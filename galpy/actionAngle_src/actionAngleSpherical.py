@@ -11,11 +11,16 @@
 ###############################################################################
 import copy
 import math as m
+import warnings
 import numpy as nu
 from scipy import integrate
 from galpy.potential import evaluatePotentials, epifreq, omegac
+from galpy.util import galpyWarning
 from actionAngle import *
 from actionAngleAxi import actionAngleAxi, potentialAxi
+import actionAngleSpherical_c
+from actionAngleSpherical_c import _ext_loaded as ext_loaded
+from galpy.potential_src.Potential import _check_c
 class actionAngleSpherical(actionAngle):
     """Action-angle formalism for spherical potentials"""
     def __init__(self,*args,**kwargs):
@@ -26,6 +31,7 @@ class actionAngleSpherical(actionAngle):
            initialize an actionAngleSpherical object
         INPUT:
            pot= a Spherical potential
+           c= if True, always use C for calculations (default: use C if the potential has a C implementation)
         OUTPUT:
         HISTORY:
            2013-12-28 - Written - Bovy (IAS)
@@ -38,12 +44,11 @@ class actionAngleSpherical(actionAngle):
             self._2dpot= [p.toPlanar() for p in self._pot]
         else:
             self._2dpot= self._pot.toPlanar()
-        #The following for if we ever implement this code in C
-        self._c= False
-        ext_loaded= False
         if ext_loaded and ((kwargs.has_key('c') and kwargs['c'])
                            or not kwargs.has_key('c')):
-            self._c= True #pragma: no cover
+            self._c= _check_c(self._pot)
+            if kwargs.has_key('c') and kwargs['c'] and not self._c:
+                warnings.warn("C module not used because potential does not have a C implementation",galpyWarning) #pragma: no cover
         else:
             self._c= False
         return None
@@ -59,8 +64,9 @@ class actionAngleSpherical(actionAngle):
               a) R,vR,vT,z,vz
               b) Orbit instance: initial condition used if that's it, orbit(t)
                  if there is a time given as well
-           fixed_quad= (False) if True, use n=10 fixed_quad integration
-           scipy.integrate.quadrature keywords
+           c= True/False; overrides the object's c= keyword to use C or not
+           fixed_quad= (False) if True, use n=10 fixed_quad integration (Python only)
+           scipy.integrate.quadrature keywords (Python only)
         OUTPUT:
            (jr,lz,jz)
         HISTORY:
@@ -88,9 +94,22 @@ class actionAngleSpherical(actionAngle):
             vT= nu.array([vT])
             z= nu.array([z])
             vz= nu.array([vz])
-        if self._c: #pragma: no cover
-            pass
+        if self._use_c(**kwargs):
+            if kwargs.has_key('c'): kwargs.pop('c')
+            Lz= R*vT
+            Jz= nu.sqrt((z*vT)**2.+(z*vR-R*vz)**2.+Lz**2.)-nu.fabs(Lz)
+            rperi, rap, Jr, err= actionAngleSpherical_c.actionAngleSpherical_c(\
+                self._pot,R,vR,vT,z,vz)
+            if err != 0: #pragma: no cover
+                raise RuntimeError("C-code for calculation actions failed; try with c=False")
+            #Unbound orbits are handled by the Python code
+            indx= nu.isnan(Jr)
+            if nu.any(indx): #pragma: no cover
+                Jr[indx]= self(R[indx],vR[indx],vT[indx],z[indx],vz[indx],
+                               c=False,fixed_quad=fixed_quad,**kwargs)[0]
+            return (Jr,Lz,Jz)
         else:
+            if kwargs.has_key('c'): kwargs.pop('c')
             Lz= R*vT
             Lx= -z*vT
             Ly= z*vR-R*vz
@@ -126,8 +145,9 @@ class actionAngleSpherical(actionAngle):
               a) R,vR,vT,z,vz
               b) Orbit instance: initial condition used if that's it, orbit(t)
                  if there is a time given as well
-           fixed_quad= (False) if True, use n=10 fixed_quad integration
-           scipy.integrate.quadrature keywords
+           c= True/False; overrides the object's c= keyword to use C or not
+           fixed_quad= (False) if True, use n=10 fixed_quad integration (Python only)
+           scipy.integrate.quadrature keywords (Python only)
         OUTPUT:
             (jr,lz,jz,Omegar,Omegaphi,Omegaz)
         HISTORY:
@@ -155,9 +175,30 @@ class actionAngleSpherical(actionAngle):
             vT= nu.array([vT])
             z= nu.array([z])
             vz= nu.array([vz])
-        if self._c: #pragma: no cover
-            pass
+        if self._use_c(**kwargs):
+            if kwargs.has_key('c'): kwargs.pop('c')
+            Lz= R*vT
+            Jz= nu.sqrt((z*vT)**2.+(z*vR-R*vz)**2.+Lz**2.)-nu.fabs(Lz)
+            rperi, rap, Jr, Or, Op, err= \
+                actionAngleSpherical_c.actionAngleFreqSpherical_c(\
+                self._pot,R,vR,vT,z,vz)
+            if err != 0: #pragma: no cover
+                raise RuntimeError("C-code for calculation actions failed; try with c=False")
+            Oz= copy.copy(Op)
+            Op[vT < 0.]*= -1.
+            #(Close-to-)circular and unbound orbits are handled by Python
+            indx= nu.isnan(Or)
+            if nu.any(indx):
+                pout= self.actionsFreqs(R[indx],vR[indx],vT[indx],z[indx],
+                                        vz[indx],c=False,
+                                        fixed_quad=fixed_quad,**kwargs)
+                Jr[indx]= pout[0]
+                Or[indx]= pout[3]
+                Op[indx]= pout[4]
+                Oz[indx]= pout[5]
+            return (Jr,Lz,Jz,Or,Op,Oz)
         else:
+            if kwargs.has_key('c'): kwargs.pop('c')
             Lz= R*vT
             Lx= -z*vT
             Ly= z*vR-R*vz
@@ -207,8 +248,9 @@ class actionAngleSpherical(actionAngle):
               a) R,vR,vT,z,vz
               b) Orbit instance: initial condition used if that's it, orbit(t)
                  if there is a time given as well
-           fixed_quad= (False) if True, use n=10 fixed_quad integration
-           scipy.integrate.quadrature keywords
+           c= True/False; overrides the object's c= keyword to use C or not
+           fixed_quad= (False) if True, use n=10 fixed_quad integration (Python only)
+           scipy.integrate.quadrature keywords (Python only)
         OUTPUT:
             (jr,lz,jz,Omegar,Omegaphi,Omegaz,ar,aphi,az)
         HISTORY:
@@ -238,9 +280,43 @@ class actionAngleSpherical(actionAngle):
             z= nu.array([z])
             vz= nu.array([vz])
             phi= nu.array([phi])
-        if self._c: #pragma: no cover
-            pass
+        if self._use_c(**kwargs):
+            if kwargs.has_key('c'): kwargs.pop('c')
+            Lz= R*vT
+            L= nu.sqrt((z*vT)**2.+(z*vR-R*vz)**2.+Lz**2.)
+            Jz= L-nu.fabs(Lz)
+            rperi, rap, Jr, Or, Op, ar, az, err= \
+                actionAngleSpherical_c.actionAngleFreqAngleSpherical_c(\
+                self._pot,R,vR,vT,z,vz)
+            if err != 0: #pragma: no cover
+                raise RuntimeError("C-code for calculation actions failed; try with c=False")
+            Oz= copy.copy(Op)
+            Op[vT < 0.]*= -1.
+            #Calculate the longitude of the ascending node
+            axivz= (z*vR-R*vz)/nu.sqrt(R**2.+z**2.)
+            ap= self._calc_long_asc(z,R,axivz,phi,Lz,L)
+            ap[vT < 0.]-= az[vT < 0.]
+            ap[vT >= 0.]+= az[vT >= 0.]
+            ar= ar % (2.*nu.pi)
+            ap= ap % (2.*nu.pi)
+            az= az % (2.*nu.pi)
+            #(Close-to-)circular and unbound orbits are handled by Python
+            indx= nu.isnan(Or)
+            if nu.any(indx):
+                pout= self.actionsFreqsAngles(R[indx],vR[indx],vT[indx],
+                                              z[indx],vz[indx],phi[indx],
+                                              c=False,fixed_quad=fixed_quad,
+                                              **kwargs)
+                Jr[indx]= pout[0]
+                Or[indx]= pout[3]
+                Op[indx]= pout[4]
+                Oz[indx]= pout[5]
+                ar[indx]= pout[6]
+                ap[indx]= pout[7]
+                az[indx]= pout[8]
+            return (Jr,Lz,Jz,Or,Op,Oz,ar,ap,az)
         else:
+            if kwargs.has_key('c'): kwargs.pop('c')
             Lz= R*vT
             Lx= -z*vT
             Ly= z*vR-R*vz
@@ -300,6 +376,15 @@ class actionAngleSpherical(actionAngle):
             return (nu.array(Jr),Jphi,Jz,nu.array(Or),Op,Oz,
                     ar,ap,az)
     
+    def _use_c(self,**kwargs):
+        """Whether to use C, taking into account the c= keyword"""
+        if kwargs.has_key('c') and kwargs['c'] and not self._c \
+                and not (ext_loaded and _check_c(self._pot)): #pragma: no cover
+            warnings.warn("C module not used because potential does not have a C implementation",galpyWarning)
+        return ((self._c and not (kwargs.has_key('c') and not kwargs['c']))\
+                    or (ext_loaded and ((kwargs.has_key('c') and kwargs['c'])))) \
+                    and _check_c(self._pot)
+
     def _calc_jr(self,rperi,rap,E,L,fixed_quad,**kwargs):
         if fixed_quad:
             return integrate.fixed_quad(_JrSphericalIntegrand,
@@ -0,0 +1,122 @@
+import os
+import sys
+import warnings
+import ctypes
+import ctypes.util
+import numpy
+from numpy.ctypeslib import ndpointer
+from galpy.util import galpyWarning
+from galpy.actionAngle_src.actionAngleStaeckel_c import _pot_handle_c, \
+    _free_pot_c
+#Find and load the library
+_lib= None
+outerr= None
+for path in sys.path:
+    try:
+        _lib = ctypes.CDLL(os.path.join(path,'galpy_actionAngle_c.so'))
+    except OSError, e:
+        if os.path.exists(os.path.join(path,'galpy_actionAngle_c.so')): #pragma: no cover
+            outerr= e
+        _lib = None
+    else:
+        break
+if _lib is None: #pragma: no cover
+    if not outerr is None:
+        warnings.warn("actionAngleSpherical_c extension module not loaded, because of error '%s' " % outerr,
+                      galpyWarning)
+    else:
+        warnings.warn("actionAngleSpherical_c extension module not loaded, because galpy_actionAngle_c.so image was not found",
+                      galpyWarning)
+    _ext_loaded= False
+else:
+    _ext_loaded= True
+
+def actionAngleSpherical_c(pot,R,vR,vT,z,vz,order=50):
+    """
+    NAME:
+       actionAngleSpherical_c
+    PURPOSE:
+       Use C to calculate actions in a spherical potential
+    INPUT:
+       pot - Potential or list of such instances
+       R, vR, vT, z, vz - coordinates (arrays)
+       order= (50) order of the Gauss-Legendre integration
+    OUTPUT:
+       (rperi,rap,jr,err)
+       rperi,rap,jr : array, shape (len(R))
+       err - non-zero if error occured
+    """
+    out, err= _actionAngleSpherical_call(\
+        _lib.actionAngleSpherical_actions,pot,R,vR,vT,z,vz,order,3)
+    return out+(err,)
+
+def actionAngleFreqSpherical_c(pot,R,vR,vT,z,vz,order=50):
+    """
+    NAME:
+       actionAngleFreqSpherical_c
+    PURPOSE:
+       Use C to calculate actions and frequencies in a spherical potential
+    INPUT:
+       pot - Potential or list of such instances
+       R, vR, vT, z, vz - coordinates (arrays)
+       order= (50) order of the Gauss-Legendre integration
+    OUTPUT:
+       (rperi,rap,jr,Omegar,Omegaphi,err)
+       rperi,rap,jr,Omegar,Omegaphi : array, shape (len(R)); Omegaphi is always positive; frequencies are NaN for close-to-circular orbits
+       err - non-zero if error occured
+    """
+    out, err= _actionAngleSpherical_call(\
+        _lib.actionAngleSpherical_actionsFreqs,pot,R,vR,vT,z,vz,order,5)
+    return out+(err,)
+
+def actionAngleFreqAngleSpherical_c(pot,R,vR,vT,z,vz,order=50):
+    """
+    NAME:
+       actionAngleFreqAngleSpherical_c
+    PURPOSE:
+       Use C to calculate actions, frequencies, and angles in a spherical potential
+    INPUT:
+       pot - Potential or list of such instances
+       R, vR, vT, z, vz - coordinates (arrays)
+       order= (50) order of the Gauss-Legendre integration
+    OUTPUT:
+       (rperi,rap,jr,Omegar,Omegaphi,angler,anglez,err)
+       rperi,rap,jr,Omegar,Omegaphi,angler,anglez : array, shape (len(R)); Omegaphi is always positive; anglez is the angle in the orbital plane measured from the ascending node, not wrapped to [0,2pi); frequencies and angles are NaN for close-to-circular orbits
+       err - non-zero if error occured
+    """
+    out, err= _actionAngleSpherical_call(\
+        _lib.actionAngleSpherical_actionsFreqsAngles,pot,R,vR,vT,z,vz,order,7)
+    return out+(err,)
+
+def _actionAngleSpherical_call(cfunc,pot,R,vR,vT,z,vz,order,nout):
+    """Run one of the actionAngleSpherical C functions, which all have the same signature up to the number (nout) of output arrays"""
+    #Set up the potential in C, re-using that of a compiledPotential
+    handle, npot, owned= _pot_handle_c(pot)
+
+    #Set up result arrays
+    out= tuple([numpy.empty(len(R)) for ii in range(nout)])
+    err= ctypes.c_int(0)
+
+    #Set up the C code
+    ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
+    cfunc.argtypes= [ctypes.c_int]\
+        +[ndpointer(dtype=numpy.float64,flags=ndarrayFlags)]*5\
+        +[ctypes.c_int,
+          ctypes.c_void_p,
+          ctypes.c_int]\
+        +[ndpointer(dtype=numpy.float64,flags=ndarrayFlags)]*nout\
+        +[ctypes.POINTER(ctypes.c_int)]
+
+    #Array requirements
+    R= numpy.require(R,dtype=numpy.float64,requirements=['C','W'])
+    vR= numpy.require(vR,dtype=numpy.float64,requirements=['C','W'])
+    vT= numpy.require(vT,dtype=numpy.float64,requirements=['C','W'])
+    z= numpy.require(z,dtype=numpy.float64,requirements=['C','W'])
+    vz= numpy.require(vz,dtype=numpy.float64,requirements=['C','W'])
+
+    #Run the C code
+    cfunc(len(R),R,vR,vT,z,vz,
+          ctypes.c_int(npot),handle,ctypes.c_int(order),
+          *(out+(ctypes.byref(err),)))
+    if owned: _free_pot_c(handle,npot)
+    return (out,err.value)
@@ -74,6 +74,7 @@ class actionAngleStaeckel():
               b) Orbit instance: initial condition used if that's it, orbit(t)
                  if there is a time given as well
             c= True/False; overrides the object's c= keyword to use C or not
+           chunksize= (None) if set, process the input in chunks of this many objects in C, to bound the memory used for large inputs
            scipy.integrate.quadrature keywords
         OUTPUT:
            (jr,lz,jz)
@@ -114,7 +115,8 @@ class actionAngleStaeckel():
             else:
                 u0= None
             jr, jz, err= actionAngleStaeckel_c.actionAngleStaeckel_c(\
-                self._pot,self._delta,R,vR,vT,z,vz,u0=u0)
+                self._pot,self._delta,R,vR,vT,z,vz,u0=u0,
+                chunksize=kwargs.get('chunksize',None))
             if err == 0:
                 return (jr,Lz,jz)
             else: #pragma: no cover
@@ -123,6 +125,7 @@ class actionAngleStaeckel():
             if kwargs.has_key('c') and kwargs['c'] and not self._c: #pragma: no cover
                 warnings.warn("C module not used because potential does not have a C implementation",galpyWarning)
             if kwargs.has_key('c'): kwargs.pop('c')
+            if kwargs.has_key('chunksize'): kwargs.pop('chunksize')
             if (len(args) == 5 or len(args) == 6) \
                     and isinstance(args[0],nu.ndarray):
                 ojr= nu.zeros((len(args[0])))
@@ -159,6 +162,7 @@ class actionAngleStaeckel():
               a) R,vR,vT,z,vz
               b) Orbit instance: initial condition used if that's it, orbit(t)
                  if there is a time given as well
+           chunksize= (None) if set, process the input in chunks of this many objects in C, to bound the memory used for large inputs
            scipy.integrate.quadrature keywords
         OUTPUT:
             (jr,lz,jz,Omegar,Omegaphi,Omegaz)
@@ -199,7 +203,8 @@ class actionAngleStaeckel():
             else:
                 u0= None
             jr, jz, Omegar, Omegaphi, Omegaz, err= actionAngleStaeckel_c.actionAngleFreqStaeckel_c(\
-                self._pot,self._delta,R,vR,vT,z,vz,u0=u0)
+                self._pot,self._delta,R,vR,vT,z,vz,u0=u0,
+                chunksize=kwargs.get('chunksize',None))
             # Adjustements for close-to-circular orbits
             indx= nu.isnan(Omegar)*(jr < 10.**-3.)+nu.isnan(Omegaz)*(jz < 10.**-3.) #Close-to-circular and close-to-the-plane orbits
             if nu.sum(indx) > 0:
@@ -227,6 +232,7 @@ class actionAngleStaeckel():
               a) R,vR,vT,z,vz,phi (MUST HAVE PHI)
               b) Orbit instance: initial condition used if that's it, orbit(t)
                  if there is a time given as well
+           chunksize= (None) if set, process the input in chunks of this many objects in C, to bound the memory used for large inputs
            scipy.integrate.quadrature keywords
         OUTPUT:
             (jr,lz,jz,Omegar,Omegaphi,Omegaz,angler,anglephi,anglez)
@@ -269,7 +275,8 @@ class actionAngleStaeckel():
             else:
                 u0= None
             jr, jz, Omegar, Omegaphi, Omegaz, angler, anglephi,anglez, err= actionAngleStaeckel_c.actionAngleFreqAngleStaeckel_c(\
-                self._pot,self._delta,R,vR,vT,z,vz,phi,u0=u0)
+                self._pot,self._delta,R,vR,vT,z,vz,phi,u0=u0,
+                chunksize=kwargs.get('chunksize',None))
             # Adjustements for close-to-circular orbits
             indx= nu.isnan(Omegar)*(jr < 10.**-3.)+nu.isnan(Omegaz)*(jz < 10.**-3.) #Close-to-circular and close-to-the-plane orbits
             if nu.sum(indx) > 0:
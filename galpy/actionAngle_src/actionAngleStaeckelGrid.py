@@ -8,21 +8,28 @@
 #
 #      methods:
 #             __call__: returns (jr,lz,jz)
+#             actionsFreqs: returns (jr,lz,jz,Or,Ophi,Oz)
+#             actionsFreqsAngles: returns (jr,lz,jz,Or,Ophi,Oz,ar,aphi,az)
 #
 ###############################################################################
 import numpy
 from scipy import interpolate, optimize, ndimage
 import actionAngleStaeckel
-from galpy.actionAngle_src.actionAngle import actionAngle
+from galpy.actionAngle_src.actionAngle import actionAngle, \
+    _actionAngleGridCache
 import actionAngleStaeckel_c
 from actionAngleStaeckel_c import _ext_loaded as ext_loaded
 import galpy.potential
 from galpy.util import multi, bovy_coords
 _PRINTOUTSIDEGRID= False
+#Signs of dJRdE,dJRdLz,dJRdI3,dJzdE,dJzdLz,dJzdI3 (for Lz > 0), such that the
+#logarithm of their absolute value can be interpolated
+_DJSIGNS= numpy.array([1.,-1.,-1.,1.,-1.,1.])
 class actionAngleStaeckelGrid():
     """Action-angle formalism for axisymmetric potentials using Binney (2012)'s Staeckel approximation, grid-based interpolation"""
     def __init__(self,pot=None,delta=None,Rmax=5.,
                  nE=25,npsi=25,nLz=30,numcores=1,
+                 cachedir=None,mmap_mode=None,
                  **kwargs):
         """
         NAME:
@@ -40,6 +47,10 @@ class actionAngleStaeckelGrid():
 
            numcores= number of cpus to use to parallellize
 
+           cachedir= (None) if set, directory in which the tables of u0, the actions, and their derivatives are cached, in a directory whose name is a hash of the potential, delta, and the grid specification; later instances with the same potential and grid (in any process) load the tables from this cache rather than computing them
+
+           mmap_mode= (None) if set, memory-map the tables loaded from the cache with this mode (e.g., 'r'; see numpy.load)
+
            +scipy.integrate.quad keywords
         OUTPUT:
         HISTORY:
@@ -68,24 +79,103 @@ class actionAngleStaeckelGrid():
                                   nLz)
         self._Lzmax= self._Lzs[-1]
         self._nLz= nLz
-        #Calculate E_c(R=RL), energy of circular orbit
-        self._RL= numpy.array([galpy.potential.rl(self._pot,l) for l in self._Lzs])
+        self._Ramax= 200./8.
+        y= numpy.linspace(0.,1.,nE)
+        self._nE= nE
+        psis= numpy.linspace(0.,1.,npsi)*numpy.pi/2.
+        self._npsi= npsi
+        #Load the tables from the cache, or calculate them
+        cache= _actionAngleGridCache('actionAngleStaeckelGrid',
+                                     [self._pot,float(self._delta),
+                                      float(self._Rmax),nE,npsi,nLz,
+                                      self._c],
+                                     cachedir,mmap_mode=mmap_mode)
+        if not 'jzFiltered' in cache:
+            self._calc_grid(cache,y,psis,numcores)
+        if self._c and not 'dJFiltered' in cache:
+            self._calc_derivs_grid(cache,psis)
+        cache.save()
+        self._RL= cache['RL']
+        self._ERL= cache['ERL']
+        self._ERa= cache['ERa']
+        self.thisv= cache['v']
+        self._jr= cache['jr']
+        self._jz= cache['jz']
+        self._u0= cache['u0']
+        self._jrLzE= cache['jrLzE']
+        self._jzLzE= cache['jzLzE']
+        self._jrFiltered= cache['jrFiltered']
+        self._jzFiltered= cache['jzFiltered']
+        if self._c: self._dJFiltered= cache['dJFiltered']
+        #Set up the interpolations
         self._RLInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
                                                                  self._RL,k=3)
-        self._ERL= galpy.potential.evaluatePotentials(self._RL,numpy.zeros(self._nLz),self._pot) +self._Lzs**2./2./self._RL**2.
         self._ERLmax= numpy.amax(self._ERL)+1.
         self._ERLInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
                                                                   numpy.log(-(self._ERL-self._ERLmax)),k=3)
-        self._Ramax= 200./8.
-        self._ERa= galpy.potential.evaluatePotentials(self._Ramax,0.,self._pot) +self._Lzs**2./2./self._Ramax**2.
-        #self._EEsc= numpy.array([self._ERL[ii]+galpy.potential.vesc(self._pot,self._RL[ii])**2./4. for ii in range(nLz)])
         self._ERamax= numpy.amax(self._ERa)+1.
         self._ERaInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
                                                                   numpy.log(-(self._ERa-self._ERamax)),k=3)
-        y= numpy.linspace(0.,1.,nE)
-        self._nE= nE
-        psis= numpy.linspace(0.,1.,npsi)*numpy.pi/2.
-        self._npsi= npsi
+        #First interpolate the maxima
+        self._jrLzInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
+                                                                   numpy.log(self._jrLzE+10.**-5.),k=3)
+        self._jzLzInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
+                                                                   numpy.log(self._jzLzE+10.**-5.),k=3)
+        #Interpolate u0
+        self._logu0Interp= interpolate.RectBivariateSpline(self._Lzs,
+                                                           y,
+                                                           numpy.log(self._u0),
+                                                           kx=3,ky=3,s=0.)
+        if self._c: self._setup_c()
+        return None
+
+    def _setup_c(self):
+        """
+        NAME:
+           _setup_c
+        PURPOSE:
+           pack the grid specification and the knots and coefficients of the splines into a single array for the C interpolation
+        INPUT:
+           (none)
+        OUTPUT:
+           (none; sets self._grid_args)
+        """
+        grid_args= [[self._Lzmin,self._Lzmax,self._nLz,self._nE,self._npsi,
+                     self._ERLmax,self._ERamax]]
+        for spl in [self._ERLInterp,self._ERaInterp,
+                    self._jrLzInterp,self._jzLzInterp]:
+            t, c, k= spl._eval_args
+            grid_args.append([len(t)])
+            grid_args.append(t)
+            grid_args.append(numpy.hstack((c,numpy.zeros(len(t)-len(c)))))
+        tx, ty, c= self._logu0Interp.tck
+        grid_args.append([len(tx),len(ty)])
+        grid_args.append(tx)
+        grid_args.append(ty)
+        grid_args.append(c[:(len(tx)-4)*(len(ty)-4)])
+        self._grid_args= numpy.hstack(grid_args).astype(numpy.float64)
+        return None
+
+    def _calc_grid(self,cache,y,psis,numcores):
+        """
+        NAME:
+           _calc_grid
+        PURPOSE:
+           calculate the tables of u0 and the actions on the (Lz,E,psi) grid
+        INPUT:
+           cache - _actionAngleGridCache instance to store the tables in
+           y - grid in the scaled energy
+           psis - grid in psi
+           numcores - number of cpus to use to parallellize
+        OUTPUT:
+           (none; tables are stored in cache)
+        """
+        nLz, nE, npsi= self._nLz, self._nE, self._npsi
+        #Calculate E_c(R=RL), energy of circular orbit
+        RL= galpy.potential.rl(self._pot,self._Lzs)
+        ERL= galpy.potential.evaluatePotentials(RL,numpy.zeros(nLz),self._pot) +self._Lzs**2./2./RL**2.
+        ERa= galpy.potential.evaluatePotentials(self._Ramax,0.,self._pot) +self._Lzs**2./2./self._Ramax**2.
+        #EEsc= numpy.array([ERL[ii]+galpy.potential.vesc(self._pot,RL[ii])**2./4. for ii in range(nLz)])
         jr= numpy.zeros((nLz,nE,npsi))
         jz= numpy.zeros((nLz,nE,npsi))
         u0= numpy.zeros((nLz,nE))
@@ -93,8 +183,8 @@ class actionAngleStaeckelGrid():
         jzLzE= numpy.zeros((nLz))
         #First calculate u0
         thisLzs= (numpy.tile(self._Lzs,(nE,1)).T).flatten()
-        thisERL= (numpy.tile(self._ERL,(nE,1)).T).flatten()
-        thisERa= (numpy.tile(self._ERa,(nE,1)).T).flatten()
+        thisERL= (numpy.tile(ERL,(nE,1)).T).flatten()
+        thisERa= (numpy.tile(ERa,(nE,1)).T).flatten()
         thisy= (numpy.tile(y,(nLz,1))).flatten()
         thisE= _invEfunc(_Efunc(thisERa,thisERL)+thisy*(_Efunc(thisERL,thisERL)-_Efunc(thisERa,thisERL)),thisERL)
         if isinstance(self._pot,galpy.potential.interpRZPotential) and hasattr(self._pot,'_origPot'):
@@ -120,7 +210,7 @@ class actionAngleStaeckelGrid():
         thisv= numpy.reshape(self.vatu0(thisE.flatten(),thisLzs.flatten(),
                                         u0.flatten(),
                                         thisR.flatten()),(nLz,nE))
-        self.thisv= thisv
+        cache['v']= thisv
         #reshape
         thisLzs= numpy.reshape(thisLzs,(nLz,nE))
         thispsi= numpy.tile(psis,(nLz,nE,1)).flatten()
@@ -161,24 +251,66 @@ class actionAngleStaeckelGrid():
         #Deal w/ NaN
         jr[numpy.isnan(jr)]= 0.
         jz[numpy.isnan(jz)]= 0.
-        #First interpolate the maxima
-        self._jr= jr
-        self._jz= jz
-        self._u0= u0
-        self._jrLzE= jrLzE
-        self._jzLzE= jzLzE
-        self._jrLzInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
-                                                                   numpy.log(jrLzE+10.**-5.),k=3)
-        self._jzLzInterp= interpolate.InterpolatedUnivariateSpline(self._Lzs,
-                                                                   numpy.log(jzLzE+10.**-5.),k=3)
-        #Interpolate u0
-        self._logu0Interp= interpolate.RectBivariateSpline(self._Lzs,
-                                                           y,
-                                                           numpy.log(u0),
-                                                           kx=3,ky=3,s=0.)
+        cache['RL']= RL
+        cache['ERL']= ERL
+        cache['ERa']= ERa
+        cache['jr']= jr
+        cache['jz']= jz
+        cache['u0']= u0
+        cache['jrLzE']= jrLzE
+        cache['jzLzE']= jzLzE
         #spline filter jr and jz, such that they can be used with ndimage.map_coordinates
-        self._jrFiltered= ndimage.spline_filter(numpy.log(self._jr+10.**-10.),order=3)
-        self._jzFiltered= ndimage.spline_filter(numpy.log(self._jz+10.**-10.),order=3)
+        cache['jrFiltered']= ndimage.spline_filter(numpy.log(jr+10.**-10.),order=3)
+        cache['jzFiltered']= ndimage.spline_filter(numpy.log(jz+10.**-10.),order=3)
+        return None
+
+    def _calc_derivs_grid(self,cache,psis):
+        """
+        NAME:
+           _calc_derivs_grid
+        PURPOSE:
+           calculate the table of the derivatives of the actions wrt the integrals of motion (E,Lz,I3) on the (Lz,E,psi) grid, from which the frequencies and angles are interpolated
+        INPUT:
+           cache - _actionAngleGridCache instance that holds the u0 and v tables; the new table is stored in it as well
+           psis - grid in psi
+        OUTPUT:
+           (none; table is stored in cache)
+        """
+        nLz, nE, npsi= self._nLz, self._nE, self._npsi
+        thisR= self._delta*numpy.sinh(cache['u0'])
+        thisR= numpy.tile(thisR.T,(npsi,1,1)).T.flatten()
+        thisv= numpy.tile(cache['v'].T,(npsi,1,1)).T.flatten()
+        thisLzs= numpy.tile(self._Lzs,(npsi,nE,1)).T.flatten()
+        thispsi= numpy.tile(psis,(nLz,nE,1)).flatten()
+        out= actionAngleStaeckel_c.actionAngleStaeckel_derivs_c(\
+            self._pot,self._delta,
+            thisR, #R
+            thisv*numpy.cos(thispsi), #vR
+            thisLzs/thisR, #vT
+            numpy.zeros(len(thisR)), #z
+            thisv*numpy.sin(thispsi)) #vz
+        dJ= numpy.reshape(numpy.array(out[:6]),(6,nLz,nE,npsi))
+        #The derivatives are undefined for (close-to-)circular orbits in R 
+        #or z (set to zero) and for failures; replace these by the nearest
+        #valid value
+        invalid= numpy.zeros(dJ.shape,dtype='bool')
+        for ii in [0,3]:
+            tinvalid= True-numpy.isfinite(dJ[ii:ii+3])
+            tinvalid+= (dJ[ii:ii+3] == 9999.99)
+            tinvalid+= (_DJSIGNS[ii:ii+3,None,None,None]*dJ[ii:ii+3] <= 0.)
+            invalid[ii:ii+3]= numpy.any(tinvalid,axis=0)
+        dJFiltered= numpy.empty(dJ.shape)
+        for ii in range(6):
+            if numpy.any(invalid[ii]) and not numpy.all(invalid[ii]):
+                indx= ndimage.distance_transform_edt(invalid[ii],
+                                                     return_distances=False,
+                                                     return_indices=True)
+                dJ[ii]= dJ[ii][tuple(indx)]
+            #spline filter log |dJ|, such that it can be used with 
+            #ndimage.map_coordinates and the C interpolation
+            dJFiltered[ii]= ndimage.spline_filter(numpy.log(_DJSIGNS[ii]*dJ[ii]),
+                                                  order=3)
+        cache['dJFiltered']= dJFiltered
         return None
 
     def __call__(self,*args,**kwargs):
@@ -190,12 +322,17 @@ class actionAngleStaeckelGrid():
         INPUT:
            Either:
               R,vR,vT,z,vz
+           c= True/False; overrides the object's c= keyword to use C to interpolate the actions or not
            scipy.integrate.quadrature keywords (for off-the-grid calcs)
         OUTPUT:
            (jr,lz,jz)
         HISTORY:
            2012-11-29 - Written - Bovy (IAS)
         """
+        if kwargs.has_key('c'):
+            usec= kwargs.pop('c') and self._c
+        else:
+            usec= self._c
         if len(args) == 5: #R,vR.vT, z, vz
             R,vR,vT, z, vz= args
         elif len(args) == 6: #R,vR.vT, z, vz, phi
@@ -207,6 +344,22 @@ class actionAngleStaeckelGrid():
             vT= meta._vT
             z= meta._z
             vz= meta._vz
+        if usec and isinstance(R,numpy.ndarray):
+            jr, jz, indx, err= actionAngleStaeckel_c.actionAngleStaeckelGrid_c(\
+                self._pot,self._delta,R,vR,vT,z,vz,self._grid_args,
+                self._jrFiltered,self._jzFiltered)
+            if numpy.sum(indx) > 0:
+                jrindiv, lzindiv, jzindiv= self._aA(R[indx],
+                                                    vR[indx],
+                                                    vT[indx],
+                                                    z[indx],
+                                                    vz[indx],
+                                                    **kwargs)
+                jr[indx]= jrindiv
+                jz[indx]= jzindiv
+            jr[jr < 0.]= 0.
+            jz[jz < 0.]= 0.
+            return (jr,R*vT,jz)
         Lz= R*vT
         Phi= galpy.potential.evaluatePotentials(R,z,self._pot)
         E= Phi+vR**2./2.+vT**2./2.+vz**2./2.
@@ -301,12 +454,154 @@ class actionAngleStaeckelGrid():
                             numpy.array([vT]),
                             numpy.array([z]),
                             numpy.array([vz]),
-                            **kwargs)
+                            c=usec,**kwargs)
             return (jr[0],Lz[0],jz[0])
         jr[jr < 0.]= 0.
         jz[jz < 0.]= 0.
         return (jr,R*vT,jz)
 
+    def actionsFreqs(self,*args,**kwargs):
+        """
+        NAME:
+           actionsFreqs
+        PURPOSE:
+           evaluate the actions and frequencies (jr,lz,jz,Omegar,Omegaphi,Omegaz) by interpolating the actions and their derivatives on the grid (if c=False, these are computed using actionAngleStaeckel)
+        INPUT:
+           Either:
+              a) R,vR,vT,z,vz
+              b) Orbit instance: initial condition used if that's it, orbit(t)
+                 if there is a time given as well
+           scipy.integrate.quadrature keywords (for off-the-grid calcs)
+        OUTPUT:
+            (jr,lz,jz,Omegar,Omegaphi,Omegaz)
+        """
+        if not self._c:
+            return self._aA.actionsFreqs(*args,**kwargs)
+        if len(args) == 5: #R,vR.vT, z, vz
+            R,vR,vT, z, vz= args
+        elif len(args) == 6: #R,vR.vT, z, vz, phi
+            R,vR,vT, z, vz, phi= args
+        else:
+            meta= actionAngle(*args)
+            R= meta._R
+            vR= meta._vR
+            vT= meta._vT
+            z= meta._z
+            vz= meta._vz
+        if isinstance(R,float):
+            R= numpy.array([R])
+            vR= numpy.array([vR])
+            vT= numpy.array([vT])
+            z= numpy.array([z])
+            vz= numpy.array([vz])
+        jr, jz, dJ, indx= self._actionsDerivs_c(R,vR,vT,z,vz)
+        indxc= True-indx
+        Omegar= numpy.empty(len(R))
+        Omegaphi= numpy.empty(len(R))
+        Omegaz= numpy.empty(len(R))
+        #Frequencies from the derivatives of the actions wrt (E,Lz,I3)
+        detA= dJ[0,indxc]*dJ[5,indxc]-dJ[3,indxc]*dJ[2,indxc]
+        Omegar[indxc]= dJ[5,indxc]/detA
+        Omegaz[indxc]= -dJ[2,indxc]/detA
+        Omegaphi[indxc]= (dJ[2,indxc]*dJ[4,indxc]-dJ[5,indxc]*dJ[1,indxc])/detA
+        if numpy.sum(indx) > 0:
+            jrindiv, lzindiv, jzindiv, Orindiv, Ophiindiv, Ozindiv=\
+                self._aA.actionsFreqs(R[indx],vR[indx],vT[indx],
+                                      z[indx],vz[indx],**kwargs)
+            jr[indx]= jrindiv
+            jz[indx]= jzindiv
+            Omegar[indx]= Orindiv
+            Omegaphi[indx]= Ophiindiv
+            Omegaz[indx]= Ozindiv
+        return (jr,R*vT,jz,Omegar,Omegaphi,Omegaz)
+
+    def actionsFreqsAngles(self,*args,**kwargs):
+        """
+        NAME:
+           actionsFreqsAngles
+        PURPOSE:
+           evaluate the actions, frequencies, and angles 
+           (jr,lz,jz,Omegar,Omegaphi,Omegaz,angler,anglephi,anglez) by interpolating the actions and their derivatives on the grid (if c=False, these are computed using actionAngleStaeckel); the angles still require the turning points of each orbit, but not the integrals over the whole orbit
+        INPUT:
+           Either:
+              a) R,vR,vT,z,vz,phi (MUST HAVE PHI)
+              b) Orbit instance: initial condition used if that's it, orbit(t)
+                 if there is a time given as well
+           scipy.integrate.quadrature keywords (for off-the-grid calcs)
+        OUTPUT:
+            (jr,lz,jz,Omegar,Omegaphi,Omegaz,angler,anglephi,anglez)
+        """
+        if not self._c:
+            return self._aA.actionsFreqsAngles(*args,**kwargs)
+        if len(args) == 5: #R,vR.vT, z, vz pragma: no cover
+            raise IOError("Must specify phi")
+        elif len(args) == 6: #R,vR.vT, z, vz, phi
+            R,vR,vT, z, vz, phi= args
+        else:
+            meta= actionAngle(*args)
+            R= meta._R
+            vR= meta._vR
+            vT= meta._vT
+            z= meta._z
+            vz= meta._vz
+            phi= meta._phi
+        if isinstance(R,float):
+            R= numpy.array([R])
+            vR= numpy.array([vR])
+            vT= numpy.array([vT])
+            z= numpy.array([z])
+            vz= numpy.array([vz])
+            phi= numpy.array([phi])
+        jr, jz, dJ, indx= self._actionsDerivs_c(R,vR,vT,z,vz)
+        indxc= True-indx
+        Omegar= numpy.empty(len(R))
+        Omegaphi= numpy.empty(len(R))
+        Omegaz= numpy.empty(len(R))
+        angler= numpy.empty(len(R))
+        anglephi= numpy.empty(len(R))
+        anglez= numpy.empty(len(R))
+        if numpy.sum(indxc) > 0:
+            Omegar[indxc], Omegaphi[indxc], Omegaz[indxc], \
+                angler[indxc], anglephi[indxc], anglez[indxc], err= \
+                actionAngleStaeckel_c.actionAngleFreqAngleFromDerivsStaeckel_c(\
+                self._pot,self._delta,R[indxc],vR[indxc],vT[indxc],
+                z[indxc],vz[indxc],phi[indxc],dJ[:,indxc])
+            if err != 0: #pragma: no cover
+                raise RuntimeError("C-code for calculation actions failed")
+        if numpy.sum(indx) > 0:
+            jrindiv, lzindiv, jzindiv, Orindiv, Ophiindiv, Ozindiv,\
+                arindiv, aphiindiv, azindiv=\
+                self._aA.actionsFreqsAngles(R[indx],vR[indx],vT[indx],
+                                            z[indx],vz[indx],phi[indx],
+                                            **kwargs)
+            jr[indx]= jrindiv
+            jz[indx]= jzindiv
+            Omegar[indx]= Orindiv
+            Omegaphi[indx]= Ophiindiv
+            Omegaz[indx]= Ozindiv
+            angler[indx]= arindiv
+            anglephi[indx]= aphiindiv
+            anglez[indx]= azindiv
+        return (jr,R*vT,jz,Omegar,Omegaphi,Omegaz,angler,anglephi,anglez)
+
+    def _actionsDerivs_c(self,R,vR,vT,z,vz):
+        """
+        NAME:
+           _actionsDerivs_c
+        PURPOSE:
+           interpolate the actions and their derivatives wrt (E,Lz,I3) on the grid using C
+        INPUT:
+           R,vR,vT,z,vz - coordinates (arrays)
+        OUTPUT:
+           (jr,jz,dJ,offgrid); dJ has shape (6,len(R)) and holds (dJRdE,dJRdLz,dJRdI3,dJzdE,dJzdLz,dJzdI3); only jr, jz, and dJ of objects on the grid are set
+        """
+        jr, jz, dJ, indx, err= actionAngleStaeckel_c.actionAngleStaeckelGrid_c(\
+            self._pot,self._delta,R,vR,vT,z,vz,self._grid_args,
+            self._jrFiltered,self._jzFiltered,dJFiltered=self._dJFiltered)
+        indxc= True-indx
+        dJ[:,indxc]= _DJSIGNS[:,None]*numpy.exp(dJ[:,indxc])
+        return (jr,jz,dJ,indx)
+
     def Jz(self,*args,**kwargs):
         """
         NAME:
@@ -6,7 +6,7 @@ import ctypes.util
 import numpy
 from numpy.ctypeslib import ndpointer
 from galpy.util import galpyWarning
-from galpy.orbit_src.integrateFullOrbit import _parse_pot
+from galpy.orbit_src.integrateFullOrbit import _parse_pot, _get_compiled
 from galpy.util import bovy_coords
 #Find and load the library
 _lib= None
@@ -31,7 +31,8 @@ if _lib is None: #pragma: no cover
 else:
     _ext_loaded= True
 
-def actionAngleStaeckel_c(pot,delta,R,vR,vT,z,vz,u0=None):
+def actionAngleStaeckel_c(pot,delta,R,vR,vT,z,vz,u0=None,
+                          chunksize=None,out=None):
     """
     NAME:
        actionAngleStaeckel_c
@@ -40,7 +41,10 @@ def actionAngleStaeckel_c(pot,delta,R,vR,vT,z,vz,u0=None):
     INPUT:
        pot - Potential or list of such instances
        delta - focal length of prolate spheroidal coordinates
-       R, vR, vT, z, vz - coordinates (arrays)
+       R, vR, vT, z, vz - coordinates (arrays, can be memory-mapped)
+       u0= (None) if set, u0 to use
+       chunksize= (None) if set, process the inputs in chunks of this many objects, such that the scratch memory used by the C code does not grow with the size of the input
+       out= (None) if set, tuple of arrays (jr,jz) to write the output to (e.g., memory-mapped arrays)
     OUTPUT:
        (jr,jz,err)
        jr,jz : array, shape (len(R))
@@ -48,75 +52,10 @@ def actionAngleStaeckel_c(pot,delta,R,vR,vT,z,vz,u0=None):
     HISTORY:
        2012-12-01 - Written - Bovy (IAS)
     """
-    if u0 is None:
-        u0, dummy= bovy_coords.Rz_to_uv(R,z,delta=delta)
-    #Parse the potential
-    npot, pot_type, pot_args= _parse_pot(pot,potforactions=True)
-
-    #Set up result arrays
-    jr= numpy.empty(len(R))
-    jz= numpy.empty(len(R))
-    err= ctypes.c_int(0)
-
-    #Set up the C code
-    ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
-    actionAngleStaeckel_actionsFunc= _lib.actionAngleStaeckel_actions
-    actionAngleStaeckel_actionsFunc.argtypes= [ctypes.c_int,
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ctypes.c_int,
-                               ndpointer(dtype=numpy.int32,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ctypes.c_double,
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ctypes.POINTER(ctypes.c_int)]
-
-    #Array requirements, first store old order
-    f_cont= [R.flags['F_CONTIGUOUS'],
-             vR.flags['F_CONTIGUOUS'],
-             vT.flags['F_CONTIGUOUS'],
-             z.flags['F_CONTIGUOUS'],
-             vz.flags['F_CONTIGUOUS'],
-             u0.flags['F_CONTIGUOUS']]
-    R= numpy.require(R,dtype=numpy.float64,requirements=['C','W'])
-    vR= numpy.require(vR,dtype=numpy.float64,requirements=['C','W'])
-    vT= numpy.require(vT,dtype=numpy.float64,requirements=['C','W'])
-    z= numpy.require(z,dtype=numpy.float64,requirements=['C','W'])
-    vz= numpy.require(vz,dtype=numpy.float64,requirements=['C','W'])
-    u0= numpy.require(u0,dtype=numpy.float64,requirements=['C','W'])
-    jr= numpy.require(jr,dtype=numpy.float64,requirements=['C','W'])
-    jz= numpy.require(jz,dtype=numpy.float64,requirements=['C','W'])
-
-    #Run the C code
-    actionAngleStaeckel_actionsFunc(len(R),
-                                    R,
-                                    vR,
-                                    vT,
-                                    z,
-                                    vz,
-                                    u0,
-                                    ctypes.c_int(npot),
-                                    pot_type,
-                                    pot_args,
-                                    ctypes.c_double(delta),
-                                    jr,
-                                    jz,
-                                    ctypes.byref(err))
-
-    #Reset input arrays
-    if f_cont[0]: R= numpy.asfortranarray(R)
-    if f_cont[1]: vR= numpy.asfortranarray(vR)
-    if f_cont[2]: vT= numpy.asfortranarray(vT)
-    if f_cont[3]: z= numpy.asfortranarray(z)
-    if f_cont[4]: vz= numpy.asfortranarray(vz)
-    if f_cont[5]: u0= numpy.asfortranarray(u0)
-
-    return (jr,jz,err.value)
+    out, err= _actionAngleStaeckel_chunked(\
+        _lib.actionAngleStaeckel_actions,pot,delta,[R,vR,vT,z,vz],u0,
+        2,chunksize,out)
+    return out+(err,)
 
 def actionAngleStaeckel_calcu0(E,Lz,pot,delta):
     """
@@ -135,8 +74,8 @@ def actionAngleStaeckel_calcu0(E,Lz,pot,delta):
     HISTORY:
        2012-12-03 - Written - Bovy (IAS)
     """
-    #Parse the potential
-    npot, pot_type, pot_args= _parse_pot(pot,potforactions=True)
+    #Set up the potential in C, re-using that of a compiledPotential
+    handle, npot, owned= _pot_handle_c(pot)
 
     #Set up result arrays
     u0= numpy.empty(len(E))
@@ -149,8 +88,7 @@ def actionAngleStaeckel_calcu0(E,Lz,pot,delta):
                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                ctypes.c_int,
-                               ndpointer(dtype=numpy.int32,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                               ctypes.c_void_p,
                                ctypes.c_double,
                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                ctypes.POINTER(ctypes.c_int)]
@@ -167,11 +105,11 @@ def actionAngleStaeckel_calcu0(E,Lz,pot,delta):
                                     E,
                                     Lz,
                                     ctypes.c_int(npot),
-                                    pot_type,
-                                    pot_args,
+                                    handle,
                                     ctypes.c_double(delta),
                                     u0,
                                     ctypes.byref(err))
+    if owned: _free_pot_c(handle,npot)
 
     #Reset input arrays
     if f_cont[0]: E= numpy.asfortranarray(E)
@@ -179,7 +117,8 @@ def actionAngleStaeckel_calcu0(E,Lz,pot,delta):
 
     return (u0,err.value)
 
-def actionAngleFreqStaeckel_c(pot,delta,R,vR,vT,z,vz,u0=None):
+def actionAngleFreqStaeckel_c(pot,delta,R,vR,vT,z,vz,u0=None,
+                              chunksize=None,out=None):
     """
     NAME:
        actionAngleFreqStaeckel_c
@@ -189,7 +128,10 @@ def actionAngleFreqStaeckel_c(pot,delta,R,vR,vT,z,vz,u0=None):
     INPUT:
        pot - Potential or list of such instances
        delta - focal length of prolate spheroidal coordinates
-       R, vR, vT, z, vz - coordinates (arrays)
+       R, vR, vT, z, vz - coordinates (arrays, can be memory-mapped)
+       u0= (None) if set, u0 to use
+       chunksize= (None) if set, process the inputs in chunks of this many objects, such that the scratch memory used by the C code does not grow with the size of the input
+       out= (None) if set, tuple of arrays (jr,jz,Omegar,Omegaphi,Omegaz) to write the output to (e.g., memory-mapped arrays)
     OUTPUT:
        (jr,jz,Omegar,Omegaphi,Omegaz,err)
        jr,jz,Omegar,Omegaphi,Omegaz : array, shape (len(R))
@@ -197,205 +139,295 @@ def actionAngleFreqStaeckel_c(pot,delta,R,vR,vT,z,vz,u0=None):
     HISTORY:
        2013-08-23 - Written - Bovy (IAS)
     """
-    if u0 is None:
-        u0, dummy= bovy_coords.Rz_to_uv(R,z,delta=delta)
-    #Parse the potential
-    npot, pot_type, pot_args= _parse_pot(pot,potforactions=True)
+    out, err= _actionAngleStaeckel_chunked(\
+        _lib.actionAngleStaeckel_actionsFreqs,pot,delta,[R,vR,vT,z,vz],u0,
+        5,chunksize,out)
+    return out+(err,)
+
+def actionAngleFreqAngleStaeckel_c(pot,delta,R,vR,vT,z,vz,phi,u0=None,
+                                   chunksize=None,out=None):
+    """
+    NAME:
+       actionAngleFreqAngleStaeckel_c
+    PURPOSE:
+       Use C to calculate actions, frequencies, and angles
+       using the Staeckel approximation
+    INPUT:
+       pot - Potential or list of such instances
+       delta - focal length of prolate spheroidal coordinates
+       R, vR, vT, z, vz, phi - coordinates (arrays, can be memory-mapped)
+       u0= (None) if set, u0 to use
+       chunksize= (None) if set, process the inputs in chunks of this many objects, such that the scratch memory used by the C code does not grow with the size of the input
+       out= (None) if set, tuple of arrays (jr,jz,Omegar,Omegaphi,Omegaz,Angler,Anglephi,Anglez) to write the output to (e.g., memory-mapped arrays)
+    OUTPUT:
+       (jr,jz,Omegar,Omegaphi,Omegaz,Angler,Anglephi,Anglez,err)
+       jr,jz,Omegar,Omegaphi,Omegaz,Angler,Anglephi,Anglez : array, shape (len(R))
+       err - non-zero if error occured
+    """
+    out, err= _actionAngleStaeckel_chunked(\
+        _lib.actionAngleStaeckel_actionsFreqsAngles,pot,delta,
+        [R,vR,vT,z,vz],u0,8,chunksize,out,phi=phi)
+    return out+(err,)
+
+def actionAngleStaeckelGrid_c(pot,delta,R,vR,vT,z,vz,grid_args,
+                              jrFiltered,jzFiltered,dJFiltered=None):
+    """
+    NAME:
+       actionAngleStaeckelGrid_c
+    PURPOSE:
+       interpolate the Staeckel actions on the grid of an actionAngleStaeckelGrid object using C, in a single pass over the input
+    INPUT:
+       pot - Potential or list of such instances
+       delta - focal length of prolate spheroidal coordinates
+       R, vR, vT, z, vz - coordinates (arrays)
+       grid_args - grid specification and spline coefficients (see actionAngleStaeckelGrid._setup_c)
+       jrFiltered, jzFiltered - spline-filtered grids of log jr and log jz (can be memory-mapped)
+       dJFiltered= (None) if set, spline-filtered grids of the derivatives (dJRdE,dJRdLz,dJRdI3,dJzdE,dJzdLz,dJzdI3), shape (6,nLz,nE,npsi), to also interpolate these
+    OUTPUT:
+       (jr,jz,offgrid,err) or (jr,jz,dJ,offgrid,err) if dJFiltered is set
+       jr,jz : array, shape (len(R)); only set where offgrid is False
+       dJ : array, shape (6,len(R)), interpolated derivatives; only set where offgrid is False
+       offgrid : boolean array, True for objects that are off the grid
+       err - non-zero if error occured
+    """
+    #Set up the potential in C, re-using that of a compiledPotential
+    handle, npot, owned= _pot_handle_c(pot)
 
     #Set up result arrays
     jr= numpy.empty(len(R))
     jz= numpy.empty(len(R))
-    Omegar= numpy.empty(len(R))
-    Omegaphi= numpy.empty(len(R))
-    Omegaz= numpy.empty(len(R))
+    if dJFiltered is None:
+        nderivs= 0
+        dJFiltered= numpy.zeros(1)
+        dJ= numpy.zeros(1)
+    else:
+        nderivs= len(dJFiltered)
+        dJ= numpy.empty((nderivs,len(R)))
+    offgrid= numpy.empty(len(R),dtype=numpy.int32)
     err= ctypes.c_int(0)
 
     #Set up the C code
     ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
-    actionAngleStaeckel_actionsFunc= _lib.actionAngleStaeckel_actionsFreqs
-    actionAngleStaeckel_actionsFunc.argtypes= [ctypes.c_int,
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+    actionAngleStaeckelGrid_actionsFunc= _lib.actionAngleStaeckelGrid_actions
+    actionAngleStaeckelGrid_actionsFunc.argtypes= [ctypes.c_int,
                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                ctypes.c_int,
-                               ndpointer(dtype=numpy.int32,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                               ctypes.c_void_p,
                                ctypes.c_double,
                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                               ndpointer(dtype=numpy.float64,flags=('C_CONTIGUOUS',)),
+                               ndpointer(dtype=numpy.float64,flags=('C_CONTIGUOUS',)),
+                               ctypes.c_int,
+                               ndpointer(dtype=numpy.float64,flags=('C_CONTIGUOUS',)),
                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
                                ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                               ndpointer(dtype=numpy.int32,flags=ndarrayFlags),
                                ctypes.POINTER(ctypes.c_int)]
 
-    #Array requirements, first store old order
-    f_cont= [R.flags['F_CONTIGUOUS'],
-             vR.flags['F_CONTIGUOUS'],
-             vT.flags['F_CONTIGUOUS'],
-             z.flags['F_CONTIGUOUS'],
-             vz.flags['F_CONTIGUOUS'],
-             u0.flags['F_CONTIGUOUS']]
+    #Array requirements; the (possibly memory-mapped) grids are only copied
+    #if they are not C-contiguous float64 arrays
     R= numpy.require(R,dtype=numpy.float64,requirements=['C','W'])
     vR= numpy.require(vR,dtype=numpy.float64,requirements=['C','W'])
     vT= numpy.require(vT,dtype=numpy.float64,requirements=['C','W'])
     z= numpy.require(z,dtype=numpy.float64,requirements=['C','W'])
     vz= numpy.require(vz,dtype=numpy.float64,requirements=['C','W'])
-    u0= numpy.require(u0,dtype=numpy.float64,requirements=['C','W'])
-    jr= numpy.require(jr,dtype=numpy.float64,requirements=['C','W'])
-    jz= numpy.require(jz,dtype=numpy.float64,requirements=['C','W'])
-    Omegar= numpy.require(Omegar,dtype=numpy.float64,requirements=['C','W'])
-    Omegaphi= numpy.require(Omegaphi,dtype=numpy.float64,
-                            requirements=['C','W'])
-    Omegaz= numpy.require(Omegaz,dtype=numpy.float64,requirements=['C','W'])
+    grid_args= numpy.require(grid_args,dtype=numpy.float64,
+                             requirements=['C','W'])
+    jrFiltered= numpy.require(jrFiltered,dtype=numpy.float64,
+                              requirements=['C'])
+    jzFiltered= numpy.require(jzFiltered,dtype=numpy.float64,
+                              requirements=['C'])
+    dJFiltered= numpy.require(dJFiltered,dtype=numpy.float64,
+                              requirements=['C'])
 
     #Run the C code
-    actionAngleStaeckel_actionsFunc(len(R),
-                                    R,
-                                    vR,
-                                    vT,
-                                    z,
-                                    vz,
-                                    u0,
-                                    ctypes.c_int(npot),
-                                    pot_type,
-                                    pot_args,
-                                    ctypes.c_double(delta),
-                                    jr,
-                                    jz,
-                                    Omegar,
-                                    Omegaphi,
-                                    Omegaz,
-                                    ctypes.byref(err))
+    actionAngleStaeckelGrid_actionsFunc(len(R),
+                                        R,
+                                        vR,
+                                        vT,
+                                        z,
+                                        vz,
+                                        ctypes.c_int(npot),
+                                        handle,
+                                        ctypes.c_double(delta),
+                                        grid_args,
+                                        jrFiltered,
+                                        jzFiltered,
+                                        ctypes.c_int(nderivs),
+                                        dJFiltered,
+                                        jr,
+                                        jz,
+                                        dJ,
+                                        offgrid,
+                                        ctypes.byref(err))
+    if owned: _free_pot_c(handle,npot)
 
-    #Reset input arrays
-    if f_cont[0]: R= numpy.asfortranarray(R)
-    if f_cont[1]: vR= numpy.asfortranarray(vR)
-    if f_cont[2]: vT= numpy.asfortranarray(vT)
-    if f_cont[3]: z= numpy.asfortranarray(z)
-    if f_cont[4]: vz= numpy.asfortranarray(vz)
-    if f_cont[5]: u0= numpy.asfortranarray(u0)
+    if nderivs == 0:
+        return (jr,jz,offgrid.astype(bool),err.value)
+    else:
+        return (jr,jz,dJ,offgrid.astype(bool),err.value)
 
-    return (jr,jz,Omegar,Omegaphi,Omegaz,err.value)
+def actionAngleStaeckel_derivs_c(pot,delta,R,vR,vT,z,vz,u0=None,
+                                 chunksize=None,out=None):
+    """
+    NAME:
+       actionAngleStaeckel_derivs_c
+    PURPOSE:
+       Use C to calculate the derivatives of the actions wrt the integrals of motion (E,Lz,I3) using the Staeckel approximation
+    INPUT:
+       pot - Potential or list of such instances
+       delta - focal length of prolate spheroidal coordinates
+       R, vR, vT, z, vz - coordinates (arrays, can be memory-mapped)
+       u0= (None) if set, u0 to use
+       chunksize= (None) if set, process the inputs in chunks of this many objects
+       out= (None) if set, tuple of arrays (dJRdE,dJRdLz,dJRdI3,dJzdE,dJzdLz,dJzdI3) to write the output to
+    OUTPUT:
+       (dJRdE,dJRdLz,dJRdI3,dJzdE,dJzdLz,dJzdI3,err)
+       dJRdE,dJRdLz,dJRdI3,dJzdE,dJzdLz,dJzdI3 : array, shape (len(R))
+       err - non-zero if error occured
+    """
+    out, err= _actionAngleStaeckel_chunked(\
+        _lib.actionAngleStaeckel_derivs,pot,delta,[R,vR,vT,z,vz],u0,
+        6,chunksize,out)
+    return out+(err,)
 
-def actionAngleFreqAngleStaeckel_c(pot,delta,R,vR,vT,z,vz,phi,u0=None):
+def actionAngleFreqAngleFromDerivsStaeckel_c(pot,delta,R,vR,vT,z,vz,phi,
+                                             dJ,u0=None,
+                                             chunksize=None,out=None):
     """
     NAME:
-       actionAngleFreqAngleStaeckel_c
+       actionAngleFreqAngleFromDerivsStaeckel_c
     PURPOSE:
-       Use C to calculate actions, frequencies, and angles
-       using the Staeckel approximation
+       Use C to calculate frequencies and angles using the Staeckel approximation, given the derivatives of the actions wrt the integrals of motion (e.g., interpolated on a grid); this avoids the integrals for the actions and their derivatives over the whole orbit
     INPUT:
        pot - Potential or list of such instances
        delta - focal length of prolate spheroidal coordinates
-       R, vR, vT, z, vz, phi - coordinates (arrays)
+       R, vR, vT, z, vz, phi - coordinates (arrays, can be memory-mapped)
+       dJ - derivatives (dJRdE,dJRdLz,dJRdI3,dJzdE,dJzdLz,dJzdI3), each an array with shape (len(R))
+       u0= (None) if set, u0 to use
+       chunksize= (None) if set, process the inputs in chunks of this many objects
+       out= (None) if set, tuple of arrays (Omegar,Omegaphi,Omegaz,Angler,Anglephi,Anglez) to write the output to
     OUTPUT:
-       (jr,jz,Omegar,Omegaphi,Omegaz,Angler,Anglephi,Anglez,err)
-       jr,jz,Omegar,Omegaphi,Omegaz,Angler,Anglephi,Anglez : array, shape (len(R))
+       (Omegar,Omegaphi,Omegaz,Angler,Anglephi,Anglez,err)
+       Omegar,Omegaphi,Omegaz,Angler,Anglephi,Anglez : array, shape (len(R))
        err - non-zero if error occured
-    HISTORY:
-       2013-08-27 - Written - Bovy (IAS)
     """
-    if u0 is None:
-        u0, dummy= bovy_coords.Rz_to_uv(R,z,delta=delta)
-    #Parse the potential
-    npot, pot_type, pot_args= _parse_pot(pot,potforactions=True)
+    out, err= _actionAngleStaeckel_chunked(\
+        _lib.actionAngleStaeckel_freqsAnglesFromDerivs,pot,delta,
+        [R,vR,vT,z,vz],u0,6,chunksize,out,phi=phi,extra=dJ)
+    return out+(err,)
 
-    #Set up result arrays
-    jr= numpy.empty(len(R))
-    jz= numpy.empty(len(R))
-    Omegar= numpy.empty(len(R))
-    Omegaphi= numpy.empty(len(R))
-    Omegaz= numpy.empty(len(R))
-    Angler= numpy.empty(len(R))
-    Anglephi= numpy.empty(len(R))
-    Anglez= numpy.empty(len(R))
-    err= ctypes.c_int(0)
+def _actionAngleStaeckel_chunked(cfunc,pot,delta,inputs,u0,nout,
+                                 chunksize,out,phi=None,extra=None):
+    """
+    NAME:
+       _actionAngleStaeckel_chunked
+    PURPOSE:
+       run one of the C Staeckel functions over the input in chunks; only the current chunk of the inputs is copied (if it is not already a C-contiguous float64 array) and the output is written directly into the output arrays when possible, such that the memory used is set by the chunk size
+    INPUT:
+       cfunc - C function to run
+       pot - Potential or list of such instances
+       delta - focal length of prolate spheroidal coordinates
+       inputs - [R,vR,vT,z,vz]
+       u0 - u0 to use (None: computed from R,z)
+       nout - number of outputs of cfunc
+       chunksize - number of objects per chunk (None: all at once)
+       out - tuple of nout output arrays (None: allocated here)
+       phi= (None) azimuth, used to compute the azimuthal angle (the second-to-last output)
+       extra= (None) list of additional input arrays, passed after delta
+    OUTPUT:
+       (tuple of output arrays,err)
+    """
+    ndata= len(inputs[0])
+    if chunksize is None or chunksize > ndata: chunksize= max(ndata,1)
+    if out is None:
+        out= tuple([numpy.empty(ndata) for ii in range(nout)])
+    elif len(out) != nout:
+        raise ValueError("out= needs to be a tuple of %i arrays" % nout)
+    if not u0 is None:
+        u0= numpy.atleast_1d(u0)
+    if extra is None: extra= []
+    #Set up the potential in C, re-using that of a compiledPotential
+    handle, npot, owned= _pot_handle_c(pot)
 
     #Set up the C code
     ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
-    actionAngleStaeckel_actionsFunc= _lib.actionAngleStaeckel_actionsFreqsAngles
-    actionAngleStaeckel_actionsFunc.argtypes= [ctypes.c_int,
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ctypes.c_int,
-                               ndpointer(dtype=numpy.int32,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ctypes.c_double,
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
-                               ctypes.POINTER(ctypes.c_int)]
+    cfunc.argtypes= [ctypes.c_int]\
+        +[ndpointer(dtype=numpy.float64,flags=ndarrayFlags)
+          for ii in range(6)]\
+        +[ctypes.c_int,
+          ctypes.c_void_p,
+          ctypes.c_double]\
+        +[ndpointer(dtype=numpy.float64,flags=ndarrayFlags)
+          for ii in range(len(extra)+nout)]\
+        +[ctypes.POINTER(ctypes.c_int)]
 
-    #Array requirements, first store old order
-    f_cont= [R.flags['F_CONTIGUOUS'],
-             vR.flags['F_CONTIGUOUS'],
-             vT.flags['F_CONTIGUOUS'],
-             z.flags['F_CONTIGUOUS'],
-             vz.flags['F_CONTIGUOUS'],
-             u0.flags['F_CONTIGUOUS']]
-    R= numpy.require(R,dtype=numpy.float64,requirements=['C','W'])
-    vR= numpy.require(vR,dtype=numpy.float64,requirements=['C','W'])
-    vT= numpy.require(vT,dtype=numpy.float64,requirements=['C','W'])
-    z= numpy.require(z,dtype=numpy.float64,requirements=['C','W'])
-    vz= numpy.require(vz,dtype=numpy.float64,requirements=['C','W'])
-    u0= numpy.require(u0,dtype=numpy.float64,requirements=['C','W'])
-    jr= numpy.require(jr,dtype=numpy.float64,requirements=['C','W'])
-    jz= numpy.require(jz,dtype=numpy.float64,requirements=['C','W'])
-    Omegar= numpy.require(Omegar,dtype=numpy.float64,requirements=['C','W'])
-    Omegaphi= numpy.require(Omegaphi,dtype=numpy.float64,
-                            requirements=['C','W'])
-    Omegaz= numpy.require(Omegaz,dtype=numpy.float64,requirements=['C','W'])
-    Angler= numpy.require(Angler,dtype=numpy.float64,requirements=['C','W'])
-    Anglephi= numpy.require(Anglephi,dtype=numpy.float64,
-                            requirements=['C','W'])
-    Anglez= numpy.require(Anglez,dtype=numpy.float64,requirements=['C','W'])
+    err= ctypes.c_int(0)
+    outerr= 0
+    for start in range(0,ndata,chunksize):
+        end= min(start+chunksize,ndata)
+        #Array requirements, this only copies the current chunk
+        R, vR, vT, z, vz= [numpy.require(x[start:end],dtype=numpy.float64,
+                                         requirements=['C','W'])
+                           for x in inputs]
+        if u0 is None:
+            tu0= bovy_coords.Rz_to_uv(R,z,delta=delta)[0]
+        else:
+            tu0= u0[start:end]
+        tu0= numpy.require(tu0,dtype=numpy.float64,requirements=['C','W'])
+        textra= [numpy.require(x[start:end],dtype=numpy.float64,
+                               requirements=['C','W']) for x in extra]
+        #Write directly into the output arrays if possible
+        tout= [o[start:end] for o in out]
+        tout= [o if (o.dtype == numpy.float64 and o.flags['C_CONTIGUOUS']
+                     and o.flags['WRITEABLE'])
+               else numpy.empty(end-start) for o in tout]
 
-    #Run the C code
-    actionAngleStaeckel_actionsFunc(len(R),
-                                    R,
-                                    vR,
-                                    vT,
-                                    z,
-                                    vz,
-                                    u0,
-                                    ctypes.c_int(npot),
-                                    pot_type,
-                                    pot_args,
-                                    ctypes.c_double(delta),
-                                    jr,
-                                    jz,
-                                    Omegar,
-                                    Omegaphi,
-                                    Omegaz,
-                                    Angler,
-                                    Anglephi,
-                                    Anglez,
-                                    ctypes.byref(err))
+        #Run the C code
+        cfunc(end-start,R,vR,vT,z,vz,tu0,
+              ctypes.c_int(npot),handle,ctypes.c_double(delta),
+              *(textra+tout+[ctypes.byref(err)]))
+        if err.value != 0: outerr= err.value
 
-    #Reset input arrays
-    if f_cont[0]: R= numpy.asfortranarray(R)
-    if f_cont[1]: vR= numpy.asfortranarray(vR)
-    if f_cont[2]: vT= numpy.asfortranarray(vT)
-    if f_cont[3]: z= numpy.asfortranarray(z)
-    if f_cont[4]: vz= numpy.asfortranarray(vz)
-    if f_cont[5]: u0= numpy.asfortranarray(u0)
-    
-    badAngle = Anglephi != 9999.99
-    Anglephi[badAngle]= (Anglephi[badAngle] + phi[badAngle] % (2.*numpy.pi)) % (2.*numpy.pi)
-    Anglephi[Anglephi < 0.]+= 2.*numpy.pi
+        if not phi is None:
+            Anglephi= tout[nout-2]
+            tphi= numpy.asarray(phi[start:end])
+            badAngle = Anglephi != 9999.99
+            Anglephi[badAngle]= (Anglephi[badAngle] + tphi[badAngle] % (2.*numpy.pi)) % (2.*numpy.pi)
+            Anglephi[Anglephi < 0.]+= 2.*numpy.pi
+        for o,to in zip(out,tout):
+            if not numpy.may_share_memory(o,to):
+                o[start:end]= to
+    if owned: _free_pot_c(handle,npot)
+    return (out,outerr)
+
+def _compile_pot_c(npot,pot_type,pot_args):
+    """Set up the C structures of a potential parsed for the actionAngle code, such that they can be re-used; returns a handle"""
+    ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
+    compileFunc= _lib.compile_actionAngleArgs
+    compileFunc.argtypes= [ctypes.c_int,
+                           ndpointer(dtype=numpy.int32,flags=ndarrayFlags),
+                           ndpointer(dtype=numpy.float64,flags=ndarrayFlags)]
+    compileFunc.restype= ctypes.c_void_p
+    return ctypes.c_void_p(compileFunc(ctypes.c_int(npot),pot_type,pot_args))
 
-    return (jr,jz,Omegar,Omegaphi,Omegaz,Angler,
-            Anglephi,Anglez,err.value)
+def _free_pot_c(handle,npot):
+    """Free the C structures set up by _compile_pot_c"""
+    freeFunc= _lib.free_actionAngleArgs
+    freeFunc.argtypes= [ctypes.c_int,ctypes.c_void_p]
+    freeFunc(ctypes.c_int(npot),handle)
+    return None
 
+def _pot_handle_c(pot):
+    """Return (handle,npot,owned) for the C structures of pot, re-using those of a compiledPotential; owned structures need to be freed with _free_pot_c when they are no longer needed"""
+    compiled= _get_compiled(pot)
+    if not compiled is None:
+        handle, npot, ncopies= compiled._c_handle('actions')
+        return (handle,npot,False)
+    npot, pot_type, pot_args= _parse_pot(pot,potforactions=True)
+    return (_compile_pot_c(npot,pot_type,pot_args),npot,True)
@@ -19,9 +19,13 @@ void parse_actionAngleArgs(int npot,
 			   int * pot_type,
 			   double * pot_args){
   int ii,jj,kk;
-  int nR, nz;
+  int nR, nz, gridtype;
+  int nwargs;
+  int * wrapped_type;
   double * Rgrid, * zgrid, * potGrid_splinecoeffs;
   for (ii=0; ii < npot; ii++){
+    potentialArgs->nwrapped= 0;
+    potentialArgs->wrappedPotentialArg= NULL;
     switch ( *pot_type++ ) {
     case 0: //LogarithmicHaloPotential, 3 arguments
       potentialArgs->potentialEval= &LogarithmicHaloPotentialEval;
@@ -68,7 +72,8 @@ void parse_actionAngleArgs(int npot,
     case 11: //DoubleExponentialDiskPotential, XX arguments
       potentialArgs->potentialEval= &DoubleExponentialDiskPotentialEval;
       //Look at pot_args to figure out the number of arguments
-      potentialArgs->nargs= (int) (8 + 2 * *(pot_args+5) + 4 * ( *(pot_args+4) + 1));
+      potentialArgs->nargs= (int) (8 + 2 * *(pot_args+5) + 4 * ( *(pot_args+4) + 1 )
+				   + 4 * *(pot_args+4) * *(pot_args+5));
       potentialArgs->i2d= NULL;
       potentialArgs->accx= NULL;
       potentialArgs->accy= NULL;
@@ -82,8 +87,21 @@ void parse_actionAngleArgs(int npot,
       break;     
     case 13: //interpRZPotential, XX arguments
       //Grab the grids and the coefficients
+      gridtype= (int) *pot_args++;
       nR= (int) *pot_args++;
       nz= (int) *pot_args++;
+      if ( gridtype == 1 ) {
+	//Non-uniform grid: knots and coefficients of the spline
+	potentialArgs->i2d= interp_2d_alloc(nR-4,nz-4);
+	interp_2d_init_knots(potentialArgs->i2d,pot_args,pot_args+nR,
+			     pot_args+nR+nz);
+	pot_args+= nR+nz+(nR-4)*(nz-4);
+	potentialArgs->accx= gsl_interp_accel_alloc ();
+	potentialArgs->accy= gsl_interp_accel_alloc ();
+	potentialArgs->potentialEval= &interpRZPotentialEval;
+	potentialArgs->nargs= 2;
+	break;
+      }
       Rgrid= (double *) malloc ( nR * sizeof ( double ) );
       zgrid= (double *) malloc ( nz * sizeof ( double ) );
       potGrid_splinecoeffs= (double *) malloc ( nR * nz * sizeof ( double ) );
@@ -120,6 +138,61 @@ void parse_actionAngleArgs(int npot,
       potentialArgs->accx= NULL;
       potentialArgs->accy= NULL;
       break;
+    case 16: //interp3DPotential, 12 + nx*nz*nphi arguments
+      potentialArgs->potentialEval= &interp3DPotentialEval;
+      potentialArgs->nargs= 12 + (int) *(pot_args+5) * (int) *(pot_args+6)
+	* (int) *(pot_args+7);
+      potentialArgs->i2d= NULL;
+      potentialArgs->accx= NULL;
+      potentialArgs->accy= NULL;
+      break;
+    case 17: //SCFPotential, 4 + 2*N*L*L arguments
+      potentialArgs->potentialEval= &SCFPotentialEval;
+      potentialArgs->nargs= 4 + 2 * (int) *(pot_args+2) * (int) *(pot_args+3)
+	* (int) *(pot_args+3);
+      potentialArgs->i2d= NULL;
+      potentialArgs->accx= NULL;
+      potentialArgs->accy= NULL;
+      break;
+    case 18: //BurkertPotential, 2 arguments
+      potentialArgs->potentialEval= &BurkertPotentialEval;
+      potentialArgs->nargs= 2;
+      potentialArgs->i2d= NULL;
+      potentialArgs->accx= NULL;
+      potentialArgs->accy= NULL;
+      break;
+    case 19: //RazorThinExponentialDiskPotential, 3 + 2*glorder arguments
+      potentialArgs->potentialEval= &RazorThinExponentialDiskPotentialEval;
+      potentialArgs->nargs= 3 + 2 * (int) *(pot_args+2);
+      potentialArgs->i2d= NULL;
+      potentialArgs->accx= NULL;
+      potentialArgs->accy= NULL;
+      break;
+    case 20: //MovingObjectPotential, 4 + nt + 12*(nt-1) arguments
+      potentialArgs->potentialEval= &MovingObjectPotentialEval;
+      potentialArgs->nargs= 4 + (int) *(pot_args+3)
+	+ 12 * ( (int) *(pot_args+3) - 1 );
+      potentialArgs->i2d= NULL;
+      potentialArgs->accx= NULL;
+      potentialArgs->accy= NULL;
+      break;
+    case 22: //TimeDependentWrapperPotential, 7 + nwrapped + nwargs arguments
+      potentialArgs->nwrapped= (int) *pot_args++;
+      wrapped_type= (int *) malloc ( potentialArgs->nwrapped * sizeof(int) );
+      for (kk=0; kk < potentialArgs->nwrapped; kk++)
+	*(wrapped_type+kk)= (int) *pot_args++;
+      nwargs= (int) *pot_args++;
+      potentialArgs->wrappedPotentialArg= (struct potentialArg *) calloc ( potentialArgs->nwrapped, sizeof (struct potentialArg) );
+      parse_actionAngleArgs(potentialArgs->nwrapped,potentialArgs->wrappedPotentialArg,
+                            wrapped_type,pot_args);
+      pot_args+= nwargs;
+      free(wrapped_type);
+      potentialArgs->potentialEval= &TimeDependentWrapperPotentialEval;
+      potentialArgs->nargs= 5;
+      potentialArgs->i2d= NULL;
+      potentialArgs->accx= NULL;
+      potentialArgs->accy= NULL;
+      break;
     }
     potentialArgs->args= (double *) malloc( potentialArgs->nargs * sizeof(double));
     for (jj=0; jj < potentialArgs->nargs; jj++){
@@ -131,3 +204,30 @@ void parse_actionAngleArgs(int npot,
   }
   potentialArgs-= npot;
 }
+/*
+  Set up the potentials once, such that they can be used by all of the
+  actionAngle functions (and re-used across calls); free the returned
+  structures with free_actionAngleArgs
+*/
+struct potentialArg * compile_actionAngleArgs(int npot,
+					      int * pot_type,
+					      double * pot_args){
+  struct potentialArg * actionAngleArgs= (struct potentialArg *) malloc ( npot * sizeof (struct potentialArg) );
+  parse_actionAngleArgs(npot,actionAngleArgs,pot_type,pot_args);
+  return actionAngleArgs;
+}
+void free_actionAngleArgs(int npot,
+			  struct potentialArg * actionAngleArgs){
+  int ii;
+  for (ii=0; ii < npot; ii++) {
+    if ( (actionAngleArgs+ii)->i2d )
+      interp_2d_free((actionAngleArgs+ii)->i2d) ;
+    if ((actionAngleArgs+ii)->accx )
+      gsl_interp_accel_free ((actionAngleArgs+ii)->accx);
+    if ((actionAngleArgs+ii)->accy )
+      gsl_interp_accel_free ((actionAngleArgs+ii)->accy);
+    free_wrappedPotentialArgs(actionAngleArgs+ii);
+    free((actionAngleArgs+ii)->args);
+  }
+  free(actionAngleArgs);
+}
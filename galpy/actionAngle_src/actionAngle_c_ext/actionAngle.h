@@ -37,4 +37,6 @@ struct pragmasolver{
 */
 double evaluatePotentials(double,double,int, struct potentialArg *);
 void parse_actionAngleArgs(int,struct potentialArg *,int *,double *);
+struct potentialArg * compile_actionAngleArgs(int,int *,double *);
+void free_actionAngleArgs(int,struct potentialArg *);
 #endif /* actionAngle.h */
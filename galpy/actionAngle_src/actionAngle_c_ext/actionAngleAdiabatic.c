@@ -39,7 +39,7 @@ struct JzAdiabaticArg{
   Function Declarations
 */
 void actionAngleAdiabatic_actions(int,double *,double *,double *,double *,
-				 double *,int,int *,double *,double,
+				 double *,int,struct potentialArg *,double,
 				 double *,double *,int *);
 void calcJRAdiabatic(int,double *,double *,double *,double *,double *,
 		     int,struct potentialArg *,int);
@@ -92,16 +92,12 @@ void actionAngleAdiabatic_actions(int ndata,
 				  double *z,
 				  double *vz,
 				  int npot,
-				  int * pot_type,
-				  double * pot_args,
+				  struct potentialArg * actionAngleArgs,
 				  double gamma,
 				  double *jr,
 				  double *jz,
 				  int * err){
   int ii;
-  //Set up the potentials
-  struct potentialArg * actionAngleArgs= (struct potentialArg *) malloc ( npot * sizeof (struct potentialArg) );
-  parse_actionAngleArgs(npot,actionAngleArgs,pot_type,pot_args);
   //ER, Ez, Lz
   double *ER= (double *) malloc ( ndata * sizeof(double) );
   double *Ez= (double *) malloc ( ndata * sizeof(double) );
@@ -123,16 +119,6 @@ void actionAngleAdiabatic_actions(int ndata,
   }
   calcRapRperi(ndata,rperi,rap,R,ER,Lz,npot,actionAngleArgs);
   calcJRAdiabatic(ndata,jr,rperi,rap,ER,Lz,npot,actionAngleArgs,10);
-  for (ii=0; ii < npot; ii++) {
-    if ( (actionAngleArgs+ii)->i2d )
-      interp_2d_free((actionAngleArgs+ii)->i2d) ;
-    if ((actionAngleArgs+ii)->accx )
-      gsl_interp_accel_free ((actionAngleArgs+ii)->accx);
-    if ((actionAngleArgs+ii)->accy )
-      gsl_interp_accel_free ((actionAngleArgs+ii)->accy);
-    free((actionAngleArgs+ii)->args);
-  }
-  free(actionAngleArgs);
   free(ER);
   free(Ez);
   free(Lz);
@@ -0,0 +1,433 @@
+/*
+  C code for the actionAngleSpherical calculations: pericenter and apocenter
+  radii, actions, frequencies, and angles of orbits in spherical potentials
+
+  All integrals over the radial motion are calculated in terms of theta, with
+  r = rm - rd cos(theta), rm = (rap+rperi)/2, rd = (rap-rperi)/2, which
+  removes the inverse-square-root singularities at the turning points, such
+  that fixed-order Gauss-Legendre integration converges quickly
+*/
+#include <stdio.h>
+#include <stdlib.h>
+#include <math.h>
+#include <gsl/gsl_math.h>
+#include <gsl/gsl_errno.h>
+#include <gsl/gsl_roots.h>
+#include <gsl/gsl_integration.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+#define CHUNKSIZE 10
+//Potentials
+#include <galpy_potentials.h>
+#include <actionAngle.h>
+#ifndef M_PI
+#define M_PI 3.14159265358979323846
+#endif
+/*
+  Structure Declarations
+*/
+struct JRSphericalArg{
+  double E;
+  double L;
+  double rm;
+  double rd;
+  int nargs;
+  struct potentialArg * actionAngleArgs;
+};
+/*
+  Function Declarations
+*/
+void actionAngleSpherical_actions(int,double *,double *,double *,double *,
+				  double *,int,struct potentialArg *,int,double *,
+				  double *,double *,int *);
+void actionAngleSpherical_actionsFreqs(int,double *,double *,double *,
+				       double *,double *,int,struct potentialArg *,
+				       int,double *,double *,double *,
+				       double *,double *,int *);
+void actionAngleSpherical_actionsFreqsAngles(int,double *,double *,double *,
+					     double *,double *,int,struct potentialArg *,
+					     int,double *,double *,
+					     double *,double *,double *,
+					     double *,double *,int *);
+void calcRperiRapSpherical(int,double *,double *,double *,double *,double *,
+			   double *,int,struct potentialArg *);
+double JRSphericalIntegrandSquared(double,void *);
+double JRSphericalIntegrand(double,void *);
+double TRSphericalIntegrand(double,void *);
+double ISphericalIntegrand(double,void *);
+double evaluatePotentials(double,double,int, struct potentialArg *);
+/*
+  Actual functions, inlines first
+*/
+static inline void calcELSpherical(int ndata,
+				   double *R,
+				   double *vR,
+				   double *vT,
+				   double *z,
+				   double *vz,
+				   double *r,
+				   double *vr,
+				   double *E,
+				   double *L,
+				   int nargs,
+				   struct potentialArg * actionAngleArgs){
+  int ii;
+  double Lx, Ly, Lz;
+  UNUSED int chunk= CHUNKSIZE;
+#pragma omp parallel for schedule(static,chunk) private(ii,Lx,Ly,Lz)
+  for (ii=0; ii < ndata; ii++){
+    *(r+ii)= sqrt( *(R+ii) * *(R+ii) + *(z+ii) * *(z+ii) );
+    *(vr+ii)= ( *(R+ii) * *(vR+ii) + *(z+ii) * *(vz+ii) ) / *(r+ii);
+    Lz= *(R+ii) * *(vT+ii);
+    Lx= - *(z+ii) * *(vT+ii);
+    Ly= *(z+ii) * *(vR+ii) - *(R+ii) * *(vz+ii);
+    *(L+ii)= sqrt( Lx * Lx + Ly * Ly + Lz * Lz );
+    *(E+ii)= evaluatePotentials(*(r+ii),0.,nargs,actionAngleArgs)
+      + 0.5 * *(vr+ii) * *(vr+ii)
+      + 0.5 * *(L+ii) * *(L+ii) / *(r+ii) / *(r+ii);
+  }
+}
+static inline double solveRperiRapSpherical(gsl_root_fsolver * s,
+					    gsl_function * F,
+					    double r_lo,double r_hi,
+					    int * status){
+  int iter= 0, max_iter= 100;
+  *status= gsl_root_fsolver_set (s,F,r_lo,r_hi);
+  if ( *status == GSL_EINVAL ) return 0.;
+  do
+    {
+      iter++;
+      *status = gsl_root_fsolver_iterate (s);
+      r_lo = gsl_root_fsolver_x_lower (s);
+      r_hi = gsl_root_fsolver_x_upper (s);
+      *status = gsl_root_test_interval (r_lo, r_hi,
+				       9.9999999999999998e-13,
+				       4.4408920985006262e-16);
+    }
+  while (*status == GSL_CONTINUE && iter < max_iter);
+  return gsl_root_fsolver_root (s);
+}
+/*
+  MAIN FUNCTIONS
+ */
+void actionAngleSpherical_actions(int ndata,
+				  double *R,
+				  double *vR,
+				  double *vT,
+				  double *z,
+				  double *vz,
+				  int npot,
+				  struct potentialArg * actionAngleArgs,
+				  int order,
+				  double *rperi,
+				  double *rap,
+				  double *jr,
+				  int * err){
+  actionAngleSpherical_actionsFreqsAngles(ndata,R,vR,vT,z,vz,
+					  npot,actionAngleArgs,order,
+					  rperi,rap,jr,NULL,NULL,NULL,NULL,err);
+}
+void actionAngleSpherical_actionsFreqs(int ndata,
+				       double *R,
+				       double *vR,
+				       double *vT,
+				       double *z,
+				       double *vz,
+				       int npot,
+				       struct potentialArg * actionAngleArgs,
+				       int order,
+				       double *rperi,
+				       double *rap,
+				       double *jr,
+				       double *Omegar,
+				       double *Omegaphi,
+				       int * err){
+  actionAngleSpherical_actionsFreqsAngles(ndata,R,vR,vT,z,vz,
+					  npot,actionAngleArgs,order,
+					  rperi,rap,jr,Omegar,Omegaphi,
+					  NULL,NULL,err);
+}
+/*
+  Calculate the actions, and, if Omegar != NULL, the frequencies, and, if
+  Angler != NULL, the angles; Omegaphi is the frequency of the motion in the
+  orbital plane (the sign for retrograde orbits and the longitude of the
+  ascending node are left to the caller), and Anglez is the angle in the
+  orbital plane measured from the ascending node. Orbits for which the
+  radial action is too small to calculate the frequencies this way or for
+  which apocenter could not be found have NaN frequencies and angles
+  (and NaN radial actions in the latter case)
+*/
+void actionAngleSpherical_actionsFreqsAngles(int ndata,
+					     double *R,
+					     double *vR,
+					     double *vT,
+					     double *z,
+					     double *vz,
+					     int npot,
+					     struct potentialArg * actionAngleArgs,
+					     int order,
+					     double *rperi,
+					     double *rap,
+					     double *jr,
+					     double *Omegar,
+					     double *Omegaphi,
+					     double *Angler,
+					     double *Anglez,
+					     int * err){
+  int ii, tid, nthreads;
+#ifdef _OPENMP
+  nthreads = omp_get_max_threads();
+#else
+  nthreads = 1;
+#endif
+  double Tr, I, Tpart, Ipart, thetar, sinpsi, psi, vtheta, wz;
+  //E,L
+  double *r= (double *) malloc ( ndata * sizeof(double) );
+  double *vr= (double *) malloc ( ndata * sizeof(double) );
+  double *E= (double *) malloc ( ndata * sizeof(double) );
+  double *L= (double *) malloc ( ndata * sizeof(double) );
+  calcELSpherical(ndata,R,vR,vT,z,vz,r,vr,E,L,npot,actionAngleArgs);
+  //Calculate peri- and apocenters
+  calcRperiRapSpherical(ndata,rperi,rap,r,vr,E,L,npot,actionAngleArgs);
+  //Setup integrator
+  gsl_function * JRInt= (gsl_function *) malloc ( nthreads * sizeof(gsl_function) );
+  struct JRSphericalArg * params= (struct JRSphericalArg *) malloc ( nthreads * sizeof (struct JRSphericalArg) );
+  for (tid=0; tid < nthreads; tid++){
+    (params+tid)->nargs= npot;
+    (params+tid)->actionAngleArgs= actionAngleArgs;
+    (JRInt+tid)->params = params+tid;
+  }
+  gsl_integration_glfixed_table * T= gsl_integration_glfixed_table_alloc (order);
+  UNUSED int chunk= CHUNKSIZE;
+#pragma omp parallel for schedule(dynamic,chunk)			\
+  private(tid,ii,Tr,I,Tpart,Ipart,thetar,sinpsi,psi,vtheta,wz)
+  for (ii=0; ii < ndata; ii++){
+#ifdef _OPENMP
+    tid= omp_get_thread_num();
+#else
+    tid = 0;
+#endif
+    if ( *(rap+ii) == -9999.99 ){
+      *(jr+ii)= NAN;
+      if ( Omegar ) {
+	*(Omegar+ii)= NAN;
+	*(Omegaphi+ii)= NAN;
+      }
+      if ( Angler ) {
+	*(Angler+ii)= NAN;
+	*(Anglez+ii)= NAN;
+      }
+      continue;
+    }
+    (params+tid)->E= *(E+ii);
+    (params+tid)->L= *(L+ii);
+    (params+tid)->rm= 0.5 * ( *(rap+ii) + *(rperi+ii) );
+    (params+tid)->rd= 0.5 * ( *(rap+ii) - *(rperi+ii) );
+    //Radial action
+    (JRInt+tid)->function = &JRSphericalIntegrand;
+    *(jr+ii)= gsl_integration_glfixed (JRInt+tid,0.,M_PI,T) / M_PI;
+    if ( ! Omegar ) continue;
+    if ( *(jr+ii) < 0.000000001 ) { //close-to-circular orbit
+      *(Omegar+ii)= NAN;
+      *(Omegaphi+ii)= NAN;
+      if ( Angler ) {
+	*(Angler+ii)= NAN;
+	*(Anglez+ii)= NAN;
+      }
+      continue;
+    }
+    //Radial period and azimuthal period integrals over half an orbit
+    (JRInt+tid)->function = &TRSphericalIntegrand;
+    Tr= gsl_integration_glfixed (JRInt+tid,0.,M_PI,T);
+    (JRInt+tid)->function = &ISphericalIntegrand;
+    I= gsl_integration_glfixed (JRInt+tid,0.,M_PI,T);
+    *(Omegar+ii)= M_PI / Tr;
+    *(Omegaphi+ii)= *(L+ii) * I / Tr;
+    if ( ! Angler ) continue;
+    //Angles, from the integrals from pericenter to the current radius
+    thetar= ( (params+tid)->rm - *(r+ii) ) / (params+tid)->rd;
+    if ( thetar > 1. ) thetar= 1.;
+    else if ( thetar < -1. ) thetar= -1.;
+    thetar= acos(thetar);
+    (JRInt+tid)->function = &TRSphericalIntegrand;
+    Tpart= gsl_integration_glfixed (JRInt+tid,0.,thetar,T);
+    (JRInt+tid)->function = &ISphericalIntegrand;
+    Ipart= gsl_integration_glfixed (JRInt+tid,0.,thetar,T);
+    *(Angler+ii)= *(Omegar+ii) * Tpart;
+    wz= *(L+ii) * Ipart;
+    if ( *(vr+ii) < 0. ) {
+      *(Angler+ii)= 2. * M_PI - *(Angler+ii);
+      wz= 2. * *(L+ii) * I - wz;
+    }
+    //Angle in the orbital plane, from the ascending node
+    vtheta= ( *(z+ii) * *(vR+ii) - *(R+ii) * *(vz+ii) ) / *(r+ii);
+    sinpsi= *(z+ii) / *(r+ii) / sin(acos( *(R+ii) * *(vT+ii) / *(L+ii) ));
+    if ( sinpsi > 1. && sinpsi < 1.0000001 ) sinpsi= 1.;
+    if ( sinpsi < -1. && sinpsi > -1.0000001 ) sinpsi= -1.;
+    psi= asin(sinpsi);
+    if ( vtheta > 0. ) psi= M_PI - psi;
+    psi= fmod(psi,2.*M_PI);
+    if ( psi < 0. ) psi+= 2.*M_PI;
+    *(Anglez+ii)= -wz + psi + *(Omegaphi+ii) / *(Omegar+ii) * *(Angler+ii);
+  }
+  //Free
+  free(r);
+  free(vr);
+  free(E);
+  free(L);
+  free(JRInt);
+  free(params);
+  gsl_integration_glfixed_table_free ( T );
+  *err= 0;
+}
+void calcRperiRapSpherical(int ndata,
+			   double * rperi,
+			   double * rap,
+			   double * r,
+			   double * vr,
+			   double * E,
+			   double * L,
+			   int nargs,
+			   struct potentialArg * actionAngleArgs){
+  int ii, tid, nthreads;
+#ifdef _OPENMP
+  nthreads = omp_get_max_threads();
+#else
+  nthreads = 1;
+#endif
+  double peps, meps, r_lo, r_hi;
+  int status;
+  gsl_function * JRRoot= (gsl_function *) malloc ( nthreads * sizeof(gsl_function) );
+  struct JRSphericalArg * params= (struct JRSphericalArg *) malloc ( nthreads * sizeof (struct JRSphericalArg) );
+  //Setup solver
+  const gsl_root_fsolver_type *T;
+  struct pragmasolver *s= (struct pragmasolver *) malloc ( nthreads * sizeof (struct pragmasolver) );
+  T = gsl_root_fsolver_brent;
+  for (tid=0; tid < nthreads; tid++){
+    (params+tid)->nargs= nargs;
+    (params+tid)->actionAngleArgs= actionAngleArgs;
+    (JRRoot+tid)->function = &JRSphericalIntegrandSquared;
+    (JRRoot+tid)->params = params+tid;
+    (s+tid)->s= gsl_root_fsolver_alloc (T);
+  }
+  UNUSED int chunk= CHUNKSIZE;
+  gsl_set_error_handler_off();
+#pragma omp parallel for schedule(dynamic,chunk)		\
+  private(tid,ii,status,r_lo,r_hi,meps,peps)
+  for (ii=0; ii < ndata; ii++){
+#ifdef _OPENMP
+    tid= omp_get_thread_num();
+#else
+    tid = 0;
+#endif
+    (params+tid)->E= *(E+ii);
+    (params+tid)->L= *(L+ii);
+    //private variables are not initialized when entering the parallel region
+    peps= 0.;
+    meps= 0.;
+    r_lo= *(r+ii);
+    r_hi= *(r+ii);
+    if ( *(vr+ii) == 0. ) { //we are at pericenter or apocenter
+      peps= GSL_FN_EVAL(JRRoot+tid,*(r+ii) * 1.000001);
+      meps= GSL_FN_EVAL(JRRoot+tid,*(r+ii) * 0.999999);
+      if ( peps <= 0. && meps <= 0. ) { //circular
+	*(rperi+ii)= *(r+ii);
+	*(rap+ii)= *(r+ii);
+	continue;
+      }
+      else if ( peps > 0. ) { //pericenter
+	*(rperi+ii)= *(r+ii);
+	r_lo= *(r+ii) * 1.000001;
+      }
+      else { //apocenter
+	*(rap+ii)= *(r+ii);
+	r_hi= *(r+ii) * 0.999999;
+      }
+    }
+    if ( *(vr+ii) != 0. || meps > 0. ) {
+      //Find pericenter, first bracket it
+      r_hi= ( *(vr+ii) == 0. ) ? r_hi : *(r+ii);
+      r_lo= 0.5 * r_hi;
+      while ( GSL_FN_EVAL(JRRoot+tid,r_lo) > 0. && r_lo > 0.000000001 ){
+	r_hi= r_lo;
+	r_lo*= 0.5;
+      }
+      if ( r_lo <= 0.000000001 ) *(rperi+ii)= 0.;
+      else {
+	*(rperi+ii)= solveRperiRapSpherical((s+tid)->s,JRRoot+tid,
+					    r_lo,r_hi,&status);
+	if ( status == GSL_EINVAL ) *(rperi+ii)= r_hi;
+      }
+    }
+    if ( *(vr+ii) != 0. || peps > 0. ) {
+      //Find apocenter, first bracket it
+      r_lo= ( *(vr+ii) == 0. ) ? *(r+ii) * 1.000001 : *(r+ii);
+      r_hi= 2. * r_lo;
+      while ( GSL_FN_EVAL(JRRoot+tid,r_hi) > 0. ){
+	if ( r_hi > 100. ) break; //Orbit seems to be unbound
+	r_lo= r_hi;
+	r_hi*= 2.;
+      }
+      if ( r_hi > 100. ) *(rap+ii)= -9999.99;
+      else {
+	*(rap+ii)= solveRperiRapSpherical((s+tid)->s,JRRoot+tid,
+					  r_lo,r_hi,&status);
+	if ( status == GSL_EINVAL ) *(rap+ii)= r_lo;
+      }
+    }
+  }
+  for (tid=0; tid < nthreads; tid++)
+    gsl_root_fsolver_free( (s+tid)->s);
+  free(s);
+  free(JRRoot);
+  free(params);
+}
+/*
+  The radial velocity squared, divided by two, as a function of r; its roots
+  are pericenter and apocenter
+*/
+double JRSphericalIntegrandSquared(double r,
+				   void * p){
+  struct JRSphericalArg * params= (struct JRSphericalArg *) p;
+  return params->E - evaluatePotentials(r,0.,params->nargs,
+					params->actionAngleArgs)
+    - 0.5 * params->L * params->L / r / r;
+}
+/*
+  The radial velocity at r= rm - rd cos(theta); returns the radius as well
+*/
+static inline double vrSpherical(double theta,
+				 struct JRSphericalArg * params,
+				 double * r){
+  double vr2;
+  *r= params->rm - params->rd * cos(theta);
+  vr2= 2. * JRSphericalIntegrandSquared(*r,params);
+  return ( vr2 > 0. ) ? sqrt(vr2) : 0.;
+}
+/*
+  The integrands for the radial action, the radial period, and the azimuthal
+  period in theta
+*/
+double JRSphericalIntegrand(double theta,
+			    void * p){
+  struct JRSphericalArg * params= (struct JRSphericalArg *) p;
+  double r;
+  return vrSpherical(theta,params,&r) * params->rd * sin(theta);
+}
+double TRSphericalIntegrand(double theta,
+			    void * p){
+  struct JRSphericalArg * params= (struct JRSphericalArg *) p;
+  double r;
+  double vr= vrSpherical(theta,params,&r);
+  if ( vr == 0. ) return 0.;
+  return params->rd * sin(theta) / vr;
+}
+double ISphericalIntegrand(double theta,
+			   void * p){
+  struct JRSphericalArg * params= (struct JRSphericalArg *) p;
+  double r;
+  double vr= vrSpherical(theta,params,&r);
+  if ( vr == 0. ) return 0.;
+  return params->rd * sin(theta) / vr / r / r;
+}
@@ -86,20 +86,32 @@ struct u0EqArg{
 /*
   Function Declarations
 */
-void calcu0(int,double *,double *,int,int *,double *,double,double *,int *);
+void calcu0(int,double *,double *,int,struct potentialArg *,double,double *,int *);
 void actionAngleStaeckel_actions(int,double *,double *,double *,double *,
-				 double *,double *,int,int *,double *,double,
+				 double *,double *,int,struct potentialArg *,double,
 				 double *,double *,int *);
 void actionAngleStaeckel_actionsFreqsAngles(int,double *,double *,double *,
 					    double *,double *,double *,
-					    int,int *,double *,
+					    int,struct potentialArg *,
 					    double,double *,double *,double *,
 					    double *,double *,double *,
 					    double *,double *,int *);
 void actionAngleStaeckel_actionsFreqs(int,double *,double *,double *,double *,
-				      double *,double *,int,int *,double *,
+				      double *,double *,int,struct potentialArg *,
 				      double,double *,double *,double *,
 				      double *,double *,int *);
+void actionAngleStaeckel_derivs(int,double *,double *,double *,double *,
+				double *,double *,int,struct potentialArg *,
+				double,double *,double *,double *,
+				double *,double *,double *,int *);
+void actionAngleStaeckel_freqsAnglesFromDerivs(int,double *,double *,
+					       double *,double *,double *,
+					       double *,int,struct potentialArg *,
+					       double,double *,double *,
+					       double *,double *,double *,
+					       double *,double *,double *,
+					       double *,double *,double *,
+					       double *,int *);
 void calcAnglesStaeckel(int,double *,double *,double *,double *,double *,
 			double *,double *,double *,double *,double *,double *,
 			double *,double *,double *,double *,double *,double *,
@@ -209,15 +221,11 @@ void calcu0(int ndata,
 	    double *E,
 	    double *Lz,
 	    int npot,
-	    int * pot_type,
-	    double * pot_args,
+	    struct potentialArg * actionAngleArgs,
 	    double delta,
 	    double *u0,
 	    int * err){
   int ii;
-  //Set up the potentials
-  struct potentialArg * actionAngleArgs= (struct potentialArg *) malloc ( npot * sizeof (struct potentialArg) );
-  parse_actionAngleArgs(npot,actionAngleArgs,pot_type,pot_args);
   //setup the function to be minimized
   gsl_function u0Eq;
   struct u0EqArg * params= (struct u0EqArg *) malloc ( sizeof (struct u0EqArg) );
@@ -267,16 +275,6 @@ void calcu0(int ndata,
   }
   gsl_min_fminimizer_free (s);
   free(params);
-  for (ii=0; ii < npot; ii++) {
-    if ( (actionAngleArgs+ii)->i2d )
-      interp_2d_free((actionAngleArgs+ii)->i2d) ;
-    if ((actionAngleArgs+ii)->accx )
-      gsl_interp_accel_free ((actionAngleArgs+ii)->accx);
-    if ((actionAngleArgs+ii)->accy )
-      gsl_interp_accel_free ((actionAngleArgs+ii)->accy);
-    free((actionAngleArgs+ii)->args);
-  }
-  free(actionAngleArgs);
   *err= status;
 }
 void actionAngleStaeckel_actions(int ndata,
@@ -287,16 +285,12 @@ void actionAngleStaeckel_actions(int ndata,
 				 double *vz,
 				 double *u0,
 				 int npot,
-				 int * pot_type,
-				 double * pot_args,
+				 struct potentialArg * actionAngleArgs,
 				 double delta,
 				 double *jr,
 				 double *jz,
 				 int * err){
   int ii;
-  //Set up the potentials
-  struct potentialArg * actionAngleArgs= (struct potentialArg *) malloc ( npot * sizeof (struct potentialArg) );
-  parse_actionAngleArgs(npot,actionAngleArgs,pot_type,pot_args);
   //E,Lz
   double *E= (double *) malloc ( ndata * sizeof(double) );
   double *Lz= (double *) malloc ( ndata * sizeof(double) );
@@ -367,16 +361,6 @@ void actionAngleStaeckel_actions(int ndata,
   calcJzStaeckel(ndata,jz,vmin,E,Lz,I3V,delta,u0,cosh2u0,sinh2u0,potupi2,
 		 npot,actionAngleArgs,10);
   //Free
-  for (ii=0; ii < npot; ii++) {
-    if ( (actionAngleArgs+ii)->i2d )
-      interp_2d_free((actionAngleArgs+ii)->i2d) ;
-    if ((actionAngleArgs+ii)->accx )
-      gsl_interp_accel_free ((actionAngleArgs+ii)->accx);
-    if ((actionAngleArgs+ii)->accy )
-      gsl_interp_accel_free ((actionAngleArgs+ii)->accy);
-    free((actionAngleArgs+ii)->args);
-  }
-  free(actionAngleArgs);
   free(E);
   free(Lz);
   free(ux);
@@ -431,7 +415,7 @@ void calcJRStaeckel(int ndata,
   //Setup integrator
   gsl_integration_glfixed_table * T= gsl_integration_glfixed_table_alloc (order);
   UNUSED int chunk= CHUNKSIZE;
-#pragma omp parallel for schedule(static,chunk)				\
+#pragma omp parallel for schedule(dynamic,chunk)				\
   private(tid,ii)							\
   shared(jr,umin,umax,JRInt,params,T,delta,E,Lz,I3U,u0,sinh2u0,v0,sin2v0,potu0v0)
   for (ii=0; ii < ndata; ii++){
@@ -497,7 +481,7 @@ void calcJzStaeckel(int ndata,
   //Setup integrator
   gsl_integration_glfixed_table * T= gsl_integration_glfixed_table_alloc (order);
   UNUSED int chunk= CHUNKSIZE;
-#pragma omp parallel for schedule(static,chunk)				\
+#pragma omp parallel for schedule(dynamic,chunk)				\
   private(tid,ii)							\
   shared(jz,vmin,JzInt,params,T,delta,E,Lz,I3V,u0,cosh2u0,sinh2u0,potupi2)
   for (ii=0; ii < ndata; ii++){
@@ -540,8 +524,7 @@ void actionAngleStaeckel_actionsFreqs(int ndata,
 				      double *vz,
 				      double *u0,
 				      int npot,
-				      int * pot_type,
-				      double * pot_args,
+				      struct potentialArg * actionAngleArgs,
 				      double delta,
 				      double *jr,
 				      double *jz,
@@ -550,9 +533,6 @@ void actionAngleStaeckel_actionsFreqs(int ndata,
 				      double *Omegaz,
 				      int * err){
   int ii;
-  //Set up the potentials
-  struct potentialArg * actionAngleArgs= (struct potentialArg *) malloc ( npot * sizeof (struct potentialArg) );
-  parse_actionAngleArgs(npot,actionAngleArgs,pot_type,pot_args);
   //E,Lz
   double *E= (double *) malloc ( ndata * sizeof(double) );
   double *Lz= (double *) malloc ( ndata * sizeof(double) );
@@ -640,16 +620,6 @@ void actionAngleStaeckel_actionsFreqs(int ndata,
 			      dJRdE,dJRdLz,dJRdI3,
 			      dJzdE,dJzdLz,dJzdI3);		      
   //Free
-  for (ii=0; ii < npot; ii++) {
-    if ( (actionAngleArgs+ii)->i2d )
-      interp_2d_free((actionAngleArgs+ii)->i2d) ;
-    if ((actionAngleArgs+ii)->accx )
-      gsl_interp_accel_free ((actionAngleArgs+ii)->accx);
-    if ((actionAngleArgs+ii)->accy )
-      gsl_interp_accel_free ((actionAngleArgs+ii)->accy);
-    free((actionAngleArgs+ii)->args);
-  }
-  free(actionAngleArgs);
   free(E);
   free(Lz);
   free(ux);
@@ -687,8 +657,7 @@ void actionAngleStaeckel_actionsFreqsAngles(int ndata,
 					    double *vz,
 					    double *u0,
 					    int npot,
-					    int * pot_type,
-					    double * pot_args,
+					    struct potentialArg * actionAngleArgs,
 					    double delta,
 					    double *jr,
 					    double *jz,
@@ -700,9 +669,6 @@ void actionAngleStaeckel_actionsFreqsAngles(int ndata,
 					    double *Anglez,
 					    int * err){
   int ii;
-  //Set up the potentials
-  struct potentialArg * actionAngleArgs= (struct potentialArg *) malloc ( npot * sizeof (struct potentialArg) );
-  parse_actionAngleArgs(npot,actionAngleArgs,pot_type,pot_args);
   //E,Lz
   double *E= (double *) malloc ( ndata * sizeof(double) );
   double *Lz= (double *) malloc ( ndata * sizeof(double) );
@@ -804,16 +770,6 @@ void actionAngleStaeckel_actionsFreqsAngles(int ndata,
 		     vmin,I3V,cosh2u0,potupi2,
 		     npot,actionAngleArgs,10);
   //Free
-  for (ii=0; ii < npot; ii++) {
-    if ( (actionAngleArgs+ii)->i2d )
-      interp_2d_free((actionAngleArgs+ii)->i2d) ;
-    if ((actionAngleArgs+ii)->accx )
-      gsl_interp_accel_free ((actionAngleArgs+ii)->accx);
-    if ((actionAngleArgs+ii)->accy )
-      gsl_interp_accel_free ((actionAngleArgs+ii)->accy);
-    free((actionAngleArgs+ii)->args);
-  }
-  free(actionAngleArgs);
   free(E);
   free(Lz);
   free(ux);
@@ -845,6 +801,232 @@ void actionAngleStaeckel_actionsFreqsAngles(int ndata,
   free(dI3dJR);
   free(dI3dJz);
 }
+/*
+  Calculate the quantities that are needed for the integrals of the
+  Staeckel approximation (coordinates, momenta, and I3) and the turning
+  points for the derivatives of the actions and the angles
+*/
+static void calcTurningPointsStaeckel(int ndata,
+				      double *R,
+				      double *vR,
+				      double *vT,
+				      double *z,
+				      double *vz,
+				      double *u0,
+				      double delta,
+				      double *E,
+				      double *Lz,
+				      double *ux,
+				      double *vx,
+				      double *pux,
+				      double *pvx,
+				      double *sinh2u0,
+				      double *cosh2u0,
+				      double *v0,
+				      double *sin2v0,
+				      double *potu0v0,
+				      double *potupi2,
+				      double *I3U,
+				      double *I3V,
+				      double *umin,
+				      double *umax,
+				      double *vmin,
+				      int npot,
+				      struct potentialArg * actionAngleArgs){
+  int ii;
+  double coshux, sinhux, cosvx, sinvx;
+  calcEL(ndata,R,vR,vT,z,vz,E,Lz,npot,actionAngleArgs);
+  Rz_to_uv_vec(ndata,R,z,ux,vx,delta);
+  UNUSED int chunk= CHUNKSIZE;
+#pragma omp parallel for schedule(static,chunk)			\
+  private(ii,coshux,sinhux,cosvx,sinvx)
+  for (ii=0; ii < ndata; ii++){
+    coshux= cosh(*(ux+ii));
+    sinhux= sinh(*(ux+ii));
+    cosvx= cos(*(vx+ii));
+    sinvx= sin(*(vx+ii));
+    *(pux+ii)= delta * (*(vR+ii) * coshux * sinvx + *(vz+ii) * sinhux * cosvx);
+    *(pvx+ii)= delta * (*(vR+ii) * sinhux * cosvx - *(vz+ii) * coshux * sinvx);
+    *(sinh2u0+ii)= sinh(*(u0+ii)) * sinh(*(u0+ii));
+    *(cosh2u0+ii)= cosh(*(u0+ii)) * cosh(*(u0+ii));
+    *(v0+ii)= 0.5 * M_PI;
+    *(sin2v0+ii)= sin(*(v0+ii)) * sin(*(v0+ii));
+    *(potu0v0+ii)= evaluatePotentialsUV(*(u0+ii),*(v0+ii),delta,
+					npot,actionAngleArgs);
+    *(I3U+ii)= *(E+ii) * sinhux * sinhux
+      - 0.5 * *(pux+ii) * *(pux+ii) / delta / delta
+      - 0.5 * *(Lz+ii) * *(Lz+ii) / delta / delta / sinhux / sinhux
+      - ( sinhux * sinhux + *(sin2v0+ii))
+      *evaluatePotentialsUV(*(ux+ii),*(v0+ii),delta,
+			    npot,actionAngleArgs)
+      + ( *(sinh2u0+ii) + *(sin2v0+ii) )* *(potu0v0+ii);
+    *(potupi2+ii)= evaluatePotentialsUV(*(u0+ii),0.5 * M_PI,delta,
+					npot,actionAngleArgs);
+    *(I3V+ii)= - *(E+ii) * sinvx * sinvx
+      + 0.5 * *(pvx+ii) * *(pvx+ii) / delta / delta
+      + 0.5 * *(Lz+ii) * *(Lz+ii) / delta / delta / sinvx / sinvx
+      - *(cosh2u0+ii) * *(potupi2+ii)
+      + ( *(sinh2u0+ii) + sinvx * sinvx)
+      * evaluatePotentialsUV(*(u0+ii),*(vx+ii),delta,
+			     npot,actionAngleArgs);
+  }
+  calcUminUmax(ndata,umin,umax,ux,pux,E,Lz,I3U,delta,u0,sinh2u0,v0,sin2v0,
+	       potu0v0,npot,actionAngleArgs);
+  calcVmin(ndata,vmin,vx,pvx,E,Lz,I3V,delta,u0,cosh2u0,sinh2u0,potupi2,
+	   npot,actionAngleArgs);
+}
+void actionAngleStaeckel_derivs(int ndata,
+				double *R,
+				double *vR,
+				double *vT,
+				double *z,
+				double *vz,
+				double *u0,
+				int npot,
+				struct potentialArg * actionAngleArgs,
+				double delta,
+				double *dJRdE,
+				double *dJRdLz,
+				double *dJRdI3,
+				double *dJzdE,
+				double *dJzdLz,
+				double *dJzdI3,
+				int * err){
+  //Calculate all necessary parameters and the turning points
+  double *E= (double *) malloc ( ndata * sizeof(double) );
+  double *Lz= (double *) malloc ( ndata * sizeof(double) );
+  double *ux= (double *) malloc ( ndata * sizeof(double) );
+  double *vx= (double *) malloc ( ndata * sizeof(double) );
+  double *pux= (double *) malloc ( ndata * sizeof(double) );
+  double *pvx= (double *) malloc ( ndata * sizeof(double) );
+  double *sinh2u0= (double *) malloc ( ndata * sizeof(double) );
+  double *cosh2u0= (double *) malloc ( ndata * sizeof(double) );
+  double *v0= (double *) malloc ( ndata * sizeof(double) );
+  double *sin2v0= (double *) malloc ( ndata * sizeof(double) );
+  double *potu0v0= (double *) malloc ( ndata * sizeof(double) );
+  double *potupi2= (double *) malloc ( ndata * sizeof(double) );
+  double *I3U= (double *) malloc ( ndata * sizeof(double) );
+  double *I3V= (double *) malloc ( ndata * sizeof(double) );
+  double *umin= (double *) malloc ( ndata * sizeof(double) );
+  double *umax= (double *) malloc ( ndata * sizeof(double) );
+  double *vmin= (double *) malloc ( ndata * sizeof(double) );
+  calcTurningPointsStaeckel(ndata,R,vR,vT,z,vz,u0,delta,E,Lz,ux,vx,pux,pvx,
+			    sinh2u0,cosh2u0,v0,sin2v0,potu0v0,potupi2,
+			    I3U,I3V,umin,umax,vmin,npot,actionAngleArgs);
+  //Calculate the derivatives of the actions wrt the integrals of motion
+  calcdJRStaeckel(ndata,dJRdE,dJRdLz,dJRdI3,
+		  umin,umax,E,Lz,I3U,delta,u0,sinh2u0,v0,sin2v0,
+		  potu0v0,npot,actionAngleArgs,10);
+  calcdJzStaeckel(ndata,dJzdE,dJzdLz,dJzdI3,
+		  vmin,E,Lz,I3V,delta,u0,cosh2u0,sinh2u0,
+		  potupi2,npot,actionAngleArgs,10);
+  //Free
+  free(E);
+  free(Lz);
+  free(ux);
+  free(vx);
+  free(pux);
+  free(pvx);
+  free(sinh2u0);
+  free(cosh2u0);
+  free(v0);
+  free(sin2v0);
+  free(potu0v0);
+  free(potupi2);
+  free(I3U);
+  free(I3V);
+  free(umin);
+  free(umax);
+  free(vmin);
+  *err= 0;
+}
+void actionAngleStaeckel_freqsAnglesFromDerivs(int ndata,
+					       double *R,
+					       double *vR,
+					       double *vT,
+					       double *z,
+					       double *vz,
+					       double *u0,
+					       int npot,
+					       struct potentialArg * actionAngleArgs,
+					       double delta,
+					       double *dJRdE,
+					       double *dJRdLz,
+					       double *dJRdI3,
+					       double *dJzdE,
+					       double *dJzdLz,
+					       double *dJzdI3,
+					       double *Omegar,
+					       double *Omegaphi,
+					       double *Omegaz,
+					       double *Angler,
+					       double *Anglephi,
+					       double *Anglez,
+					       int * err){
+  //Calculate all necessary parameters and the turning points
+  double *E= (double *) malloc ( ndata * sizeof(double) );
+  double *Lz= (double *) malloc ( ndata * sizeof(double) );
+  double *ux= (double *) malloc ( ndata * sizeof(double) );
+  double *vx= (double *) malloc ( ndata * sizeof(double) );
+  double *pux= (double *) malloc ( ndata * sizeof(double) );
+  double *pvx= (double *) malloc ( ndata * sizeof(double) );
+  double *sinh2u0= (double *) malloc ( ndata * sizeof(double) );
+  double *cosh2u0= (double *) malloc ( ndata * sizeof(double) );
+  double *v0= (double *) malloc ( ndata * sizeof(double) );
+  double *sin2v0= (double *) malloc ( ndata * sizeof(double) );
+  double *potu0v0= (double *) malloc ( ndata * sizeof(double) );
+  double *potupi2= (double *) malloc ( ndata * sizeof(double) );
+  double *I3U= (double *) malloc ( ndata * sizeof(double) );
+  double *I3V= (double *) malloc ( ndata * sizeof(double) );
+  double *umin= (double *) malloc ( ndata * sizeof(double) );
+  double *umax= (double *) malloc ( ndata * sizeof(double) );
+  double *vmin= (double *) malloc ( ndata * sizeof(double) );
+  calcTurningPointsStaeckel(ndata,R,vR,vT,z,vz,u0,delta,E,Lz,ux,vx,pux,pvx,
+			    sinh2u0,cosh2u0,v0,sin2v0,potu0v0,potupi2,
+			    I3U,I3V,umin,umax,vmin,npot,actionAngleArgs);
+  //Frequencies and the derivatives of I3 from the given derivatives
+  double *detA= (double *) malloc ( ndata * sizeof(double) );
+  double *dI3dJR= (double *) malloc ( ndata * sizeof(double) );
+  double *dI3dJz= (double *) malloc ( ndata * sizeof(double) );
+  double *dI3dLz= (double *) malloc ( ndata * sizeof(double) );
+  calcFreqsFromDerivsStaeckel(ndata,Omegar,Omegaphi,Omegaz,detA,
+			      dJRdE,dJRdLz,dJRdI3,
+			      dJzdE,dJzdLz,dJzdI3);
+  calcdI3dJFromDerivsStaeckel(ndata,dI3dJR,dI3dJz,dI3dLz,detA,
+			      dJRdE,dJzdE,dJRdLz,dJzdLz);
+  calcAnglesStaeckel(ndata,Angler,Anglephi,Anglez,
+		     Omegar,Omegaphi,Omegaz,dI3dJR,dI3dJz,dI3dLz,
+		     dJRdE,dJRdLz,dJRdI3,
+		     dJzdE,dJzdLz,dJzdI3,
+		     ux,vx,pux,pvx,
+		     umin,umax,E,Lz,I3U,delta,u0,sinh2u0,v0,sin2v0,
+		     potu0v0,
+		     vmin,I3V,cosh2u0,potupi2,
+		     npot,actionAngleArgs,10);
+  //Free
+  free(E);
+  free(Lz);
+  free(ux);
+  free(vx);
+  free(pux);
+  free(pvx);
+  free(sinh2u0);
+  free(cosh2u0);
+  free(v0);
+  free(sin2v0);
+  free(potu0v0);
+  free(potupi2);
+  free(I3U);
+  free(I3V);
+  free(umin);
+  free(umax);
+  free(vmin);
+  free(detA);
+  free(dI3dJR);
+  free(dI3dJz);
+  free(dI3dLz);
+  *err= 0;
+}
 void calcFreqsFromDerivsStaeckel(int ndata,
 				 double * Omegar,
 				 double * Omegaphi,
@@ -1021,7 +1203,7 @@ void calcdJzStaeckel(int ndata,
   //Setup integrator
   gsl_integration_glfixed_table * T= gsl_integration_glfixed_table_alloc (order);
   UNUSED int chunk= CHUNKSIZE;
-#pragma omp parallel for schedule(static,chunk)				\
+#pragma omp parallel for schedule(dynamic,chunk)				\
   private(tid,ii,mid)							\
   shared(djzdE,djzdLz,djzdI3,vmin,dJzInt,params,T,delta,E,Lz,I3V,u0,cosh2u0,sinh2u0,potupi2)
   for (ii=0; ii < ndata; ii++){
@@ -1141,7 +1323,7 @@ void calcAnglesStaeckel(int ndata,
   //Setup integrator
   gsl_integration_glfixed_table * T= gsl_integration_glfixed_table_alloc (order);
   UNUSED int chunk= CHUNKSIZE;
-#pragma omp parallel for schedule(static,chunk)				\
+#pragma omp parallel for schedule(dynamic,chunk)				\
   private(tid,ii,mid,midpoint,Or1,Or2,I3r1,I3r2,phitmp)			\
   shared(Angler,Anglephi,Anglez,Omegar,Omegaz,dI3dJR,dI3dJz,umin,umax,AngleuInt,AnglevInt,paramsu,paramsv,T,delta,E,Lz,I3U,u0,sinh2u0,v0,sin2v0,potu0v0,vmin,I3V,cosh2u0,potupi2)
   for (ii=0; ii < ndata; ii++){
@@ -1393,7 +1575,7 @@ void calcUminUmax(int ndata,
   }
   UNUSED int chunk= CHUNKSIZE;
   gsl_set_error_handler_off();
-#pragma omp parallel for schedule(static,chunk)				\
+#pragma omp parallel for schedule(dynamic,chunk)				\
   private(tid,ii,iter,status,u_lo,u_hi,meps,peps)				\
   shared(umin,umax,JRRoot,params,s,ux,delta,E,Lz,I3U,u0,sinh2u0,v0,sin2v0,potu0v0,max_iter)
   for (ii=0; ii < ndata; ii++){
@@ -1608,7 +1790,7 @@ void calcVmin(int ndata,
   }
   UNUSED int chunk= CHUNKSIZE;
   gsl_set_error_handler_off();
-#pragma omp parallel for schedule(static,chunk)				\
+#pragma omp parallel for schedule(dynamic,chunk)				\
   private(tid,ii,iter,status,v_lo,v_hi)				\
   shared(vmin,JzRoot,params,s,vx,delta,E,Lz,I3V,u0,cosh2u0,sinh2u0,potupi2,max_iter)
   for (ii=0; ii < ndata; ii++){
@@ -0,0 +1,292 @@
+/*
+  C code for the interpolation in actionAngleStaeckelGrid: evaluates u0,
+  E_r, E_z, psi, and the cubic-spline interpolation of the actions (and,
+  optionally, of their derivatives wrt the integrals of motion) on the
+  (Lz,E,psi) grid in a single pass over the input
+*/
+#include <stdlib.h>
+#include <math.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+#define CHUNKSIZE 100
+//Potentials
+#include <galpy_potentials.h>
+#include <actionAngle.h>
+#ifndef M_PI
+#define M_PI 3.14159265358979323846
+#endif
+/*
+  Structure declarations
+*/
+struct splineArg{ //FITPACK spline of degree 3, as in scipy.interpolate
+  int n;
+  double * t;
+  double * c;
+};
+struct bivariateSplineArg{ //FITPACK bivariate spline of degree (3,3)
+  int nx;
+  int ny;
+  double * tx;
+  double * ty;
+  double * c;
+};
+/*
+  Function declarations
+*/
+void actionAngleStaeckelGrid_actions(int,double *,double *,double *,double *,
+				     double *,int,struct potentialArg *,double,
+				     double *,double *,double *,int,double *,
+				     double *,double *,double *,int *,int *);
+/*
+  Actual functions, inlines first
+*/
+static inline double * parse_spline(double * args,struct splineArg * spl){
+  spl->n= (int) *args++;
+  spl->t= args;
+  spl->c= args+spl->n;
+  return args+2*spl->n;
+}
+static inline double * parse_bivariateSpline(double * args,
+					     struct bivariateSplineArg * spl){
+  spl->nx= (int) *args++;
+  spl->ny= (int) *args++;
+  spl->tx= args;
+  spl->ty= args+spl->nx;
+  spl->c= args+spl->nx+spl->ny;
+  return args+spl->nx+spl->ny+(spl->nx-4)*(spl->ny-4);
+}
+/*
+  Find the knot interval and the non-zero cubic B-splines at x
+  (FITPACK's fpbspl); returns the index of the first non-zero B-spline
+*/
+static inline int bspline_basis(double x,int n,double * t,double * h){
+  int ii,jj,li,lj;
+  int l= 3;
+  double f;
+  double hh[3];
+  while ( x >= *(t+l+1) && l != n-5 ) l++;
+  h[0]= 1.;
+  for (jj=1; jj < 4; jj++) {
+    for (ii=0; ii < jj; ii++) hh[ii]= h[ii];
+    h[0]= 0.;
+    for (ii=1; ii <= jj; ii++) {
+      li= l+ii;
+      lj= li-jj;
+      if ( *(t+li) == *(t+lj) ) {
+	h[ii]= 0.;
+	continue;
+      }
+      f= hh[ii-1] / ( *(t+li) - *(t+lj) );
+      h[ii-1]+= f * ( *(t+li) - x );
+      h[ii]= f * ( x - *(t+lj) );
+    }
+  }
+  return l-3;
+}
+static inline double eval_spline(double x,struct splineArg * spl){
+  int ii, l;
+  double h[4];
+  double out= 0.;
+  l= bspline_basis(x,spl->n,spl->t,h);
+  for (ii=0; ii < 4; ii++) out+= *(spl->c+l+ii) * h[ii];
+  return out;
+}
+static inline double eval_bivariateSpline(double x,double y,
+					  struct bivariateSplineArg * spl){
+  int ii, jj, lx, ly;
+  int nky1= spl->ny-4;
+  double hx[4], hy[4];
+  double out= 0.;
+  //Clip to the domain of the spline, like FITPACK's fpbisp
+  if ( x < *(spl->tx+3) ) x= *(spl->tx+3);
+  if ( x > *(spl->tx+spl->nx-4) ) x= *(spl->tx+spl->nx-4);
+  if ( y < *(spl->ty+3) ) y= *(spl->ty+3);
+  if ( y > *(spl->ty+spl->ny-4) ) y= *(spl->ty+spl->ny-4);
+  lx= bspline_basis(x,spl->nx,spl->tx,hx);
+  ly= bspline_basis(y,spl->ny,spl->ty,hy);
+  for (ii=0; ii < 4; ii++)
+    for (jj=0; jj < 4; jj++)
+      out+= *(spl->c+(lx+ii)*nky1+ly+jj) * hx[ii] * hy[jj];
+  return out;
+}
+/*
+  Cubic B-spline interpolation in a 3D array of B-spline coefficients
+  (ndimage.spline_filter), with mirror-symmetric boundary conditions, the
+  same as ndimage.map_coordinates(order=3,prefilter=False) for coordinates
+  within the grid
+*/
+static inline int mirror_index(int ii,int n){
+  int p= 2*(n-1);
+  if ( n == 1 ) return 0;
+  ii= abs(ii) % p;
+  if ( ii > n-1 ) ii= p-ii;
+  return ii;
+}
+static inline void cubic_bspline_weights(double x,int n,double * w,int * indx){
+  int ii;
+  int fl= (int) floor(x);
+  double t= x-fl;
+  double omt= 1.-t;
+  w[0]= omt*omt*omt/6.;
+  w[1]= (3.*t*t*t-6.*t*t+4.)/6.;
+  w[2]= (-3.*t*t*t+3.*t*t+3.*t+1.)/6.;
+  w[3]= t*t*t/6.;
+  for (ii=0; ii < 4; ii++) indx[ii]= mirror_index(fl-1+ii,n);
+}
+static inline double eval_cubic_bspline_3d(double x,double y,double z,
+					   int nx,int ny,int nz,
+					   double * coeffs){
+  int ii, jj, kk;
+  int ix[4], iy[4], iz[4];
+  double wx[4], wy[4], wz[4];
+  double out= 0., tmp;
+  cubic_bspline_weights(x,nx,wx,ix);
+  cubic_bspline_weights(y,ny,wy,iy);
+  cubic_bspline_weights(z,nz,wz,iz);
+  for (ii=0; ii < 4; ii++)
+    for (jj=0; jj < 4; jj++) {
+      tmp= 0.;
+      for (kk=0; kk < 4; kk++)
+	tmp+= wz[kk] * *(coeffs+(ix[ii]*ny+iy[jj])*nz+iz[kk]);
+      out+= wx[ii] * wy[jj] * tmp;
+    }
+  return out;
+}
+static inline double evaluatePotentialsUVGrid(double u,double v,double delta,
+					      int nargs,
+					      struct potentialArg * actionAngleArgs){
+  return evaluatePotentials(delta * sinh(u) * sin(v),delta * cosh(u) * cos(v),
+			    nargs,actionAngleArgs);
+}
+static inline double Efunc(double E,double ERL){
+  return log(E-ERL+1e-10);
+}
+/*
+  MAIN FUNCTIONS
+ */
+void actionAngleStaeckelGrid_actions(int ndata,
+				     double *R,
+				     double *vR,
+				     double *vT,
+				     double *z,
+				     double *vz,
+				     int npot,
+				     struct potentialArg * actionAngleArgs,
+				     double delta,
+				     double * grid_args,
+				     double * jrFiltered,
+				     double * jzFiltered,
+				     int nderivs,
+				     double * dJFiltered,
+				     double *jr,
+				     double *jz,
+				     double *dJ,
+				     int *offgrid,
+				     int * err){
+  int ii;
+  //Parse the grid
+  double Lzmin= *grid_args++;
+  double Lzmax= *grid_args++;
+  int nLz= (int) *grid_args++;
+  int nE= (int) *grid_args++;
+  int npsi= (int) *grid_args++;
+  double ERLmax= *grid_args++;
+  double ERamax= *grid_args++;
+  struct splineArg ERLInterp, ERaInterp, jrLzInterp, jzLzInterp;
+  struct bivariateSplineArg logu0Interp;
+  grid_args= parse_spline(grid_args,&ERLInterp);
+  grid_args= parse_spline(grid_args,&ERaInterp);
+  grid_args= parse_spline(grid_args,&jrLzInterp);
+  grid_args= parse_spline(grid_args,&jzLzInterp);
+  grid_args= parse_bivariateSpline(grid_args,&logu0Interp);
+  UNUSED int chunk= CHUNKSIZE;
+#pragma omp parallel for schedule(static,chunk) private(ii)
+  for (ii=0; ii < ndata; ii++){
+    double Lz, E, ERL, ERa, x, y, u0, sinh2u0, potu0pi2, v2;
+    double d12, d22, u, v, sinhu, coshu, sinv, cosv, pu, pv;
+    double Er, Ez, cos2psi, sin2psi, cLz, cE, cpsir, cpsiz;
+    int jj;
+    Lz= *(R+ii) * *(vT+ii);
+    E= evaluatePotentials(*(R+ii),*(z+ii),npot,actionAngleArgs)
+      + 0.5 * *(vR+ii) * *(vR+ii)
+      + 0.5 * *(vT+ii) * *(vT+ii)
+      + 0.5 * *(vz+ii) * *(vz+ii);
+    ERL= -exp(eval_spline(Lz,&ERLInterp))+ERLmax;
+    ERa= -exp(eval_spline(Lz,&ERaInterp))+ERamax;
+    //Move energies just outside of the grid onto the grid
+    x= (E-ERa)/(ERL-ERa);
+    if ( x > 1. && x-1. < 1e-2 ) E= ERL;
+    x= (E-ERa)/(ERL-ERa);
+    if ( x < 0. && x > -1e-2 ) E= ERa;
+    x= (E-ERa)/(ERL-ERa);
+    if ( Lz < Lzmin || Lz > Lzmax || x > 1. || x < 0. || isnan(x) ) {
+      *(offgrid+ii)= 1;
+      continue;
+    }
+    y= (Efunc(E,ERL)-Efunc(ERa,ERL))/(Efunc(ERL,ERL)-Efunc(ERa,ERL));
+    u0= exp(eval_bivariateSpline(Lz,y,&logu0Interp));
+    sinh2u0= sinh(u0) * sinh(u0);
+    potu0pi2= evaluatePotentialsUVGrid(u0,0.5*M_PI,delta,
+				       npot,actionAngleArgs);
+    //u,v
+    d12= (*(z+ii)+delta)*(*(z+ii)+delta)+(*(R+ii))*(*(R+ii));
+    d22= (*(z+ii)-delta)*(*(z+ii)-delta)+(*(R+ii))*(*(R+ii));
+    u= acosh(0.5/delta*(sqrt(d12)+sqrt(d22)));
+    v= acos(0.5/delta*(sqrt(d12)-sqrt(d22)));
+    sinhu= sinh(u);
+    coshu= cosh(u);
+    sinv= sin(v);
+    cosv= cos(v);
+    //Radial and vertical energy (no delta in the momenta, divided out)
+    pu= *(vR+ii) * coshu * sinv + *(vz+ii) * sinhu * cosv;
+    pv= *(vR+ii) * sinhu * cosv - *(vz+ii) * coshu * sinv;
+    Er= 0.5 * pu * pu
+      + 0.5 * Lz * Lz / delta / delta * ( 1. / sinhu / sinhu - 1. / sinh2u0 )
+      - E * ( sinhu * sinhu - sinh2u0 )
+      + ( sinhu * sinhu + 1. ) * evaluatePotentialsUVGrid(u,0.5*M_PI,delta,
+							  npot,
+							  actionAngleArgs)
+      - ( sinh2u0 + 1. ) * potu0pi2;
+    Ez= 0.5 * pv * pv
+      + 0.5 * Lz * Lz / delta / delta * ( 1. / sinv / sinv - 1. )
+      - E * ( sinv * sinv - 1. )
+      - ( sinh2u0 + 1. ) * potu0pi2
+      + ( sinh2u0 + sinv * sinv ) * evaluatePotentialsUVGrid(u0,v,delta,
+							     npot,
+							     actionAngleArgs);
+    v2= 2. * ( E - potu0pi2 ) - Lz * Lz / delta / delta / sinh2u0;
+    cos2psi= 2. * Er / v2 / ( 1. + sinh2u0 );
+    if ( cos2psi > 1. && cos2psi < 1. + 1e-5 ) cos2psi= 1.;
+    sin2psi= 2. * Ez / v2 / ( 1. + sinh2u0 );
+    if ( sin2psi > 1. && sin2psi < 1. + 1e-5 ) sin2psi= 1.;
+    if ( cos2psi > 1. || cos2psi < 0. || sin2psi > 1. || sin2psi < 0.
+	 || isnan(cos2psi) || isnan(sin2psi) ) {
+      *(offgrid+ii)= 1;
+      continue;
+    }
+    *(offgrid+ii)= 0;
+    //Interpolate
+    cLz= (Lz-Lzmin)/(Lzmax-Lzmin)*(nLz-1.);
+    cE= y*(nE-1.);
+    cpsir= acos(sqrt(cos2psi))/M_PI*2.*(npsi-1.);
+    cpsiz= asin(sqrt(sin2psi))/M_PI*2.*(npsi-1.);
+    *(jr+ii)= ( exp(eval_cubic_bspline_3d(cLz,cE,cpsir,
+					  nLz,nE,npsi,jrFiltered))-1e-10)
+      * (exp(eval_spline(Lz,&jrLzInterp))-1e-5);
+    *(jz+ii)= ( exp(eval_cubic_bspline_3d(cLz,cE,cpsiz,
+					  nLz,nE,npsi,jzFiltered))-1e-10)
+      * (exp(eval_spline(Lz,&jzLzInterp))-1e-5);
+    if ( *(jr+ii) < 0. ) *(jr+ii)= 0.;
+    if ( *(jz+ii) < 0. ) *(jz+ii)= 0.;
+    //Derivatives of the actions wrt (E,Lz,I3): the first half are those
+    //of jr (psi from Er), the second half those of jz (psi from Ez)
+    for (jj=0; jj < nderivs; jj++)
+      *(dJ+jj*ndata+ii)= eval_cubic_bspline_3d(cLz,cE,
+					       2*jj < nderivs ? cpsir : cpsiz,
+					       nLz,nE,npsi,
+					       dJFiltered+jj*nLz*nE*npsi);
+  }
+  //Free
+  *err= 0;
+}
@@ -15,14 +15,17 @@ import galpy.util.bovy_plot as plot
 import galpy.util.bovy_symplecticode as symplecticode
 import galpy.util.bovy_coords as coords
 #try:
-from galpy.orbit_src.integrateFullOrbit import integrateFullOrbit_c, _ext_loaded
+from galpy.orbit_src.integrateFullOrbit import integrateFullOrbit_c, \
+    integrateFullOrbit_dense_c, integrateFullOrbit_dxdv_c, _ext_loaded
 ext_loaded= _ext_loaded
 from galpy.util.bovy_conversion import physical_conversion
-from OrbitTop import OrbitTop
+from OrbitTop import OrbitTop, _denseInterp
+from galpy.orbit_src.planarOrbit import _parse_warnmessage
 _ORBFITNORMRADEC= 360.
 _ORBFITNORMDIST= 10.
 _ORBFITNORMPMRADEC= 4.
 _ORBFITNORMVLOS= 200.
+_DXDV_FDSTEP= 10.**-5.
 class FullOrbit(OrbitTop):
     """Class that holds and integrates orbits in full 3D potentials"""
     def __init__(self,vxvv=[1.,0.,0.9,0.,0.1],vo=220.,ro=8.0,zo=0.025,
@@ -63,7 +66,7 @@ class FullOrbit(OrbitTop):
                           ro=ro,zo=zo,vo=vo,solarmotion=solarmotion)
         return None
 
-    def integrate(self,t,pot,method='symplec4_c'):
+    def integrate(self,t,pot,method='symplec4_c',dense=False,events=None):
         """
         NAME:
            integrate
@@ -78,6 +81,8 @@ class FullOrbit(OrbitTop):
                    'rk4_c' for a 4th-order Runge-Kutta integrator in C
                    'rk6_c' for a 6-th order Runge-Kutta integrator in C
                    'dopr54_c' for a Dormand-Prince integrator in C (generally the fastest)
+           dense= (False) if True, store the dense output of all steps taken by the integrator (only for method='dopr54_c'), such that the orbit can be evaluated at any time between t[0] and t[-1]
+           events= (None) list of events to locate during the integration (only for method='dopr54_c'): 'pericenter', 'apocenter', 'zcross', 'zmax', or ('escape',rmax) to stop the integration when the spherical radius exceeds rmax (get the events using getEvents())
         OUTPUT:
            (none) (get the actual orbit using getOrbit()
         HISTORY:
@@ -85,11 +90,64 @@ class FullOrbit(OrbitTop):
         """
         #Reset things that may have been defined by a previous integration
         if hasattr(self,'_orbInterp'): delattr(self,'_orbInterp')
+        if hasattr(self,'_denseInterp'): delattr(self,'_denseInterp')
+        if hasattr(self,'_events'): delattr(self,'_events')
         if hasattr(self,'rs'): delattr(self,'rs')
         self.t= nu.array(t)
         self._pot= pot
+        if dense or not events is None:
+            out= _integrateFullOrbit_dense(self.vxvv,pot,t,method,
+                                           events=events)
+            if not out is None:
+                denseInterp, rawevents= out
+                #Only keep the times before a terminal event
+                self.t= self.t[nu.sign(self.t[-1]-self.t[0])\
+                                   *(self.t-denseInterp._tend) <= 0.]
+                if dense:
+                    #The orbit is evaluated from the dense output when needed
+                    if hasattr(self,'orbit'): delattr(self,'orbit')
+                    self._denseInterp= denseInterp
+                else:
+                    self.orbit= denseInterp(self.t).T
+                if not events is None:
+                    self._setEvents(events,rawevents,denseInterp)
+                return None
         self.orbit= _integrateFullOrbit(self.vxvv,pot,t,method)
 
+    def integrate_dxdv(self,dxdv,t,pot,method='dopr54_c',
+                       rectIn=False,rectOut=False,renorm_every=0):
+        """
+        NAME:
+           integrate_dxdv
+        PURPOSE:
+           integrate the orbit and a small area of phase space
+        INPUT:
+           dxdv - [dR,dvR,dvT,dz,dvz,dphi]
+           t - list of times at which to output (0 has to be in this!)
+           pot - potential instance or list of instances
+           method= 'odeint' for scipy's odeint
+                   'rk4_c' for a 4th-order Runge-Kutta integrator in C
+                   'rk6_c' for a 6-th order Runge-Kutta integrator in C
+                   'dopr54_c' for a Dormand-Prince integrator in C (generally the fastest)
+           rectIn= (False) if True, input dxdv is in rectangular coordinates [dx,dy,dz,dvx,dvy,dvz]
+           rectOut= (False) if True, output dxdv (that in orbit_dxdv) is in rectangular coordinates
+           renorm_every= (0) renormalize dxdv (in rectangular coordinates) to unit length every renorm_every-th time in t to avoid overflow when integrating chaotic orbits over long times; the actual dxdv is then that in orbit_dxdv x exp(lnnorm), with lnnorm returned by getOrbit_dxdv(lnnorm=True) (0: never renormalize)
+        OUTPUT:
+           (none) (get the actual orbit using getOrbit_dxdv()
+        """
+        if hasattr(self,'_orbInterp'): delattr(self,'_orbInterp')
+        if hasattr(self,'_denseInterp'): delattr(self,'_denseInterp')
+        if hasattr(self,'_events'): delattr(self,'_events')
+        if hasattr(self,'rs'): delattr(self,'rs')
+        self.t= nu.array(t)
+        self._pot_dxdv= pot
+        self._pot= pot
+        self.orbit_dxdv, self._lnnorm_dxdv, msg=\
+            _integrateFullOrbit_dxdv(self.vxvv,dxdv,pot,t,method,
+                                     rectIn,rectOut,renorm_every)
+        self.orbit= self.orbit_dxdv[:,:6]
+        return msg
+
     @physical_conversion('energy')
     def Jacobi(self,*args,**kwargs):
         """
@@ -302,7 +360,10 @@ class FullOrbit(OrbitTop):
         if not hasattr(self,'orbit'):
             raise AttributeError("Integrate the orbit first")
         if not hasattr(self,'rs'):
-            self.rs= nu.sqrt(self.orbit[:,0]**2.+self.orbit[:,3]**2.)
+            self.rs= self._with_events(\
+                nu.sqrt(self.orbit[:,0]**2.+self.orbit[:,3]**2.),
+                ['pericenter','apocenter'],
+                lambda x: nu.sqrt(x[:,0]**2.+x[:,3]**2.))
         return (nu.amax(self.rs)-nu.amin(self.rs))/(nu.amax(self.rs)+nu.amin(self.rs))
 
     @physical_conversion('position')
@@ -327,7 +388,10 @@ class FullOrbit(OrbitTop):
         if not hasattr(self,'orbit'):
             raise AttributeError("Integrate the orbit first")
         if not hasattr(self,'rs'):
-            self.rs= nu.sqrt(self.orbit[:,0]**2.+self.orbit[:,3]**2.)
+            self.rs= self._with_events(\
+                nu.sqrt(self.orbit[:,0]**2.+self.orbit[:,3]**2.),
+                ['pericenter','apocenter'],
+                lambda x: nu.sqrt(x[:,0]**2.+x[:,3]**2.))
         return nu.amax(self.rs)
 
     @physical_conversion('position')
@@ -352,7 +416,10 @@ class FullOrbit(OrbitTop):
         if not hasattr(self,'orbit'):
             raise AttributeError("Integrate the orbit first")
         if not hasattr(self,'rs'):
-            self.rs= nu.sqrt(self.orbit[:,0]**2.+self.orbit[:,3]**2.)
+            self.rs= self._with_events(\
+                nu.sqrt(self.orbit[:,0]**2.+self.orbit[:,3]**2.),
+                ['pericenter','apocenter'],
+                lambda x: nu.sqrt(x[:,0]**2.+x[:,3]**2.))
         return nu.amin(self.rs)
 
     @physical_conversion('position')
@@ -377,7 +444,8 @@ class FullOrbit(OrbitTop):
             return zmax
         if not hasattr(self,'orbit'):
             raise AttributeError("Integrate the orbit first")
-        return nu.amax(nu.fabs(self.orbit[:,3]))
+        return nu.amax(nu.fabs(self._with_events(self.orbit[:,3],['zmax'],
+                                                 lambda x: x[:,3])))
 
     def fit(self,vxvv,vxvv_err=None,pot=None,radec=False,lb=False,
             tintJ=10,ntintJ=1000,integrate_method='dopr54_c',
@@ -505,12 +573,13 @@ class FullOrbit(OrbitTop):
             kwargs.pop('d1')
         else:
             d1= 't'
-        self.EzJz= [(evaluatePotentials(self.orbit[ii,0],self.orbit[ii,3],
+        orb= self.getOrbit()
+        self.EzJz= [(evaluatePotentials(orb[ii,0],orb[ii,3],
                                         pot,t=self.t[ii])-
-                     evaluatePotentials(self.orbit[ii,0],0.,pot,
-                                        phi= self.orbit[ii,5],t=self.t[ii])+
-                     self.orbit[ii,4]**2./2.)/\
-                        nu.sqrt(evaluateDensities(self.orbit[ii,0],0.,pot,phi=self.orbit[ii,5],t=self.t[ii]))\
+                     evaluatePotentials(orb[ii,0],0.,pot,
+                                        phi= orb[ii,5],t=self.t[ii])+
+                     orb[ii,4]**2./2.)/\
+                        nu.sqrt(evaluateDensities(orb[ii,0],0.,pot,phi=orb[ii,5],t=self.t[ii]))\
                         for ii in range(len(self.t))]
         if not kwargs.has_key('xlabel'):
             kwargs['xlabel']= labeldict[d1]
@@ -520,21 +589,65 @@ class FullOrbit(OrbitTop):
             plot.bovy_plot(nu.array(self.t),nu.array(self.EzJz)/self.EzJz[0],
                            *args,**kwargs)
         elif d1 == 'z':
-            plot.bovy_plot(self.orbit[:,3],nu.array(self.EzJz)/self.EzJz[0],
+            plot.bovy_plot(orb[:,3],nu.array(self.EzJz)/self.EzJz[0],
                            *args,**kwargs)
         elif d1 == 'R':
-            plot.bovy_plot(self.orbit[:,0],nu.array(self.EzJz)/self.EzJz[0],
+            plot.bovy_plot(orb[:,0],nu.array(self.EzJz)/self.EzJz[0],
                            *args,**kwargs)
         elif d1 == 'vR':
-            plot.bovy_plot(self.orbit[:,1],nu.array(self.EzJz)/self.EzJz[0],
+            plot.bovy_plot(orb[:,1],nu.array(self.EzJz)/self.EzJz[0],
                            *args,**kwargs)
         elif d1 == 'vT':
-            plot.bovy_plot(self.orbit[:,2],nu.array(self.EzJz)/self.EzJz[0],
+            plot.bovy_plot(orb[:,2],nu.array(self.EzJz)/self.EzJz[0],
                            *args,**kwargs)
         elif d1 == 'vz':
-            plot.bovy_plot(self.orbit[:,4],nu.array(self.EzJz)/self.EzJz[0],
+            plot.bovy_plot(orb[:,4],nu.array(self.EzJz)/self.EzJz[0],
                            *args,**kwargs)
 
+def _integrateFullOrbit_dense(vxvv,pot,t,method,events=None):
+    """
+    NAME:
+       _integrateFullOrbit_dense
+    PURPOSE:
+       integrate an orbit in a Phi(R,z,phi) potential with the Dormand-Prince integrator in C, keeping the dense output and locating events
+    INPUT:
+       vxvv - array with the initial conditions stacked like
+              [R,vR,vT,z,vz,phi] or [R,vR,vT,z,vz]; vR outward!
+       pot - Potential instance
+       t - list of times; the orbit is integrated from t[0] to t[-1]
+       method - 'dopr54_c'
+       events= (None) list of events to locate
+    OUTPUT:
+       (_denseInterp instance that returns [R,vR,vT,z,vz(,phi)] at any t, [nfound,8] array of events from the C integrator) or None if the potential does not have a C implementation and no events are requested
+    """
+    if not method.lower() == 'dopr54_c':
+        raise NotImplementedError("Dense output and events are only implemented for method='dopr54_c'")
+    if isinstance(pot,list):
+        allHasC= nu.prod([p.hasC for p in pot])
+    else:
+        allHasC= pot.hasC
+    if (not allHasC or not ext_loaded) and not events is None:
+        raise NotImplementedError("Events can only be located for potentials with a C implementation")
+    elif not allHasC or not ext_loaded:
+        warnings.warn("Dense output requires a potential with a C implementation; orbit is integrated without dense output",
+                      galpyWarning)
+        return None
+    if len(vxvv) == 5:
+        phio= 0.
+    else:
+        phio= vxvv[5]
+    #go to the rectangular frame
+    this_vxvv= nu.array([vxvv[0]*nu.cos(phio),
+                         vxvv[0]*nu.sin(phio),
+                         vxvv[3],
+                         vxvv[1]*nu.cos(phio)-vxvv[2]*nu.sin(phio),
+                         vxvv[2]*nu.cos(phio)+vxvv[1]*nu.sin(phio),
+                         vxvv[4]])
+    #integrate
+    dense, rawevents, tend, msg= integrateFullOrbit_dense_c(pot,this_vxvv,t,
+                                                            events=events)
+    return (_denseInterp(dense,len(vxvv),tend=tend),rawevents)
+
 def _integrateFullOrbit(vxvv,pot,t,method):
     """
     NAME:
@@ -632,6 +745,136 @@ def _integrateFullOrbit(vxvv,pot,t,method):
     out[neg_radii,5]+= m.pi
     return out
 
+def _integrateFullOrbit_dxdv(vxvv,dxdv,pot,t,method,rectIn,rectOut,
+                             renorm_every=0,nthreads=None):
+    """
+    NAME:
+       _integrateFullOrbit_dxdv
+    PURPOSE:
+       integrate an orbit and area of phase space in a Phi(R,z,phi) potential
+    INPUT:
+       vxvv - array with the initial conditions stacked like
+              [R,vR,vT,z,vz,phi]; vR outward! (or array [nobj,6] of such initial conditions)
+       dxdv - difference to integrate [dR,dvR,dvT,dz,dvz,dphi] (or array [nobj,6])
+       pot - Potential instance
+       t - list of times at which to output (0 has to be in this!)
+       method - 'odeint', 'rk4_c', 'rk6_c', or 'dopr54_c'
+       rectIn= (False) if True, input dxdv is in rectangular coordinates
+       rectOut= (False) if True, output dxdv (that in orbit_dxdv) is in rectangular coordinates
+       renorm_every= (0) renormalize dxdv to unit length every renorm_every-th time in t (0: never)
+       nthreads= (None) number of OpenMP threads to use for multiple objects in C (None: all available)
+    OUTPUT:
+       ([:,12] array of [R,vR,vT,z,vz,phi,dR,dvR,dvT,dz,dvz,dphi] at each t,
+        [:] array of the accumulated log of the renormalization factors,
+        error message from integrator)
+       (with an extra leading [nobj] dimension for multiple objects)
+    """
+    vxvv= nu.array(vxvv,dtype=nu.float64)
+    dxdv= nu.array(dxdv,dtype=nu.float64)
+    multi= len(vxvv.shape) > 1
+    if not multi:
+        vxvv= nu.reshape(vxvv,(1,6))
+        dxdv= nu.reshape(dxdv,(1,6))
+    #First check that the potential has C
+    if '_c' in method:
+        if isinstance(pot,list):
+            allHasC= nu.prod([p.hasC for p in pot])
+        else:
+            allHasC= pot.hasC
+        if (not allHasC or not ext_loaded) \
+                and not 'leapfrog' in method and not 'symplec' in method:
+            method= 'odeint'
+            warnings.warn("Using odeint because not all used potential have adequate C implementations to integrate phase-space volumes",galpyWarning)
+    #go to the rectangular frame
+    this_vxvv, this_dxdv= _cylToRect_dxdv(vxvv,dxdv,rectIn)
+    if 'leapfrog' in method.lower() or 'symplec' in method.lower():
+        raise TypeError('Symplectic integration for phase-space volume is not possible')
+    elif method.lower() == 'rk4_c' or method.lower() == 'rk6_c' \
+            or method.lower() == 'dopr54_c':
+        warnings.warn("Using C implementation to integrate orbits",galpyWarning)
+        #integrate
+        tmp_out, lnnorm, msg= integrateFullOrbit_dxdv_c(pot,this_vxvv,
+                                                        this_dxdv,t,method,
+                                                        nthreads=nthreads,
+                                                        renorm_every=renorm_every)
+    elif method.lower() == 'odeint':
+        tmp_out= nu.empty((vxvv.shape[0],len(t),12))
+        lnnorm= nu.zeros((vxvv.shape[0],len(t)))
+        if renorm_every < 1 or renorm_every > len(t)-1: nseg= len(t)-1
+        else: nseg= renorm_every
+        for ii in range(vxvv.shape[0]):
+            init= nu.hstack((this_vxvv[ii],this_dxdv[ii]))
+            start= 0
+            #integrate, in segments between renormalizations
+            while start < len(t)-1:
+                end= nu.amin([start+nseg,len(t)-1])
+                tmp_out[ii,start:end+1]=\
+                    integrate.odeint(_EOM_dxdv,init,t[start:end+1],
+                                     args=(pot,),rtol=10.**-8.)
+                lnnorm[ii,start+1:end+1]= lnnorm[ii,start]
+                if renorm_every > 0:
+                    norm= nu.sqrt(nu.sum(tmp_out[ii,end,6:]**2.))
+                    tmp_out[ii,end,6:]/= norm
+                    lnnorm[ii,end]+= nu.log(norm)
+                init= tmp_out[ii,end]
+                start= end
+        msg= nu.zeros(vxvv.shape[0],dtype='int')
+    else:
+        raise NotImplementedError("requested integration method does not exist")
+    #go back to the cylindrical frame
+    out= _rectToCyl_dxdv(tmp_out,rectOut)
+    for thismsg in nu.atleast_1d(msg): _parse_warnmessage(thismsg)
+    if multi:
+        return (out,lnnorm,msg)
+    else:
+        return (out[0],lnnorm[0],msg[0])
+
+def _cylToRect_dxdv(vxvv,dxdv,rectIn):
+    """Transform [...,6] cylindrical initial conditions and deviations to the rectangular frame"""
+    R, vR, vT, z, vz, phi= [vxvv[...,ii] for ii in range(6)]
+    cp= nu.cos(phi)
+    sp= nu.sin(phi)
+    this_vxvv= nu.array([R*cp,R*sp,z,vR*cp-vT*sp,vT*cp+vR*sp,vz])
+    this_vxvv= nu.rollaxis(this_vxvv,0,this_vxvv.ndim)
+    if rectIn:
+        return (this_vxvv,dxdv)
+    dR, dvR, dvT, dz, dvz, dphi= [dxdv[...,ii] for ii in range(6)]
+    this_dxdv= nu.array([cp*dR-R*sp*dphi,
+                         sp*dR+R*cp*dphi,
+                         dz,
+                         -(vR*sp+vT*cp)*dphi+cp*dvR-sp*dvT,
+                         (vR*cp-vT*sp)*dphi+sp*dvR+cp*dvT,
+                         dvz])
+    return (this_vxvv,nu.rollaxis(this_dxdv,0,this_dxdv.ndim))
+
+def _rectToCyl_dxdv(tmp_out,rectOut):
+    """Transform [...,12] rectangular orbits and deviations to the cylindrical frame"""
+    R= nu.sqrt(tmp_out[...,0]**2.+tmp_out[...,1]**2.)
+    phi= nu.arccos(tmp_out[...,0]/R)
+    phi[(tmp_out[...,1] < 0.)]= 2.*nu.pi-phi[(tmp_out[...,1] < 0.)]
+    cp= nu.cos(phi)
+    sp= nu.sin(phi)
+    vR= tmp_out[...,3]*cp+tmp_out[...,4]*sp
+    vT= tmp_out[...,4]*cp-tmp_out[...,3]*sp
+    out= nu.zeros(tmp_out.shape)
+    out[...,0]= R
+    out[...,1]= vR
+    out[...,2]= vT
+    out[...,3]= tmp_out[...,2]
+    out[...,4]= tmp_out[...,5]
+    out[...,5]= phi
+    if rectOut:
+        out[...,6:]= tmp_out[...,6:]
+    else:
+        dphi= (cp*tmp_out[...,7]-sp*tmp_out[...,6])/R
+        out[...,6]= cp*tmp_out[...,6]+sp*tmp_out[...,7]
+        out[...,7]= cp*tmp_out[...,9]+sp*tmp_out[...,10]+vT*dphi
+        out[...,8]= cp*tmp_out[...,10]-sp*tmp_out[...,9]-vR*dphi
+        out[...,9]= tmp_out[...,8]
+        out[...,10]= tmp_out[...,11]
+        out[...,11]= dphi
+    return out
+
 def _FullEOM(y,t,pot):
     """
     NAME:
@@ -685,6 +928,34 @@ def _rectForce(x,pot,t=0.):
                      sinphi*Rforce+1./R*cosphi*phiforce,
                      evaluatezforces(R,x[2],pot,phi=phi,t=t)])
 
+def _EOM_dxdv(x,t,pot):
+    """
+    NAME:
+       _EOM_dxdv
+    PURPOSE:
+       implements the EOM, i.e., the right-hand side of the differential 
+       equation, for integrating phase space differences, rectangular
+    INPUT:
+       x - current phase-space position
+       t - current time
+       pot - (list of) Potential instance(s)
+    OUTPUT:
+       dy/dt
+    """
+    out= nu.zeros(12)
+    out[:3]= x[3:6]
+    out[3:6]= _rectForce(x[:3],pot,t)
+    out[6:9]= x[9:]
+    #The Hessian times dx is the central finite difference of the force
+    #along dx (the C implementation uses the analytic second derivatives
+    #where they are available)
+    dxnorm= nu.sqrt(nu.sum(x[6:9]**2.))
+    if dxnorm > 0.:
+        eps= _DXDV_FDSTEP*(nu.sqrt(nu.sum(x[:3]**2.))+1.)/dxnorm #floor, for orbits through r=0
+        out[9:]= (_rectForce(x[:3]+eps*x[6:9],pot,t)
+                  -_rectForce(x[:3]-eps*x[6:9],pot,t))/2./eps
+    return out
+
 def _fit_orbit(orb,vxvv,vxvv_err,pot,radec=False,lb=False,
                tintJ=100,ntintJ=1000,integrate_method='dopr54_c',
                ro=None,vo=None,obs=None):
@@ -250,7 +250,7 @@ class Orbit:
         """
         self._orb.turn_physical_off()
 
-    def integrate(self,t,pot,method='symplec4_c'):
+    def integrate(self,t,pot,method='symplec4_c',dense=False,events=None):
         """
         NAME:
 
@@ -275,6 +275,10 @@ class Orbit:
                    'rk6_c' for a 6-th order Runge-Kutta integrator in C
                    'dopr54_c' for a Dormand-Prince integrator in C (generally the fastest)
 
+           dense= (False) if True, store the dense output of all steps taken by the integrator (only for method='dopr54_c' and potentials with a C implementation), such that the orbit can be evaluated at any time between t[0] and t[-1] at the accuracy of the integrator
+
+           events= (None) list of events to locate to the accuracy of the integrator (only for method='dopr54_c' and potentials with a C implementation); events can be 'pericenter', 'apocenter', 'zcross' (disk crossing), 'zmax' (maximum |z|), or ('escape',rmax), which stops the integration when the (spherical) radius exceeds rmax (in which case the orbit is only returned at the times before the escape); get the events using getEvents(); rap, rperi, e, and zmax use the located events
+
         OUTPUT:
 
            (none) (get the actual orbit using getOrbit()
@@ -283,11 +287,16 @@ class Orbit:
 
            2010-07-10 - Written - Bovy (NYU)
 
+
+
         """
-        self._orb.integrate(t,pot,method=method)
+        if dense or not events is None:
+            self._orb.integrate(t,pot,method=method,dense=dense,events=events)
+        else:
+            self._orb.integrate(t,pot,method=method)
 
     def integrate_dxdv(self,dxdv,t,pot,method='dopr54_c',
-                       rectIn=False,rectOut=False):
+                       rectIn=False,rectOut=False,renorm_every=0):
         """
         NAME:
 
@@ -299,7 +308,7 @@ class Orbit:
 
         INPUT:
 
-           dxdv - [dR,dvR,dvT,dphi]
+           dxdv - [dR,dvR,dvT,dphi] for 2D orbits, [dR,dvR,dvT,dz,dvz,dphi] for 3D orbits
 
            t - list of times at which to output (0 has to be in this!)
 
@@ -320,6 +329,8 @@ class Orbit:
 
            rectOut= (False) if True, output dxdv (that in orbit_dxdv) is in rectangular coordinates
 
+           renorm_every= (0) only for 3D orbits: renormalize dxdv to unit length every renorm_every-th time in t (0: never); the actual dxdv is then getOrbit_dxdv() x exp(lnnorm), with lnnorm from getOrbit_dxdv(lnnorm=True)
+
         OUTPUT:
 
            (none) (get the actual orbit using getOrbit_dxdv(), the orbit that is integrated alongside with dxdv is stored as usual, any previous regular orbit integration will be erased!)
@@ -330,9 +341,11 @@ class Orbit:
 
            2014-06-29 - Added rectIn and rectOut - Bovy (IAS)
 
+
         """
         self._orb.integrate_dxdv(dxdv,t,pot,method=method,
-                                 rectIn=rectIn,rectOut=rectOut)
+                                 rectIn=rectIn,rectOut=rectOut,
+                                 renorm_every=renorm_every)
 
     def reverse(self):
         """
@@ -441,7 +454,29 @@ class Orbit:
         """
         return self._orb.getOrbit()
 
-    def getOrbit_dxdv(self):
+    def getEvents(self,event=None):
+        """
+
+        NAME:
+
+           getEvents
+
+        PURPOSE:
+
+           return the events located during the orbit integration (see integrate)
+
+        INPUT:
+
+           event= (None) name of the event ('pericenter', 'apocenter', 'zcross', 'zmax', or 'escape'); if None, return all events
+
+        OUTPUT:
+
+           (t,vxvv) with t the times of the events and vxvv[nevent,nd] the phase-space positions at the events, or a dictionary of these for all events
+
+        """
+        return self._orb.getEvents(event=event)
+
+    def getOrbit_dxdv(self,lnnorm=False):
         """
 
         NAME:
@@ -454,18 +489,19 @@ class Orbit:
 
         INPUT:
 
-           (none)
+           lnnorm= (False) if True, also return the accumulated log of the renormalization factors of dxdv (see integrate_dxdv's renorm_every)
 
         OUTPUT:
 
-           array orbit[nt,nd*2] with for each t the dxdv vector
+           array orbit[nt,nd] with for each t the dxdv vector (,array lnnorm[nt])
 
         HISTORY:
 
            2010-07-10 - Written - Bovy (NYU)
 
+
         """
-        return self._orb.getOrbit_dxdv()
+        return self._orb.getOrbit_dxdv(lnnorm=lnnorm)
 
     def fit(self,vxvv,vxvv_err=None,pot=None,radec=False,lb=False,
             tintJ=10,ntintJ=1000,integrate_method='dopr54_c',
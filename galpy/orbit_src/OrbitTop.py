@@ -1,4 +1,5 @@
 import math as m
+import copy
 import numpy as nu
 from scipy import interpolate, optimize
 from galpy import actionAngle
@@ -105,22 +106,98 @@ class OrbitTop:
         HISTORY:
            2010-07-10 - Written - Bovy (NYU)
         """
+        if hasattr(self,'_denseInterp'):
+            return self._denseInterp(self.t).T
         return self.orbit
 
-    def getOrbit_dxdv(self):
+    def __getattr__(self,name):
+        #The orbit of a dense integration is not stored, but evaluated 
+        #from the dense output of the integrator when it is accessed
+        if name == 'orbit' and '_denseInterp' in self.__dict__:
+            return self._denseInterp(self.t).T
+        raise AttributeError(name)
+
+    def getOrbit_dxdv(self,lnnorm=False):
         """
         NAME:
            getOrbit_dxdv
         PURPOSE:
            return a previously calculated orbit_dxdv
         INPUT:
-           (none)
+           lnnorm= (False) if True, also return the accumulated log of the renormalization factors of dxdv (zero if dxdv was not renormalized)
         OUTPUT:
-           (none)
+           orbit_dxdv[nt,ndim] (,lnnorm[nt])
         HISTORY:
            2010-07-10 - Written - Bovy (NYU)
         """
-        return self.orbit_dxdv[:,4:]
+        ndim= self.orbit_dxdv.shape[1]//2
+        if not lnnorm:
+            return self.orbit_dxdv[:,ndim:]
+        if hasattr(self,'_lnnorm_dxdv'):
+            return (self.orbit_dxdv[:,ndim:],self._lnnorm_dxdv)
+        else:
+            return (self.orbit_dxdv[:,ndim:],nu.zeros(len(self.orbit_dxdv)))
+
+    def getEvents(self,event=None):
+        """
+        NAME:
+           getEvents
+        PURPOSE:
+           return the events located during the orbit integration
+        INPUT:
+           event= (None) name of the event ('pericenter', 'apocenter', 'zcross', 'zmax', or 'escape'); if None, return all events
+        OUTPUT:
+           (t,vxvv) with t the times of the events and vxvv[nevent,dim] the phase-space positions at the events, or a dictionary of these for all events
+        """
+        if not hasattr(self,'_events'):
+            raise AttributeError("Integrate the orbit with events first")
+        if event is None:
+            return copy.deepcopy(self._events)
+        return copy.deepcopy(self._events[event])
+
+    def _setEvents(self,events,rawevents,denseInterp):
+        """
+        NAME:
+           _setEvents
+        PURPOSE:
+           store the events located by the C integrator
+        INPUT:
+           events - list of events given to integrate
+           rawevents - array [nfound,2+rdim] of [index of the event,t,rectangular phase-space position] from the C integrator
+           denseInterp - _denseInterp instance for this orbit, used to convert to the cylindrical frame
+        OUTPUT:
+           (none)
+        """
+        self._events= {}
+        for ii,event in enumerate(events):
+            if isinstance(event,(list,tuple)): event= event[0]
+            indx= rawevents[:,0] == ii
+            ts= rawevents[indx,1]
+            sortindx= nu.argsort(nu.sign(self.t[-1]-self.t[0])*ts)
+            self._events[event.lower()]=\
+                (ts[sortindx],
+                 denseInterp.rectToCyl(rawevents[indx,2:][sortindx]).T)
+        return None
+
+    def _with_events(self,x,events,func):
+        """
+        NAME:
+           _with_events
+        PURPOSE:
+           add the values of a function of the phase-space position at recorded events to an array of values along the orbit (e.g., to compute exact peri- and apocenters)
+        INPUT:
+           x - array of values along the orbit
+           events - list of event names
+           func - function of the phase-space positions vxvv[nevent,dim] at the events
+        OUTPUT:
+           x with the values at the events appended
+        """
+        if not hasattr(self,'_events'): return x
+        out= [x]
+        for event in events:
+            if event in self._events and len(self._events[event][0]) > 0:
+                out.append(func(self._events[event][1]))
+        return nu.hstack(out)
 
     @physical_conversion('time')
     def time(self,*args,**kwargs):
@@ -1125,7 +1202,16 @@ class OrbitTop:
             return nu.array(self.vxvv)
         else:
             t= args[0]
-        if isinstance(t,(int,float)) and hasattr(self,'t') \
+        if hasattr(self,'_denseInterp'):
+            #Evaluate the dense output of the integrator
+            if isinstance(t,(int,float)): 
+                return self._denseInterp(t)[:,0]
+            out= self._denseInterp(t)
+            if out.shape[1] == 1:
+                return out[:,0]
+            else:
+                return out
+        elif isinstance(t,(int,float)) and hasattr(self,'t') \
                 and t in list(self.t):
             return self.orbit[list(self.t).index(t),:]
         else:
@@ -1904,6 +1990,73 @@ class OrbitTop:
         return None
 
 
+class _denseInterp:
+    """Class that evaluates the dense output of the Dormand-Prince integrator (in the rectangular frame) at arbitrary times in the cylindrical frame"""
+    def __init__(self,dense,dim,tend=None):
+        """
+        NAME:
+           __init__
+        PURPOSE:
+           initialize the dense-output evaluator
+        INPUT:
+           dense - dense output (nsteps,2+5*rdim) from integrateFullOrbit_dense_c (rdim=6) or integratePlanarOrbit_dense_c (rdim=4)
+           dim - dimension of the orbit (6: [R,vR,vT,z,vz,phi], 5: [R,vR,vT,z,vz], 4: [R,vR,vT,phi])
+           tend= (None) time at which the integration ended, if this was before the end of the last step (terminal event)
+        OUTPUT:
+           instance
+        """
+        self._dense= dense
+        self._dim= dim
+        self._tmin= dense[0,0]
+        if tend is None:
+            self._tend= dense[-1,0]+dense[-1,1]
+        else:
+            self._tend= tend
+        self._tmax= self._tend
+        if self._tmin > self._tmax: #backward integration
+            self._tmin, self._tmax= self._tmax, self._tmin
+        return None
+    def __call__(self,t):
+        """
+        NAME:
+           __call__
+        PURPOSE:
+           evaluate the orbit at time(s) t
+        INPUT:
+           t - time or array of times within the integrated range
+        OUTPUT:
+           array [dim,nt]
+        """
+        from galpy.orbit_src.integratePlanarOrbit import _evaluate_dense
+        t= nu.atleast_1d(nu.array(t,dtype=nu.float64))
+        tol= 10.**-10.*(self._tmax-self._tmin)
+        if nu.any(t < self._tmin-tol) or nu.any(t > self._tmax+tol):
+            raise LookupError("Requested time is outside of the range over which the orbit was integrated")
+        return self.rectToCyl(_evaluate_dense(self._dense,t))
+    def rectToCyl(self,rect):
+        """
+        NAME:
+           rectToCyl
+        PURPOSE:
+           convert phase-space points in the rectangular frame used by the integrator to the cylindrical frame of the orbit
+        INPUT:
+           rect - array [n,rdim] of (x,y,z,vx,vy,vz) (rdim=6) or (x,y,vx,vy) (rdim=4)
+        OUTPUT:
+           array [dim,n]
+        """
+        if rect.shape[1] == 6:
+            x, y, z, vx, vy, vz= rect.T
+        else:
+            x, y, vx, vy= rect.T
+        R= nu.sqrt(x**2.+y**2.)
+        phi= nu.arctan2(y,x) % (2.*nu.pi)
+        vR= vx*nu.cos(phi)+vy*nu.sin(phi)
+        vT= vy*nu.cos(phi)-vx*nu.sin(phi)
+        if rect.shape[1] == 6:
+            return nu.array([R,vR,vT,z,vz,phi])[:self._dim]
+        else:
+            return nu.array([R,vR,vT,phi])
+
 class _fakeInterp: 
     """Fake class to simulate interpolation when orbit was not integrated"""
     def __init__(self,x):
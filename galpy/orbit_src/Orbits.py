@@ -0,0 +1,467 @@
+import math as m
+import warnings
+import numpy as nu
+from numpy.lib.format import open_memmap
+from galpy.util import galpyWarning
+from galpy.orbit_src.Orbit import Orbit
+from galpy.orbit_src.FullOrbit import _integrateFullOrbit, \
+    _integrateFullOrbit_dxdv
+from galpy.orbit_src.RZOrbit import _integrateRZOrbit
+from galpy.orbit_src.planarOrbit import _integrateOrbit, _parse_warnmessage
+from galpy.orbit_src.integrateFullOrbit import integrateFullOrbit_c, \
+    _ext_loaded
+from galpy.orbit_src.integratePlanarOrbit import integratePlanarOrbit_c
+from galpy.potential_src.planarPotential import RZToplanarPotential
+ext_loaded= _ext_loaded
+_C_METHODS= ['leapfrog_c','rk4_c','rk6_c','symplec4_c','symplec6_c',
+             'dopr54_c']
+#Number of (object,time) pairs that are transformed to cylindrical coordinates
+#in double precision at once when storing orbits in single precision
+_FLOAT32_NBLOCK= 2**20
+class Orbits:
+    """Class that holds and integrates multiple orbits in the same potential"""
+    def __init__(self,vxvv,vo=None,ro=None):
+        """
+        NAME:
+
+           __init__
+
+        PURPOSE:
+
+           Initialize an Orbits instance
+
+        INPUT:
+
+           vxvv - initial conditions, array [nobj,dim] in Galactocentric cylindrical coordinates (natural units), where each row is [R,vR,vT,z,vz,phi] (dim=6), [R,vR,vT,z,vz] (dim=5), or [R,vR,vT,phi] (dim=4)
+
+        OPTIONAL INPUTS:
+
+           vo - circular velocity at ro (km/s); passed on to the individual Orbit instances
+
+           ro - distance from vantage point to GC (kpc); passed on to the individual Orbit instances
+
+        OUTPUT:
+
+           instance
+
+        """
+        vxvv= nu.array(vxvv,dtype=nu.float64)
+        if len(vxvv.shape) != 2:
+            raise ValueError("vxvv input to Orbits needs to be a 2D array [nobj,dim]")
+        if not vxvv.shape[1] in [4,5,6]:
+            raise ValueError("Orbits only supports 4D (planar), 5D (RZ), or 6D (full) initial conditions")
+        self.vxvv= vxvv
+        self.dim= vxvv.shape[1]
+        self._vo= vo
+        self._ro= ro
+        return None
+
+    def __len__(self):
+        return self.vxvv.shape[0]
+
+    def __getitem__(self,key):
+        """
+        NAME:
+
+           __getitem__
+
+        PURPOSE:
+
+           return a single orbit as an Orbit instance, including the integrated orbit if integrate has been run
+
+        INPUT:
+
+           key - index of the orbit
+
+        OUTPUT:
+
+           Orbit instance
+
+        """
+        out= Orbit(vxvv=self.vxvv[key],vo=self._vo,ro=self._ro)
+        if hasattr(self,'orbit'):
+            out._orb.orbit= self.orbit[key]
+            out._orb.t= self.t
+            out._orb._pot= self._pot
+        return out
+
+    def integrate(self,t,pot,method='symplec4_c',nthreads=None,
+                  out=None,nobj_block=None,nt_block=None,output_every=1,
+                  float32=False):
+        """
+        NAME:
+
+           integrate
+
+        PURPOSE:
+
+           integrate all orbits; if the potential and the method support it, all orbits are integrated in a single call to the C integrators
+
+        INPUT:
+
+           t - list of times at which to output (0 has to be in this!)
+
+           pot - potential instance or list of instances
+
+           method= 'odeint' for scipy's odeint
+                   'leapfrog' for a simple leapfrog implementation
+                   'leapfrog_c' for a simple leapfrog implementation in C
+                   'rk4_c' for a 4th-order Runge-Kutta integrator in C
+                   'rk6_c' for a 6-th order Runge-Kutta integrator in C
+                   'dopr54_c' for a Dormand-Prince integrator in C (generally the fastest)
+
+           nthreads= (None) number of OpenMP threads to use for the C integrators (None: all available)
+
+           out= (None) where to write the integrated orbits: None: keep them in memory; filename: write them to a .npy file that is memory-mapped as the orbit (such that accessors only read the parts of the orbits that they need); function: call out(objslice,tindx,orbit) for each integrated block, with objslice the slice of objects, tindx the indices of the output times (t[::output_every]), and orbit the [nobj_block,len(tindx),dim] block of integrated orbits (the orbits are then not stored)
+
+           nobj_block= (None) integrate the orbits in blocks of this many objects (None: all objects at once)
+
+           nt_block= (None) integrate the orbits in blocks of this many time steps, restarting the integration at the end of each block (None: all times at once)
+
+           output_every= (1) only output every output_every-th time in t (the integration itself is performed on the full t; for the C integrators, the orbits are never stored at the full t)
+
+           float32= (False) if True, store the orbits in single precision (the integration itself is performed in double precision)
+
+        OUTPUT:
+
+           (none) (get the actual orbits using getOrbit())
+
+        """
+        if self.dim == 4:
+            thispot= RZToplanarPotential(pot)
+        else:
+            thispot= pot
+        if hasattr(self,'orbit'): delattr(self,'orbit')
+        self.t= nu.array(t)
+        self._pot= thispot
+        if out is None and nobj_block is None and nt_block is None:
+            self.orbit= self._integrate(self.vxvv,self.t,thispot,method,
+                                        nthreads,output_every=output_every,
+                                        float32=float32)
+            self.t= self.t[::output_every]
+            return None
+        #Integrate in blocks, writing each block to out
+        nobj= len(self)
+        nt= len(self.t)
+        if nobj_block is None: nobj_block= nobj
+        if nt_block is None: nt_block= nt-1
+        #Blocks start at an output time, such that they can be restarted
+        nt_block= max(output_every,(nt_block//output_every)*output_every)
+        tout= self.t[::output_every]
+        if float32: rdtype= nu.float32
+        else: rdtype= nu.float64
+        if out is None:
+            self.orbit= nu.empty((nobj,len(tout),self.dim),dtype=rdtype)
+        elif not callable(out):
+            self.orbit= open_memmap(out,mode='w+',dtype=rdtype,
+                                    shape=(nobj,len(tout),self.dim))
+        for start in range(0,nobj,nobj_block):
+            objslice= slice(start,min(start+nobj_block,nobj))
+            vxvv= self.vxvv[objslice]
+            toff= 0
+            while True:
+                tend= min(toff+nt_block,nt-1)
+                #Blocks are integrated in double precision, such that they can
+                #be restarted without loss of precision
+                orbit= self._integrate(vxvv,self.t[toff:tend+1],thispot,
+                                       method,nthreads,
+                                       output_every=output_every)
+                #The first time of a block is the last of the previous block
+                if toff == 0: first= 0
+                else: first= 1
+                tindx= toff//output_every+nu.arange(first,orbit.shape[1])
+                if len(tindx) > 0:
+                    if callable(out):
+                        out(objslice,tindx,orbit[:,first:].astype(rdtype))
+                    else:
+                        self.orbit[objslice,tindx[0]:tindx[-1]+1]=\
+                            orbit[:,first:]
+                if tend == nt-1: break
+                vxvv= orbit[:,-1]
+                toff= tend
+        self.t= tout
+        if callable(out):
+            if hasattr(self,'orbit'): delattr(self,'orbit')
+        elif not out is None:
+            self.orbit.flush()
+        return None
+
+    def integrate_dxdv(self,dxdv,t,pot,method='dopr54_c',nthreads=None,
+                       rectIn=False,rectOut=False,renorm_every=0):
+        """
+        NAME:
+
+           integrate_dxdv
+
+        PURPOSE:
+
+           integrate all (3D) orbits and a small area of phase space around each of them; if the potential supports it, all orbits are integrated in a single call to the C integrators
+
+        INPUT:
+
+           dxdv - array [nobj,6] of [dR,dvR,dvT,dz,dvz,dphi]
+
+           t - list of times at which to output (0 has to be in this!)
+
+           pot - potential instance or list of instances
+
+           method= 'odeint' for scipy's odeint
+                   'rk4_c' for a 4th-order Runge-Kutta integrator in C
+                   'rk6_c' for a 6-th order Runge-Kutta integrator in C
+                   'dopr54_c' for a Dormand-Prince integrator in C (generally the fastest)
+
+           nthreads= (None) number of OpenMP threads to use for the C integrators (None: all available)
+
+           rectIn= (False) if True, input dxdv is in rectangular coordinates
+
+           rectOut= (False) if True, output dxdv (that in orbit_dxdv) is in rectangular coordinates
+
+           renorm_every= (0) renormalize dxdv to unit length every renorm_every-th time in t (0: never); the actual dxdv is then getOrbit_dxdv() x exp(lnnorm), with lnnorm from getOrbit_dxdv(lnnorm=True)
+
+        OUTPUT:
+
+           (none) (get the integrated dxdv using getOrbit_dxdv(), the orbits are stored as usual)
+
+        """
+        if not self.dim == 6:
+            raise AttributeError("integrate_dxdv is only implemented for 3D orbits with dim=6")
+        if hasattr(self,'orbit'): delattr(self,'orbit')
+        self.t= nu.array(t)
+        self._pot= pot
+        self.orbit_dxdv, self._lnnorm_dxdv, msg=\
+            _integrateFullOrbit_dxdv(self.vxvv,dxdv,pot,self.t,method,
+                                     rectIn,rectOut,renorm_every=renorm_every,
+                                     nthreads=nthreads)
+        self.orbit= self.orbit_dxdv[:,:,:6]
+        return None
+
+    def _integrate(self,vxvv,t,pot,method,nthreads,output_every=1,
+                   float32=False):
+        """
+        NAME:
+           _integrate
+        PURPOSE:
+           integrate a set of orbits at once
+        INPUT:
+           vxvv - initial conditions [nobj,dim]
+           t - times at which to output
+           pot - potential (planarPotential for dim == 4)
+           method - integration method
+           nthreads - number of OpenMP threads (None: all available)
+           output_every= (1) only return every output_every-th time
+           float32= (False) if True, return the orbits in single precision
+        OUTPUT:
+           [nobj,len(t[::output_every]),dim]
+        """
+        if isinstance(pot,list):
+            allHasC= nu.prod([p.hasC for p in pot])
+        else:
+            allHasC= pot.hasC
+        if ext_loaded and allHasC and method.lower() in _C_METHODS:
+            if self.dim == 4:
+                return _integratePlanarOrbits_c(vxvv,pot,t,method,
+                                                nthreads=nthreads,
+                                                output_every=output_every,
+                                                float32=float32)
+            else:
+                return _integrateFullOrbits_c(vxvv,pot,t,method,
+                                              nthreads=nthreads,
+                                              output_every=output_every,
+                                              float32=float32)
+        else:
+            # Fall back onto integrating the orbits one by one
+            if float32: rdtype= nu.float32
+            else: rdtype= nu.float64
+            orbit= nu.empty((vxvv.shape[0],(len(t)-1)//output_every+1,
+                             self.dim),dtype=rdtype)
+            for ii in range(vxvv.shape[0]):
+                if self.dim == 6:
+                    orbit[ii]= _integrateFullOrbit(vxvv[ii],pot,t,
+                                                   method)[::output_every]
+                elif self.dim == 5:
+                    orbit[ii]= _integrateRZOrbit(vxvv[ii],pot,t,
+                                                 method)[::output_every]
+                else:
+                    orbit[ii]= _integrateOrbit(vxvv[ii],pot,t,
+                                               method)[0][::output_every]
+            return orbit
+
+    def getOrbit(self):
+        """
+        NAME:
+
+           getOrbit
+
+        PURPOSE:
+
+           return all integrated orbits
+
+        INPUT:
+
+           (none)
+
+        OUTPUT:
+
+           array orbit[nobj,nt,dim] (the memory-mapped array itself if the orbits were written to a file)
+
+        """
+        if not hasattr(self,'orbit'):
+            raise AttributeError("Integrate the orbits first (orbits integrated with a callback output are not stored)")
+        if isinstance(self.orbit,nu.memmap):
+            return self.orbit
+        return self.orbit.copy()
+
+    def getOrbit_dxdv(self,lnnorm=False):
+        """
+        NAME:
+
+           getOrbit_dxdv
+
+        PURPOSE:
+
+           return all previously integrated small phase-space volumes (with integrate_dxdv)
+
+        INPUT:
+
+           lnnorm= (False) if True, also return the accumulated log of the renormalization factors of dxdv
+
+        OUTPUT:
+
+           array orbit_dxdv[nobj,nt,6] (,array lnnorm[nobj,nt])
+
+        """
+        if not hasattr(self,'orbit_dxdv'):
+            raise AttributeError("Integrate the orbits with integrate_dxdv first")
+        if lnnorm:
+            return (self.orbit_dxdv[:,:,6:].copy(),self._lnnorm_dxdv.copy())
+        return self.orbit_dxdv[:,:,6:].copy()
+
+def _integrateFullOrbits_c(vxvv,pot,t,method,nthreads=None,output_every=1,
+                           float32=False):
+    """
+    NAME:
+       _integrateFullOrbits_c
+    PURPOSE:
+       integrate multiple orbits in a Phi(R,z,phi) potential using a single call to the C integrator
+    INPUT:
+       vxvv - array [nobj,6] or [nobj,5] with the initial conditions stacked like
+              [R,vR,vT,z,vz(,phi)]; vR outward!
+       pot - Potential instance
+       t - list of times at which to output (0 has to be in this!)
+       method - 'leapfrog_c', 'rk4_c', ...
+       nthreads= (None) number of OpenMP threads to use (None: all available)
+       output_every= (1) only return every output_every-th time
+       float32= (False) if True, return the orbits in single precision (the integration and the transformation to cylindrical coordinates are performed in double precision)
+    OUTPUT:
+       [nobj,nt,6] (or [nobj,nt,5]) array of [R,vR,vT,z,vz(,phi)] at each t[::output_every]
+    """
+    if float32:
+        #Integrate and go to the cylindrical frame in double precision in
+        #blocks of objects, only storing the final result in single precision
+        out= nu.empty((vxvv.shape[0],(len(t)-1)//output_every+1,
+                       vxvv.shape[1]),dtype=nu.float32)
+        nobj_block= max(1,_FLOAT32_NBLOCK//out.shape[1])
+        for start in range(0,vxvv.shape[0],nobj_block):
+            out[start:start+nobj_block]=\
+                _integrateFullOrbits_c(vxvv[start:start+nobj_block],pot,t,
+                                       method,nthreads=nthreads,
+                                       output_every=output_every)
+        return out
+    warnings.warn("Using C implementation to integrate orbits",
+                  galpyWarning)
+    dim= vxvv.shape[1]
+    if dim == 5:
+        phio= nu.zeros(vxvv.shape[0])
+    else:
+        phio= vxvv[:,5]
+    #go to the rectangular frame
+    this_vxvv= nu.array([vxvv[:,0]*nu.cos(phio),
+                         vxvv[:,0]*nu.sin(phio),
+                         vxvv[:,3],
+                         vxvv[:,1]*nu.cos(phio)-vxvv[:,2]*nu.sin(phio),
+                         vxvv[:,2]*nu.cos(phio)+vxvv[:,1]*nu.sin(phio),
+                         vxvv[:,4]]).T
+    #integrate
+    tmp_out, msg= integrateFullOrbit_c(pot,this_vxvv,t,method,
+                                       nthreads=nthreads,
+                                       output_every=output_every)
+    #go back to the cylindrical frame
+    R= nu.sqrt(tmp_out[:,:,0]**2.+tmp_out[:,:,1]**2.)
+    phi= nu.arccos(tmp_out[:,:,0]/R)
+    phi[(tmp_out[:,:,1] < 0.)]= 2.*nu.pi-phi[(tmp_out[:,:,1] < 0.)]
+    vR= tmp_out[:,:,3]*nu.cos(phi)+tmp_out[:,:,4]*nu.sin(phi)
+    vT= tmp_out[:,:,4]*nu.cos(phi)-tmp_out[:,:,3]*nu.sin(phi)
+    out= nu.zeros((vxvv.shape[0],tmp_out.shape[1],6),dtype=tmp_out.dtype)
+    out[:,:,0]= R
+    out[:,:,1]= vR
+    out[:,:,2]= vT
+    out[:,:,5]= phi
+    out[:,:,3]= tmp_out[:,:,2]
+    out[:,:,4]= tmp_out[:,:,5]
+    #post-process to remove negative radii
+    neg_radii= (out[:,:,0] < 0.)
+    out[:,:,0][neg_radii]= -out[:,:,0][neg_radii]
+    out[:,:,5][neg_radii]+= m.pi
+    _parse_warnmessage(nu.any(msg == 1))
+    return out[:,:,:dim]
+
+def _integratePlanarOrbits_c(vxvv,pot,t,method,nthreads=None,output_every=1,
+                             float32=False):
+    """
+    NAME:
+       _integratePlanarOrbits_c
+    PURPOSE:
+       integrate multiple orbits in a Phi(R,phi) potential using a single call to the C integrator
+    INPUT:
+       vxvv - array [nobj,4] with the initial conditions stacked like
+              [R,vR,vT,phi]; vR outward!
+       pot - planarPotential instance
+       t - list of times at which to output (0 has to be in this!)
+       method - 'leapfrog_c', 'rk4_c', ...
+       nthreads= (None) number of OpenMP threads to use (None: all available)
+       output_every= (1) only return every output_every-th time
+       float32= (False) if True, return the orbits in single precision (the integration and the transformation to cylindrical coordinates are performed in double precision)
+    OUTPUT:
+       [nobj,nt,4] array of [R,vR,vT,phi] at each t[::output_every]
+    """
+    if float32:
+        #Integrate and go to the cylindrical frame in double precision in
+        #blocks of objects, only storing the final result in single precision
+        out= nu.empty((vxvv.shape[0],(len(t)-1)//output_every+1,4),
+                      dtype=nu.float32)
+        nobj_block= max(1,_FLOAT32_NBLOCK//out.shape[1])
+        for start in range(0,vxvv.shape[0],nobj_block):
+            out[start:start+nobj_block]=\
+                _integratePlanarOrbits_c(vxvv[start:start+nobj_block],pot,t,
+                                         method,nthreads=nthreads,
+                                         output_every=output_every)
+        return out
+    warnings.warn("Using C implementation to integrate orbits",galpyWarning)
+    #go to the rectangular frame
+    this_vxvv= nu.array([vxvv[:,0]*nu.cos(vxvv[:,3]),
+                         vxvv[:,0]*nu.sin(vxvv[:,3]),
+                         vxvv[:,1]*nu.cos(vxvv[:,3])\
+                             -vxvv[:,2]*nu.sin(vxvv[:,3]),
+                         vxvv[:,2]*nu.cos(vxvv[:,3])\
+                             +vxvv[:,1]*nu.sin(vxvv[:,3])]).T
+    #integrate
+    tmp_out, msg= integratePlanarOrbit_c(pot,this_vxvv,t,method,
+                                         nthreads=nthreads,
+                                         output_every=output_every)
+    #go back to the cylindrical frame
+    R= nu.sqrt(tmp_out[:,:,0]**2.+tmp_out[:,:,1]**2.)
+    phi= nu.arccos(tmp_out[:,:,0]/R)
+    phi[(tmp_out[:,:,1] < 0.)]= 2.*nu.pi-phi[(tmp_out[:,:,1] < 0.)]
+    vR= tmp_out[:,:,2]*nu.cos(phi)+tmp_out[:,:,3]*nu.sin(phi)
+    vT= tmp_out[:,:,3]*nu.cos(phi)-tmp_out[:,:,2]*nu.sin(phi)
+    out= nu.zeros((vxvv.shape[0],tmp_out.shape[1],4),dtype=tmp_out.dtype)
+    out[:,:,0]= R
+    out[:,:,1]= vR
+    out[:,:,2]= vT
+    out[:,:,3]= phi
+    #post-process to remove negative radii
+    neg_radii= (out[:,:,0] < 0.)
+    out[:,:,0][neg_radii]= -out[:,:,0][neg_radii]
+    out[:,:,3][neg_radii]+= m.pi
+    _parse_warnmessage(nu.any(msg == 1))
+    return out
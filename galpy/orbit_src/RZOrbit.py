@@ -5,7 +5,8 @@ from galpy.potential_src.Potential import evaluateRforces, evaluatezforces,\
     evaluatePotentials, evaluateDensities
 import galpy.util.bovy_plot as plot
 import galpy.util.bovy_symplecticode as symplecticode
-from galpy.orbit_src.FullOrbit import _integrateFullOrbit
+from galpy.orbit_src.FullOrbit import _integrateFullOrbit, \
+    _integrateFullOrbit_dense
 from galpy.util.bovy_conversion import physical_conversion
 from OrbitTop import OrbitTop
 class RZOrbit(OrbitTop):
@@ -49,7 +50,7 @@ class RZOrbit(OrbitTop):
                           ro=ro,zo=zo,vo=vo,solarmotion=solarmotion)
         return None
 
-    def integrate(self,t,pot,method='symplec4_c'):
+    def integrate(self,t,pot,method='symplec4_c',dense=False,events=None):
         """
         NAME:
            integrate
@@ -64,15 +65,36 @@ class RZOrbit(OrbitTop):
                    'rk4_c' for a 4th-order Runge-Kutta integrator in C
                    'rk6_c' for a 6-th order Runge-Kutta integrator in C
                    'dopr54_c' for a Dormand-Prince integrator in C (generally the fastest)
+           dense= (False) if True, store the dense output of all steps taken by the integrator (only for method='dopr54_c'), such that the orbit can be evaluated at any time between t[0] and t[-1]
+           events= (None) list of events to locate during the integration (only for method='dopr54_c'): 'pericenter', 'apocenter', 'zcross', 'zmax', or ('escape',rmax) to stop the integration when the spherical radius exceeds rmax (get the events using getEvents())
         OUTPUT:
            (none) (get the actual orbit using getOrbit()
         HISTORY:
            2010-07-10
         """
         if hasattr(self,'_orbInterp'): delattr(self,'_orbInterp')
+        if hasattr(self,'_denseInterp'): delattr(self,'_denseInterp')
+        if hasattr(self,'_events'): delattr(self,'_events')
         if hasattr(self,'rs'): delattr(self,'rs')
         self.t= nu.array(t)
         self._pot= pot
+        if dense or not events is None:
+            out= _integrateFullOrbit_dense(self.vxvv,pot,t,method,
+                                           events=events)
+            if not out is None:
+                denseInterp, rawevents= out
+                #Only keep the times before a terminal event
+                self.t= self.t[nu.sign(self.t[-1]-self.t[0])\
+                                   *(self.t-denseInterp._tend) <= 0.]
+                if dense:
+                    #The orbit is evaluated from the dense output when needed
+                    if hasattr(self,'orbit'): delattr(self,'orbit')
+                    self._denseInterp= denseInterp
+                else:
+                    self.orbit= denseInterp(self.t).T
+                if not events is None:
+                    self._setEvents(events,rawevents,denseInterp)
+                return None
         self.orbit= _integrateRZOrbit(self.vxvv,pot,t,method)
 
     @physical_conversion('energy')
@@ -282,7 +304,10 @@ class RZOrbit(OrbitTop):
         if not hasattr(self,'orbit'):
             raise AttributeError("Integrate the orbit first")
         if not hasattr(self,'rs'):
-            self.rs= nu.sqrt(self.orbit[:,0]**2.+self.orbit[:,3]**2.)
+            self.rs= self._with_events(\
+                nu.sqrt(self.orbit[:,0]**2.+self.orbit[:,3]**2.),
+                ['pericenter','apocenter'],
+                lambda x: nu.sqrt(x[:,0]**2.+x[:,3]**2.))
         return (nu.amax(self.rs)-nu.amin(self.rs))/(nu.amax(self.rs)+nu.amin(self.rs))
 
     @physical_conversion('position')
@@ -307,7 +332,10 @@ class RZOrbit(OrbitTop):
         if not hasattr(self,'orbit'):
             raise AttributeError("Integrate the orbit first")
         if not hasattr(self,'rs'):
-            self.rs= nu.sqrt(self.orbit[:,0]**2.+self.orbit[:,3]**2.)
+            self.rs= self._with_events(\
+                nu.sqrt(self.orbit[:,0]**2.+self.orbit[:,3]**2.),
+                ['pericenter','apocenter'],
+                lambda x: nu.sqrt(x[:,0]**2.+x[:,3]**2.))
         return nu.amax(self.rs)
 
     @physical_conversion('position')
@@ -332,7 +360,10 @@ class RZOrbit(OrbitTop):
         if not hasattr(self,'orbit'):
             raise AttributeError("Integrate the orbit first")
         if not hasattr(self,'rs'):
-            self.rs= nu.sqrt(self.orbit[:,0]**2.+self.orbit[:,3]**2.)
+            self.rs= self._with_events(\
+                nu.sqrt(self.orbit[:,0]**2.+self.orbit[:,3]**2.),
+                ['pericenter','apocenter'],
+                lambda x: nu.sqrt(x[:,0]**2.+x[:,3]**2.))
         return nu.amin(self.rs)
 
     @physical_conversion('position')
@@ -354,7 +385,8 @@ class RZOrbit(OrbitTop):
             return zmax
         if not hasattr(self,'orbit'):
             raise AttributeError("Integrate the orbit first")
-        return nu.amax(nu.fabs(self.orbit[:,3]))
+        return nu.amax(nu.fabs(self._with_events(self.orbit[:,3],['zmax'],
+                                                 lambda x: x[:,3])))
 
     def plotEz(self,*args,**kwargs):
         """
@@ -428,11 +460,12 @@ class RZOrbit(OrbitTop):
             kwargs.pop('d1')
         else:
             d1= 't'
-        self.EzJz= [(evaluatePotentials(self.orbit[ii,0],self.orbit[ii,3],
+        orb= self.getOrbit()
+        self.EzJz= [(evaluatePotentials(orb[ii,0],orb[ii,3],
                                         pot,t=self.t[ii])-
-                     evaluatePotentials(self.orbit[ii,0],0.,pot,t=self.t[ii])+
-                     self.orbit[ii,4]**2./2.)/\
-                        nu.sqrt(evaluateDensities(self.orbit[ii,0],0.,pot,
+                     evaluatePotentials(orb[ii,0],0.,pot,t=self.t[ii])+
+                     orb[ii,4]**2./2.)/\
+                        nu.sqrt(evaluateDensities(orb[ii,0],0.,pot,
                                                   t=self.t[ii]))\
                         for ii in range(len(self.t))]
         if not kwargs.has_key('xlabel'):
@@ -443,19 +476,19 @@ class RZOrbit(OrbitTop):
             plot.bovy_plot(nu.array(self.t),nu.array(self.EzJz)/self.EzJz[0],
                            *args,**kwargs)
         elif d1 == 'z':
-            plot.bovy_plot(self.orbit[:,3],nu.array(self.EzJz)/self.EzJz[0],
+            plot.bovy_plot(orb[:,3],nu.array(self.EzJz)/self.EzJz[0],
                            *args,**kwargs)
         elif d1 == 'R':
-            plot.bovy_plot(self.orbit[:,0],nu.array(self.EzJz)/self.EzJz[0],
+            plot.bovy_plot(orb[:,0],nu.array(self.EzJz)/self.EzJz[0],
                            *args,**kwargs)
         elif d1 == 'vR':
-            plot.bovy_plot(self.orbit[:,1],nu.array(self.EzJz)/self.EzJz[0],
+            plot.bovy_plot(orb[:,1],nu.array(self.EzJz)/self.EzJz[0],
                            *args,**kwargs)
         elif d1 == 'vT':
-            plot.bovy_plot(self.orbit[:,2],nu.array(self.EzJz)/self.EzJz[0],
+            plot.bovy_plot(orb[:,2],nu.array(self.EzJz)/self.EzJz[0],
                            *args,**kwargs)
         elif d1 == 'vz':
-            plot.bovy_plot(self.orbit[:,4],nu.array(self.EzJz)/self.EzJz[0],
+            plot.bovy_plot(orb[:,4],nu.array(self.EzJz)/self.EzJz[0],
                            *args,**kwargs)
 
 def _integrateRZOrbit(vxvv,pot,t,method):
@@ -7,7 +7,8 @@ from numpy.ctypeslib import ndpointer
 import os
 from galpy import potential
 from galpy.util import galpyWarning
-from galpy.orbit_src.integratePlanarOrbit import _parse_integrator, _parse_tol
+from galpy.orbit_src.integratePlanarOrbit import _parse_integrator, _parse_tol, \
+    _integrate_dense_c, _parse_events, _parse_movingobject, _parse_wrapper
 #Find and load the library
 _lib= None
 outerr= None
@@ -70,22 +71,40 @@ def _parse_pot(pot,potforactions=False):
             pot_args.extend([p._j1zeros[ii] for ii in range(p._nzeros+1)])
             pot_args.extend([p._dj1zeros[ii] for ii in range(p._nzeros+1)])
             pot_args.extend([p._kp._amp,p._kp.alpha])
+            pot_args.extend(p._glks[0])
+            pot_args.extend(p._cweights[0])
+            pot_args.extend(p._glks[1])
+            pot_args.extend(p._cweights[1])
         elif isinstance(p,potential.FlattenedPowerPotential):
             pot_type.append(12)
             pot_args.extend([p._amp,p.alpha,p.q2,p.core2])
         elif isinstance(p,potential.interpRZPotential):
             pot_type.append(13)
-            pot_args.extend([len(p._rgrid),len(p._zgrid)])
-            if p._logR:
-                pot_args.extend([p._logrgrid[ii] for ii in range(len(p._rgrid))])
+            if p._adaptive:
+                #Non-uniform grid: pass the knots and coefficients of the
+                #splines
+                if potforactions:
+                    splines= [p._potInterp]
+                else:
+                    splines= [p._rforceInterp,p._zforceInterp]
+                tx, ty= splines[0].get_knots()
+                pot_args.extend([1,len(tx),len(ty)])
+                pot_args.extend(tx)
+                pot_args.extend(ty)
+                for spl in splines:
+                    pot_args.extend(spl.get_coeffs())
             else:
-                pot_args.extend([p._rgrid[ii] for ii in range(len(p._rgrid))])
-            pot_args.extend([p._zgrid[ii] for ii in range(len(p._zgrid))])
-            if potforactions:
-                pot_args.extend([x for x in p._potGrid_splinecoeffs.flatten(order='C')])
-            else:
-                pot_args.extend([x for x in p._rforceGrid_splinecoeffs.flatten(order='C')])
-                pot_args.extend([x for x in p._zforceGrid_splinecoeffs.flatten(order='C')])
+                pot_args.extend([0,len(p._rgrid),len(p._zgrid)])
+                if p._logR:
+                    pot_args.extend([p._logrgrid[ii] for ii in range(len(p._rgrid))])
+                else:
+                    pot_args.extend([p._rgrid[ii] for ii in range(len(p._rgrid))])
+                pot_args.extend([p._zgrid[ii] for ii in range(len(p._zgrid))])
+                if potforactions:
+                    pot_args.extend([x for x in p._potGrid_splinecoeffs.flatten(order='C')])
+                else:
+                    pot_args.extend([x for x in p._rforceGrid_splinecoeffs.flatten(order='C')])
+                    pot_args.extend([x for x in p._zforceGrid_splinecoeffs.flatten(order='C')])
             pot_args.extend([p._amp,int(p._logR)])
         elif isinstance(p,potential.IsochronePotential):
             pot_type.append(14)
@@ -93,114 +112,265 @@ def _parse_pot(pot,potforactions=False):
         elif isinstance(p,potential.PowerSphericalPotentialwCutoff):
             pot_type.append(15)
             pot_args.extend([p._amp,p.alpha,p.rc])
+        elif isinstance(p,potential.interp3DPotential):
+            pot_type.append(16)
+            pot_args.extend([p._amp,int(p._logR),int(p._zsym),p._omegab,
+                             p._t0])
+            pot_args.extend(p._coeffs.shape)
+            pot_args.extend([p._x0,p._xgrid[1]-p._xgrid[0],
+                             p._z0,p._zgrid[1]-p._zgrid[0]])
+            pot_args.extend(p._coeffs.flatten(order='C'))
+        elif isinstance(p,potential.SCFPotential):
+            pot_type.append(17)
+            pot_args.extend([p._amp,p.a,p._N,p._L])
+            pot_args.extend(p._Acos.flatten(order='C'))
+            pot_args.extend(p._Asin.flatten(order='C'))
+        elif isinstance(p,potential.BurkertPotential):
+            pot_type.append(18)
+            pot_args.extend([p._amp,p.a])
+        elif isinstance(p,potential.RazorThinExponentialDiskPotential):
+            pot_type.append(19)
+            pot_args.extend([p._amp,p._alpha,p._glorder])
+            pot_args.extend(p._glx)
+            pot_args.extend(p._glw)
+        elif isinstance(p,potential.MovingObjectPotential):
+            pot_type.append(20)
+            pot_args.extend(_parse_movingobject(p))
+        elif isinstance(p,potential.TimeDependentWrapperPotential):
+            pot_type.append(22)
+            wrap_npot, wrap_pot_type, wrap_pot_args= \
+                _parse_pot(p._pot,potforactions=potforactions)
+            pot_args.extend(_parse_wrapper(p,wrap_npot,wrap_pot_type,
+                                           wrap_pot_args))
+        elif isinstance(p,potential.compiledPotential):
+            if potforactions:
+                c_npot, c_pot_type, c_pot_args= p._parse('actions')
+            else:
+                c_npot, c_pot_type, c_pot_args= p._parse('full')
+            npot+= c_npot-1
+            pot_type.extend(c_pot_type)
+            pot_args.extend(c_pot_args)
     pot_type= nu.array(pot_type,dtype=nu.int32,order='C')
     pot_args= nu.array(pot_args,dtype=nu.float64,order='C')
     return (npot,pot_type,pot_args)
 
-def integrateFullOrbit_c(pot,yo,t,int_method,rtol=None,atol=None):
+def _get_compiled(pot):
+    """Return the compiledPotential if pot is one, None otherwise"""
+    if isinstance(pot,list) and len(pot) == 1:
+        pot= pot[0]
+    if isinstance(pot,potential.compiledPotential):
+        return pot
+    else:
+        return None
+
+def _compile_pot_c(npot,pot_type,pot_args):
+    """Set up the C structures for a parsed potential once, such that they can be re-used; returns (handle,ncopies)"""
+    ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
+    compileFunc= _lib.compile_potentialArgs_Full
+    compileFunc.argtypes= [ctypes.c_int,
+                           ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+                           ndpointer(dtype=nu.float64,flags=ndarrayFlags),
+                           ctypes.POINTER(ctypes.c_int)]
+    compileFunc.restype= ctypes.c_void_p
+    ncopies= ctypes.c_int(0) #C code sets up a copy for each thread
+    handle= compileFunc(ctypes.c_int(npot),pot_type,pot_args,
+                        ctypes.byref(ncopies))
+    return (ctypes.c_void_p(handle),ncopies.value)
+
+def _free_pot_c(handle,npot,ncopies):
+    """Free the C structures set up by _compile_pot_c"""
+    freeFunc= _lib.free_potentialArgs_Full
+    freeFunc.argtypes= [ctypes.c_int,ctypes.c_void_p,ctypes.c_int]
+    freeFunc(ctypes.c_int(npot),handle,ctypes.c_int(ncopies))
+    return None
+
+def integrateFullOrbit_c(pot,yo,t,int_method,rtol=None,atol=None,nthreads=None,
+                         output_every=1,float32=False):
     """
     NAME:
        integrateFullOrbit_c
     PURPOSE:
        C integrate an ode for a FullOrbit
     INPUT:
-       pot - Potential or list of such instances
-       yo - initial condition [q,p]
+       pot - Potential or list of such instances (or a compiledPotential, in which case the potential is not parsed again)
+       yo - initial condition [q,p], or array [nobj,6] of such initial conditions for multiple objects
        t - set of times at which one wants the result
        int_method= 'leapfrog_c', 'rk4_c', 'rk6_c', 'symplec4_c'
        rtol, atol
+       nthreads= (None) number of OpenMP threads to use when integrating multiple objects (None: all available)
+       output_every= (1) only return the orbit at every output_every-th time in t (the integration is performed on the full t)
+       float32= (False) if True, return the orbit in single precision (the integration is performed in double precision)
     OUTPUT:
        (y,err)
-       y : array, shape (len(y0), len(t))
+       y : array, shape (len(t[::output_every]),6) or (nobj,len(t[::output_every]),6) for multiple objects
        Array containing the value of y for each desired time in t, \
        with the initial value y0 in the first row.
-       err: error message, if not zero: 1 means maximum step reduction happened for adaptive integrators
+       err: error message, if not zero: 1 means maximum step reduction happened for adaptive integrators (array of nobj for multiple objects)
     HISTORY:
        2011-11-13 - Written - Bovy (IAS)
     """
     rtol, atol= _parse_tol(rtol,atol)
-    npot, pot_type, pot_args= _parse_pot(pot)
+    compiled= _get_compiled(pot)
+    if compiled is None:
+        npot, pot_type, pot_args= _parse_pot(pot)
     int_method_c= _parse_integrator(int_method)
+    yo= nu.array(yo,dtype=nu.float64)
+    multi= len(yo.shape) > 1
+    if not multi: yo= nu.reshape(yo,(1,6))
+    nobj= yo.shape[0]
+    if nthreads is None: nthreads= 0 #C code uses all available threads
 
     #Set up result array
-    result= nu.empty((len(t),6))
-    err= ctypes.c_int(0)
+    if float32: rdtype= nu.float32
+    else: rdtype= nu.float64
+    result= nu.empty((nobj,(len(t)-1)//output_every+1,6),dtype=rdtype)
+    err= nu.zeros(nobj,dtype=nu.int32)
 
     #Set up the C code
     ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
-    integrationFunc= _lib.integrateFullOrbit
-    integrationFunc.argtypes= [ndpointer(dtype=nu.float64,flags=ndarrayFlags),
-                               ctypes.c_int,                             
-                               ndpointer(dtype=nu.float64,flags=ndarrayFlags),
-                               ctypes.c_int,
-                               ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+    if compiled is None:
+        integrationFunc= _lib.integrateFullOrbit
+        potArgtypes= [ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+                      ndpointer(dtype=nu.float64,flags=ndarrayFlags)]
+    else:
+        integrationFunc= _lib.integrateFullOrbit_potentialArgs
+        potArgtypes= [ctypes.c_void_p,ctypes.c_int]
+    integrationFunc.argtypes= [ctypes.c_int,
                                ndpointer(dtype=nu.float64,flags=ndarrayFlags),
-                               ctypes.c_double,
-                               ctypes.c_double,
+                               ctypes.c_int,                             
                                ndpointer(dtype=nu.float64,flags=ndarrayFlags),
-                               ctypes.POINTER(ctypes.c_int),
-                               ctypes.c_int]
+                               ctypes.c_int]\
+                               +potArgtypes\
+                               +[ctypes.c_double,
+                                 ctypes.c_double,
+                                 ndpointer(dtype=rdtype,flags=ndarrayFlags),
+                                 ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+                                 ctypes.c_int,
+                                 ctypes.c_int,
+                                 ctypes.c_int,
+                                 ctypes.c_int]
 
     #Array requirements, first store old order
-    f_cont= [yo.flags['F_CONTIGUOUS'],
-             t.flags['F_CONTIGUOUS']]
+    f_cont= [t.flags['F_CONTIGUOUS']]
     yo= nu.require(yo,dtype=nu.float64,requirements=['C','W'])
     t= nu.require(t,dtype=nu.float64,requirements=['C','W'])
-    result= nu.require(result,dtype=nu.float64,requirements=['C','W'])
+    result= nu.require(result,dtype=rdtype,requirements=['C','W'])
 
     #Run the C code
-    integrationFunc(yo,
-                    ctypes.c_int(len(t)),
-                    t,
-                    ctypes.c_int(npot),
-                    pot_type,
-                    pot_args,
-                    ctypes.c_double(rtol),ctypes.c_double(atol),
-                    result,
-                    ctypes.byref(err),
-                    ctypes.c_int(int_method_c))
+    if compiled is None:
+        integrationFunc(ctypes.c_int(nobj),
+                        yo,
+                        ctypes.c_int(len(t)),
+                        t,
+                        ctypes.c_int(npot),
+                        pot_type,
+                        pot_args,
+                        ctypes.c_double(rtol),ctypes.c_double(atol),
+                        result,
+                        err,
+                        ctypes.c_int(int_method_c),
+                        ctypes.c_int(nthreads),
+                        ctypes.c_int(output_every),
+                        ctypes.c_int(float32))
+    else:
+        handle, npot, ncopies= compiled._c_handle('full')
+        integrationFunc(ctypes.c_int(nobj),
+                        yo,
+                        ctypes.c_int(len(t)),
+                        t,
+                        ctypes.c_int(npot),
+                        handle,
+                        ctypes.c_int(ncopies),
+                        ctypes.c_double(rtol),ctypes.c_double(atol),
+                        result,
+                        err,
+                        ctypes.c_int(int_method_c),
+                        ctypes.c_int(nthreads),
+                        ctypes.c_int(output_every),
+                        ctypes.c_int(float32))
 
     #Reset input arrays
-    if f_cont[0]: yo= nu.asfortranarray(yo)
-    if f_cont[1]: t= nu.asfortranarray(t)
+    if f_cont[0]: t= nu.asfortranarray(t)
 
-    return (result,err.value)
+    if multi:
+        return (result,err)
+    else:
+        return (result[0],err[0])
 
-def integrateFullOrbit_dxdv_c(pot,yo,dyo,t,int_method,rtol=None,atol=None): #pragma: no cover because not included in v1, uncover when included
+def integrateFullOrbit_dense_c(pot,yo,t,rtol=None,atol=None,events=None):
     """
     NAME:
-       integrateFullOrbit_dxdv_c
+       integrateFullOrbit_dense_c
     PURPOSE:
-       C integrate an ode for a planarOrbit+phase space volume dxdv
+       C integrate an ode for a FullOrbit using the Dormand-Prince integrator, storing the dense output of all accepted steps and locating events
     INPUT:
        pot - Potential or list of such instances
        yo - initial condition [q,p]
-       dyo - initial condition [dq,dp]
+       t - set of times; the orbit is integrated from t[0] to t[-1] (t[1]-t[0] is used to estimate the initial step)
+       rtol, atol
+       events= (None) list of events to locate (see integratePlanarOrbit._parse_events)
+    OUTPUT:
+       (dense,events,tend,err)
+       dense : array, shape (nsteps,32), for each accepted step [t_step,h_step,rcont1,...,rcont5], where the rcont are the coefficients of the continuous extension (see integratePlanarOrbit._evaluate_dense)
+       events: array, shape (nfound,8), for each event found [index of the event in events,t,q,p]
+       tend: time at which the integration ended (t[-1] unless a terminal event occurred)
+       err: error message if not zero, 1: maximum step reduction happened
+    """
+    rtol, atol= _parse_tol(rtol,atol)
+    npot, pot_type, pot_args= _parse_pot(pot)
+    return _integrate_dense_c(_lib.integrateFullOrbit_dense,6,yo,t,
+                              npot,pot_type,pot_args,rtol,atol,
+                              _parse_events(events,6))
+
+def integrateFullOrbit_dxdv_c(pot,yo,dyo,t,int_method,rtol=None,atol=None,
+                              nthreads=None,renorm_every=0):
+    """
+    NAME:
+       integrateFullOrbit_dxdv_c
+    PURPOSE:
+       C integrate an ode for a FullOrbit+phase space volume dxdv
+    INPUT:
+       pot - Potential or list of such instances
+       yo - initial condition [q,p], or array [nobj,6] of such initial conditions for multiple objects
+       dyo - initial condition [dq,dp], or array [nobj,6] of such initial conditions for multiple objects
        t - set of times at which one wants the result
-       int_method= 'leapfrog_c', 'rk4_c', 'rk6_c', 'symplec4_c'
+       int_method= 'rk4_c', 'rk6_c', 'dopr54_c'
        rtol, atol
+       nthreads= (None) number of OpenMP threads to use when integrating multiple objects (None: all available)
+       renorm_every= (0) renormalize the deviation [dq,dp] to unit length every renorm_every-th time in t (0: never)
     OUTPUT:
-       (y,err)
-       y : array, shape (len(y0), len(t))
-       Array containing the value of y for each desired time in t, \
-       with the initial value y0 in the first row.
-       err: error message if not zero, 1: maximum step reduction happened for adaptive integrators
+       (y,lnnorm,err)
+       y : array, shape (len(t),12) or (nobj,len(t),12) for multiple objects
+       Array containing the value of [q,p,dq,dp] for each desired time in t, \
+       with the initial value in the first row; when renormalizing, the actual deviation is [dq,dp] x exp(lnnorm)
+       lnnorm: array, shape (len(t)) or (nobj,len(t)), accumulated logarithm of the renormalization factors
+       err: error message, if not zero: 1 means maximum step reduction happened for adaptive integrators (array of nobj for multiple objects)
     HISTORY:
        2011-11-13 - Written - Bovy (IAS)
     """
     rtol, atol= _parse_tol(rtol,atol)
     npot, pot_type, pot_args= _parse_pot(pot)
     int_method_c= _parse_integrator(int_method)
-    yo= nu.concatenate((yo,dyo))
+    yo= nu.array(yo,dtype=nu.float64)
+    dyo= nu.array(dyo,dtype=nu.float64)
+    multi= len(yo.shape) > 1
+    if not multi:
+        yo= nu.reshape(yo,(1,6))
+        dyo= nu.reshape(dyo,(1,6))
+    nobj= yo.shape[0]
+    yo= nu.concatenate((yo,dyo),axis=1)
+    if nthreads is None: nthreads= 0 #C code uses all available threads
 
-    #Set up result array
-    result= nu.empty((len(t),12))
-    err= ctypes.c_int(0)
+    #Set up result arrays
+    result= nu.empty((nobj,len(t),12))
+    lnnorm= nu.empty((nobj,len(t)))
+    err= nu.zeros(nobj,dtype=nu.int32)
 
     #Set up the C code
     ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
     integrationFunc= _lib.integrateFullOrbit_dxdv
-    integrationFunc.argtypes= [ndpointer(dtype=nu.float64,flags=ndarrayFlags),
+    integrationFunc.argtypes= [ctypes.c_int,
+                               ndpointer(dtype=nu.float64,flags=ndarrayFlags),
                                ctypes.c_int,                             
                                ndpointer(dtype=nu.float64,flags=ndarrayFlags),
                                ctypes.c_int,
@@ -208,31 +378,40 @@ def integrateFullOrbit_dxdv_c(pot,yo,dyo,t,int_method,rtol=None,atol=None): #pra
                                ndpointer(dtype=nu.float64,flags=ndarrayFlags),
                                ctypes.c_double,
                                ctypes.c_double,
+                               ctypes.c_int,
+                               ndpointer(dtype=nu.float64,flags=ndarrayFlags),
                                ndpointer(dtype=nu.float64,flags=ndarrayFlags),
-                               ctypes.POINTER(ctypes.c_int),
+                               ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+                               ctypes.c_int,
                                ctypes.c_int]
 
     #Array requirements, first store old order
-    f_cont= [yo.flags['F_CONTIGUOUS'],
-             t.flags['F_CONTIGUOUS']]
+    f_cont= [t.flags['F_CONTIGUOUS']]
     yo= nu.require(yo,dtype=nu.float64,requirements=['C','W'])
     t= nu.require(t,dtype=nu.float64,requirements=['C','W'])
     result= nu.require(result,dtype=nu.float64,requirements=['C','W'])
+    lnnorm= nu.require(lnnorm,dtype=nu.float64,requirements=['C','W'])
 
     #Run the C code
-    integrationFunc(yo,
+    integrationFunc(ctypes.c_int(nobj),
+                    yo,
                     ctypes.c_int(len(t)),
                     t,
                     ctypes.c_int(npot),
                     pot_type,
                     pot_args,
                     ctypes.c_double(rtol),ctypes.c_double(atol),
+                    ctypes.c_int(renorm_every),
                     result,
-                    ctypes.byref(err),
-                    ctypes.c_int(int_method_c))
+                    lnnorm,
+                    err,
+                    ctypes.c_int(int_method_c),
+                    ctypes.c_int(nthreads))
 
     #Reset input arrays
-    if f_cont[0]: yo= nu.asfortranarray(yo)
-    if f_cont[1]: t= nu.asfortranarray(t)
+    if f_cont[0]: t= nu.asfortranarray(t)
 
-    return (result,err.value)
+    if multi:
+        return (result,lnnorm,err)
+    else:
+        return (result[0],lnnorm[0],err[0])
@@ -110,6 +110,10 @@ def _parse_pot(pot):
             pot_args.extend([p._RZPot._j1zeros[ii] for ii in range(p._RZPot._nzeros+1)])
             pot_args.extend([p._RZPot._dj1zeros[ii] for ii in range(p._RZPot._nzeros+1)])
             pot_args.extend([p._RZPot._kp._amp,p._RZPot._kp.alpha])
+            pot_args.extend(p._RZPot._glks[0])
+            pot_args.extend(p._RZPot._cweights[0])
+            pot_args.extend(p._RZPot._glks[1])
+            pot_args.extend(p._RZPot._cweights[1])
         elif isinstance(p,potential_src.planarPotential.planarPotentialFromRZPotential) \
                 and isinstance(p._RZPot,potential.FlattenedPowerPotential):
             pot_type.append(12)
@@ -122,10 +126,134 @@ def _parse_pot(pot):
                  and isinstance(p._RZPot,potential.PowerSphericalPotentialwCutoff):
             pot_type.append(15)
             pot_args.extend([p._RZPot._amp,p._RZPot.alpha,p._RZPot.rc])
+        elif isinstance(p,potential_src.planarPotential.planarPotentialFromRZPotential) \
+                 and isinstance(p._RZPot,potential.interp3DPotential):
+            pot_type.append(16)
+            pot_args.extend([p._RZPot._amp,int(p._RZPot._logR),
+                             int(p._RZPot._zsym),p._RZPot._omegab,
+                             p._RZPot._t0])
+            pot_args.extend(p._RZPot._coeffs.shape)
+            pot_args.extend([p._RZPot._x0,
+                             p._RZPot._xgrid[1]-p._RZPot._xgrid[0],
+                             p._RZPot._z0,
+                             p._RZPot._zgrid[1]-p._RZPot._zgrid[0]])
+            pot_args.extend(p._RZPot._coeffs.flatten(order='C'))
+        elif isinstance(p,potential_src.planarPotential.planarPotentialFromRZPotential) \
+                 and isinstance(p._RZPot,potential.SCFPotential):
+            pot_type.append(17)
+            pot_args.extend([p._RZPot._amp,p._RZPot.a,p._RZPot._N,
+                             p._RZPot._L])
+            pot_args.extend(p._RZPot._Acos.flatten(order='C'))
+            pot_args.extend(p._RZPot._Asin.flatten(order='C'))
+        elif isinstance(p,potential_src.planarPotential.planarPotentialFromRZPotential) \
+                 and isinstance(p._RZPot,potential.BurkertPotential):
+            pot_type.append(18)
+            pot_args.extend([p._RZPot._amp,p._RZPot.a])
+        elif isinstance(p,potential_src.planarPotential.planarPotentialFromRZPotential) \
+                 and isinstance(p._RZPot,potential.RazorThinExponentialDiskPotential):
+            pot_type.append(19)
+            pot_args.extend([p._RZPot._amp,p._RZPot._alpha,
+                             p._RZPot._glorder])
+            pot_args.extend(p._RZPot._glx)
+            pot_args.extend(p._RZPot._glw)
+        elif isinstance(p,potential_src.planarPotential.planarPotentialFromRZPotential) \
+                 and isinstance(p._RZPot,potential.MovingObjectPotential):
+            pot_type.append(20)
+            pot_args.extend(_parse_movingobject(p._RZPot))
+        elif isinstance(p,potential.CosmphiDiskPotential):
+            pot_type.append(21)
+            if p._tform is None:
+                pot_args.extend([p._amp,float('nan'), float('nan'),
+                                 p._mphio,p._p,p._phib,p._m])
+            else:
+                pot_args.extend([p._amp,p._tform,p._tsteady,
+                                 p._mphio,p._p,p._phib,p._m])
+        elif isinstance(p,potential_src.planarPotential.planarPotentialFromRZPotential) \
+                 and isinstance(p._RZPot,potential.TimeDependentWrapperPotential):
+            pot_type.append(22)
+            wrap_npot, wrap_pot_type, wrap_pot_args= \
+                _parse_pot(potential.RZToplanarPotential(p._RZPot._pot))
+            pot_args.extend(_parse_wrapper(p._RZPot,wrap_npot,wrap_pot_type,
+                                           wrap_pot_args))
+        elif isinstance(p,potential_src.planarPotential.planarPotentialFromRZPotential) \
+                 and isinstance(p._RZPot,potential.compiledPotential):
+            c_npot, c_pot_type, c_pot_args= p._RZPot._parse('planar')
+            npot+= c_npot-1
+            pot_type.extend(c_pot_type)
+            pot_args.extend(c_pot_args)
     pot_type= nu.array(pot_type,dtype=nu.int32,order='C')
     pot_args= nu.array(pot_args,dtype=nu.float64,order='C')
     return (npot,pot_type,pot_args)
 
+def _parse_movingobject(p):
+    """Return the C arguments of a MovingObjectPotential: amp, GM, softening length, and the cubic-spline representation of its orbit"""
+    from scipy import interpolate
+    orb= p._orb._orb
+    if hasattr(orb,'t'):
+        ts= nu.array(orb.t,dtype='float')
+        vxvv= orb.orbit
+    else: #Orbit has not been integrated, object does not move
+        ts= nu.array([0.,1.])
+        vxvv= nu.array([orb.vxvv,orb.vxvv])
+    if vxvv.shape[1] == 4 or vxvv.shape[1] == 6:
+        phi= vxvv[:,-1]
+    else:
+        phi= nu.zeros(len(ts))
+    if vxvv.shape[1] > 4:
+        z= vxvv[:,3]
+    else:
+        z= nu.zeros(len(ts))
+    sindx= nu.argsort(ts)
+    ts= ts[sindx]
+    out= [p._amp,p._gm,p._softening._softening_length,len(ts)]
+    out.extend(ts)
+    for coord in [vxvv[:,0]*nu.cos(phi),vxvv[:,0]*nu.sin(phi),z]:
+        out.extend(interpolate.CubicSpline(ts,coord[sindx]).c.flatten())
+    return out
+
+def _parse_wrapper(p,wrap_npot,wrap_pot_type,wrap_pot_args):
+    """Return the C arguments of a TimeDependentWrapperPotential: the parsed wrapped potential(s), followed by amp, tform, tsteady, omegab, and pa"""
+    out= [wrap_npot]
+    out.extend(wrap_pot_type)
+    out.append(len(wrap_pot_args))
+    out.extend(wrap_pot_args)
+    if p._tform is None:
+        out.extend([p._amp,float('nan'),float('nan'),p._omegab,p._pa])
+    else:
+        out.extend([p._amp,p._tform,p._tsteady,p._omegab,p._pa])
+    return out
+
+def _get_compiled(pot):
+    """Return the compiledPotential if pot is (the planar version of) one, None otherwise"""
+    if isinstance(pot,list) and len(pot) == 1:
+        pot= pot[0]
+    if isinstance(pot,potential_src.planarPotential.planarPotentialFromRZPotential) \
+            and isinstance(pot._RZPot,potential.compiledPotential):
+        return pot._RZPot
+    else:
+        return None
+
+def _compile_pot_c(npot,pot_type,pot_args):
+    """Set up the C structures for a parsed potential once, such that they can be re-used; returns (handle,ncopies)"""
+    ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
+    compileFunc= _lib.compile_potentialArgs_planar
+    compileFunc.argtypes= [ctypes.c_int,
+                           ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+                           ndpointer(dtype=nu.float64,flags=ndarrayFlags),
+                           ctypes.POINTER(ctypes.c_int)]
+    compileFunc.restype= ctypes.c_void_p
+    ncopies= ctypes.c_int(0) #C code sets up a copy for each thread
+    handle= compileFunc(ctypes.c_int(npot),pot_type,pot_args,
+                        ctypes.byref(ncopies))
+    return (ctypes.c_void_p(handle),ncopies.value)
+
+def _free_pot_c(handle,npot,ncopies):
+    """Free the C structures set up by _compile_pot_c"""
+    freeFunc= _lib.free_potentialArgs_planar
+    freeFunc.argtypes= [ctypes.c_int,ctypes.c_void_p,ctypes.c_int]
+    freeFunc(ctypes.c_int(npot),handle,ctypes.c_int(ncopies))
+    return None
+
 def _parse_integrator(int_method):
     """parse the integrator method to pass to C"""
     #Pick integrator
@@ -156,74 +284,118 @@ def _parse_tol(rtol,atol):
         atol= nu.log(atol)
     return (rtol,atol)
 
-def integratePlanarOrbit_c(pot,yo,t,int_method,rtol=None,atol=None):
+def integratePlanarOrbit_c(pot,yo,t,int_method,rtol=None,atol=None,nthreads=None,
+                           output_every=1,float32=False):
     """
     NAME:
        integratePlanarOrbit_c
     PURPOSE:
        C integrate an ode for a planarOrbit
     INPUT:
-       pot - Potential or list of such instances
-       yo - initial condition [q,p]
+       pot - Potential or list of such instances (or a compiledPotential, in which case the potential is not parsed again)
+       yo - initial condition [q,p], or array [nobj,4] of such initial conditions for multiple objects
        t - set of times at which one wants the result
        int_method= 'leapfrog_c', 'rk4_c', 'rk6_c', 'symplec4_c'
        rtol, atol
+       nthreads= (None) number of OpenMP threads to use when integrating multiple objects (None: all available)
+       output_every= (1) only return the orbit at every output_every-th time in t (the integration is performed on the full t)
+       float32= (False) if True, return the orbit in single precision (the integration is performed in double precision)
     OUTPUT:
        (y,err)
-       y : array, shape (len(y0), len(t))
+       y : array, shape (len(t[::output_every]),4) or (nobj,len(t[::output_every]),4) for multiple objects
        Array containing the value of y for each desired time in t, \
        with the initial value y0 in the first row.
-       err: error message, if not zero: 1 means maximum step reduction happened for adaptive integrators
+       err: error message, if not zero: 1 means maximum step reduction happened for adaptive integrators (array of nobj for multiple objects)
     HISTORY:
        2011-10-03 - Written - Bovy (IAS)
     """
     rtol, atol= _parse_tol(rtol,atol)
-    npot, pot_type, pot_args= _parse_pot(pot)
+    compiled= _get_compiled(pot)
+    if compiled is None:
+        npot, pot_type, pot_args= _parse_pot(pot)
     int_method_c= _parse_integrator(int_method)
+    yo= nu.array(yo,dtype=nu.float64)
+    multi= len(yo.shape) > 1
+    if not multi: yo= nu.reshape(yo,(1,4))
+    nobj= yo.shape[0]
+    if nthreads is None: nthreads= 0 #C code uses all available threads
 
     #Set up result array
-    result= nu.empty((len(t),4))
-    err= ctypes.c_int(0)
+    if float32: rdtype= nu.float32
+    else: rdtype= nu.float64
+    result= nu.empty((nobj,(len(t)-1)//output_every+1,4),dtype=rdtype)
+    err= nu.zeros(nobj,dtype=nu.int32)
 
     #Set up the C code
     ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
-    integrationFunc= _lib.integratePlanarOrbit
-    integrationFunc.argtypes= [ndpointer(dtype=nu.float64,flags=ndarrayFlags),
-                               ctypes.c_int,                             
-                               ndpointer(dtype=nu.float64,flags=ndarrayFlags),
-                               ctypes.c_int,
-                               ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+    if compiled is None:
+        integrationFunc= _lib.integratePlanarOrbit
+        potArgtypes= [ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+                      ndpointer(dtype=nu.float64,flags=ndarrayFlags)]
+    else:
+        integrationFunc= _lib.integratePlanarOrbit_potentialArgs
+        potArgtypes= [ctypes.c_void_p,ctypes.c_int]
+    integrationFunc.argtypes= [ctypes.c_int,
                                ndpointer(dtype=nu.float64,flags=ndarrayFlags),
-                               ctypes.c_double,
-                               ctypes.c_double,
+                               ctypes.c_int,                             
                                ndpointer(dtype=nu.float64,flags=ndarrayFlags),
-                               ctypes.POINTER(ctypes.c_int),
-                               ctypes.c_int]
+                               ctypes.c_int]\
+                               +potArgtypes\
+                               +[ctypes.c_double,
+                                 ctypes.c_double,
+                                 ndpointer(dtype=rdtype,flags=ndarrayFlags),
+                                 ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+                                 ctypes.c_int,
+                                 ctypes.c_int,
+                                 ctypes.c_int,
+                                 ctypes.c_int]
 
     #Array requirements, first store old order
-    f_cont= [yo.flags['F_CONTIGUOUS'],
-             t.flags['F_CONTIGUOUS']]
+    f_cont= [t.flags['F_CONTIGUOUS']]
     yo= nu.require(yo,dtype=nu.float64,requirements=['C','W'])
     t= nu.require(t,dtype=nu.float64,requirements=['C','W'])
-    result= nu.require(result,dtype=nu.float64,requirements=['C','W'])
+    result= nu.require(result,dtype=rdtype,requirements=['C','W'])
 
     #Run the C code
-    integrationFunc(yo,
-                    ctypes.c_int(len(t)),
-                    t,
-                    ctypes.c_int(npot),
-                    pot_type,
-                    pot_args,
-                    ctypes.c_double(rtol),ctypes.c_double(atol),
-                    result,
-                    ctypes.byref(err),
-                    ctypes.c_int(int_method_c))
+    if compiled is None:
+        integrationFunc(ctypes.c_int(nobj),
+                        yo,
+                        ctypes.c_int(len(t)),
+                        t,
+                        ctypes.c_int(npot),
+                        pot_type,
+                        pot_args,
+                        ctypes.c_double(rtol),ctypes.c_double(atol),
+                        result,
+                        err,
+                        ctypes.c_int(int_method_c),
+                        ctypes.c_int(nthreads),
+                        ctypes.c_int(output_every),
+                        ctypes.c_int(float32))
+    else:
+        handle, npot, ncopies= compiled._c_handle('planar')
+        integrationFunc(ctypes.c_int(nobj),
+                        yo,
+                        ctypes.c_int(len(t)),
+                        t,
+                        ctypes.c_int(npot),
+                        handle,
+                        ctypes.c_int(ncopies),
+                        ctypes.c_double(rtol),ctypes.c_double(atol),
+                        result,
+                        err,
+                        ctypes.c_int(int_method_c),
+                        ctypes.c_int(nthreads),
+                        ctypes.c_int(output_every),
+                        ctypes.c_int(float32))
 
     #Reset input arrays
-    if f_cont[0]: yo= nu.asfortranarray(yo)
-    if f_cont[1]: t= nu.asfortranarray(t)
+    if f_cont[0]: t= nu.asfortranarray(t)
 
-    return (result,err.value)
+    if multi:
+        return (result,err)
+    else:
+        return (result[0],err[0])
 
 
 def integratePlanarOrbit_dxdv_c(pot,yo,dyo,t,int_method,rtol=None,atol=None):
@@ -296,3 +468,166 @@ def integratePlanarOrbit_dxdv_c(pot,yo,dyo,t,int_method,rtol=None,atol=None):
     if f_cont[1]: t= nu.asfortranarray(t)
 
     return (result,err.value)
+
+def integratePlanarOrbit_dense_c(pot,yo,t,rtol=None,atol=None,events=None):
+    """
+    NAME:
+       integratePlanarOrbit_dense_c
+    PURPOSE:
+       C integrate an ode for a planarOrbit using the Dormand-Prince integrator, storing the dense output of all accepted steps and locating events
+    INPUT:
+       pot - Potential or list of such instances
+       yo - initial condition [q,p]
+       t - set of times; the orbit is integrated from t[0] to t[-1] (t[1]-t[0] is used to estimate the initial step)
+       rtol, atol
+       events= (None) list of events to locate (see _parse_events; 'zcross' and 'zmax' are not supported for planar orbits)
+    OUTPUT:
+       (dense,events,tend,err)
+       dense : array, shape (nsteps,22), for each accepted step [t_step,h_step,rcont1,...,rcont5], where the rcont are the coefficients of the continuous extension (see _evaluate_dense)
+       events: array, shape (nfound,6), for each event found [index of the event in events,t,q,p]
+       tend: time at which the integration ended (t[-1] unless a terminal event occurred)
+       err: error message if not zero, 1: maximum step reduction happened
+    """
+    rtol, atol= _parse_tol(rtol,atol)
+    npot, pot_type, pot_args= _parse_pot(pot)
+    return _integrate_dense_c(_lib.integratePlanarOrbit_dense,4,yo,t,
+                              npot,pot_type,pot_args,rtol,atol,
+                              _parse_events(events,4))
+
+def _parse_events(events,dim):
+    """
+    NAME:
+       _parse_events
+    PURPOSE:
+       parse a list of events into the format used by the C code
+    INPUT:
+       events - list of events or None; each event is one of 
+                'pericenter', 'apocenter', 'zcross' (disk crossing), 'zmax' (maximum |z|), or ('escape',rmax) (terminal event when the spherical radius exceeds rmax)
+       dim - dimension of the phase space (6 or 4)
+    OUTPUT:
+       (event_type,event_par,event_dir,event_terminal)
+    """
+    if events is None: events= []
+    nevent= len(events)
+    event_type= nu.empty(nevent,dtype=nu.int32)
+    event_par= nu.zeros(nevent)
+    event_dir= nu.empty(nevent,dtype=nu.int32)
+    event_terminal= nu.zeros(nevent,dtype=nu.int32)
+    for ii,event in enumerate(events):
+        if isinstance(event,(list,tuple)):
+            event, par= event
+        else:
+            par= None
+        if event.lower() == 'pericenter':
+            event_type[ii], event_dir[ii]= 0, 1
+        elif event.lower() == 'apocenter':
+            event_type[ii], event_dir[ii]= 0, -1
+        elif event.lower() == 'zcross' and dim == 6:
+            event_type[ii], event_dir[ii]= 1, 0
+        elif event.lower() == 'zmax' and dim == 6:
+            event_type[ii], event_dir[ii]= 2, -1
+        elif event.lower() == 'escape' and not par is None:
+            event_type[ii], event_dir[ii]= 3, 1
+            event_par[ii]= par
+            event_terminal[ii]= 1
+        else:
+            raise ValueError("Event %s not understood" % str(events[ii]))
+    return (event_type,event_par,event_dir,event_terminal)
+
+def _integrate_dense_c(integrationFunc,dim,yo,t,npot,pot_type,pot_args,
+                       rtol,atol,parsed_events):
+    """Run one of the C dense-output integrators and copy the dense output and events"""
+    #Set up the C code
+    ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
+    integrationFunc.argtypes= [ndpointer(dtype=nu.float64,flags=ndarrayFlags),
+                               ctypes.c_double,
+                               ctypes.c_double,
+                               ctypes.c_double,
+                               ctypes.c_int,
+                               ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+                               ndpointer(dtype=nu.float64,flags=ndarrayFlags),
+                               ctypes.c_double,
+                               ctypes.c_double,
+                               ctypes.c_int,
+                               ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+                               ndpointer(dtype=nu.float64,flags=ndarrayFlags),
+                               ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+                               ndpointer(dtype=nu.int32,flags=ndarrayFlags),
+                               ctypes.POINTER(ctypes.c_int),
+                               ctypes.POINTER(ctypes.POINTER(ctypes.c_double)),
+                               ctypes.POINTER(ctypes.c_int),
+                               ctypes.POINTER(ctypes.POINTER(ctypes.c_double)),
+                               ctypes.POINTER(ctypes.c_double),
+                               ctypes.POINTER(ctypes.c_int)]
+    yo= nu.require(yo,dtype=nu.float64,requirements=['C','W'])
+    event_type, event_par, event_dir, event_terminal= parsed_events
+    nsteps= ctypes.c_int(0)
+    dense= ctypes.POINTER(ctypes.c_double)()
+    nfound= ctypes.c_int(0)
+    events= ctypes.POINTER(ctypes.c_double)()
+    tend= ctypes.c_double(0.)
+    err= ctypes.c_int(0)
+
+    #Run the C code
+    integrationFunc(yo,
+                    ctypes.c_double(t[0]),
+                    ctypes.c_double(t[-1]),
+                    ctypes.c_double(t[1]-t[0]),
+                    ctypes.c_int(npot),
+                    pot_type,
+                    pot_args,
+                    ctypes.c_double(rtol),ctypes.c_double(atol),
+                    ctypes.c_int(len(event_type)),
+                    event_type,
+                    event_par,
+                    event_dir,
+                    event_terminal,
+                    ctypes.byref(nsteps),
+                    ctypes.byref(dense),
+                    ctypes.byref(nfound),
+                    ctypes.byref(events),
+                    ctypes.byref(tend),
+                    ctypes.byref(err))
+
+    #Copy the dense output and events, which were allocated in C, and free them
+    stride= 2+5*dim
+    out= nu.ctypeslib.as_array(dense,shape=(nsteps.value*stride,)).copy()
+    _lib.bovy_dopr54_dense_free.argtypes= [ctypes.POINTER(ctypes.c_double)]
+    _lib.bovy_dopr54_dense_free(dense)
+    if nfound.value > 0:
+        evout= nu.ctypeslib.as_array(events,
+                                     shape=(nfound.value*(2+dim),)).copy()
+    else:
+        evout= nu.empty(0)
+    _lib.bovy_dopr54_dense_free(events)
+    return (out.reshape((nsteps.value,stride)),
+            evout.reshape((nfound.value,2+dim)),
+            tend.value,err.value)
+
+def _evaluate_dense(dense,t):
+    """
+    NAME:
+       _evaluate_dense
+    PURPOSE:
+       evaluate the dense output of the Dormand-Prince integrator at arbitrary times
+    INPUT:
+       dense - dense output (nsteps,2+5*dim) from one of the *_dense_c functions
+       t - array of times within the integrated range
+    OUTPUT:
+       array [len(t),dim]
+    """
+    dim= (dense.shape[1]-2)//5
+    ts= dense[:,0]
+    hs= dense[:,1]
+    #Find the step that each time falls into (the integration can go backward)
+    sign= nu.sign(hs[0])
+    indx= nu.searchsorted(sign*ts,sign*t,side='right')-1
+    indx[indx < 0]= 0
+    theta= ((t-ts[indx])/hs[indx])[:,None]
+    theta1= 1.-theta
+    rcont= dense[indx,2:]
+    return rcont[:,:dim]\
+        +theta*(rcont[:,dim:2*dim]\
+                    +theta1*(rcont[:,2*dim:3*dim]\
+                                 +theta*(rcont[:,3*dim:4*dim]\
+                                             +theta1*rcont[:,4*dim:])))
@@ -5,6 +5,13 @@
 #include <stdlib.h>
 #include <stdbool.h>
 #include <math.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+#define CHUNKSIZE 1
+//Step (relative to r+1) for the finite-difference Hessian in the dxdv integration
+//of potentials without analytic second derivatives
+#define _DXDV_FDSTEP 1e-5
 #include <bovy_symplecticode.h>
 #include <bovy_rk.h>
 //Potentials
@@ -17,6 +24,7 @@
 */
 void evalRectForce(double, double *, double *,
 		   int, struct potentialArg *);
+double evalRectEvent(int,double,double *);
 void evalRectDeriv(double, double *, double *,
 			 int, struct potentialArg *);
 void evalRectDeriv_dxdv(double,double *, double *,
@@ -33,6 +41,10 @@ double calcphi2deriv(double, double, double,double,
 			   int, struct potentialArg *);
 double calcRphideriv(double, double, double,double, 
 			   int, struct potentialArg *);
+double calcz2deriv(double, double, double,double, 
+		   int, struct potentialArg *);
+double calcRzderiv(double, double, double,double, 
+		   int, struct potentialArg *);
 /*
   Actual functions
 */
@@ -41,9 +53,13 @@ void parse_leapFuncArgs_Full(int npot,
 			     int * pot_type,
 			     double * pot_args){
   int ii,jj,kk;
-  int nR, nz;
+  int nR, nz, gridtype;
+  int nwargs;
+  int * wrapped_type;
   double * Rgrid, * zgrid, * potGrid_splinecoeffs;
   for (ii=0; ii < npot; ii++){
+    potentialArgs->nwrapped= 0;
+    potentialArgs->wrappedPotentialArg= NULL;
     potentialArgs->i2drforce= NULL;
     potentialArgs->accxrforce= NULL;
     potentialArgs->accyrforce= NULL;
@@ -55,73 +71,121 @@ void parse_leapFuncArgs_Full(int npot,
       potentialArgs->Rforce= &LogarithmicHaloPotentialRforce;
       potentialArgs->zforce= &LogarithmicHaloPotentialzforce;
       potentialArgs->phiforce= &ZeroForce;
-      //potentialArgs->R2deriv= &LogarithmicHaloPotentialR2deriv;
-      //potentialArgs->planarphi2deriv= &ZeroForce;
-      //potentialArgs->planarRphideriv= &ZeroForce;
+      potentialArgs->R2deriv= &LogarithmicHaloPotentialR2deriv;
+      potentialArgs->z2deriv= &LogarithmicHaloPotentialz2deriv;
+      potentialArgs->Rzderiv= &LogarithmicHaloPotentialRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
       potentialArgs->nargs= 3;
       break;
     case 5: //MiyamotoNagaiPotential, 3 arguments
       potentialArgs->Rforce= &MiyamotoNagaiPotentialRforce;
       potentialArgs->zforce= &MiyamotoNagaiPotentialzforce;
       potentialArgs->phiforce= &ZeroForce;
-      //potentialArgs->R2deriv= &MiyamotoNagaiPotentialR2deriv;
-      //potentialArgs->planarphi2deriv= &ZeroForce;
-      //potentialArgs->planarRphideriv= &ZeroForce;
+      potentialArgs->R2deriv= &MiyamotoNagaiPotentialR2deriv;
+      potentialArgs->z2deriv= &MiyamotoNagaiPotentialz2deriv;
+      potentialArgs->Rzderiv= &MiyamotoNagaiPotentialRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
       potentialArgs->nargs= 3;
       break;
     case 7: //PowerSphericalPotential, 2 arguments
       potentialArgs->Rforce= &PowerSphericalPotentialRforce;
       potentialArgs->zforce= &PowerSphericalPotentialzforce;
       potentialArgs->phiforce= &ZeroForce;
-      //potentialArgs->R2deriv= &PowerSphericalPotentialR2deriv;
-      //potentialArgs->planarphi2deriv= &ZeroForce;
-      //potentialArgs->planarRphideriv= &ZeroForce;
+      potentialArgs->R2deriv= &PowerSphericalPotentialR2deriv;
+      potentialArgs->z2deriv= &PowerSphericalPotentialz2deriv;
+      potentialArgs->Rzderiv= &PowerSphericalPotentialRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
       potentialArgs->nargs= 2;
       break;
     case 8: //HernquistPotential, 2 arguments
       potentialArgs->Rforce= &HernquistPotentialRforce;
       potentialArgs->zforce= &HernquistPotentialzforce;
       potentialArgs->phiforce= &ZeroForce;
-      //potentialArgs->R2deriv= &HernquistPotentialR2deriv;
-      //potentialArgs->planarphi2deriv= &ZeroForce;
-      //potentialArgs->planarRphideriv= &ZeroForce;
+      potentialArgs->R2deriv= &HernquistPotentialR2deriv;
+      potentialArgs->z2deriv= &HernquistPotentialz2deriv;
+      potentialArgs->Rzderiv= &HernquistPotentialRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
       potentialArgs->nargs= 2;
       break;
     case 9: //NFWPotential, 2 arguments
       potentialArgs->Rforce= &NFWPotentialRforce;
       potentialArgs->zforce= &NFWPotentialzforce;
       potentialArgs->phiforce= &ZeroForce;
-      //potentialArgs->R2deriv= &NFWPotentialR2deriv;
-      //potentialArgs->planarphi2deriv= &ZeroForce;
-      //potentialArgs->planarRphideriv= &ZeroForce;
+      potentialArgs->R2deriv= &NFWPotentialR2deriv;
+      potentialArgs->z2deriv= &NFWPotentialz2deriv;
+      potentialArgs->Rzderiv= &NFWPotentialRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
       potentialArgs->nargs= 2;
       break;
     case 10: //JaffePotential, 2 arguments
       potentialArgs->Rforce= &JaffePotentialRforce;
       potentialArgs->zforce= &JaffePotentialzforce;
       potentialArgs->phiforce= &ZeroForce;
-      //potentialArgs->R2deriv= &JaffePotentialR2deriv;
-      //potentialArgs->planarphi2deriv= &ZeroForce;
-      //potentialArgs->planarRphideriv= &ZeroForce;
+      potentialArgs->R2deriv= &JaffePotentialR2deriv;
+      potentialArgs->z2deriv= &JaffePotentialz2deriv;
+      potentialArgs->Rzderiv= &JaffePotentialRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
       potentialArgs->nargs= 2;
       break;
     case 11: //DoubleExponentialDiskPotential, XX arguments
       potentialArgs->Rforce= &DoubleExponentialDiskPotentialRforce;
       potentialArgs->zforce= &DoubleExponentialDiskPotentialzforce;
       potentialArgs->phiforce= &ZeroForce;
+      potentialArgs->R2deriv= &DoubleExponentialDiskPotentialR2deriv;
+      potentialArgs->z2deriv= &DoubleExponentialDiskPotentialz2deriv;
+      potentialArgs->Rzderiv= &DoubleExponentialDiskPotentialRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
       //Look at pot_args to figure out the number of arguments
-      potentialArgs->nargs= (int) (8 + 2 * *(pot_args+5) + 4 * ( *(pot_args+4) + 1 ));
+      potentialArgs->nargs= (int) (8 + 2 * *(pot_args+5) + 4 * ( *(pot_args+4) + 1 )
+				   + 4 * *(pot_args+4) * *(pot_args+5));
       break;
     case 12: //FlattenedPowerPotential, 4 arguments
       potentialArgs->Rforce= &FlattenedPowerPotentialRforce;
       potentialArgs->zforce= &FlattenedPowerPotentialzforce;
       potentialArgs->phiforce= &ZeroForce;
+      potentialArgs->R2deriv= &FlattenedPowerPotentialR2deriv;
+      potentialArgs->z2deriv= &FlattenedPowerPotentialz2deriv;
+      potentialArgs->Rzderiv= &FlattenedPowerPotentialRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
       potentialArgs->nargs= 4;
       break;
     case 13: //interpRZPotential, XX arguments
       //Grab the grids and the coefficients
+      gridtype= (int) *pot_args++;
       nR= (int) *pot_args++;
       nz= (int) *pot_args++;
+      if ( gridtype == 1 ) {
+	//Non-uniform grid: knots and coefficients of the splines
+	potentialArgs->i2drforce= interp_2d_alloc(nR-4,nz-4);
+	interp_2d_init_knots(potentialArgs->i2drforce,pot_args,pot_args+nR,
+			     pot_args+nR+nz);
+	potentialArgs->i2dzforce= interp_2d_alloc(nR-4,nz-4);
+	interp_2d_init_knots(potentialArgs->i2dzforce,pot_args,pot_args+nR,
+			     pot_args+nR+nz+(nR-4)*(nz-4));
+	pot_args+= nR+nz+2*(nR-4)*(nz-4);
+	potentialArgs->accxrforce= gsl_interp_accel_alloc ();
+	potentialArgs->accyrforce= gsl_interp_accel_alloc ();
+	potentialArgs->accxzforce= gsl_interp_accel_alloc ();
+	potentialArgs->accyzforce= gsl_interp_accel_alloc ();
+	potentialArgs->Rforce= &interpRZPotentialRforce;
+	potentialArgs->zforce= &interpRZPotentialzforce;
+	potentialArgs->phiforce= &ZeroForce;
+	potentialArgs->R2deriv= &NumericalR2deriv;
+	potentialArgs->z2deriv= &Numericalz2deriv;
+	potentialArgs->Rzderiv= &NumericalRzderiv;
+	potentialArgs->phi2deriv= &ZeroForce;
+	potentialArgs->Rphideriv= &ZeroForce;
+	potentialArgs->nargs= 2;
+	break;
+      }
       Rgrid= (double *) malloc ( nR * sizeof ( double ) );
       zgrid= (double *) malloc ( nz * sizeof ( double ) );
       potGrid_splinecoeffs= (double *) malloc ( nR * nz * sizeof ( double ) );
@@ -148,6 +212,11 @@ void parse_leapFuncArgs_Full(int npot,
       potentialArgs->Rforce= &interpRZPotentialRforce;
       potentialArgs->zforce= &interpRZPotentialzforce;
       potentialArgs->phiforce= &ZeroForce;
+      potentialArgs->R2deriv= &NumericalR2deriv;
+      potentialArgs->z2deriv= &Numericalz2deriv;
+      potentialArgs->Rzderiv= &NumericalRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
       potentialArgs->nargs= 2;
       //clean up
       free(Rgrid);
@@ -158,17 +227,103 @@ void parse_leapFuncArgs_Full(int npot,
       potentialArgs->Rforce= &IsochronePotentialRforce;
       potentialArgs->zforce= &IsochronePotentialzforce;
       potentialArgs->phiforce= &ZeroForce;
+      potentialArgs->R2deriv= &IsochronePotentialR2deriv;
+      potentialArgs->z2deriv= &IsochronePotentialz2deriv;
+      potentialArgs->Rzderiv= &IsochronePotentialRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
       potentialArgs->nargs= 2;
       break;
     case 15: //PowerSphericalwCutoffPotential, 3 arguments
       potentialArgs->Rforce= &PowerSphericalPotentialwCutoffRforce;
       potentialArgs->zforce= &PowerSphericalPotentialwCutoffzforce;
       potentialArgs->phiforce= &ZeroForce;
-      //potentialArgs->R2deriv= &PowerSphericalPotentialR2deriv;
-      //potentialArgs->planarphi2deriv= &ZeroForce;
-      //potentialArgs->planarRphideriv= &ZeroForce;
+      potentialArgs->R2deriv= &PowerSphericalPotentialwCutoffR2deriv;
+      potentialArgs->z2deriv= &PowerSphericalPotentialwCutoffz2deriv;
+      potentialArgs->Rzderiv= &PowerSphericalPotentialwCutoffRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
       potentialArgs->nargs= 3;
       break;
+    case 16: //interp3DPotential, 12 + nx*nz*nphi arguments
+      potentialArgs->Rforce= &interp3DPotentialRforce;
+      potentialArgs->zforce= &interp3DPotentialzforce;
+      potentialArgs->phiforce= &interp3DPotentialphiforce;
+      potentialArgs->R2deriv= &NumericalR2deriv;
+      potentialArgs->z2deriv= &Numericalz2deriv;
+      potentialArgs->Rzderiv= &NumericalRzderiv;
+      potentialArgs->phi2deriv= &Numericalphi2deriv;
+      potentialArgs->Rphideriv= &NumericalRphideriv;
+      potentialArgs->nargs= 12 + (int) *(pot_args+5) * (int) *(pot_args+6)
+	* (int) *(pot_args+7);
+      break;
+    case 17: //SCFPotential, 4 + 2*N*L*L arguments
+      potentialArgs->Rforce= &SCFPotentialRforce;
+      potentialArgs->zforce= &SCFPotentialzforce;
+      potentialArgs->phiforce= &SCFPotentialphiforce;
+      potentialArgs->R2deriv= &NumericalR2deriv;
+      potentialArgs->z2deriv= &Numericalz2deriv;
+      potentialArgs->Rzderiv= &NumericalRzderiv;
+      potentialArgs->phi2deriv= &Numericalphi2deriv;
+      potentialArgs->Rphideriv= &NumericalRphideriv;
+      potentialArgs->nargs= 4 + 2 * (int) *(pot_args+2) * (int) *(pot_args+3)
+	* (int) *(pot_args+3);
+      break;
+    case 18: //BurkertPotential, 2 arguments
+      potentialArgs->Rforce= &BurkertPotentialRforce;
+      potentialArgs->zforce= &BurkertPotentialzforce;
+      potentialArgs->phiforce= &ZeroForce;
+      potentialArgs->R2deriv= &BurkertPotentialR2deriv;
+      potentialArgs->z2deriv= &BurkertPotentialz2deriv;
+      potentialArgs->Rzderiv= &BurkertPotentialRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
+      potentialArgs->nargs= 2;
+      break;
+    case 19: //RazorThinExponentialDiskPotential, 3 + 2*glorder arguments
+      potentialArgs->Rforce= &RazorThinExponentialDiskPotentialRforce;
+      potentialArgs->zforce= &RazorThinExponentialDiskPotentialzforce;
+      potentialArgs->phiforce= &ZeroForce;
+      potentialArgs->R2deriv= &RazorThinExponentialDiskPotentialR2deriv;
+      potentialArgs->z2deriv= &Numericalz2deriv;
+      potentialArgs->Rzderiv= &NumericalRzderiv;
+      potentialArgs->phi2deriv= &ZeroForce;
+      potentialArgs->Rphideriv= &ZeroForce;
+      potentialArgs->nargs= 3 + 2 * (int) *(pot_args+2);
+      break;
+    case 20: //MovingObjectPotential, 4 + nt + 12*(nt-1) arguments
+      potentialArgs->Rforce= &MovingObjectPotentialRforce;
+      potentialArgs->zforce= &MovingObjectPotentialzforce;
+      potentialArgs->phiforce= &MovingObjectPotentialphiforce;
+      potentialArgs->R2deriv= &MovingObjectPotentialR2deriv;
+      potentialArgs->z2deriv= &MovingObjectPotentialz2deriv;
+      potentialArgs->Rzderiv= &MovingObjectPotentialRzderiv;
+      potentialArgs->phi2deriv= &MovingObjectPotentialphi2deriv;
+      potentialArgs->Rphideriv= &MovingObjectPotentialRphideriv;
+      potentialArgs->nargs= 4 + (int) *(pot_args+3)
+	+ 12 * ( (int) *(pot_args+3) - 1 );
+      break;
+    case 22: //TimeDependentWrapperPotential, 7 + nwrapped + nwargs arguments
+      potentialArgs->nwrapped= (int) *pot_args++;
+      wrapped_type= (int *) malloc ( potentialArgs->nwrapped * sizeof(int) );
+      for (kk=0; kk < potentialArgs->nwrapped; kk++)
+	*(wrapped_type+kk)= (int) *pot_args++;
+      nwargs= (int) *pot_args++;
+      potentialArgs->wrappedPotentialArg= (struct potentialArg *) calloc ( potentialArgs->nwrapped, sizeof (struct potentialArg) );
+      parse_leapFuncArgs_Full(potentialArgs->nwrapped,potentialArgs->wrappedPotentialArg,
+                              wrapped_type,pot_args);
+      pot_args+= nwargs;
+      free(wrapped_type);
+      potentialArgs->Rforce= &TimeDependentWrapperPotentialRforce;
+      potentialArgs->zforce= &TimeDependentWrapperPotentialzforce;
+      potentialArgs->phiforce= &TimeDependentWrapperPotentialphiforce;
+      potentialArgs->R2deriv= &TimeDependentWrapperPotentialR2deriv;
+      potentialArgs->z2deriv= &TimeDependentWrapperPotentialz2deriv;
+      potentialArgs->Rzderiv= &TimeDependentWrapperPotentialRzderiv;
+      potentialArgs->phi2deriv= &TimeDependentWrapperPotentialphi2deriv;
+      potentialArgs->Rphideriv= &TimeDependentWrapperPotentialRphideriv;
+      potentialArgs->nargs= 5;
+      break;
     }
     potentialArgs->args= (double *) malloc( potentialArgs->nargs * sizeof(double));
     for (jj=0; jj < potentialArgs->nargs; jj++){
@@ -180,22 +335,69 @@ void parse_leapFuncArgs_Full(int npot,
   }
   potentialArgs-= npot;
 }
-void integrateFullOrbit(double *yo,
-			int nt, 
-			double *t,
-			int npot,
-			int * pot_type,
-			double * pot_args,
-			double rtol,
-			double atol,
-			double *result,
-			int * err,
-			int odeint_type){
-  //Set up the forces, first count
-  int ii;
+struct potentialArg * compile_potentialArgs_Full(int npot,
+						 int * pot_type,
+						 double * pot_args,
+						 int * ncopies){
+  //Parse the potential ncopies times, such that each thread has its own copy
+  int tid;
+#ifdef _OPENMP
+  if ( *ncopies < 1 ) *ncopies= omp_get_max_threads();
+#else
+  *ncopies= 1;
+#endif
+  struct potentialArg * potentialArgs= (struct potentialArg *) malloc ( *ncopies * npot * sizeof (struct potentialArg) );
+  for (tid=0; tid < *ncopies; tid++)
+    parse_leapFuncArgs_Full(npot,potentialArgs+tid*npot,pot_type,pot_args);
+  return potentialArgs;
+}
+void free_potentialArgs_Full(int npot,
+			     struct potentialArg * potentialArgs,
+			     int ncopies){
+  int jj;
+  for (jj=0; jj < ncopies * npot; jj++) {
+    if ( (potentialArgs+jj)->i2drforce )
+      interp_2d_free((potentialArgs+jj)->i2drforce) ;
+    if ( (potentialArgs+jj)->accxrforce )
+      gsl_interp_accel_free ((potentialArgs+jj)->accxrforce);
+    if ( (potentialArgs+jj)->accyrforce )
+      gsl_interp_accel_free ((potentialArgs+jj)->accyrforce);
+    if ( (potentialArgs+jj)->i2dzforce )
+      interp_2d_free((potentialArgs+jj)->i2dzforce) ;
+    if ( (potentialArgs+jj)->accxzforce )
+      gsl_interp_accel_free ((potentialArgs+jj)->accxzforce);
+    if ( (potentialArgs+jj)->accyzforce )
+      gsl_interp_accel_free ((potentialArgs+jj)->accyzforce);
+    free_wrappedPotentialArgs(potentialArgs+jj);
+    free((potentialArgs+jj)->args);
+  }
+  free(potentialArgs);
+}
+void integrateFullOrbit_potentialArgs(int nobj,
+				      double *yo,
+				      int nt, 
+				      double *t,
+				      int npot,
+				      struct potentialArg * potentialArgs,
+				      int ncopies,
+				      double rtol,
+				      double atol,
+				      void *result,
+				      int * err,
+				      int odeint_type,
+				      int nthreads,
+				      int output_every,
+				      int float32){
+  //potentialArgs contains ncopies copies of the parsed potential
+  int ii, tid;
   int dim;
-  struct potentialArg * potentialArgs= (struct potentialArg *) malloc ( npot * sizeof (struct potentialArg) );
-  parse_leapFuncArgs_Full(npot,potentialArgs,pot_type,pot_args);
+#ifdef _OPENMP
+  if ( nthreads < 1 || nthreads > ncopies ) nthreads= ncopies;
+  if ( nthreads > nobj ) nthreads= nobj;
+  if ( nthreads < 1 ) nthreads= 1;
+#else
+  nthreads= 1;
+#endif
   //Integrate
   void (*odeint_func)(void (*func)(double, double *, double *,
 			   int, struct potentialArg *),
@@ -239,34 +441,141 @@ void integrateFullOrbit(double *yo,
     dim= 6;
     break;
   }
-  odeint_func(odeint_deriv_func,dim,yo,nt,t,npot,potentialArgs,rtol,atol,
-	      result,err);
-  //Free allocated memory
-  for (ii=0; ii < npot; ii++) {
-    free(potentialArgs->args);
-    potentialArgs++;
+  //Integrate all objects with the same potential setup
+  UNUSED int chunk= CHUNKSIZE;
+  //Output every output_every-th time, possibly in single precision; in that
+  //case, the full orbit is integrated in a (per-thread) temporary array
+  int jj, kk;
+  int nt_out= (nt-1)/output_every+1;
+  int direct= ( output_every == 1 && !float32 );
+  double * tmp_result= NULL;
+  if ( !direct )
+    tmp_result= (double *) malloc ( nthreads * 6 * nt * sizeof(double) );
+#pragma omp parallel for schedule(dynamic,chunk) private(tid,ii,jj,kk)	\
+  shared(odeint_func,odeint_deriv_func,dim,yo,nt,t,npot,potentialArgs,rtol,atol,result,err,tmp_result) \
+  num_threads(nthreads)
+  for (ii=0; ii < nobj; ii++){
+#ifdef _OPENMP
+    tid= omp_get_thread_num();
+#else
+    tid = 0;
+#endif
+    if ( direct ) {
+      odeint_func(odeint_deriv_func,dim,yo+6*ii,nt,t,npot,
+		  potentialArgs+tid*npot,rtol,atol,
+		  (double *) result+6*nt*ii,err+ii);
+      continue;
+    }
+    odeint_func(odeint_deriv_func,dim,yo+6*ii,nt,t,npot,
+		potentialArgs+tid*npot,rtol,atol,tmp_result+6*nt*tid,err+ii);
+    for (jj=0; jj < nt_out; jj++)
+      for (kk=0; kk < 6; kk++) {
+	if ( float32 )
+	  *((float *) result+6*(nt_out*ii+jj)+kk)=
+	    (float) *(tmp_result+6*(nt*tid+jj*output_every)+kk);
+	else
+	  *((double *) result+6*(nt_out*ii+jj)+kk)=
+	    *(tmp_result+6*(nt*tid+jj*output_every)+kk);
+      }
   }
-  potentialArgs-= npot;
-  free(potentialArgs);
+  free(tmp_result);
   //Done!
 }
-// LCOV_EXCL_START
-void integrateOrbit_dxdv(double *yo,
-			 int nt, 
-			 double *t,
-			 int npot,
-			 int * pot_type,
-			 double * pot_args,
-			 double rtol,
-			 double atol,
-			 double *result,
-			 int * err,
-			 int odeint_type){
-  //Set up the forces, first count
-  int ii;
-  int dim;
-  struct potentialArg * potentialArgs= (struct potentialArg *) malloc ( npot * sizeof (struct potentialArg) );
-  parse_leapFuncArgs_Full(npot,potentialArgs,pot_type,pot_args);
+void integrateFullOrbit(int nobj,
+			double *yo,
+			int nt, 
+			double *t,
+			int npot,
+			int * pot_type,
+			double * pot_args,
+			double rtol,
+			double atol,
+			void *result,
+			int * err,
+			int odeint_type,
+			int nthreads,
+			int output_every,
+			int float32){
+  //Set up the forces, each thread gets its own copy of the potential
+#ifdef _OPENMP
+  if ( nthreads < 1 ) nthreads= omp_get_max_threads();
+  if ( nthreads > nobj ) nthreads= nobj;
+  if ( nthreads < 1 ) nthreads= 1;
+#else
+  nthreads= 1;
+#endif
+  struct potentialArg * potentialArgs= compile_potentialArgs_Full(npot,pot_type,pot_args,&nthreads);
+  //Integrate
+  integrateFullOrbit_potentialArgs(nobj,yo,nt,t,npot,potentialArgs,nthreads,
+				   rtol,atol,result,err,odeint_type,nthreads,
+				   output_every,float32);
+  //Free allocated memory
+  free_potentialArgs_Full(npot,potentialArgs,nthreads);
+  //Done!
+}
+void integrateFullOrbit_dense(double *yo,
+                              double to,
+                              double tf,
+                              double dt,
+                              int npot,
+                              int * pot_type,
+                              double * pot_args,
+                              double rtol,
+                              double atol,
+                              int nevent,
+                              int * event_type,
+                              double * event_par,
+                              int * event_dir,
+                              int * event_terminal,
+                              int * nsteps,
+                              double ** dense,
+                              int * nfound,
+                              double ** events,
+                              double * tend,
+                              int * err){
+  //Integrate a single orbit with DOPR54, store its dense output, and locate
+  //events
+  int ncopies= 1;
+  struct potentialArg * potentialArgs= compile_potentialArgs_Full(npot,pot_type,pot_args,&ncopies);
+  bovy_dopr54_events(&evalRectDeriv,6,yo,to,tf,dt,npot,potentialArgs,rtol,atol,
+		     &evalRectEvent,nevent,event_type,event_par,event_dir,
+		     event_terminal,nsteps,dense,nfound,events,tend,err);
+  free_potentialArgs_Full(npot,potentialArgs,ncopies);
+}
+void integrateFullOrbit_dxdv(int nobj,
+			     double *yo,
+			     int nt, 
+			     double *t,
+			     int npot,
+			     int * pot_type,
+			     double * pot_args,
+			     double rtol,
+			     double atol,
+			     int renorm_every,
+			     double *result,
+			     double *lnnorm,
+			     int * err,
+			     int odeint_type,
+			     int nthreads){
+  //Integrate nobj orbits together with their deviation vectors (yo and 
+  //result are [nobj,nt,12]); every renorm_every outputs the deviation 
+  //vector is renormalized to unit length and the log of its norm is 
+  //accumulated in lnnorm [nobj,nt], such that the actual deviation vector
+  //is result x exp(lnnorm); renorm_every < 1 means no renormalization
+  int ii, jj, kk, tid;
+  int start, nseg, end, seg_err;
+  double norm;
+  double yseg[12];
+  UNUSED int chunk= CHUNKSIZE;
+  //Set up the forces, each thread gets its own copy of the potential
+#ifdef _OPENMP
+  if ( nthreads < 1 ) nthreads= omp_get_max_threads();
+  if ( nthreads > nobj ) nthreads= nobj;
+  if ( nthreads < 1 ) nthreads= 1;
+#else
+  nthreads= 1;
+#endif
+  struct potentialArg * potentialArgs= compile_potentialArgs_Full(npot,pot_type,pot_args,&nthreads);
   //Integrate
   void (*odeint_func)(void (*func)(double, double *, double *,
 			   int, struct potentialArg *),
@@ -276,52 +585,61 @@ void integrateOrbit_dxdv(double *yo,
 		      int, struct potentialArg *,
 		      double, double,
 		      double *,int *);
-  void (*odeint_deriv_func)(double, double *, double *,
-			    int,struct potentialArg *);
   switch ( odeint_type ) {
-  case 0: //leapfrog
-    odeint_func= &leapfrog;
-    odeint_deriv_func= &evalRectForce;
-    dim= 6;
-    break;
   case 1: //RK4
     odeint_func= &bovy_rk4;
-    odeint_deriv_func= &evalRectDeriv_dxdv;
-    dim= 12;
     break;
   case 2: //RK6
     odeint_func= &bovy_rk6;
-    odeint_deriv_func= &evalRectDeriv_dxdv;
-    dim= 12;
-    break;
-  case 3: //symplec4
-    odeint_func= &symplec4;
-    odeint_deriv_func= &evalRectForce;
-    dim= 6;
-    break;
-  case 4: //symplec6
-    odeint_func= &symplec6;
-    odeint_deriv_func= &evalRectForce;
-    dim= 6;
     break;
   case 5: //DOPR54
+  default: //symplectic integrators cannot be used for the deviations
     odeint_func= &bovy_dopr54;
-    odeint_deriv_func= &evalRectDeriv_dxdv;
-    dim= 12;
     break;
   }
-  odeint_func(odeint_deriv_func,dim,yo,nt,t,npot,potentialArgs,rtol,atol,
-	      result,err);
-  //Free allocated memory
-  for (ii=0; ii < npot; ii++) {
-    free(potentialArgs->args);
-    potentialArgs++;
+  int renorm= ( renorm_every > 0 );
+  if ( !renorm || renorm_every > nt-1 ) renorm_every= nt-1;
+#pragma omp parallel for schedule(dynamic,chunk)			\
+  private(tid,ii,jj,kk,start,nseg,end,seg_err,norm,yseg)		\
+  shared(odeint_func,yo,nt,t,npot,potentialArgs,rtol,atol,result,lnnorm,err,renorm,renorm_every) \
+  num_threads(nthreads)
+  for (ii=0; ii < nobj; ii++){
+#ifdef _OPENMP
+    tid= omp_get_thread_num();
+#else
+    tid = 0;
+#endif
+    *(err+ii)= 0;
+    *(lnnorm+nt*ii)= 0.;
+    for (kk=0; kk < 12; kk++) *(yseg+kk)= *(yo+12*ii+kk);
+    //Integrate in segments of renorm_every outputs
+    for (start=0; start < nt-1; start+= renorm_every){
+      nseg= ( nt-1-start < renorm_every ) ? nt-start : renorm_every+1;
+      end= start+nseg-1;
+      odeint_func(&evalRectDeriv_dxdv,12,yseg,nseg,t+start,npot,
+		  potentialArgs+tid*npot,rtol,atol,result+12*(nt*ii+start),
+		  &seg_err);
+      if ( seg_err ) *(err+ii)= seg_err;
+      for (jj=start+1; jj <= end; jj++)
+	*(lnnorm+nt*ii+jj)= *(lnnorm+nt*ii+start);
+      if ( renorm ) {
+	norm= 0.;
+	for (kk=6; kk < 12; kk++)
+	  norm+= *(result+12*(nt*ii+end)+kk) * *(result+12*(nt*ii+end)+kk);
+	norm= sqrt(norm);
+	if ( norm > 0. ) {
+	  for (kk=6; kk < 12; kk++)
+	    *(result+12*(nt*ii+end)+kk)/= norm;
+	  *(lnnorm+nt*ii+end)+= log(norm);
+	}
+      }
+      for (kk=0; kk < 12; kk++) *(yseg+kk)= *(result+12*(nt*ii+end)+kk);
+    }
   }
-  potentialArgs-= npot;
-  free(potentialArgs);
+  //Free allocated memory
+  free_potentialArgs_Full(npot,potentialArgs,nthreads);
   //Done!
 }
-// LCOV_EXCL_STOP
 void evalRectForce(double t, double *q, double *a,
 		   int nargs, struct potentialArg * potentialArgs){
   double sinphi, cosphi, x, y, phi,R,Rforce,phiforce, z, zforce;
@@ -342,6 +660,21 @@ void evalRectForce(double t, double *q, double *a,
   *a++= sinphi*Rforce+1./R*cosphi*phiforce;
   *a= zforce;
 }
+double evalRectEvent(int type, double par, double *q){
+  //Event functions for the orbit q= (x,y,z,vx,vy,vz)
+  switch ( type ) {
+  case 0: //spherical radial velocity x r: peri- and apocenters
+    return *q * *(q+3) + *(q+1) * *(q+4) + *(q+2) * *(q+5);
+  case 1: //z: disk crossings
+    return *(q+2);
+  case 2: //z x vz: maximum |z| when it goes from positive to negative
+    return *(q+2) * *(q+5);
+  case 3: //spherical radius - par: escape
+    return sqrt( *q * *q + *(q+1) * *(q+1) + *(q+2) * *(q+2) ) - par;
+  default:
+    return 1.;
+  }
+}
 void evalRectDeriv(double t, double *q, double *a,
 		   int nargs, struct potentialArg * potentialArgs){
   double sinphi, cosphi, x, y, phi,R,Rforce,phiforce,z,zforce;
@@ -404,16 +737,26 @@ double calcPhiforce(double R, double Z, double phi, double t,
   potentialArgs-= nargs;
   return phiforce;
 }
-// LCOV_EXCL_START
 void evalRectDeriv_dxdv(double t, double *q, double *a,
 			int nargs, struct potentialArg * potentialArgs){
-  double sinphi, cosphi, x, y, phi,R,Rforce,phiforce,z,zforce;
-  double R2deriv, phi2deriv, Rphideriv, dFxdx, dFxdy, dFydx, dFydy;
-  //first three derivatives are just the velocities
-  *a++= *(q+3);
-  *a++= *(q+4);
-  *a++= *(q+5);
-  //Rest is force
+  //Derivatives of (x,v,dx,dv); the derivative of dv is the Hessian of the
+  //potential times dx, which is computed from the analytic second
+  //derivatives for axisymmetric potentials that have them and as the
+  //central finite difference of the force along dx for all others
+  int ii, jj;
+  double sinphi, cosphi, x, y, z, phi, R, Rforce, R2deriv, z2deriv, Rzderiv;
+  double dFxdx, dFxdy, dFydy, dFxdz, dFydz, dFzdz;
+  double r, dxnorm, eps;
+  double qp[3], qm[3], Fp[3], Fm[3];
+  struct potentialArg * thisPotentialArg;
+  //first six derivatives are the velocities and the force
+  evalRectDeriv(t,q,a,nargs,potentialArgs);
+  //dx derivatives are just dv
+  for (ii=0; ii < 3; ii++) *(a+6+ii)= *(q+9+ii);
+  //dv derivatives
+  for (ii=0; ii < 3; ii++) *(a+9+ii)= 0.;
+  dxnorm= sqrt( *(q+6) * *(q+6) + *(q+7) * *(q+7) + *(q+8) * *(q+8) );
+  if ( dxnorm == 0. ) return;
   //q is rectangular so calculate R and phi
   x= *q;
   y= *(q+1);
@@ -423,45 +766,43 @@ void evalRectDeriv_dxdv(double t, double *q, double *a,
   sinphi= y/R;
   cosphi= x/R;
   if ( y < 0. ) phi= 2.*M_PI-phi;
-  //Calculate the forces
-  Rforce= calcRforce(R,z,phi,t,nargs,potentialArgs);
-  zforce= calczforce(R,z,phi,t,nargs,potentialArgs);
-  phiforce= calcPhiforce(R,z,phi,t,nargs,potentialArgs);
-  *a++= cosphi*Rforce-1./R*sinphi*phiforce;
-  *a++= sinphi*Rforce+1./R*cosphi*phiforce;
-  *a++= zforce;
-  //dx derivatives are just dv
-  *a++= *(q+9);
-  *a++= *(q+10);
-  *a++= *(q+11);
-  //for the dv derivatives we need also R2deriv, phi2deriv, and Rphideriv
-  R2deriv= calcR2deriv(R,z,phi,t,nargs,potentialArgs);
-  phi2deriv= calcphi2deriv(R,z,phi,t,nargs,potentialArgs);
-  Rphideriv= calcRphideriv(R,z,phi,t,nargs,potentialArgs);
-  //..and dFxdx, dFxdy, dFydx, dFydy
-  dFxdx= -cosphi*cosphi*R2deriv
-    +2.*cosphi*sinphi/R/R*phiforce
-    +sinphi*sinphi/R*Rforce
-    +2.*sinphi*cosphi/R*Rphideriv
-    -sinphi*sinphi/R/R*phi2deriv;
-  dFxdy= -sinphi*cosphi*R2deriv
-    +(sinphi*sinphi-cosphi*cosphi)/R/R*phiforce
-    -cosphi*sinphi/R*Rforce
-    -(cosphi*cosphi-sinphi*sinphi)/R*Rphideriv
-    +cosphi*sinphi/R/R*phi2deriv;
-  dFydx= -cosphi*sinphi*R2deriv
-    +(sinphi*sinphi-cosphi*cosphi)/R/R*phiforce
-    +(sinphi*sinphi-cosphi*cosphi)/R*Rphideriv
-    -sinphi*cosphi/R*Rforce
-    +sinphi*cosphi/R/R*phi2deriv;
-  dFydy= -sinphi*sinphi*R2deriv
-    -2.*sinphi*cosphi/R/R*phiforce
-    -2.*sinphi*cosphi/R*Rphideriv
-    +cosphi*cosphi/R*Rforce
-    -cosphi*cosphi/R/R*phi2deriv;
-  *a++= dFxdx * *(q+4) + dFxdy * *(q+5);
-  *a++= dFydx * *(q+4) + dFydy * *(q+5);
-  *a= 0; //BOVY: PUT IN Z2DERIVS
+  //finite-difference points
+  r= sqrt( R*R + z*z );
+  eps= _DXDV_FDSTEP * ( r + 1. ) / dxnorm; //floor, for orbits through r=0
+  for (ii=0; ii < 3; ii++) {
+    *(qp+ii)= *(q+ii) + eps * *(q+6+ii);
+    *(qm+ii)= *(q+ii) - eps * *(q+6+ii);
+  }
+  for (jj=0; jj < nargs; jj++){
+    thisPotentialArg= potentialArgs+jj;
+    if ( R > 0.
+	 && thisPotentialArg->phiforce == &ZeroForce
+	 && thisPotentialArg->phi2deriv == &ZeroForce
+	 && thisPotentialArg->Rphideriv == &ZeroForce
+	 && thisPotentialArg->R2deriv != &NumericalR2deriv
+	 && thisPotentialArg->z2deriv != &Numericalz2deriv
+	 && thisPotentialArg->Rzderiv != &NumericalRzderiv ) {
+      Rforce= thisPotentialArg->Rforce(R,z,phi,t,thisPotentialArg);
+      R2deriv= thisPotentialArg->R2deriv(R,z,phi,t,thisPotentialArg);
+      z2deriv= thisPotentialArg->z2deriv(R,z,phi,t,thisPotentialArg);
+      Rzderiv= thisPotentialArg->Rzderiv(R,z,phi,t,thisPotentialArg);
+      dFxdx= -cosphi*cosphi*R2deriv+sinphi*sinphi/R*Rforce;
+      dFxdy= -sinphi*cosphi*R2deriv-cosphi*sinphi/R*Rforce;
+      dFydy= -sinphi*sinphi*R2deriv+cosphi*cosphi/R*Rforce;
+      dFxdz= -cosphi*Rzderiv;
+      dFydz= -sinphi*Rzderiv;
+      dFzdz= -z2deriv;
+      *(a+9)+= dFxdx * *(q+6) + dFxdy * *(q+7) + dFxdz * *(q+8);
+      *(a+10)+= dFxdy * *(q+6) + dFydy * *(q+7) + dFydz * *(q+8);
+      *(a+11)+= dFxdz * *(q+6) + dFydz * *(q+7) + dFzdz * *(q+8);
+    }
+    else {
+      evalRectForce(t,qp,Fp,1,thisPotentialArg);
+      evalRectForce(t,qm,Fm,1,thisPotentialArg);
+      for (ii=0; ii < 3; ii++)
+	*(a+9+ii)+= ( *(Fp+ii) - *(Fm+ii) ) / 2. / eps;
+    }
+  }
 }
 
 double calcR2deriv(double R, double Z, double phi, double t, 
@@ -501,4 +842,27 @@ double calcRphideriv(double R, double Z, double phi, double t,
   potentialArgs-= nargs;
   return Rphideriv;
 }
-// LCOV_EXCL_STOP
+double calcz2deriv(double R, double Z, double phi, double t, 
+		   int nargs, struct potentialArg * potentialArgs){
+  int ii;
+  double z2deriv= 0.;
+  for (ii=0; ii < nargs; ii++){
+    z2deriv+= potentialArgs->z2deriv(R,Z,phi,t,
+				     potentialArgs);
+    potentialArgs++;
+  }
+  potentialArgs-= nargs;
+  return z2deriv;
+}
+double calcRzderiv(double R, double Z, double phi, double t, 
+		   int nargs, struct potentialArg * potentialArgs){
+  int ii;
+  double Rzderiv= 0.;
+  for (ii=0; ii < nargs; ii++){
+    Rzderiv+= potentialArgs->Rzderiv(R,Z,phi,t,
+				     potentialArgs);
+    potentialArgs++;
+  }
+  potentialArgs-= nargs;
+  return Rzderiv;
+}
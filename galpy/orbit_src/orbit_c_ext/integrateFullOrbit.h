@@ -2,6 +2,14 @@
 #define __INTEGRATEFULLORBIT_H__
 #include <galpy_potentials.h>
 void parse_leapFuncArgs_Full(int, struct potentialArg *,int *,double *);
+struct potentialArg * compile_potentialArgs_Full(int,int *,double *,int *);
+void free_potentialArgs_Full(int,struct potentialArg *,int);
 double calcRforce(double,double,double,double,int,struct potentialArg *);
 double calczforce(double,double,double,double,int,struct potentialArg *);
+double calcPhiforce(double,double,double,double,int,struct potentialArg *);
+double calcR2deriv(double,double,double,double,int,struct potentialArg *);
+double calcz2deriv(double,double,double,double,int,struct potentialArg *);
+double calcRzderiv(double,double,double,double,int,struct potentialArg *);
+double calcphi2deriv(double,double,double,double,int,struct potentialArg *);
+double calcRphideriv(double,double,double,double,int,struct potentialArg *);
 #endif /* integrateFullOrbit.h */
@@ -5,6 +5,10 @@
 #include <stdlib.h>
 #include <stdbool.h>
 #include <math.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+#define CHUNKSIZE 1
 #include <bovy_symplecticode.h>
 #include <bovy_rk.h>
 //Potentials
@@ -17,6 +21,7 @@
 */
 void evalPlanarRectForce(double, double *, double *,
 			 int, struct potentialArg *);
+double evalPlanarRectEvent(int,double,double *);
 void evalPlanarRectDeriv(double, double *, double *,
 			 int, struct potentialArg *);
 void evalPlanarRectDeriv_dxdv(double, double *, double *,
@@ -37,8 +42,12 @@ double calcPlanarRphideriv(double, double, double,
 void parse_leapFuncArgs(int npot,struct potentialArg * potentialArgs,
 			int * pot_type,
 			double * pot_args){
-  int ii,jj;
+  int ii,jj,kk;
+  int nwargs;
+  int * wrapped_type;
   for (ii=0; ii < npot; ii++){
+    potentialArgs->nwrapped= 0;
+    potentialArgs->wrappedPotentialArg= NULL;
     switch ( *pot_type++ ) {
     case 0: //LogarithmicHaloPotential, 2 arguments
       potentialArgs->planarRforce= &LogarithmicHaloPotentialPlanarRforce;
@@ -125,11 +134,12 @@ void parse_leapFuncArgs(int npot,struct potentialArg * potentialArgs,
     case 11: //DoubleExponentialDiskPotential, XX arguments
       potentialArgs->planarRforce= &DoubleExponentialDiskPotentialPlanarRforce;
       potentialArgs->planarphiforce= &ZeroPlanarForce;
-      //potentialArgs->planarR2deriv= &DoubleExponentialDiskPotentialPlanarR2deriv;
+      potentialArgs->planarR2deriv= &DoubleExponentialDiskPotentialPlanarR2deriv;
       potentialArgs->planarphi2deriv= &ZeroPlanarForce;
       potentialArgs->planarRphideriv= &ZeroPlanarForce;
       //Look at pot_args to figure out the number of arguments
-      potentialArgs->nargs= (int) (8 + 2 * *(pot_args+5) + 4 * ( *(pot_args+4) + 1 ));
+      potentialArgs->nargs= (int) (8 + 2 * *(pot_args+5) + 4 * ( *(pot_args+4) + 1 )
+				   + 4 * *(pot_args+4) * *(pot_args+5));
       break;
     case 12: //FlattenedPowerPotential, 4 arguments
       potentialArgs->planarRforce= &FlattenedPowerPotentialPlanarRforce;
@@ -155,6 +165,81 @@ void parse_leapFuncArgs(int npot,struct potentialArg * potentialArgs,
       potentialArgs->planarRphideriv= &ZeroPlanarForce;
       potentialArgs->nargs= 3;
       break;
+    case 16: //interp3DPotential, 12 + nx*nz*nphi arguments
+      potentialArgs->planarRforce= &interp3DPotentialPlanarRforce;
+      potentialArgs->planarphiforce= &interp3DPotentialPlanarphiforce;
+      //second derivatives are computed numerically from the 3D forces
+      potentialArgs->Rforce= &interp3DPotentialRforce;
+      potentialArgs->phiforce= &interp3DPotentialphiforce;
+      potentialArgs->planarR2deriv= &NumericalPlanarR2deriv;
+      potentialArgs->planarphi2deriv= &NumericalPlanarphi2deriv;
+      potentialArgs->planarRphideriv= &NumericalPlanarRphideriv;
+      potentialArgs->nargs= 12 + (int) *(pot_args+5) * (int) *(pot_args+6)
+	* (int) *(pot_args+7);
+      break;
+    case 17: //SCFPotential, 4 + 2*N*L*L arguments
+      potentialArgs->planarRforce= &SCFPotentialPlanarRforce;
+      potentialArgs->planarphiforce= &SCFPotentialPlanarphiforce;
+      //second derivatives are computed numerically from the 3D forces
+      potentialArgs->Rforce= &SCFPotentialRforce;
+      potentialArgs->phiforce= &SCFPotentialphiforce;
+      potentialArgs->planarR2deriv= &NumericalPlanarR2deriv;
+      potentialArgs->planarphi2deriv= &NumericalPlanarphi2deriv;
+      potentialArgs->planarRphideriv= &NumericalPlanarRphideriv;
+      potentialArgs->nargs= 4 + 2 * (int) *(pot_args+2) * (int) *(pot_args+3)
+	* (int) *(pot_args+3);
+      break;
+    case 18: //BurkertPotential, 2 arguments
+      potentialArgs->planarRforce= &BurkertPotentialPlanarRforce;
+      potentialArgs->planarphiforce= &ZeroPlanarForce;
+      potentialArgs->planarR2deriv= &BurkertPotentialPlanarR2deriv;
+      potentialArgs->planarphi2deriv= &ZeroPlanarForce;
+      potentialArgs->planarRphideriv= &ZeroPlanarForce;
+      potentialArgs->nargs= 2;
+      break;
+    case 19: //RazorThinExponentialDiskPotential, 3 + 2*glorder arguments
+      potentialArgs->planarRforce= &RazorThinExponentialDiskPotentialPlanarRforce;
+      potentialArgs->planarphiforce= &ZeroPlanarForce;
+      potentialArgs->planarR2deriv= &RazorThinExponentialDiskPotentialPlanarR2deriv;
+      potentialArgs->planarphi2deriv= &ZeroPlanarForce;
+      potentialArgs->planarRphideriv= &ZeroPlanarForce;
+      potentialArgs->nargs= 3 + 2 * (int) *(pot_args+2);
+      break;
+    case 20: //MovingObjectPotential, 4 + nt + 12*(nt-1) arguments
+      potentialArgs->planarRforce= &MovingObjectPotentialPlanarRforce;
+      potentialArgs->planarphiforce= &MovingObjectPotentialPlanarphiforce;
+      potentialArgs->planarR2deriv= &MovingObjectPotentialPlanarR2deriv;
+      potentialArgs->planarphi2deriv= &MovingObjectPotentialPlanarphi2deriv;
+      potentialArgs->planarRphideriv= &MovingObjectPotentialPlanarRphideriv;
+      potentialArgs->nargs= 4 + (int) *(pot_args+3)
+	+ 12 * ( (int) *(pot_args+3) - 1 );
+      break;
+    case 21: //CosmphiDiskPotential, 7 arguments
+      potentialArgs->planarRforce= &CosmphiDiskPotentialRforce;
+      potentialArgs->planarphiforce= &CosmphiDiskPotentialphiforce;
+      potentialArgs->planarR2deriv= &CosmphiDiskPotentialR2deriv;
+      potentialArgs->planarphi2deriv= &CosmphiDiskPotentialphi2deriv;
+      potentialArgs->planarRphideriv= &CosmphiDiskPotentialRphideriv;
+      potentialArgs->nargs= 7;
+      break;
+    case 22: //TimeDependentWrapperPotential, 7 + nwrapped + nwargs arguments
+      potentialArgs->nwrapped= (int) *pot_args++;
+      wrapped_type= (int *) malloc ( potentialArgs->nwrapped * sizeof(int) );
+      for (kk=0; kk < potentialArgs->nwrapped; kk++)
+	*(wrapped_type+kk)= (int) *pot_args++;
+      nwargs= (int) *pot_args++;
+      potentialArgs->wrappedPotentialArg= (struct potentialArg *) calloc ( potentialArgs->nwrapped, sizeof (struct potentialArg) );
+      parse_leapFuncArgs(potentialArgs->nwrapped,potentialArgs->wrappedPotentialArg,
+                         wrapped_type,pot_args);
+      pot_args+= nwargs;
+      free(wrapped_type);
+      potentialArgs->planarRforce= &TimeDependentWrapperPotentialPlanarRforce;
+      potentialArgs->planarphiforce= &TimeDependentWrapperPotentialPlanarphiforce;
+      potentialArgs->planarR2deriv= &TimeDependentWrapperPotentialPlanarR2deriv;
+      potentialArgs->planarphi2deriv= &TimeDependentWrapperPotentialPlanarphi2deriv;
+      potentialArgs->planarRphideriv= &TimeDependentWrapperPotentialPlanarRphideriv;
+      potentialArgs->nargs= 5;
+      break;
     }
     potentialArgs->args= (double *) malloc( potentialArgs->nargs * sizeof(double));
     for (jj=0; jj < potentialArgs->nargs; jj++){
@@ -166,22 +251,57 @@ void parse_leapFuncArgs(int npot,struct potentialArg * potentialArgs,
   }
   potentialArgs-= npot;
 }
-void integratePlanarOrbit(double *yo,
-			  int nt, 
-			  double *t,
-			  int npot,
-			  int * pot_type,
-			  double * pot_args,
-			  double rtol,
-			  double atol,
-			  double *result,
-			  int * err,
-			  int odeint_type){
-  //Set up the forces, first count
-  int ii;
+struct potentialArg * compile_potentialArgs_planar(int npot,
+						   int * pot_type,
+						   double * pot_args,
+						   int * ncopies){
+  //Parse the potential ncopies times, such that each thread has its own copy
+  int tid;
+#ifdef _OPENMP
+  if ( *ncopies < 1 ) *ncopies= omp_get_max_threads();
+#else
+  *ncopies= 1;
+#endif
+  struct potentialArg * potentialArgs= (struct potentialArg *) malloc ( *ncopies * npot * sizeof (struct potentialArg) );
+  for (tid=0; tid < *ncopies; tid++)
+    parse_leapFuncArgs(npot,potentialArgs+tid*npot,pot_type,pot_args);
+  return potentialArgs;
+}
+void free_potentialArgs_planar(int npot,
+			       struct potentialArg * potentialArgs,
+			       int ncopies){
+  int jj;
+  for (jj=0; jj < ncopies * npot; jj++) {
+    free_wrappedPotentialArgs(potentialArgs+jj);
+    free((potentialArgs+jj)->args);
+  }
+  free(potentialArgs);
+}
+void integratePlanarOrbit_potentialArgs(int nobj,
+					double *yo,
+					int nt, 
+					double *t,
+					int npot,
+					struct potentialArg * potentialArgs,
+					int ncopies,
+					double rtol,
+					double atol,
+					void *result,
+					int * err,
+					int odeint_type,
+					int nthreads,
+					int output_every,
+					int float32){
+  //potentialArgs contains ncopies copies of the parsed potential
+  int ii, tid;
   int dim;
-  struct potentialArg * potentialArgs= (struct potentialArg *) malloc ( npot * sizeof (struct potentialArg) );
-  parse_leapFuncArgs(npot,potentialArgs,pot_type,pot_args);
+#ifdef _OPENMP
+  if ( nthreads < 1 || nthreads > ncopies ) nthreads= ncopies;
+  if ( nthreads > nobj ) nthreads= nobj;
+  if ( nthreads < 1 ) nthreads= 1;
+#else
+  nthreads= 1;
+#endif
   //Integrate
   void (*odeint_func)(void (*func)(double, double *, double *,
 			   int, struct potentialArg *),
@@ -225,17 +345,107 @@ void integratePlanarOrbit(double *yo,
     dim= 4;
     break;
   }
-  odeint_func(odeint_deriv_func,dim,yo,nt,t,npot,potentialArgs,rtol,atol,
-	      result,err);
-  //Free allocated memory
-  for (ii=0; ii < npot; ii++) {
-    free(potentialArgs->args);
-    potentialArgs++;
+  //Integrate all objects with the same potential setup
+  UNUSED int chunk= CHUNKSIZE;
+  //Output every output_every-th time, possibly in single precision; in that
+  //case, the full orbit is integrated in a (per-thread) temporary array
+  int jj, kk;
+  int nt_out= (nt-1)/output_every+1;
+  int direct= ( output_every == 1 && !float32 );
+  double * tmp_result= NULL;
+  if ( !direct )
+    tmp_result= (double *) malloc ( nthreads * 4 * nt * sizeof(double) );
+#pragma omp parallel for schedule(dynamic,chunk) private(tid,ii,jj,kk)	\
+  shared(odeint_func,odeint_deriv_func,dim,yo,nt,t,npot,potentialArgs,rtol,atol,result,err,tmp_result) \
+  num_threads(nthreads)
+  for (ii=0; ii < nobj; ii++){
+#ifdef _OPENMP
+    tid= omp_get_thread_num();
+#else
+    tid = 0;
+#endif
+    if ( direct ) {
+      odeint_func(odeint_deriv_func,dim,yo+4*ii,nt,t,npot,
+		  potentialArgs+tid*npot,rtol,atol,
+		  (double *) result+4*nt*ii,err+ii);
+      continue;
+    }
+    odeint_func(odeint_deriv_func,dim,yo+4*ii,nt,t,npot,
+		potentialArgs+tid*npot,rtol,atol,tmp_result+4*nt*tid,err+ii);
+    for (jj=0; jj < nt_out; jj++)
+      for (kk=0; kk < 4; kk++) {
+	if ( float32 )
+	  *((float *) result+4*(nt_out*ii+jj)+kk)=
+	    (float) *(tmp_result+4*(nt*tid+jj*output_every)+kk);
+	else
+	  *((double *) result+4*(nt_out*ii+jj)+kk)=
+	    *(tmp_result+4*(nt*tid+jj*output_every)+kk);
+      }
   }
-  potentialArgs-= npot;
-  free(potentialArgs);
+  free(tmp_result);
+  //Done!
+}
+void integratePlanarOrbit(int nobj,
+			  double *yo,
+			  int nt, 
+			  double *t,
+			  int npot,
+			  int * pot_type,
+			  double * pot_args,
+			  double rtol,
+			  double atol,
+			  void *result,
+			  int * err,
+			  int odeint_type,
+			  int nthreads,
+			  int output_every,
+			  int float32){
+  //Set up the forces, each thread gets its own copy of the potential
+#ifdef _OPENMP
+  if ( nthreads < 1 ) nthreads= omp_get_max_threads();
+  if ( nthreads > nobj ) nthreads= nobj;
+  if ( nthreads < 1 ) nthreads= 1;
+#else
+  nthreads= 1;
+#endif
+  struct potentialArg * potentialArgs= compile_potentialArgs_planar(npot,pot_type,pot_args,&nthreads);
+  //Integrate
+  integratePlanarOrbit_potentialArgs(nobj,yo,nt,t,npot,potentialArgs,nthreads,
+				     rtol,atol,result,err,odeint_type,nthreads,
+				     output_every,float32);
+  //Free allocated memory
+  free_potentialArgs_planar(npot,potentialArgs,nthreads);
   //Done!
 }
+void integratePlanarOrbit_dense(double *yo,
+                                double to,
+                                double tf,
+                                double dt,
+                                int npot,
+                                int * pot_type,
+                                double * pot_args,
+                                double rtol,
+                                double atol,
+                                int nevent,
+                                int * event_type,
+                                double * event_par,
+                                int * event_dir,
+                                int * event_terminal,
+                                int * nsteps,
+                                double ** dense,
+                                int * nfound,
+                                double ** events,
+                                double * tend,
+                                int * err){
+  //Integrate a single orbit with DOPR54, store its dense output, and locate
+  //events
+  int ncopies= 1;
+  struct potentialArg * potentialArgs= compile_potentialArgs_planar(npot,pot_type,pot_args,&ncopies);
+  bovy_dopr54_events(&evalPlanarRectDeriv,4,yo,to,tf,dt,npot,potentialArgs,rtol,atol,
+		     &evalPlanarRectEvent,nevent,event_type,event_par,event_dir,
+		     event_terminal,nsteps,dense,nfound,events,tend,err);
+  free_potentialArgs_planar(npot,potentialArgs,ncopies);
+}
 
 void integratePlanarOrbit_dxdv(double *yo,
 			       int nt, 
@@ -285,6 +495,7 @@ void integratePlanarOrbit_dxdv(double *yo,
 	      result,err);
   //Free allocated memory
   for (ii=0; ii < npot; ii++) {
+    free_wrappedPotentialArgs(potentialArgs);
     free(potentialArgs->args);
     potentialArgs++;
   }
@@ -310,6 +521,17 @@ void evalPlanarRectForce(double t, double *q, double *a,
   *a++= cosphi*Rforce-1./R*sinphi*phiforce;
   *a--= sinphi*Rforce+1./R*cosphi*phiforce;
 }
+double evalPlanarRectEvent(int type, double par, double *q){
+  //Event functions for the planar orbit q= (x,y,vx,vy)
+  switch ( type ) {
+  case 0: //radial velocity x R: peri- and apocenters
+    return *q * *(q+2) + *(q+1) * *(q+3);
+  case 3: //radius - par: escape
+    return sqrt( *q * *q + *(q+1) * *(q+1) ) - par;
+  default: //vertical events do not apply
+    return 1.;
+  }
+}
 void evalPlanarRectDeriv(double t, double *q, double *a,
 			 int nargs, struct potentialArg * potentialArgs){
   double sinphi, cosphi, x, y, phi,R,Rforce,phiforce;
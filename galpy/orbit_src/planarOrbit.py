@@ -5,7 +5,7 @@ from scipy import integrate
 import galpy.util.bovy_plot as plot
 import galpy.util.bovy_symplecticode as symplecticode
 from galpy.util.bovy_conversion import physical_conversion
-from OrbitTop import OrbitTop
+from OrbitTop import OrbitTop, _denseInterp
 from galpy.potential_src.planarPotential import evaluateplanarRforces,\
     RZToplanarPotential, evaluateplanarphiforces,\
     evaluateplanarPotentials
@@ -13,7 +13,7 @@ from galpy.potential_src.Potential import Potential
 from galpy.util import galpyWarning
 #try:
 from galpy.orbit_src.integratePlanarOrbit import integratePlanarOrbit_c,\
-    integratePlanarOrbit_dxdv_c, _ext_loaded
+    integratePlanarOrbit_dxdv_c, integratePlanarOrbit_dense_c, _ext_loaded
 ext_loaded= _ext_loaded
 class planarOrbitTop(OrbitTop):
     """Top-level class representing a planar orbit (i.e., one in the plane 
@@ -75,7 +75,9 @@ class planarOrbitTop(OrbitTop):
         if not hasattr(self,'orbit'):
             raise AttributeError("Integrate the orbit first")
         if not hasattr(self,'rs'):
-            self.rs= self.orbit[:,0]
+            self.rs= self._with_events(self.orbit[:,0],
+                                       ['pericenter','apocenter'],
+                                       lambda x: x[:,0])
         return (nu.amax(self.rs)-nu.amin(self.rs))/(nu.amax(self.rs)+nu.amin(self.rs))
 
     @physical_conversion('energy')
@@ -148,7 +150,9 @@ class planarOrbitTop(OrbitTop):
         if not hasattr(self,'orbit'):
             raise AttributeError("Integrate the orbit first")
         if not hasattr(self,'rs'):
-            self.rs= self.orbit[:,0]
+            self.rs= self._with_events(self.orbit[:,0],
+                                       ['pericenter','apocenter'],
+                                       lambda x: x[:,0])
         return nu.amax(self.rs)
 
     @physical_conversion('position')
@@ -173,7 +177,9 @@ class planarOrbitTop(OrbitTop):
         if not hasattr(self,'orbit'):
             raise AttributeError("Integrate the orbit first")
         if not hasattr(self,'rs'):
-            self.rs= self.orbit[:,0]
+            self.rs= self._with_events(self.orbit[:,0],
+                                       ['pericenter','apocenter'],
+                                       lambda x: x[:,0])
         return nu.amin(self.rs)
 
     @physical_conversion('position')
@@ -220,7 +226,7 @@ class planarROrbit(planarOrbitTop):
                           ro=ro,zo=zo,vo=vo,solarmotion=solarmotion)
         return None
 
-    def integrate(self,t,pot,method='symplec4_c'):
+    def integrate(self,t,pot,method='symplec4_c',dense=False,events=None):
         """
         NAME:
            integrate
@@ -235,11 +241,15 @@ class planarROrbit(planarOrbitTop):
                    'rk4_c' for a 4th-order Runge-Kutta integrator in C
                    'rk6_c' for a 6-th order Runge-Kutta integrator in C
                    'dopr54_c' for a Dormand-Prince integrator in C (generally the fastest)
+           dense= (False) dense output is not supported for planarROrbits
+           events= (None) events are not supported for planarROrbits
         OUTPUT:
            error message number (get the actual orbit using getOrbit()
         HISTORY:
            2010-07-20
         """
+        if dense or not events is None:
+            raise NotImplementedError("Dense output and events are not implemented for planarROrbits")
         if hasattr(self,'_orbInterp'): delattr(self,'_orbInterp')
         if hasattr(self,'rs'): delattr(self,'rs')
         thispot= RZToplanarPotential(pot)
@@ -341,7 +351,7 @@ class planarOrbit(planarOrbitTop):
                           ro=ro,zo=zo,vo=vo,solarmotion=solarmotion)
         return None
 
-    def integrate(self,t,pot,method='symplec4_c'):
+    def integrate(self,t,pot,method='symplec4_c',dense=False,events=None):
         """
         NAME:
            integrate
@@ -356,21 +366,42 @@ class planarOrbit(planarOrbitTop):
                    'rk4_c' for a 4th-order Runge-Kutta integrator in C
                    'rk6_c' for a 6-th order Runge-Kutta integrator in C
                    'dopr54_c' for a Dormand-Prince integrator in C (generally the fastest)
+           dense= (False) if True, store the dense output of all steps taken by the integrator (only for method='dopr54_c'), such that the orbit can be evaluated at any time between t[0] and t[-1]
+           events= (None) list of events to locate during the integration (only for method='dopr54_c'): 'pericenter', 'apocenter', or ('escape',rmax) to stop the integration when the radius exceeds rmax (get the events using getEvents())
         OUTPUT:
            (none) (get the actual orbit using getOrbit()
         HISTORY:
            2010-07-20
         """
         if hasattr(self,'_orbInterp'): delattr(self,'_orbInterp')
+        if hasattr(self,'_denseInterp'): delattr(self,'_denseInterp')
+        if hasattr(self,'_events'): delattr(self,'_events')
         if hasattr(self,'rs'): delattr(self,'rs')
         thispot= RZToplanarPotential(pot)
         self.t= nu.array(t)
         self._pot= thispot
+        if dense or not events is None:
+            out= _integrateOrbit_dense(self.vxvv,thispot,t,method,
+                                       events=events)
+            if not out is None:
+                denseInterp, rawevents, msg= out
+                #Only keep the times before a terminal event
+                self.t= self.t[nu.sign(self.t[-1]-self.t[0])\
+                                   *(self.t-denseInterp._tend) <= 0.]
+                if dense:
+                    #The orbit is evaluated from the dense output when needed
+                    if hasattr(self,'orbit'): delattr(self,'orbit')
+                    self._denseInterp= denseInterp
+                else:
+                    self.orbit= denseInterp(self.t).T
+                if not events is None:
+                    self._setEvents(events,rawevents,denseInterp)
+                return msg
         self.orbit, msg= _integrateOrbit(self.vxvv,thispot,t,method)
         return msg
 
     def integrate_dxdv(self,dxdv,t,pot,method='dopr54_c',
-                       rectIn=False,rectOut=False):
+                       rectIn=False,rectOut=False,renorm_every=0):
         """
         NAME:
            integrate_dxdv
@@ -386,12 +417,15 @@ class planarOrbit(planarOrbitTop):
                    'dopr54_c' for a Dormand-Prince integrator in C (generally the fastest)
            rectIn= (False) if True, input dxdv is in rectangular coordinates
            rectOut= (False) if True, output dxdv (that in orbit_dxdv) is in rectangular coordinates
+           renorm_every= (0) renormalization of dxdv is not implemented for planar orbits; only 0 is allowed
         OUTPUT:
            (none) (get the actual orbit using getOrbit_dxdv()
         HISTORY:
            2010-10-17 - Written - Bovy (IAS)
            2014-06-29 - Added rectIn and rectOut - Bovy (IAS)
         """
+        if renorm_every:
+            raise NotImplementedError("renorm_every is only implemented for 3D orbits")
         if hasattr(self,'_orbInterp'): delattr(self,'_orbInterp')
         if hasattr(self,'rs'): delattr(self,'rs')
         thispot= RZToplanarPotential(pot)
@@ -477,7 +511,9 @@ class planarOrbit(planarOrbitTop):
         if not hasattr(self,'orbit'):
             raise AttributeError("Integrate the orbit first")
         if not hasattr(self,'rs'):
-            self.rs= self.orbit[:,0]
+            self.rs= self._with_events(self.orbit[:,0],
+                                       ['pericenter','apocenter'],
+                                       lambda x: x[:,0])
         return (nu.amax(self.rs)-nu.amin(self.rs))/(nu.amax(self.rs)+nu.amin(self.rs))
 
 def _integrateROrbit(vxvv,pot,t,method):
@@ -651,6 +687,45 @@ def _integrateOrbit(vxvv,pot,t,method):
     _parse_warnmessage(msg)
     return (out,msg)
 
+def _integrateOrbit_dense(vxvv,pot,t,method,events=None):
+    """
+    NAME:
+       _integrateOrbit_dense
+    PURPOSE:
+       integrate an orbit in a Phi(R,phi) potential with the Dormand-Prince integrator in C, keeping the dense output and locating events
+    INPUT:
+       vxvv - array with the initial conditions stacked like
+              [R,vR,vT,phi]; vR outward!
+       pot - Potential instance
+       t - list of times; the orbit is integrated from t[0] to t[-1]
+       method - 'dopr54_c'
+       events= (None) list of events to locate
+    OUTPUT:
+       (_denseInterp instance that returns [R,vR,vT,phi] at any t, [nfound,6] array of events from the C integrator, error message) or None if the potential does not have a C implementation and no events are requested
+    """
+    if not method.lower() == 'dopr54_c':
+        raise NotImplementedError("Dense output and events are only implemented for method='dopr54_c'")
+    if isinstance(pot,list):
+        allHasC= nu.prod([p.hasC for p in pot])
+    else:
+        allHasC= pot.hasC
+    if (not allHasC or not ext_loaded) and not events is None:
+        raise NotImplementedError("Events can only be located for potentials with a C implementation")
+    elif not allHasC or not ext_loaded:
+        warnings.warn("Dense output requires a potential with a C implementation; orbit is integrated without dense output",
+                      galpyWarning)
+        return None
+    #go to the rectangular frame
+    this_vxvv= nu.array([vxvv[0]*nu.cos(vxvv[3]),
+                         vxvv[0]*nu.sin(vxvv[3]),
+                         vxvv[1]*nu.cos(vxvv[3])-vxvv[2]*nu.sin(vxvv[3]),
+                         vxvv[2]*nu.cos(vxvv[3])+vxvv[1]*nu.sin(vxvv[3])])
+    #integrate
+    dense, rawevents, tend, msg= integratePlanarOrbit_dense_c(pot,this_vxvv,t,
+                                                              events=events)
+    _parse_warnmessage(msg)
+    return (_denseInterp(dense,4,tend=tend),rawevents,msg)
+
 def _integrateOrbit_dxdv(vxvv,dxdv,pot,t,method,rectIn,rectOut):
     """
     NAME:
@@ -23,6 +23,10 @@ from galpy.potential_src import CosmphiDiskPotential
 from galpy.potential_src import RazorThinExponentialDiskPotential
 from galpy.potential_src import FlattenedPowerPotential
 from galpy.potential_src import BurkertPotential
+from galpy.potential_src import compiledPotential
+from galpy.potential_src import interp3DPotential
+from galpy.potential_src import SCFPotential
+from galpy.potential_src import TimeDependentWrapperPotential
 #
 # Functions
 #
@@ -62,6 +66,8 @@ evaluatelinearPotentials= linearPotential.evaluatelinearPotentials
 evaluatelinearForces= linearPotential.evaluatelinearForces
 PotentialError= Potential.PotentialError
 LinShuReductionFactor= planarPotential.LinShuReductionFactor
+scf_compute_coeffs= SCFPotential.scf_compute_coeffs
+scf_compute_coeffs_nbody= SCFPotential.scf_compute_coeffs_nbody
 #
 # Classes
 #
@@ -92,6 +98,10 @@ CosmphiDiskPotential= CosmphiDiskPotential.CosmphiDiskPotential
 RazorThinExponentialDiskPotential= RazorThinExponentialDiskPotential.RazorThinExponentialDiskPotential
 FlattenedPowerPotential= FlattenedPowerPotential.FlattenedPowerPotential
 BurkertPotential= BurkertPotential.BurkertPotential
+compiledPotential= compiledPotential.compiledPotential
+interp3DPotential= interp3DPotential.interp3DPotential
+SCFPotential= SCFPotential.SCFPotential
+TimeDependentWrapperPotential= TimeDependentWrapperPotential.TimeDependentWrapperPotential
 #Softenings
 PlummerSoftening= ForceSoftening.PlummerSoftening
 
@@ -61,7 +61,8 @@ class CosmphiDiskPotential(planarPotential):
 
         """
         planarPotential.__init__(self,amp=amp)
-        self.hasC= False
+        self.hasC= True
+        self.hasC_dxdv= True
         self._m= m
         if cp is None or sp is None:
             self._phib= phib
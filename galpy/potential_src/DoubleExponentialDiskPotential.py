@@ -4,14 +4,16 @@
 #
 #                                      rho(R,z) = rho_0 e^-R/h_R e^-|z|/h_z
 ###############################################################################
+import copy
 import numpy as nu
 import warnings
-from scipy import special, integrate
+from scipy import special, integrate, interpolate
 from galpy.util import galpyWarning
 from Potential import Potential
 from PowerSphericalPotential import KeplerPotential
 _TOL= 1.4899999999999999e-15
 _MAXITER= 20
+_MAXBATCH= 200000 #maximum number of (point,node) pairs evaluated at once
 class DoubleExponentialDiskPotential(Potential):
     """Class that implements the double exponential disk potential
 
@@ -22,7 +24,7 @@ class DoubleExponentialDiskPotential(Potential):
     """
     def __init__(self,amp=1.,hr=1./3.,hz=1./16.,
                  maxiter=_MAXITER,tol=0.001,normalize=False,
-                 new=True,kmaxFac=2.,glorder=10):
+                 new=True,kmaxFac=2.,glorder=10,tabulate=False):
         """
         NAME:
 
@@ -46,6 +48,8 @@ class DoubleExponentialDiskPotential(Potential):
 
            normalize - if True, normalize such that vc(1.,0.)=1., or, if given as a number, such that the force is this fraction of the force necessary to make vc(1.,0.)=1.
 
+           tabulate= (False) if True, tabulate the potential and forces on a (R,z) grid and evaluate them by interpolation inside the grid (see the tabulate method, which can also be called with a custom grid)
+
         OUTPUT:
 
            DoubleExponentialDiskPotential object
@@ -56,9 +60,11 @@ class DoubleExponentialDiskPotential(Potential):
 
            2013-01-01 - Re-implemented using faster integration techniques - Bovy (IAS)
 
+
         """
         Potential.__init__(self,amp=amp)
         self.hasC= True
+        self.hasC_dxdv= True
         self._kmaxFac= kmaxFac
         self._glorder= glorder
         self._hr= hr
@@ -88,12 +94,35 @@ class DoubleExponentialDiskPotential(Potential):
         self._j2zeros[1:self._nzeros+1]= special.jn_zeros(2,self._nzeros)
         self._dj2zeros= self._j2zeros-nu.roll(self._j2zeros,1)
         self._dj2zeros[0]= self._j2zeros[0]
+        #Gauss-Legendre nodes and weights between consecutive zeros, shared
+        #by all evaluations
+        self._jzeros= [self._j0zeros,self._j1zeros,self._j2zeros]
+        self._glks= [(0.5*(self._glx+1.)*djzeros[1:,None]
+                      +jzeros[:-1,None]).flatten()
+                     for jzeros,djzeros in zip(self._jzeros,
+                                               [self._dj0zeros,
+                                                self._dj1zeros,
+                                                self._dj2zeros])]
+        self._glweights= [(self._glw*djzeros[1:,None]).flatten()
+                          for djzeros in [self._dj0zeros,self._dj1zeros,
+                                          self._dj2zeros]]
+        #Weights for the C implementation, which include all factors of the
+        #potential and radial-force integrands that only depend on k
+        self._cweights= [self._glweights[0]\
+                             *(self._alpha**2.+self._glks[0]**2.)**-1.5\
+                             /(self._beta**2.-self._glks[0]**2.),
+                         self._glweights[1]*self._glks[1]\
+                             *(self._alpha**2.+self._glks[1]**2.)**-1.5\
+                             /(self._beta**2.-self._glks[1]**2.)]
+        self._tabulated= False
         if normalize or \
                 (isinstance(normalize,(int,float)) \
                      and not isinstance(normalize,bool)): #pragma: no cover
             self.normalize(normalize)
         #Load Kepler potential for large R
         self._kp= KeplerPotential(normalize=4.*nu.pi/self._alpha**2./self._beta)
+        if tabulate:
+            self.tabulate()
 
     def _evaluate(self,R,z,phi=0.,t=0.,dR=0,dphi=0):
         """
@@ -117,28 +146,20 @@ class DoubleExponentialDiskPotential(Potential):
            ...
            >>> assert( r+1.89595350484)**2.< 10.**-6.
         """
-        if True:
-            if isinstance(R,float):
-                floatIn= True
-                R= nu.array([R])
-                z= nu.array([z])
-            else:
-                floatIn= False
-            out= nu.empty(len(R))
-            indx= (R <= 6.)
-            out[True-indx]= self._kp(R[True-indx],z[True-indx])
-            R4max= nu.copy(R)
-            R4max[(R < 1.)]= 1.
-            kmax= self._kmaxFac*self._beta
-            for jj in range(len(R)):
-                if not indx[jj]: continue
-                maxj0zeroIndx= nu.argmin((self._j0zeros-kmax*R4max[jj])**2.) #close enough
-                ks= nu.array([0.5*(self._glx+1.)*self._dj0zeros[ii+1] + self._j0zeros[ii] for ii in range(maxj0zeroIndx)]).flatten()
-                weights= nu.array([self._glw*self._dj0zeros[ii+1] for ii in range(maxj0zeroIndx)]).flatten()
-                evalInt= special.jn(0,ks*R[jj])*(self._alpha**2.+ks**2.)**-1.5*(self._beta*nu.exp(-ks*nu.fabs(z[jj]))-ks*nu.exp(-self._beta*nu.fabs(z[jj])))/(self._beta**2.-ks**2.)
-                out[jj]= -2.*nu.pi*self._alpha*nu.sum(weights*evalInt)
-            if floatIn: return out[0]
-            else: return out
+        R, z, floatIn= _parse_input(R,z)
+        out= nu.empty(len(R))
+        indx= (R <= 6.)
+        out[True-indx]= self._kp(R[True-indx],z[True-indx])
+        tindx= self._tabindx(R,z)*indx
+        if nu.sum(tindx) > 0:
+            out[tindx]= self._tabeval(self._tabPot,R[tindx],z[tindx])
+        indx*= True-tindx
+        alpha, beta= self._alpha, self._beta
+        out[indx]= -2.*nu.pi*self._alpha\
+            *self._besselsum(R[indx],z[indx],0,self._kmaxFac*self._beta,
+                             lambda ks,z: (alpha**2.+ks**2.)**-1.5*(beta*nu.exp(-ks*z)-ks*nu.exp(-beta*z))/(beta**2.-ks**2.))
+        if floatIn: return out[0]
+        else: return out
     
     def _Rforce(self,R,z,phi=0.,t=0.):
         """
@@ -157,21 +178,25 @@ class DoubleExponentialDiskPotential(Potential):
            2010-04-16 - Written - Bovy (NYU)
         DOCTEST:
         """
-        if True:
-            if isinstance(R,nu.ndarray):
-                if not isinstance(z,nu.ndarray): z= nu.ones_like(R)*z
-                out= nu.array([self._Rforce(rr,zz) for rr,zz in zip(R,z)])
-                return out
-            if (R > 16.*self._hr or R > 6.) and hasattr(self,'_kp'): return self._kp.Rforce(R,z)
-            if R < 1.: R4max= 1.
-            else: R4max= R
-            kmax= self._kmaxFac*self._beta
-            kmax= 2.*self._kmaxFac*self._beta
-            maxj1zeroIndx= nu.argmin((self._j1zeros-kmax*R4max)**2.) #close enough
-            ks= nu.array([0.5*(self._glx+1.)*self._dj1zeros[ii+1] + self._j1zeros[ii] for ii in range(maxj1zeroIndx)]).flatten()
-            weights= nu.array([self._glw*self._dj1zeros[ii+1] for ii in range(maxj1zeroIndx)]).flatten()
-            evalInt= ks*special.jn(1,ks*R)*(self._alpha**2.+ks**2.)**-1.5*(self._beta*nu.exp(-ks*nu.fabs(z))-ks*nu.exp(-self._beta*nu.fabs(z)))/(self._beta**2.-ks**2.)
-            return -2.*nu.pi*self._alpha*nu.sum(weights*evalInt)
+        R, z, floatIn= _parse_input(R,z)
+        out= nu.empty(len(R))
+        if hasattr(self,'_kp'):
+            indx= (R <= 16.*self._hr)*(R <= 6.)
+        else:
+            indx= nu.ones(len(R),dtype='bool')
+        if nu.sum(True-indx) > 0:
+            out[True-indx]= self._kp.Rforce(R[True-indx],z[True-indx])
+        tindx= self._tabindx(R,z)*indx
+        if nu.sum(tindx) > 0:
+            out[tindx]= self._tabeval(self._tabRforce,R[tindx],z[tindx])
+        indx*= True-tindx
+        alpha, beta= self._alpha, self._beta
+        out[indx]= -2.*nu.pi*self._alpha\
+            *self._besselsum(R[indx],z[indx],1,
+                             2.*self._kmaxFac*self._beta,
+                             lambda ks,z: ks*(alpha**2.+ks**2.)**-1.5*(beta*nu.exp(-ks*z)-ks*nu.exp(-beta*z))/(beta**2.-ks**2.))
+        if floatIn: return out[0]
+        else: return out
     
     def _zforce(self,R,z,phi=0.,t=0.):
         """
@@ -190,23 +215,23 @@ class DoubleExponentialDiskPotential(Potential):
            2010-04-16 - Written - Bovy (NYU)
         DOCTEST:
         """
-        if True:
-            if isinstance(R,nu.ndarray):
-                if not isinstance(z,nu.ndarray): z= nu.ones_like(R)*z
-                out= nu.array([self._zforce(rr,zz) for rr,zz in zip(R,z)])
-                return out
-            if R > 16.*self._hr or R > 6.: return self._kp.zforce(R,z)
-            if R < 1.: R4max= 1.
-            else: R4max= R
-            kmax= self._kmaxFac*self._beta
-            maxj0zeroIndx= nu.argmin((self._j0zeros-kmax*R4max)**2.) #close enough
-            ks= nu.array([0.5*(self._glx+1.)*self._dj0zeros[ii+1] + self._j0zeros[ii] for ii in range(maxj0zeroIndx)]).flatten()
-            weights= nu.array([self._glw*self._dj0zeros[ii+1] for ii in range(maxj0zeroIndx)]).flatten()
-            evalInt= ks*special.jn(0,ks*R)*(self._alpha**2.+ks**2.)**-1.5*(nu.exp(-ks*nu.fabs(z))-nu.exp(-self._beta*nu.fabs(z)))/(self._beta**2.-ks**2.)
-            if z > 0.:
-                return -2.*nu.pi*self._alpha*self._beta*nu.sum(weights*evalInt)
-            else:
-                return 2.*nu.pi*self._alpha*self._beta*nu.sum(weights*evalInt)
+        R, z, floatIn= _parse_input(R,z)
+        out= nu.empty(len(R))
+        indx= (R <= 16.*self._hr)*(R <= 6.)
+        if nu.sum(True-indx) > 0:
+            out[True-indx]= self._kp.zforce(R[True-indx],z[True-indx])
+        tindx= self._tabindx(R,z)*indx
+        if nu.sum(tindx) > 0:
+            out[tindx]= nu.sign(z[tindx])\
+                *self._tabeval(self._tabzforce,R[tindx],z[tindx])
+        indx*= True-tindx
+        alpha, beta= self._alpha, self._beta
+        out[indx]= -2.*nu.pi*self._alpha*self._beta\
+            *(2.*(z[indx] > 0.)-1.)\
+            *self._besselsum(R[indx],z[indx],0,self._kmaxFac*self._beta,
+                             lambda ks,z: ks*(alpha**2.+ks**2.)**-1.5*(nu.exp(-ks*z)-nu.exp(-beta*z))/(beta**2.-ks**2.))
+        if floatIn: return out[0]
+        else: return out
 
     def _R2deriv(self,R,z,phi=0.,t=0.):
         """
@@ -224,25 +249,20 @@ class DoubleExponentialDiskPotential(Potential):
         HISTORY:
            2012-12-27 - Written - Bovy (IAS)
         """
-        if True:
-            if isinstance(R,nu.ndarray):
-                if not isinstance(z,nu.ndarray): z= nu.ones_like(R)*z
-                out= nu.array([self._R2deriv(rr,zz) for rr,zz in zip(R,z)])
-                return out
-            if R > 16.*self._hr or R > 6.: return self._kp.R2deriv(R,z)
-            if R < 1.: R4max= 1.
-            else: R4max= R
-            kmax= 2.*self._kmaxFac*self._beta
-            maxj0zeroIndx= nu.argmin((self._j0zeros-kmax*R4max)**2.) #close enough
-            maxj2zeroIndx= nu.argmin((self._j2zeros-kmax*R4max)**2.) #close enough
-            ks0= nu.array([0.5*(self._glx+1.)*self._dj0zeros[ii+1] + self._j0zeros[ii] for ii in range(maxj0zeroIndx)]).flatten()
-            weights0= nu.array([self._glw*self._dj0zeros[ii+1] for ii in range(maxj0zeroIndx)]).flatten()
-            ks2= nu.array([0.5*(self._glx+1.)*self._dj2zeros[ii+1] + self._j2zeros[ii] for ii in range(maxj2zeroIndx)]).flatten()
-            weights2= nu.array([self._glw*self._dj2zeros[ii+1] for ii in range(maxj2zeroIndx)]).flatten()
-            evalInt0= ks0**2.*special.jn(0,ks0*R)*(self._alpha**2.+ks0**2.)**-1.5*(self._beta*nu.exp(-ks0*nu.fabs(z))-ks0*nu.exp(-self._beta*nu.fabs(z)))/(self._beta**2.-ks0**2.)
-            evalInt2= ks2**2.*special.jn(2,ks2*R)*(self._alpha**2.+ks2**2.)**-1.5*(self._beta*nu.exp(-ks2*nu.fabs(z))-ks2*nu.exp(-self._beta*nu.fabs(z)))/(self._beta**2.-ks2**2.)
-            return nu.pi*self._alpha*(nu.sum(weights0*evalInt0)
-                                      -nu.sum(weights2*evalInt2))
+        R, z, floatIn= _parse_input(R,z)
+        out= nu.empty(len(R))
+        indx= (R <= 16.*self._hr)*(R <= 6.)
+        if nu.sum(True-indx) > 0:
+            out[True-indx]= self._kp.R2deriv(R[True-indx],z[True-indx])
+        alpha, beta= self._alpha, self._beta
+        integrand= lambda ks,z: ks**2.*(alpha**2.+ks**2.)**-1.5*(beta*nu.exp(-ks*z)-ks*nu.exp(-beta*z))/(beta**2.-ks**2.)
+        out[indx]= nu.pi*self._alpha\
+            *(self._besselsum(R[indx],z[indx],0,2.*self._kmaxFac*self._beta,
+                              integrand)
+              -self._besselsum(R[indx],z[indx],2,2.*self._kmaxFac*self._beta,
+                               integrand))
+        if floatIn: return out[0]
+        else: return out
     
     def _z2deriv(self,R,z,phi=0.,t=0.):
         """
@@ -260,20 +280,17 @@ class DoubleExponentialDiskPotential(Potential):
         HISTORY:
            2012-12-26 - Written - Bovy (IAS)
         """
-        if True:
-            if isinstance(R,nu.ndarray):
-                if not isinstance(z,nu.ndarray): z= nu.ones_like(R)*z
-                out= nu.array([self._z2deriv(rr,zz) for rr,zz in zip(R,z)])
-                return out
-            if R > 16.*self._hr or R > 6.: return self._kp.z2deriv(R,z)
-            if R < 1.: R4max= 1.
-            else: R4max= R
-            kmax= self._kmaxFac*self._beta
-            maxj0zeroIndx= nu.argmin((self._j0zeros-kmax*R4max)**2.) #close enough
-            ks= nu.array([0.5*(self._glx+1.)*self._dj0zeros[ii+1] + self._j0zeros[ii] for ii in range(maxj0zeroIndx)]).flatten()
-            weights= nu.array([self._glw*self._dj0zeros[ii+1] for ii in range(maxj0zeroIndx)]).flatten()
-            evalInt= ks*special.jn(0,ks*R)*(self._alpha**2.+ks**2.)**-1.5*(ks*nu.exp(-ks*nu.fabs(z))-self._beta*nu.exp(-self._beta*nu.fabs(z)))/(self._beta**2.-ks**2.)
-            return -2.*nu.pi*self._alpha*self._beta*nu.sum(weights*evalInt)
+        R, z, floatIn= _parse_input(R,z)
+        out= nu.empty(len(R))
+        indx= (R <= 16.*self._hr)*(R <= 6.)
+        if nu.sum(True-indx) > 0:
+            out[True-indx]= self._kp.z2deriv(R[True-indx],z[True-indx])
+        alpha, beta= self._alpha, self._beta
+        out[indx]= -2.*nu.pi*self._alpha*self._beta\
+            *self._besselsum(R[indx],z[indx],0,self._kmaxFac*self._beta,
+                             lambda ks,z: ks*(alpha**2.+ks**2.)**-1.5*(ks*nu.exp(-ks*z)-beta*nu.exp(-beta*z))/(beta**2.-ks**2.))
+        if floatIn: return out[0]
+        else: return out
 
     def _Rzderiv(self,R,z,phi=0.,t=0.):
         """
@@ -291,23 +308,113 @@ class DoubleExponentialDiskPotential(Potential):
         HISTORY:
            2013-08-28 - Written - Bovy (IAS)
         """
-        if True:
-            if isinstance(R,nu.ndarray):
-                if not isinstance(z,nu.ndarray): z= nu.ones_like(R)*z
-                out= nu.array([self._Rzderiv(rr,zz) for rr,zz in zip(R,z)])
-                return out
-            if R > 6.: return self._kp.Rzderiv(R,z)
-            if R < 1.: R4max= 1.
-            else: R4max= R
-            kmax= 2.*self._kmaxFac*self._beta
-            maxj1zeroIndx= nu.argmin((self._j1zeros-kmax*R4max)**2.) #close enough
-            ks= nu.array([0.5*(self._glx+1.)*self._dj1zeros[ii+1] + self._j1zeros[ii] for ii in range(maxj1zeroIndx)]).flatten()
-            weights= nu.array([self._glw*self._dj1zeros[ii+1] for ii in range(maxj1zeroIndx)]).flatten()
-            evalInt= ks**2.*special.jn(1,ks*R)*(self._alpha**2.+ks**2.)**-1.5*(nu.exp(-ks*nu.fabs(z))-nu.exp(-self._beta*nu.fabs(z)))/(self._beta**2.-ks**2.)
-            if z >= 0.:
-                return -2.*nu.pi*self._alpha*self._beta*nu.sum(weights*evalInt)
-            else:
-                return 2.*nu.pi*self._alpha*self._beta*nu.sum(weights*evalInt)
+        R, z, floatIn= _parse_input(R,z)
+        out= nu.empty(len(R))
+        indx= (R <= 6.)
+        if nu.sum(True-indx) > 0:
+            out[True-indx]= self._kp.Rzderiv(R[True-indx],z[True-indx])
+        alpha, beta= self._alpha, self._beta
+        out[indx]= -2.*nu.pi*self._alpha*self._beta\
+            *(2.*(z[indx] >= 0.)-1.)\
+            *self._besselsum(R[indx],z[indx],1,2.*self._kmaxFac*self._beta,
+                             lambda ks,z: ks**2.*(alpha**2.+ks**2.)**-1.5*(nu.exp(-ks*z)-nu.exp(-beta*z))/(beta**2.-ks**2.))
+        if floatIn: return out[0]
+        else: return out
+
+    def _besselsum(self,R,z,n,kmax,integrand):
+        """
+        NAME:
+           _besselsum
+        PURPOSE:
+           compute the Gauss-Legendre approximation of the Hankel-type integral int dk J_n(kR) integrand(k,|z|), summed over the intervals between the zeros of J_n up to k ~ kmax x max(R,1), for arrays of (R,z) at once
+        INPUT:
+           R, z - arrays of cylindrical Galactocentric radius and height
+           n - order of the Bessel function (0, 1, or 2)
+           kmax - maximum k (for R < 1)
+           integrand - function of (k,|z|) that can be broadcast
+        OUTPUT:
+           array of integrals
+        """
+        out= nu.zeros(len(R))
+        if len(R) == 0: return out
+        R4max= nu.copy(R)
+        R4max[(R < 1.)]= 1.
+        zeros= self._jzeros[n]
+        maxIndx= nu.argmin((zeros[None,:]-kmax*R4max[:,None])**2.,axis=1) #close enough
+        absz= nu.fabs(z)
+        #The quadrature nodes only depend on the number of intervals, so
+        #evaluate points with the same number of intervals together
+        for mi in nu.unique(maxIndx):
+            if mi == 0: continue
+            nk= mi*self._glorder
+            ks= self._glks[n][:nk]
+            weights= self._glweights[n][:nk]
+            indx= nu.arange(len(R))[maxIndx == mi]
+            chunk= max(1,_MAXBATCH//nk)
+            for start in range(0,len(indx),chunk):
+                tindx= indx[start:start+chunk]
+                out[tindx]= nu.sum(weights*integrand(ks,absz[tindx,None])
+                                   *special.jn(n,ks*R[tindx,None]),axis=1)
+        return out
+
+    def tabulate(self,rgrid=(nu.log(0.01),nu.log(6.),101),zgrid=(0.,1.,101),
+                 logR=True):
+        """
+        NAME:
+           tabulate
+        PURPOSE:
+           tabulate the potential and forces on a (R,z) grid, which is subsequently used to evaluate these (through cubic-spline interpolation) inside the grid
+        INPUT:
+           rgrid - R grid to be given to linspace as in rs= linspace(*rgrid)
+           zgrid - |z| grid to be given to linspace as in zs= linspace(*zgrid)
+           logR - if True, rgrid is in the log of R so logrs= linspace(*rgrid)
+        OUTPUT:
+           error estimates: dictionary with the maximum absolute difference between the interpolated and directly computed 'potential', 'Rforce', and 'zforce' (without the amplitude) at the centers of all grid cells
+        """
+        self._tabulated= False
+        xs= nu.linspace(*rgrid)
+        zs= nu.linspace(*zgrid)
+        self._tablogR= logR
+        if logR: rs= nu.exp(xs)
+        else: rs= xs
+        self._tabrmin, self._tabrmax, self._tabzmax= rs[0], rs[-1], zs[-1]
+        mR, mz= nu.meshgrid(rs,zs,indexing='ij')
+        self._tabPot= interpolate.RectBivariateSpline(\
+            xs,zs,nu.reshape(self._evaluate(mR.flatten(),mz.flatten()),
+                             mR.shape))
+        self._tabRforce= interpolate.RectBivariateSpline(\
+            xs,zs,nu.reshape(self._Rforce(mR.flatten(),mz.flatten()),
+                             mR.shape))
+        self._tabzforce= interpolate.RectBivariateSpline(\
+            xs,zs,nu.reshape(self._zforce(mR.flatten(),mz.flatten()),
+                             mR.shape))
+        #Estimate the error at the centers of the grid cells
+        xcs= 0.5*(xs[1:]+xs[:-1])
+        zcs= 0.5*(zs[1:]+zs[:-1])
+        if logR: rcs= nu.exp(xcs)
+        else: rcs= xcs
+        mR, mz= nu.meshgrid(rcs,zcs,indexing='ij')
+        mR= mR.flatten()
+        mz= mz.flatten()
+        self._tabErr= {}
+        for key,tab,func in [('potential',self._tabPot,self._evaluate),
+                             ('Rforce',self._tabRforce,self._Rforce),
+                             ('zforce',self._tabzforce,self._zforce)]:
+            self._tabErr[key]= nu.amax(nu.fabs(self._tabeval(tab,mR,mz)
+                                               -func(mR,mz)))
+        self._tabulated= True
+        return copy.copy(self._tabErr)
+
+    def _tabindx(self,R,z):
+        """Return the points that are evaluated using the tabulated potential"""
+        if not self._tabulated: return nu.zeros(len(R),dtype='bool')
+        return (R >= self._tabrmin)*(R <= self._tabrmax)\
+            *(nu.fabs(z) <= self._tabzmax)
+
+    def _tabeval(self,tab,R,z):
+        """Evaluate a tabulated quantity"""
+        if self._tablogR: return tab.ev(nu.log(R),nu.fabs(z))
+        else: return tab.ev(R,nu.fabs(z))
 
     def _dens(self,R,z,phi=0.,t=0.):
         """
@@ -327,6 +434,13 @@ class DoubleExponentialDiskPotential(Potential):
         """
         return nu.exp(-self._alpha*R-self._beta*nu.fabs(z))
 
+def _parse_input(R,z):
+    """Return R and z as arrays of the same length and whether the input was scalar"""
+    floatIn= nu.array(R).shape == () and nu.array(z).shape == ()
+    R, z= nu.broadcast_arrays(nu.atleast_1d(R).astype('float'),
+                              nu.atleast_1d(z).astype('float'))
+    return (R,z,floatIn)
+
 if __name__ == '__main__':
     print "doctesting ..."
     import doctest
@@ -70,6 +70,9 @@ class MovingObjectPotential(Potential):
         else:
             self._softening= softening
         self.isNonAxi= True
+        #The C implementation only supports Plummer softening
+        self.hasC= isinstance(self._softening,PlummerSoftening)
+        self.hasC_dxdv= self.hasC
         return None
 
     def _evaluate(self,R,z,phi=0.,t=0.):
@@ -31,7 +31,6 @@ class Potential:
         INPUT:
            amp - amplitude to be applied when evaluating the potential and its forces
         OUTPUT:
-        HISTORY:
         """
         self._amp= amp
         self.dim= 3
@@ -39,6 +38,7 @@ class Potential:
         self.isNonAxi= False
         self.hasC= False
         self.hasC_dxdv= False
+        self._profileCache= None
         return None
 
     def __call__(self,R,z,phi=0.,t=0.,dR=0,dphi=0):
@@ -226,9 +226,12 @@ class Potential:
 
            2014-01-29 - Written - Bovy (IAS)
 
+
         """
         if self.isNonAxi:
             raise NotImplementedError('mass for non-axisymmetric potentials is not currently supported')
+        if not self._profileCache is None and z is None and not forceint:
+            return self._profileCache('mass',R)
         try:
             if forceint: raise AttributeError #Hack!
             return self._amp*self._mass(R,z=z,t=t)
@@ -416,6 +419,7 @@ class Potential:
 
         """
         self._amp*= norm/nu.fabs(self.Rforce(1.,0.,t=t))
+        if not self._profileCache is None: self._profileCache.reset()
 
     def phiforce(self,R,z,phi=0.,t=0.):
         """
@@ -763,6 +767,8 @@ class Potential:
             2011-10-09 - Written - Bovy (IAS)
         
         """
+        if not self._profileCache is None:
+            return self._profileCache('vcirc',R)
         return nu.sqrt(R*-self.Rforce(R,0.))
 
     def dvcircdR(self,R):
@@ -816,6 +822,8 @@ class Potential:
             2011-10-09 - Written - Bovy (IAS)
         
         """
+        if not self._profileCache is None:
+            return self._profileCache('omegac',R)
         return nu.sqrt(-self.Rforce(R,0.)/R)
 
     def epifreq(self,R):
@@ -842,6 +850,8 @@ class Potential:
            2011-10-09 - Written - Bovy (IAS)
         
         """
+        if not self._profileCache is None:
+            return self._profileCache('epifreq',R)
         return nu.sqrt(self.R2deriv(R,0.)-3./R*self.Rforce(R,0.))
 
     def verticalfreq(self,R):
@@ -868,6 +878,8 @@ class Potential:
            2012-07-25 - Written - Bovy (IAS@MPIA)
         
         """
+        if not self._profileCache is None:
+            return self._profileCache('verticalfreq',R)
         return nu.sqrt(self.z2deriv(R,0.))
 
     def lindbladR(self,OmegaP,m=2,**kwargs):
@@ -957,6 +969,41 @@ class Potential:
         """
         return rl(self,lz)
 
+    def cacheProfiles(self,cache=True,rgrid=(nu.log(0.01),nu.log(20.),101),
+                      tol=10.**-8.,maxn=10001):
+        """
+        NAME:
+
+            cacheProfiles
+
+        PURPOSE:
+
+            enable (or disable) a cache of the radial profiles of this potential: the enclosed mass (spherical, as returned by mass(R)), vcirc, omegac, epifreq, verticalfreq, and rl; each profile is tabulated on a grid in log R when it is first needed and interpolated afterwards
+
+        INPUT:
+
+            cache= (True) if False, disable the cache
+
+            rgrid= initial grid in log R to be given to linspace as in logrs= linspace(*rgrid); outside of the grid, profiles are calculated directly
+
+            tol= (10.**-8.) the grid is refined by bisecting the grid intervals in which the relative interpolation error at the midpoint is larger than tol
+
+            maxn= (10001) maximum number of grid points
+        
+        OUTPUT:
+        
+            (none)
+        
+        """
+        if not cache:
+            self._profileCache= None
+            return None
+        if self.isNonAxi:
+            raise PotentialError('Cannot cache the profiles of a non-axisymmetric potential')
+        from profileCache import _profileCache
+        self._profileCache= _profileCache(self,rgrid,tol,maxn)
+        return None
+
     def flattening(self,R,z):
         """
         
@@ -1148,6 +1195,8 @@ def evaluatePotentials(R,z,Pot,phi=0.,t=0.,dR=0,dphi=0):
     HISTORY:
        2010-04-16 - Written - Bovy (NYU)
     """
+    if dR == 0 and dphi == 0 and _check_c_eval(Pot,R,z,phi,t):
+        return _evaluate_c(R,z,Pot,phi,t,'potential')
     if isinstance(Pot,list):
         sum= 0.
         for pot in Pot:
@@ -1224,6 +1273,8 @@ def evaluateRforces(R,z,Pot,phi=0.,t=0.):
     HISTORY:
        2010-04-16 - Written - Bovy (NYU)
     """
+    if _check_c_eval(Pot,R,z,phi,t):
+        return _evaluate_c(R,z,Pot,phi,t,'Rforce')
     if isinstance(Pot,list):
         sum= 0.
         for pot in Pot:
@@ -1263,7 +1314,10 @@ def evaluatephiforces(R,z,Pot,phi=0.,t=0.):
 
        2010-04-16 - Written - Bovy (NYU)
 
+
     """
+    if _check_c_eval(Pot,R,z,phi,t):
+        return _evaluate_c(R,z,Pot,phi,t,'phiforce')
     if isinstance(Pot,list):
         sum= 0.
         for pot in Pot:
@@ -1304,7 +1358,10 @@ def evaluatezforces(R,z,Pot,phi=0.,t=0.):
 
        2010-04-16 - Written - Bovy (NYU)
 
+
     """
+    if _check_c_eval(Pot,R,z,phi,t):
+        return _evaluate_c(R,z,Pot,phi,t,'zforce')
     if isinstance(Pot,list):
         sum= 0.
         for pot in Pot:
@@ -1336,6 +1393,8 @@ def evaluateR2derivs(R,z,Pot,phi=0.,t=0.):
     HISTORY:
        2012-07-25 - Written - Bovy (IAS)
     """
+    if _check_c_eval(Pot,R,z,phi,t):
+        return _evaluate_c(R,z,Pot,phi,t,'R2deriv')
     if isinstance(Pot,list):
         sum= 0.
         for pot in Pot:
@@ -1367,6 +1426,8 @@ def evaluatez2derivs(R,z,Pot,phi=0.,t=0.):
     HISTORY:
        2012-07-25 - Written - Bovy (IAS)
     """
+    if _check_c_eval(Pot,R,z,phi,t):
+        return _evaluate_c(R,z,Pot,phi,t,'z2deriv')
     if isinstance(Pot,list):
         sum= 0.
         for pot in Pot:
@@ -1398,6 +1459,8 @@ def evaluateRzderivs(R,z,Pot,phi=0.,t=0.):
     HISTORY:
        2013-08-28 - Written - Bovy (IAS)
     """
+    if _check_c_eval(Pot,R,z,phi,t):
+        return _evaluate_c(R,z,Pot,phi,t,'Rzderiv')
     if isinstance(Pot,list):
         sum= 0.
         for pot in Pot:
@@ -1692,6 +1755,8 @@ def vterm(Pot,l,deg=True):
         sinl= nu.sin(l/180.*nu.pi)
     else:
         sinl= nu.sin(l)
+    if nu.ndim(sinl) > 0:
+        return sinl*(_omegac_vec(Pot,nu.fabs(sinl))-omegac(Pot,1.))
     return sinl*(omegac(Pot,sinl)-omegac(Pot,1.))
 
 def rl(Pot,lz):
@@ -1708,7 +1773,7 @@ def rl(Pot,lz):
 
        Pot - Potential instance or list thereof
 
-       lz - Angular momentum
+       lz - Angular momentum (float or array)
 
     OUTPUT:
 
@@ -1718,12 +1783,19 @@ def rl(Pot,lz):
 
        2012-07-30 - Written - Bovy (IAS@MPIA)
 
+
     NOTE:
 
        seems to take about ~0.5 ms for a Miyamoto-Nagai potential; 
        ~0.75 ms for a MWPotential
 
+       array input is solved for in a single vectorized pass (in C for potentials that have a C implementation)
+
     """
+    if isinstance(Pot,Potential) and not Pot._profileCache is None:
+        return Pot._profileCache('rl',lz)
+    if nu.ndim(lz) > 0:
+        return _rl_vec(Pot,nu.array(lz,dtype='float'))
     #Find interval
     rstart= _rlFindStart(math.fabs(lz),#assumes vo=1.
                          math.fabs(lz),
@@ -1740,7 +1812,77 @@ def rl(Pot,lz):
         return optimize.brentq(_rlfunc,rlower,rstart,
                                args=(math.fabs(lz),
                                      Pot))
-        
+
+def _rl_vec(Pot,lz):
+    """rl for array input"""
+    if _check_c_eval(Pot,lz):
+        from interpRZPotential import calc_rl_c
+        out, err= calc_rl_c(Pot,lz.flatten())
+        if err != 0: #pragma: no cover
+            raise RuntimeError('rl C code failed to bracket the radius of a circular orbit for some of the input angular momenta')
+        return nu.reshape(out,lz.shape)
+    lz= nu.fabs(lz)
+    out= nu.zeros(lz.shape)
+    indx= lz > 0.
+    if nu.sum(indx) == 0: return out
+    tlz= lz[indx]
+    func= lambda R,indx: R*_vectorized(lambda r: vcirc(Pot,r),R)-tlz[indx]
+    #Find interval, as in the scalar case
+    b= 2.*tlz
+    fb= func(b,nu.ones(len(tlz),dtype='bool'))
+    for ii in range(200):
+        bindx= fb <= 0.
+        if nu.sum(bindx) == 0: break
+        b[bindx]*= 2.
+        fb[bindx]= func(b[bindx],bindx)
+    a= 10.**-5.*nu.ones_like(tlz)
+    fa= func(a,nu.ones(len(tlz),dtype='bool'))
+    for ii in range(200):
+        aindx= fa > 0.
+        if nu.sum(aindx) == 0: break
+        a[aindx]/= 2.
+        fa[aindx]= func(a[aindx],aindx)
+    out[indx]= _illinois(func,a,b,fa,fb)
+    return out
+
+def _vectorized(func,x):
+    """Evaluate func for array x, in a single call if func supports array input and element-by-element otherwise"""
+    try:
+        out= nu.asarray(func(x),dtype='float')
+    except (TypeError,ValueError):
+        out= None
+    if out is None or out.shape != x.shape:
+        out= nu.array([func(tx) for tx in x])
+    return out
+
+def _illinois(func,a,b,fa,fb,xtol=2e-12,rtol=8.88e-16,maxiter=200):
+    """
+    NAME:
+       _illinois
+    PURPOSE:
+       vectorized root finding using the Illinois variant of regula falsi
+    INPUT:
+       func - function to solve, called as func(x,indx), where indx is a boolean index into the array of roots being solved for and x the corresponding trial values
+       a, b - arrays that bracket the roots
+       fa, fb - func evaluated at a and b
+       xtol, rtol, maxiter - convergence parameters as in scipy.optimize.brentq
+    OUTPUT:
+       roots
+    """
+    a, b, fa, fb= a.copy(), b.copy(), fa.copy(), fb.copy()
+    for ii in range(maxiter):
+        indx= (fb != 0.)*(nu.fabs(b-a) >= xtol+rtol*nu.fabs(b))
+        if nu.sum(indx) == 0: break
+        c= (a[indx]*fb[indx]-b[indx]*fa[indx])/(fb[indx]-fa[indx])
+        fc= func(c,indx)
+        swap= fc*fb[indx] < 0.
+        sindx= nu.arange(len(a))[indx]
+        a[sindx[swap]]= b[sindx[swap]]
+        fa[sindx[swap]]= fb[sindx[swap]]
+        fa[sindx[True-swap]]*= 0.5
+        b[indx]= c
+        fb[indx]= fc
+    return b
 
 def _rlfunc(rl,lz,pot):
     """Function that gives rvc-lz"""
@@ -1779,12 +1921,13 @@ def lindbladR(Pot,OmegaP,m=2,**kwargs):
 
     OUTPUT:
 
-       radius of Linblad resonance, None if there is no resonance
+       radius of Linblad resonance, None if there is no resonance (NaN for array input)
 
     HISTORY:
 
        2011-10-09 - Written - Bovy (IAS)
 
+
     """
     if isinstance(m,str):
         if 'corot' in m.lower():
@@ -1793,6 +1936,9 @@ def lindbladR(Pot,OmegaP,m=2,**kwargs):
             raise IOError("'m' input not recognized, should be an integer or 'corotation'")
     else:
         corotation= False
+    if nu.ndim(OmegaP) > 0:
+        return _lindbladR_vec(Pot,nu.array(OmegaP,dtype='float'),m,
+                              corotation,**kwargs)
     if corotation:
         try:
             out= optimize.brentq(_corotationR_eq,0.0000001,1000.,
@@ -1812,6 +1958,36 @@ def lindbladR(Pot,OmegaP,m=2,**kwargs):
             raise
         return out
 
+def _lindbladR_vec(Pot,OmegaP,m,corotation,**kwargs):
+    """lindbladR for array input"""
+    tOmegaP= OmegaP.flatten()
+    if corotation:
+        func= lambda R,indx: _omegac_vec(Pot,R)-tOmegaP[indx]
+    else:
+        func= lambda R,indx: m*(_omegac_vec(Pot,R)-tOmegaP[indx])\
+            -_vectorized(lambda r: epifreq(Pot,r),R)
+    a= 0.0000001*nu.ones_like(tOmegaP)
+    b= 1000.*nu.ones_like(tOmegaP)
+    allindx= nu.ones(len(tOmegaP),dtype='bool')
+    fa= func(a,allindx)
+    fb= func(b,allindx)
+    out= nu.empty_like(tOmegaP)
+    out[:]= nu.nan
+    #Only solve where the interval brackets the resonance, like brentq
+    indx= fa*fb <= 0.
+    if nu.sum(indx) > 0:
+        subfunc= lambda R,sindx: func(R,nu.arange(len(tOmegaP))[indx][sindx])
+        out[indx]= _illinois(subfunc,a[indx],b[indx],fa[indx],fb[indx],
+                             **kwargs)
+    return nu.reshape(out,OmegaP.shape)
+
+def _omegac_vec(Pot,R):
+    """Circular angular speed for array R, using the batched C evaluation of the forces if possible"""
+    if (not isinstance(Pot,Potential) or Pot._profileCache is None) \
+            and _check_c_eval(Pot,R):
+        return nu.sqrt(-evaluateRforces(R,0.,Pot)/R)
+    return _vectorized(lambda r: omegac(Pot,r),R)
+
 def _corotationR_eq(R,Pot,OmegaP):
     return omegac(Pot,R)-OmegaP
 def _lindbladR_eq(R,Pot,OmegaP,m):
@@ -1843,6 +2019,8 @@ def omegac(Pot,R):
        2011-10-09 - Written - Bovy (IAS)
 
     """
+    if isinstance(Pot,Potential) and not Pot._profileCache is None:
+        return Pot._profileCache('omegac',R)
     from planarPotential import evaluateplanarRforces
     try:
         return nu.sqrt(-evaluateplanarRforces(R,Pot)/R)
@@ -1879,3 +2057,81 @@ def _check_c(Pot):
         return nu.all(nu.array([p.hasC for p in Pot],dtype='bool'))
     elif isinstance(Pot,Potential):
         return Pot.hasC
+
+def _check_c_eval(Pot,*args):
+    """
+
+    NAME:
+
+       _check_c_eval
+
+    PURPOSE:
+
+       check whether a potential or list thereof can and should be evaluated using the batched C code
+
+    INPUT:
+
+       Pot - Potential instance or list of such instances
+
+       args - the inputs (R,z,phi,t); the C code is only used if at least one of these is an array
+
+    OUTPUT:
+
+       True if the batched C code should be used, False otherwise
+
+    """
+    if not nu.any([nu.ndim(arg) > 0 for arg in args]): return False
+    if not _check_c(Pot): return False
+    from interpRZPotential import interpRZPotential, ext_loaded
+    if not ext_loaded: return False #pragma: no cover
+    from compiledPotential import compiledPotential
+    from TimeDependentWrapperPotential import TimeDependentWrapperPotential
+    from DoubleExponentialDiskPotential import DoubleExponentialDiskPotential
+    if not isinstance(Pot,list): Pot= [Pot]
+    for p in Pot:
+        if isinstance(p,(compiledPotential,TimeDependentWrapperPotential)):
+            if not _check_c_eval(p._pot,*args): return False
+        #interpRZPotential already uses C on its grid, but falls back onto
+        #the original potential off the grid
+        elif not isinstance(p,Potential) or isinstance(p,interpRZPotential):
+            return False
+        #The C DoubleExponentialDiskPotential truncates the Bessel integrals
+        #differently from the Python one, so use Python to make array and
+        #scalar input agree (this also covers the tabulated potential)
+        elif isinstance(p,DoubleExponentialDiskPotential):
+            return False
+    return True
+
+def _evaluate_c(R,z,Pot,phi,t,quantity):
+    """
+
+    NAME:
+
+       _evaluate_c
+
+    PURPOSE:
+
+       evaluate a potential, one of its forces, or one of its second derivatives using the batched C code
+
+    INPUT:
+
+       R, z, phi, t - coordinates (any combination of scalars and arrays that can be broadcast against each other)
+
+       Pot - Potential instance or list of such instances
+
+       quantity - 'potential', 'Rforce', 'zforce', 'phiforce', 'R2deriv', 'z2deriv', 'Rzderiv', 'phi2deriv', or 'Rphideriv'
+
+    OUTPUT:
+
+       array of the requested quantity
+
+    """
+    from interpRZPotential import eval_potential_batch_c
+    R, z, phi, t= nu.broadcast_arrays(nu.asarray(R,dtype=nu.float64),
+                                      nu.asarray(z,dtype=nu.float64),
+                                      nu.asarray(phi,dtype=nu.float64),
+                                      nu.asarray(t,dtype=nu.float64))
+    out, err= eval_potential_batch_c(Pot,R.flatten(),z.flatten(),
+                                     phi.flatten(),t.flatten(),
+                                     quantity=quantity)
+    return nu.reshape(out,R.shape)
@@ -66,6 +66,8 @@ class RazorThinExponentialDiskPotential(Potential):
                 (isinstance(normalize,(int,float)) \
                      and not isinstance(normalize,bool)): #pragma: no cover
             self.normalize(normalize)
+        self.hasC= True
+        self.hasC_dxdv= True
         #Load Kepler potential for large R
         #self._kp= KeplerPotential(normalize=4.*nu.pi/self._alpha**2./self._beta)
 
@@ -0,0 +1,406 @@
+###############################################################################
+#   SCFPotential.py: Potential expanded in the basis functions of the
+#                    self-consistent-field (SCF) method of Hernquist &
+#                    Ostriker (1992)
+#
+#   Phi(r,theta,phi)= amp/a sum_nlm Phi_nl(r/a) N_lm P_lm(cos theta)
+#                           x [Acos_nlm cos(m phi) + Asin_nlm sin(m phi)]
+#
+#   Phi_nl(s)= - s^l / (1+s)^(2l+1) C_n^(2l+3/2)((s-1)/(s+1))
+###############################################################################
+import math
+import numpy
+from scipy import special
+from Potential import Potential
+class SCFPotential(Potential):
+    """Class that implements a potential expanded in the basis functions of the self-consistent-field method of `Hernquist & Ostriker (1992) <http://adsabs.harvard.edu/abs/1992ApJ...386..375H>`_
+
+    .. math::
+
+        \\Phi(r,\\theta,\\phi) = \\frac{\\mathrm{amp}}{a}\\,\\sum_{n,l,m} \\Phi_{nl}(r/a)\\,N_{lm}\\,P_{lm}(\\cos\\theta)\\,\\left[A^{\\mathrm{cos}}_{nlm}\\,\\cos m\\phi + A^{\\mathrm{sin}}_{nlm}\\,\\sin m\\phi\\right]
+
+    with :math:`\\Phi_{nl}(s) = -s^l\\,(1+s)^{-2l-1}\\,C_n^{(2l+3/2)}\\left(\\frac{s-1}{s+1}\\right)` and :math:`N_{lm}` the normalization of the real spherical harmonics. The coefficients can be computed from a density with scf_compute_coeffs or from a set of particles with scf_compute_coeffs_nbody
+
+    """
+    def __init__(self,amp=1.,Acos=numpy.array([[[1.]]]),Asin=None,a=1.,
+                 normalize=False):
+        """
+        NAME:
+
+           __init__
+
+        PURPOSE:
+
+           initialize an SCF potential
+
+        INPUT:
+
+           amp= amplitude to be applied to the potential (default: 1)
+
+           Acos= cosine coefficients, array with shape (N,L,L) indexed as [n,l,m] (entries with m > l are ignored; default: a Hernquist potential)
+
+           Asin= sine coefficients, same shape as Acos (default: None, all zero)
+
+           a= scale radius of the expansion
+
+           normalize= if True, normalize such that vc(1.,0.)=1., or, if given as a number, such that the force is this fraction of the force necessary to make vc(1.,0.)=1.
+
+        OUTPUT:
+
+           (none)
+
+        """
+        Potential.__init__(self,amp=amp)
+        Acos= numpy.array(Acos,dtype='float')
+        if not len(Acos.shape) == 3 or not Acos.shape[1] == Acos.shape[2]:
+            raise ValueError("Acos needs to have shape (N,L,L)")
+        if Asin is None:
+            Asin= numpy.zeros_like(Acos)
+        else:
+            Asin= numpy.array(Asin,dtype='float')
+            if not Asin.shape == Acos.shape:
+                raise ValueError("Asin needs to have the same shape as Acos")
+        #Only m <= l terms, and no sin(0 phi) terms, contribute
+        lmmask= numpy.tril(numpy.ones(Acos.shape[1:]))
+        self._Acos= Acos*lmmask
+        self._Asin= Asin*lmmask
+        self._Asin[:,:,0]= 0.
+        self._N, self._L= Acos.shape[:2]
+        self.a= a
+        self._scale= self.a
+        self.isNonAxi= bool(numpy.any(self._Acos[:,:,1:] != 0.)
+                            or numpy.any(self._Asin != 0.))
+        if normalize or \
+                (isinstance(normalize,(int,float)) \
+                     and not isinstance(normalize,bool)): #pragma: no cover
+            self.normalize(normalize)
+        self.hasC= True
+        self.hasC_dxdv= True
+        return None
+
+    def _evaluate(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _evaluate
+        PURPOSE:
+           evaluate the potential at R,z
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           Phi(R,z,phi)
+        """
+        return self._compute(R,z,phi,'potential')
+
+    def _Rforce(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _Rforce
+        PURPOSE:
+           evaluate the radial force for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the radial force
+        """
+        return self._compute(R,z,phi,'Rforce')
+
+    def _zforce(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _zforce
+        PURPOSE:
+           evaluate the vertical force for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the vertical force
+        """
+        return self._compute(R,z,phi,'zforce')
+
+    def _phiforce(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _phiforce
+        PURPOSE:
+           evaluate the azimuthal force for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the azimuthal force
+        """
+        return self._compute(R,z,phi,'phiforce')
+
+    def _dens(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _dens
+        PURPOSE:
+           evaluate the density for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the density
+        """
+        return self._compute(R,z,phi,'density')
+
+    def _compute(self,R,z,phi,quantity):
+        """Evaluate the expansion for (arrays of) R,z,phi"""
+        R,z,phi= numpy.broadcast_arrays(numpy.array(R,dtype='float'),
+                                        numpy.array(z,dtype='float'),
+                                        numpy.array(phi,dtype='float'))
+        shape= R.shape
+        R= R.flatten()
+        z= z.flatten()
+        phi= phi.flatten()
+        r= numpy.sqrt(R**2.+z**2.)
+        s= r/self.a
+        atzero= (r == 0.)
+        rr= r.copy()
+        rr[atzero]= 1.
+        costheta= z/rr
+        costheta[atzero]= 1.
+        sintheta= R/rr
+        mphi= numpy.outer(numpy.arange(self._L),phi)
+        cosmphi= numpy.cos(mphi)
+        sinmphi= numpy.sin(mphi)
+        if quantity == 'density':
+            radial= _scf_rho_nl(s,self._N,self._L)
+        else:
+            radial, dradial= _scf_phi_nl(s,self._N,self._L,deriv=True)
+        NP, dNP= _scf_NP_lm(costheta,sintheta,self._L,deriv=True)
+        Bcos= numpy.einsum('nlm,nlk->lmk',self._Acos,radial)
+        Bsin= numpy.einsum('nlm,nlk->lmk',self._Asin,radial)
+        if quantity == 'potential':
+            out= numpy.sum(NP*(Bcos*cosmphi+Bsin*sinmphi),axis=(0,1))/self.a
+        elif quantity == 'density':
+            out= numpy.sum(NP*(Bcos*cosmphi+Bsin*sinmphi),axis=(0,1))\
+                /self.a**3.
+        elif quantity == 'phiforce':
+            ms= numpy.arange(self._L).reshape((1,self._L,1))
+            out= -numpy.sum(NP*ms*(Bsin*cosmphi-Bcos*sinmphi),axis=(0,1))\
+                /self.a
+        else:
+            dBcos= numpy.einsum('nlm,nlk->lmk',self._Acos,dradial)
+            dBsin= numpy.einsum('nlm,nlk->lmk',self._Asin,dradial)
+            dPhidr= numpy.sum(NP*(dBcos*cosmphi+dBsin*sinmphi),axis=(0,1))\
+                /self.a**2.
+            dPhidtheta= numpy.sum(dNP*(Bcos*cosmphi+Bsin*sinmphi),
+                                  axis=(0,1))/self.a
+            if quantity == 'Rforce':
+                out= -dPhidr*sintheta-dPhidtheta*costheta/rr
+            else: #zforce
+                out= -dPhidr*costheta+dPhidtheta*sintheta/rr
+            out[atzero]= 0.
+        if shape == ():
+            return out[0]
+        else:
+            return numpy.reshape(out,shape)
+
+def _gegenbauer(nmax,alpha,x):
+    """Gegenbauer polynomials C_n^alpha(x) for n < nmax; returns (nmax,len(x))"""
+    out= numpy.zeros((nmax,len(x)))
+    if nmax > 0: out[0]= 1.
+    if nmax > 1: out[1]= 2.*alpha*x
+    for n in range(2,nmax):
+        out[n]= (2.*(n-1.+alpha)*x*out[n-1]-(n+2.*alpha-2.)*out[n-2])/n
+    return out
+
+def _scf_phi_nl(s,N,L,deriv=False):
+    """Radial basis functions Phi_nl(s) (and their derivatives); returns (N,L,len(s))"""
+    xi= (s-1.)/(s+1.)
+    out= numpy.empty((N,L,len(s)))
+    if deriv: dout= numpy.empty((N,L,len(s)))
+    for l in range(L):
+        alpha= 2.*l+1.5
+        pref= s**l/(1.+s)**(2.*l+1.)
+        C= _gegenbauer(N,alpha,xi)
+        out[:,l]= -pref*C
+        if deriv:
+            dpref= -(2.*l+1.)*pref/(1.+s)
+            if l > 0: dpref+= l*s**(l-1.)/(1.+s)**(2.*l+1.)
+            dC= numpy.zeros_like(C)
+            dC[1:]= 2.*alpha*_gegenbauer(N-1,alpha+1.,xi)
+            dout[:,l]= -dpref*C-pref*dC*2./(1.+s)**2.
+    if deriv:
+        return (out,dout)
+    else:
+        return out
+
+def _scf_rho_nl(s,N,L):
+    """Density corresponding to the radial basis functions Phi_nl(s); returns (N,L,len(s))"""
+    xi= (s-1.)/(s+1.)
+    out= numpy.empty((N,L,len(s)))
+    ns= numpy.arange(N)
+    for l in range(L):
+        Knl= 0.5*ns*(ns+4.*l+3.)+(l+1.)*(2.*l+1.)
+        C= _gegenbauer(N,2.*l+1.5,xi)
+        out[:,l]= numpy.outer(Knl/2./numpy.pi,
+                              s**(l-1.)/(1.+s)**(2.*l+3.))*C
+    return out
+
+def _scf_I_nl(N,L):
+    """Normalization integral int r^2 Phi_nl rho_nl dr of the radial basis functions; returns (N,L)"""
+    n= numpy.arange(N).reshape((N,1))
+    l= numpy.arange(L).reshape((1,L))
+    Knl= 0.5*n*(n+4.*l+3.)+(l+1.)*(2.*l+1.)
+    return -Knl*numpy.exp(special.gammaln(n+4.*l+3.)-special.gammaln(n+1.)
+                          -2.*special.gammaln(2.*l+1.5)
+                          -(8.*l+6.)*numpy.log(2.))/(n+2.*l+1.5)
+
+def _scf_NP_lm(costheta,sintheta,L,deriv=False):
+    """Normalized associated Legendre functions N_lm P_lm(cos theta) (without the Condon-Shortley phase) and their derivatives wrt theta; returns (L,L,len(costheta))"""
+    P= numpy.zeros((L+1,L+1,len(costheta)))
+    for m in range(L):
+        #P_m^m, P_{m+1}^m, and upward recursion in l
+        if m == 0: P[0,0]= 1.
+        else: P[m,m]= (2.*m-1.)*sintheta*P[m-1,m-1]
+        P[m+1,m]= (2.*m+1.)*costheta*P[m,m]
+        for l in range(m+2,L):
+            P[l,m]= ((2.*l-1.)*costheta*P[l-1,m]-(l+m-1.)*P[l-2,m])/(l-m)
+    Nlm= numpy.zeros((L,L,1))
+    for l in range(L):
+        for m in range(l+1):
+            Nlm[l,m]= math.sqrt((2.*l+1.)/4./numpy.pi
+                                *math.exp(special.gammaln(l-m+1.)
+                                          -special.gammaln(l+m+1.)))
+    if not deriv: return Nlm*P[:L,:L]
+    dP= numpy.zeros((L,L,len(costheta)))
+    for l in range(L):
+        dP[l,0]= -P[l,1]
+        for m in range(1,l+1):
+            dP[l,m]= 0.5*((l+m)*(l-m+1.)*P[l,m-1]-P[l,m+1])
+    return (Nlm*P[:L,:L],Nlm*dP)
+
+def _scf_expand(s,costheta,phi,weights,N,L):
+    """Compute the (Acos,Asin) coefficients of sum weights delta(s,costheta,phi)"""
+    sintheta= numpy.sqrt(1.-costheta**2.)
+    radial= _scf_phi_nl(s,N,L)
+    NP= _scf_NP_lm(costheta,sintheta,L)
+    mphi= numpy.outer(numpy.arange(L),phi)
+    Acos= numpy.einsum('nlk,lmk,mk->nlm',radial*weights,NP,numpy.cos(mphi))
+    Asin= numpy.einsum('nlk,lmk,mk->nlm',radial*weights,NP,numpy.sin(mphi))
+    norm= _scf_I_nl(N,L).reshape((N,L,1))
+    mfac= 2.*numpy.ones((1,1,L))
+    mfac[0,0,0]= 1.
+    Acos*= mfac/norm
+    Asin*= mfac/norm
+    return (Acos,Asin)
+
+def scf_compute_coeffs(dens,N,L,a=1.,radial_order=None,costheta_order=None,
+                       phi_order=None):
+    """
+    NAME:
+
+       scf_compute_coeffs
+
+    PURPOSE:
+
+       compute the SCF expansion coefficients of a density through Gauss-Legendre quadrature
+
+    INPUT:
+
+       dens - Potential instance (its density is expanded) or function dens(R,z,phi) that can be evaluated for arrays of R,z,phi
+
+       N - number of radial basis functions
+
+       L - number of spherical-harmonic degrees (the expansion goes up to l=L-1)
+
+       a= (1.) scale radius of the expansion
+
+       radial_order= (max(40,3N/2)) number of quadrature points in the radial coordinate (s-1)/(s+1)
+
+       costheta_order= (max(40,3L/2)) number of quadrature points in cos(theta)
+
+       phi_order= (2L-1, or 1 for an axisymmetric Potential) number of equally-spaced points in phi; phi_order=1 assumes that the density is axisymmetric
+
+    OUTPUT:
+
+       (Acos,Asin) coefficients, arrays with shape (N,L,L), to be used as SCFPotential(Acos=Acos,Asin=Asin,a=a)
+
+    """
+    if isinstance(dens,Potential):
+        densfunc= lambda R,z,phi: dens.dens(R,z,phi=phi)
+        if phi_order is None and not dens.isNonAxi: phi_order= 1
+    else:
+        densfunc= dens
+    if radial_order is None: radial_order= max(40,int(1.5*N))
+    if costheta_order is None: costheta_order= max(40,int(1.5*L))
+    if phi_order is None: phi_order= 2*L-1
+    xis, xiws= numpy.polynomial.legendre.leggauss(radial_order)
+    cts, ctws= numpy.polynomial.legendre.leggauss(costheta_order)
+    phis= numpy.arange(phi_order)*2.*numpy.pi/phi_order
+    s= (1.+xis)/(1.-xis)
+    sws= xiws*2./(1.-xis)**2.*s**2.
+    S, CT, PHI= numpy.meshgrid(s,cts,phis,indexing='ij')
+    S= S.flatten()
+    CT= CT.flatten()
+    PHI= PHI.flatten()
+    R= a*S*numpy.sqrt(1.-CT**2.)
+    z= a*S*CT
+    try:
+        rho= densfunc(R,z,PHI)
+        if not numpy.shape(rho) == R.shape: raise ValueError
+    except (ValueError,TypeError):
+        rho= numpy.array([densfunc(R[ii],z[ii],PHI[ii])
+                          for ii in range(len(R))])
+    weights= (numpy.outer(sws,ctws).reshape((radial_order,costheta_order,1))
+              *numpy.ones((1,1,phi_order))).flatten()\
+              *2.*numpy.pi/phi_order*a**3.*rho
+    Acos, Asin= _scf_expand(S,CT,PHI,weights,N,L)
+    if phi_order == 1: #axisymmetric, m > 0 terms are aliased
+        Acos[:,:,1:]= 0.
+        Asin[:,:,1:]= 0.
+    return (Acos,Asin)
+
+def scf_compute_coeffs_nbody(R,z,phi,mass,N,L,a=1.):
+    """
+    NAME:
+
+       scf_compute_coeffs_nbody
+
+    PURPOSE:
+
+       compute the SCF expansion coefficients of a set of particles
+
+    INPUT:
+
+       R, z, phi - positions of the particles (arrays)
+
+       mass - mass of the particles (array or number)
+
+       N - number of radial basis functions
+
+       L - number of spherical-harmonic degrees (the expansion goes up to l=L-1)
+
+       a= (1.) scale radius of the expansion
+
+    OUTPUT:
+
+       (Acos,Asin) coefficients, arrays with shape (N,L,L), to be used as SCFPotential(Acos=Acos,Asin=Asin,a=a)
+
+    """
+    R= numpy.array(R,dtype='float').flatten()
+    z= numpy.array(z,dtype='float').flatten()
+    phi= numpy.array(phi,dtype='float').flatten()
+    mass= mass*numpy.ones(len(R))
+    r= numpy.sqrt(R**2.+z**2.)
+    rr= r.copy()
+    rr[r == 0.]= 1.
+    costheta= z/rr
+    costheta[r == 0.]= 1.
+    return _scf_expand(r/a,costheta,phi,mass,N,L)
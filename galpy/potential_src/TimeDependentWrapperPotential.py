@@ -0,0 +1,254 @@
+###############################################################################
+#   TimeDependentWrapperPotential.py: wrapper that smoothly grows a potential
+#                                     (or list of potentials) and rotates it
+#                                     as a rigid pattern
+###############################################################################
+import copy
+import numpy as nu
+from Potential import Potential, PotentialError, evaluatePotentials, \
+    evaluateDensities, evaluateRforces, evaluatezforces, evaluatephiforces, \
+    evaluateR2derivs, evaluatez2derivs, evaluateRzderivs
+class TimeDependentWrapperPotential(Potential):
+    """Class that wraps a potential or a list of potentials, grows its amplitude smoothly between :math:`t_{\mathrm{form}}` and  :math:`t_{\mathrm{form}}+T_{\mathrm{steady}}` in the same way as DehnenBarPotential, and rotates it as a rigid pattern with pattern speed :math:`\\Omega_b`
+
+    .. math::
+
+        \\Phi(R,z,\\phi,t) = A(t)\\,\\Phi_w(R,z,\\phi-\\Omega_b\\,t-\\phi_b,t)
+
+    where :math:`\\Phi_w` is the wrapped potential; times are given directly in galpy time units
+
+    """
+    def __init__(self,amp=1.,pot=None,tform=None,tsteady=None,
+                 omegab=0.,pa=0.):
+        """
+        NAME:
+
+           __init__
+
+        PURPOSE:
+
+           initialize a time-dependent wrapper potential
+
+        INPUT:
+
+           amp - amplitude to be applied to the wrapped potential(s) (default: 1.)
+
+           pot - Potential instance or list thereof (planarPotentials cannot be wrapped)
+
+           tform= start of growth (default: None, not grown)
+
+           tsteady= time delay at which the potential is fully grown (default: 2.)
+
+           omegab= pattern speed (default: 0.)
+
+           pa= azimuth of the pattern at t=0 (rad; default: 0.)
+
+        OUTPUT:
+
+           (none)
+
+        """
+        Potential.__init__(self,amp=amp)
+        if isinstance(pot,list):
+            self._pot= copy.copy(pot)
+        else:
+            self._pot= [pot]
+        for p in self._pot:
+            if not isinstance(p,Potential):
+                raise PotentialError("Input to 'TimeDependentWrapperPotential' is neither a Potential-instance or a list of such instances")
+        self._tform= tform
+        if tform is None:
+            self._tsteady= None
+        elif tsteady is None:
+            self._tsteady= tform+2.
+        else:
+            self._tsteady= tform+tsteady
+        self._omegab= omegab
+        self._pa= pa
+        self.isNonAxi= nu.any([p.isNonAxi for p in self._pot])
+        self.hasC= nu.all([p.hasC for p in self._pot])
+        self.hasC_dxdv= nu.all([p.hasC_dxdv for p in self._pot])
+        return None
+
+    def _smooth(self,t):
+        """Growth factor of the amplitude at time t"""
+        if self._tform is None: return 1.
+        #Clipping xi to [-1,1] gives 0 before tform and 1 after tsteady
+        xi= nu.clip(2.*(t-self._tform)/(self._tsteady-self._tform)-1.,-1.,1.)
+        return 3./16.*xi**5.-5./8*xi**3.+15./16.*xi+.5
+
+    def _phi(self,phi,t):
+        """Azimuth in the frame of the wrapped potential(s)"""
+        return phi-self._omegab*t-self._pa
+
+    def _evaluate(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _evaluate
+        PURPOSE:
+           evaluate the potential at R,z
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           Phi(R,z)
+        """
+        return self._smooth(t)*evaluatePotentials(R,z,self._pot,
+                                                  phi=self._phi(phi,t),t=t)
+
+    def _Rforce(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _Rforce
+        PURPOSE:
+           evaluate the radial force for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the radial force
+        """
+        return self._smooth(t)*evaluateRforces(R,z,self._pot,
+                                               phi=self._phi(phi,t),t=t)
+
+    def _zforce(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _zforce
+        PURPOSE:
+           evaluate the vertical force for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the vertical force
+        """
+        return self._smooth(t)*evaluatezforces(R,z,self._pot,
+                                               phi=self._phi(phi,t),t=t)
+
+    def _phiforce(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _phiforce
+        PURPOSE:
+           evaluate the azimuthal force for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the azimuthal force
+        """
+        return self._smooth(t)*evaluatephiforces(R,z,self._pot,
+                                                 phi=self._phi(phi,t),t=t)
+
+    def _dens(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _dens
+        PURPOSE:
+           evaluate the density for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the density
+        """
+        return self._smooth(t)*evaluateDensities(R,z,self._pot,
+                                                 phi=self._phi(phi,t),t=t)
+
+    def _R2deriv(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _R2deriv
+        PURPOSE:
+           evaluate the second radial derivative for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the second radial derivative
+        """
+        return self._smooth(t)*evaluateR2derivs(R,z,self._pot,
+                                                phi=self._phi(phi,t),t=t)
+
+    def _z2deriv(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _z2deriv
+        PURPOSE:
+           evaluate the second vertical derivative for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the second vertical derivative
+        """
+        return self._smooth(t)*evaluatez2derivs(R,z,self._pot,
+                                                phi=self._phi(phi,t),t=t)
+
+    def _Rzderiv(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _Rzderiv
+        PURPOSE:
+           evaluate the mixed R,z derivative for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           d2phi/dR/dz
+        """
+        return self._smooth(t)*evaluateRzderivs(R,z,self._pot,
+                                                phi=self._phi(phi,t),t=t)
+
+    def _phi2deriv(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _phi2deriv
+        PURPOSE:
+           evaluate the second azimuthal derivative for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           d2phi/dphi2
+        """
+        phi= self._phi(phi,t)
+        return self._smooth(t)*nu.sum([p.phi2deriv(R,z,phi=phi,t=t)
+                                       for p in self._pot],axis=0)
+
+    def _Rphideriv(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _Rphideriv
+        PURPOSE:
+           evaluate the mixed R,phi derivative for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           d2phi/dR/dphi
+        """
+        phi= self._phi(phi,t)
+        return self._smooth(t)*nu.sum([p.Rphideriv(R,z,phi=phi,t=t)
+                                       for p in self._pot],axis=0)
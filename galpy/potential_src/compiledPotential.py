@@ -0,0 +1,264 @@
+###############################################################################
+#   compiledPotential.py: wrapper around a potential (or list of potentials)
+#                         that keeps its parsed C representation alive, such
+#                         that repeated calls to the C code do not need to
+#                         set up the potential again
+###############################################################################
+import copy
+import threading
+import numpy as nu
+from Potential import Potential, PotentialError, evaluatePotentials, \
+    evaluateDensities, evaluateRforces, evaluatezforces, evaluatephiforces, \
+    evaluateR2derivs, evaluatez2derivs, evaluateRzderivs
+class compiledPotential(Potential):
+    """Class that wraps a potential or a list of potentials and holds on to
+    the parsed version of the potential that is used by the C code, such that
+    it only needs to be set up once when the same potential is used
+    repeatedly (e.g., in many short orbit integrations); can be used anywhere
+    a Potential can be used"""
+    def __init__(self,pot):
+        """
+        NAME:
+
+           __init__
+
+        PURPOSE:
+
+           initialize a compiled potential
+
+        INPUT:
+
+           pot - Potential instance or list thereof; the parameters of the potential(s) are assumed not to change after the compiledPotential has been set up
+
+        OUTPUT:
+
+           (none)
+
+        """
+        Potential.__init__(self,amp=1.)
+        if isinstance(pot,list):
+            self._pot= copy.copy(pot)
+        else:
+            self._pot= [pot]
+        for p in self._pot:
+            if not isinstance(p,Potential):
+                raise PotentialError("Input to 'compiledPotential' is neither a Potential-instance or a list of such instances")
+        self.isNonAxi= nu.any([p.isNonAxi for p in self._pot])
+        self.hasC= nu.all([p.hasC for p in self._pot])
+        self.hasC_dxdv= nu.all([p.hasC_dxdv for p in self._pot])
+        #Caches for the parsed potential and the C structures
+        self._parsed= {}
+        self._c_handles= {}
+        return None
+
+    def __del__(self):
+        self._free_c_handles()
+
+    def __getstate__(self):
+        #The C structures cannot be pickled
+        state= self.__dict__.copy()
+        state['_c_handles']= {}
+        return state
+
+    def __setstate__(self,state):
+        self.__dict__= state
+
+    def normalize(self,norm,t=0.): #pragma: no cover
+        raise PotentialError("A compiledPotential cannot be normalized; normalize the potential(s) before compiling them")
+
+    def _parse(self,kind):
+        """
+        NAME:
+           _parse
+        PURPOSE:
+           return the (cached) parsed potential that is passed to C
+        INPUT:
+           kind - 'full' (3D orbit integration), 'actions' (actionAngle), or 'planar' (2D orbit integration)
+        OUTPUT:
+           (npot,pot_type,pot_args)
+        """
+        if not kind in self._parsed:
+            if kind == 'planar':
+                from galpy.orbit_src.integratePlanarOrbit import _parse_pot
+                from planarPotential import RZToplanarPotential
+                self._parsed[kind]= _parse_pot(RZToplanarPotential(self._pot))
+            else:
+                from galpy.orbit_src.integrateFullOrbit import _parse_pot
+                self._parsed[kind]= _parse_pot(self._pot,
+                                               potforactions=kind=='actions')
+        return self._parsed[kind]
+
+    def _c_handle(self,kind):
+        """
+        NAME:
+           _c_handle
+        PURPOSE:
+           return the (cached) C structures set up for this potential; the C code modifies these structures while it runs (and releases the GIL), so each calling thread gets its own copy
+        INPUT:
+           kind - 'full' (3D orbit integration), 'actions' (actionAngle), or 'planar' (2D orbit integration)
+        OUTPUT:
+           (handle,npot,ncopies), where handle points to ncopies copies of the C potentialArg structures
+        """
+        key= (kind,threading.current_thread().ident)
+        if not key in self._c_handles:
+            npot, pot_type, pot_args= self._parse(kind)
+            if kind == 'actions':
+                from galpy.actionAngle_src.actionAngleStaeckel_c import \
+                    _compile_pot_c
+                handle, ncopies= _compile_pot_c(npot,pot_type,pot_args), 1
+            else:
+                if kind == 'planar':
+                    from galpy.orbit_src.integratePlanarOrbit import \
+                        _compile_pot_c
+                else:
+                    from galpy.orbit_src.integrateFullOrbit import \
+                        _compile_pot_c
+                handle, ncopies= _compile_pot_c(npot,pot_type,pot_args)
+            self._c_handles[key]= (handle,npot,ncopies)
+        return self._c_handles[key]
+
+    def _free_c_handles(self):
+        try:
+            for key in self._c_handles.keys():
+                handle, npot, ncopies= self._c_handles.pop(key)
+                if key[0] == 'actions':
+                    from galpy.actionAngle_src.actionAngleStaeckel_c import \
+                        _free_pot_c
+                    _free_pot_c(handle,npot)
+                    continue
+                elif key[0] == 'planar':
+                    from galpy.orbit_src.integratePlanarOrbit import _free_pot_c
+                else:
+                    from galpy.orbit_src.integrateFullOrbit import _free_pot_c
+                _free_pot_c(handle,npot,ncopies)
+        except (AttributeError,ImportError,TypeError): #pragma: no cover
+            pass #interpreter shutting down
+        return None
+
+    def _evaluate(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _evaluate
+        PURPOSE:
+           evaluate the potential at R,z
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           Phi(R,z)
+        """
+        return evaluatePotentials(R,z,self._pot,phi=phi,t=t)
+
+    def _Rforce(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _Rforce
+        PURPOSE:
+           evaluate the radial force for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the radial force
+        """
+        return evaluateRforces(R,z,self._pot,phi=phi,t=t)
+
+    def _zforce(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _zforce
+        PURPOSE:
+           evaluate the vertical force for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the vertical force
+        """
+        return evaluatezforces(R,z,self._pot,phi=phi,t=t)
+
+    def _phiforce(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _phiforce
+        PURPOSE:
+           evaluate the azimuthal force for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the azimuthal force
+        """
+        return evaluatephiforces(R,z,self._pot,phi=phi,t=t)
+
+    def _dens(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _dens
+        PURPOSE:
+           evaluate the density for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the density
+        """
+        return evaluateDensities(R,z,self._pot,phi=phi,t=t)
+
+    def _R2deriv(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _R2deriv
+        PURPOSE:
+           evaluate the second radial derivative for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the second radial derivative
+        """
+        return evaluateR2derivs(R,z,self._pot,phi=phi,t=t)
+
+    def _z2deriv(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _z2deriv
+        PURPOSE:
+           evaluate the second vertical derivative for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the second vertical derivative
+        """
+        return evaluatez2derivs(R,z,self._pot,phi=phi,t=t)
+
+    def _Rzderiv(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _Rzderiv
+        PURPOSE:
+           evaluate the mixed R,z derivative for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           d2phi/dR/dz
+        """
+        return evaluateRzderivs(R,z,self._pot,phi=phi,t=t)
@@ -0,0 +1,288 @@
+###############################################################################
+#   interp3DPotential.py: class that interpolates a (non-axisymmetric)
+#                         potential on a 3D (R,z,phi) grid, optionally in a
+#                         frame rotating with a constant pattern speed
+###############################################################################
+import copy
+import numpy
+from scipy import ndimage
+from Potential import Potential, PotentialError
+from planarPotential import planarPotential
+from interpRZPotential import _interpRZCache
+_NPAD= 10 #number of points by which the grid is extended in R and z
+class interp3DPotential(Potential):
+    """Class that interpolates a given (non-axisymmetric) potential on a 3D (R,z,phi) grid for fast orbit integration; the potential can rotate rigidly with a constant pattern speed; outside of the grid, the spline is extended close to linearly over _NPAD grid points in R and z and held constant beyond that (both in Python and in C, such that they agree everywhere; the original potential is not used), so the grid should cover all positions of interest"""
+    def __init__(self,pot=None,rgrid=(numpy.log(0.01),numpy.log(20.),51),
+                 zgrid=(0.,1.,51),nphi=32,logR=True,zsym=True,
+                 omegab=None,t0=0.,cachedir=None):
+        """
+        NAME:
+
+           __init__
+
+        PURPOSE:
+
+           Initialize an interp3DPotential instance
+
+        INPUT:
+
+           pot - Potential or planarPotential instance or list of such instances to be interpolated (planarPotentials are taken to be independent of z)
+
+           rgrid - R grid to be given to linspace as in rs= linspace(*rgrid); the grids should cover all positions of interest, as the interpolation is only extrapolated over a few grid points beyond them and held constant further out
+
+           zgrid - z grid to be given to linspace as in zs= linspace(*zgrid)
+
+           nphi= (32) number of points of the (periodic) grid in phi, which runs from 0 to 2pi (2pi not included)
+
+           logR - if True, rgrid is in the log of R so logrs= linspace(*rgrid)
+
+           zsym= if True (default), the potential is assumed to be symmetric around z=0 (so you can use, e.g.,  zgrid=(0.,1.,51)).
+
+           omegab= (None) if set, the interpolated potential rotates rigidly with this pattern speed, Phi(R,z,phi,t)= Phi(R,z,phi-omegab*(t-t0),t0)
+
+           t0= (0.) time at which the potential is tabulated (e.g., after a bar has fully grown)
+
+           cachedir= (None) if set, directory in which the grid is cached (see interpRZPotential)
+
+        OUTPUT:
+
+           instance
+
+        """
+        if not isinstance(pot,list): pot= [pot]
+        for p in pot:
+            if isinstance(p,interp3DPotential):
+                raise PotentialError('Cannot setup interp3DPotential with another interp3DPotential')
+            if not isinstance(p,(Potential,planarPotential)):
+                raise PotentialError("Input to 'interp3DPotential' is neither a Potential-instance, a planarPotential-instance, or a list of such instances")
+        if int(rgrid[2]) < 3 or int(zgrid[2]) < 3 or nphi < 3:
+            raise PotentialError('interp3DPotential requires grids with at least 3 points in each dimension')
+        Potential.__init__(self,amp=1.)
+        self._origPot= copy.copy(pot)
+        self._logR= logR
+        self._xgrid= numpy.linspace(*rgrid)
+        if self._logR:
+            self._rgrid= numpy.exp(self._xgrid)
+        else:
+            self._rgrid= self._xgrid
+        self._zgrid= numpy.linspace(*zgrid)
+        self._phigrid= numpy.arange(nphi)*2.*numpy.pi/nphi
+        self._zsym= zsym
+        if omegab is None:
+            self._omegab= 0.
+        else:
+            self._omegab= omegab
+        self._t0= t0
+        self.isNonAxi= True
+        self.hasC= True
+        self.hasC_dxdv= True
+        #Tabulate the potential
+        cache= _interpRZCache(self._origPot,rgrid,zgrid,logR,cachedir,
+                              options=['interp3DPotential',int(nphi),
+                                       float(t0)])
+        if 'potGrid3D' in cache:
+            self._potGrid= cache['potGrid3D']
+        else:
+            R,z,phi= numpy.meshgrid(self._rgrid,self._zgrid,self._phigrid,
+                                    indexing='ij')
+            self._potGrid= numpy.reshape(\
+                _evaluate_orig(self._origPot,R.flatten(),z.flatten(),
+                               phi.flatten(),self._t0*numpy.ones(R.size),
+                               'potential'),R.shape)
+            cache['potGrid3D']= self._potGrid
+        cache.save()
+        self._coeffs= _spline3d_coeffs(self._potGrid,
+                                       self._zsym and self._zgrid[0] == 0.)
+        #Origin of the (padded) grid of coefficients
+        self._x0= self._xgrid[0]-_NPAD*(self._xgrid[1]-self._xgrid[0])
+        self._z0= self._zgrid[0]-_NPAD*(self._zgrid[1]-self._zgrid[0])
+        return None
+
+    def _evaluate(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _evaluate
+        PURPOSE:
+           evaluate the potential at R,z,phi,t
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           Phi(R,z,phi,t)
+        """
+        return self._interp_array(R,z,phi,t,'potential')
+
+    def _Rforce(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _Rforce
+        PURPOSE:
+           evaluate the radial force for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the radial force
+        """
+        return self._interp_array(R,z,phi,t,'Rforce')
+
+    def _zforce(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _zforce
+        PURPOSE:
+           evaluate the vertical force for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the vertical force
+        """
+        return self._interp_array(R,z,phi,t,'zforce')
+
+    def _phiforce(self,R,z,phi=0.,t=0.):
+        """
+        NAME:
+           _phiforce
+        PURPOSE:
+           evaluate the azimuthal force for this potential
+        INPUT:
+           R - Galactocentric cylindrical radius
+           z - vertical height
+           phi - azimuth
+           t - time
+        OUTPUT:
+           the azimuthal force
+        """
+        return self._interp_array(R,z,phi,t,'phiforce')
+
+    def _interp_array(self,R,z,phi,t,quantity):
+        """Evaluate the interpolated quantity for scalar or array inputs; off the grid, the extended spline is used, as in the C code"""
+        scalarOut= numpy.all([numpy.array(x).shape == () for x in [R,z,phi,t]])
+        R,z,phi,t= [numpy.atleast_1d(x).astype(numpy.float64)
+                    for x in numpy.broadcast_arrays(R,z,phi,t)]
+        out= self._interp(R,z,phi,t,quantity)
+        if scalarOut:
+            return out[0]
+        else:
+            return out
+
+    def _interp(self,R,z,phi,t,quantity):
+        """Evaluate the 3D spline or one of its (negative) derivatives; same algorithm as the C code"""
+        deriv= ['potential','Rforce','zforce','phiforce'].index(quantity)-1
+        if self._logR: x= numpy.log(R)
+        else: x= R
+        if self._zsym:
+            zsign= numpy.sign(z)
+            z= numpy.fabs(z)
+        else:
+            zsign= 1.
+        phi= phi-self._omegab*(t-self._t0)
+        nx, nz, nphi= self._coeffs.shape
+        dx= self._xgrid[1]-self._xgrid[0]
+        dz= self._zgrid[1]-self._zgrid[0]
+        tx, ix= _bspline_indices((x-self._x0)/dx,nx,False)
+        tz, iz= _bspline_indices((z-self._z0)/dz,nz,False)
+        tphi, iphi= _bspline_indices(phi/2./numpy.pi*nphi,nphi,True)
+        wx= _bspline_weights(tx,deriv == 0)
+        wz= _bspline_weights(tz,deriv == 1)
+        wphi= _bspline_weights(tphi,deriv == 2)
+        out= numpy.sum(wx[:,:,None,None]*wz[:,None,:,None]
+                       *wphi[:,None,None,:]
+                       *self._coeffs[ix[:,:,None,None],iz[:,None,:,None],
+                                     iphi[:,None,None,:]],axis=(1,2,3))
+        if deriv == 0:
+            out/= -dx
+            if self._logR: out/= R
+        elif deriv == 1:
+            out*= -zsign/dz
+        elif deriv == 2:
+            out*= -nphi/2./numpy.pi
+        return out
+
+def _spline3d_coeffs(grid,zeven):
+    """Compute the coefficients of the cubic B-spline interpolating grid; the grid is extended by _NPAD points in R and z by reflecting it through its edges, such that the spline is close to linear at the edges, except at z=0 if zeven, where it is even in z; the spline is periodic in phi"""
+    grid= numpy.pad(grid,((_NPAD,_NPAD),(0,0),(0,0)),
+                    mode='reflect',reflect_type='odd')
+    if zeven:
+        grid= numpy.pad(grid,((0,0),(_NPAD,0),(0,0)),mode='reflect')
+    else:
+        grid= numpy.pad(grid,((0,0),(_NPAD,0),(0,0)),
+                        mode='reflect',reflect_type='odd')
+    grid= numpy.pad(grid,((0,0),(0,_NPAD),(0,0)),
+                    mode='reflect',reflect_type='odd')
+    coeffs= ndimage.spline_filter1d(grid,order=3,axis=0)
+    coeffs= ndimage.spline_filter1d(coeffs,order=3,axis=1)
+    #Periodic: divide by the Fourier transform of the sampled cubic B-spline
+    nphi= grid.shape[2]
+    kernel= numpy.zeros(nphi)
+    kernel[0]= 2./3.
+    kernel[1]+= 1./6.
+    kernel[-1]+= 1./6.
+    return numpy.ascontiguousarray(\
+        numpy.real(numpy.fft.ifft(numpy.fft.fft(coeffs,axis=2)\
+                                      /numpy.fft.fft(kernel),axis=2)))
+
+def _bspline_indices(u,n,periodic):
+    """Fractional position and indices of the four cubic B-spline coefficients that contribute at index coordinate u"""
+    if periodic:
+        u= numpy.mod(u,n)
+    else:
+        u= numpy.clip(u,0.,n-1.)
+    ii= numpy.floor(u).astype(int)
+    indx= ii[:,None]+numpy.arange(-1,3)[None,:]
+    if periodic:
+        indx= numpy.mod(indx,n)
+    else:
+        indx= numpy.fabs(indx).astype(int)
+        indx[indx > n-1]= 2*(n-1)-indx[indx > n-1]
+    return (u-ii,indx)
+
+def _bspline_weights(t,deriv):
+    """Cubic B-spline basis functions (or their derivatives) at fractional position t"""
+    if deriv:
+        return numpy.array([-0.5*(1.-t)**2.,0.5*t*(3.*t-4.),
+                            0.5*(-3.*t**2.+2.*t+1.),0.5*t**2.]).T
+    else:
+        return numpy.array([(1.-t)**3./6.,(3.*t**3.-6.*t**2.+4.)/6.,
+                            (-3.*t**3.+3.*t**2.+3.*t+1.)/6.,t**3./6.]).T
+
+def _evaluate_orig(pot,R,z,phi,t,quantity):
+    """Evaluate the original (list of) Potential(s) and planarPotential(s), trying vectorized evaluation first"""
+    out= numpy.zeros(len(R))
+    for p in pot:
+        try:
+            thisout= _evaluate_single(p,R,z,phi,t,quantity)
+            if not numpy.shape(thisout) == R.shape: raise ValueError
+        except (ValueError,TypeError):
+            thisout= numpy.array([_evaluate_single(p,R[ii],z[ii],phi[ii],
+                                                   t[ii],quantity)
+                                  for ii in range(len(R))])
+        out+= thisout
+    return out
+
+def _evaluate_single(p,R,z,phi,t,quantity):
+    if isinstance(p,planarPotential):
+        if quantity == 'potential':
+            return p(R,phi=phi,t=t)
+        elif quantity == 'Rforce':
+            return p.Rforce(R,phi=phi,t=t)
+        elif quantity == 'zforce':
+            return 0.*R
+        elif quantity == 'phiforce':
+            return p.phiforce(R,phi=phi,t=t)
+    else:
+        if quantity == 'potential':
+            return p(R,z,phi=phi,t=t)
+        elif quantity == 'Rforce':
+            return p.Rforce(R,z,phi=phi,t=t)
+        elif quantity == 'zforce':
+            return p.zforce(R,z,phi=phi,t=t)
+        elif quantity == 'phiforce':
+            return p.phiforce(R,z,phi=phi,t=t)
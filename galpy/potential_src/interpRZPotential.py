@@ -1,6 +1,9 @@
 import os
 import sys
 import copy
+import hashlib
+import tempfile
+import types
 import ctypes
 import ctypes.util
 import warnings
@@ -102,7 +105,8 @@ class interpRZPotential(Potential):
                  interpdvcircdr=False,
                  interpepifreq=False,interpverticalfreq=False,
                  use_c=False,enable_c=False,zsym=True,
-                 numcores=None):
+                 numcores=None,cachedir=None,
+                 adaptive=False,tol=10.**-6.,maxn=1001):
         """
         NAME:
 
@@ -116,9 +120,9 @@ class interpRZPotential(Potential):
 
            RZPot - RZPotential to be interpolated
 
-           rgrid - R grid to be given to linspace as in rs= linspace(*rgrid)
+           rgrid - R grid to be given to linspace as in rs= linspace(*rgrid) (initial grid when adaptive=True)
 
-           zgrid - z grid to be given to linspace as in zs= linspace(*zgrid)
+           zgrid - z grid to be given to linspace as in zs= linspace(*zgrid) (initial grid when adaptive=True)
 
            logR - if True, rgrid is in the log of R so logrs= linspace(*rgrid)
 
@@ -132,6 +136,14 @@ class interpRZPotential(Potential):
 
            numcores= if set to an integer, use this many cores (only used for vcirc, dvcircdR, epifreq, and verticalfreq; NOT NECESSARILY FASTER, TIME TO MAKE SURE)
 
+           cachedir= (None) if set, directory in which the grids and spline coefficients are cached in a file whose name is a hash of the potential's class and parameters and of the grid; later instances with the same potential and grid (in any process) load the grids from this file rather than computing them
+
+           adaptive= (False) if True, refine the R and z grids by bisecting the grid intervals in which the interpolation error of the potential and the forces (those that are interpolated, or the potential if none are) at the midpoint is larger than tol times the maximum absolute value of that quantity on the grid
+
+           tol= (10.**-6.) tolerance for the adaptive grid refinement
+
+           maxn= (1001) maximum number of grid points in R and z for the adaptive grid refinement
+
         OUTPUT:
 
            instance
@@ -142,6 +154,8 @@ class interpRZPotential(Potential):
 
            2013-01-24 - Started with new implementation - Bovy (IAS)
 
+
+
         """
         if isinstance(RZPot,interpRZPotential):
             from galpy.potential import PotentialError
@@ -165,8 +179,36 @@ class interpRZPotential(Potential):
         self._enable_c= enable_c*ext_loaded
         self.hasC= self._enable_c
         self._zsym= zsym
+        self._adaptive= adaptive
+        if adaptive:
+            #The adaptive grid depends on the quantities that drive the
+            #refinement, so these are part of the cache key
+            quantities= [q for q,interp in [('potential',interpPot),
+                                            ('rforce',interpRforce),
+                                            ('zforce',interpzforce)]
+                         if interp]
+            if len(quantities) == 0: quantities= ['potential']
+            cache= _interpRZCache(RZPot,rgrid,zgrid,logR,cachedir,
+                                  options=[tol,maxn,sorted(quantities)])
+        else:
+            cache= _interpRZCache(RZPot,rgrid,zgrid,logR,cachedir)
+        if adaptive:
+            if not 'adaptive_rgrid' in cache:
+                if self._logR: xgrid= self._logrgrid
+                else: xgrid= self._rgrid
+                xgrid, zgrid= _adaptive_grid(self._origPot,xgrid,self._zgrid,
+                                             self._logR,quantities,tol,maxn,
+                                             use_c*ext_loaded)
+                if self._logR: xgrid= numpy.exp(xgrid)
+                cache['adaptive_rgrid']= xgrid
+                cache['adaptive_zgrid']= zgrid
+            self._rgrid= cache['adaptive_rgrid']
+            if self._logR: self._logrgrid= numpy.log(self._rgrid)
+            self._zgrid= cache['adaptive_zgrid']
         if interpPot:
-            if use_c*ext_loaded:
+            if 'potGrid' in cache:
+                self._potGrid= cache['potGrid']
+            elif use_c*ext_loaded:
                 self._potGrid, err= calc_potential_c(self._origPot,self._rgrid,self._zgrid)
             else:
                 from galpy.potential import evaluatePotentials
@@ -175,6 +217,7 @@ class interpRZPotential(Potential):
                     for jj in range(len(self._zgrid)):
                         potGrid[ii,jj]= evaluatePotentials(self._rgrid[ii],self._zgrid[jj],self._origPot)
                 self._potGrid= potGrid
+            cache['potGrid']= self._potGrid
             if self._logR:
                 self._potInterp= interpolate.RectBivariateSpline(self._logrgrid,
                                                                  self._zgrid,
@@ -185,10 +228,15 @@ class interpRZPotential(Potential):
                                                                  self._zgrid,
                                                                  self._potGrid,
                                                                  kx=3,ky=3,s=0.)
-            if enable_c*ext_loaded:
-                self._potGrid_splinecoeffs= calc_2dsplinecoeffs_c(self._potGrid)
+            if enable_c*ext_loaded and not adaptive:
+                if not 'potGrid_splinecoeffs' in cache:
+                    cache['potGrid_splinecoeffs']=\
+                        calc_2dsplinecoeffs_c(self._potGrid)
+                self._potGrid_splinecoeffs= cache['potGrid_splinecoeffs']
         if interpRforce:
-            if use_c*ext_loaded:
+            if 'rforceGrid' in cache:
+                self._rforceGrid= cache['rforceGrid']
+            elif use_c*ext_loaded:
                 self._rforceGrid, err= calc_potential_c(self._origPot,self._rgrid,self._zgrid,rforce=True)
             else:
                 from galpy.potential import evaluateRforces
@@ -197,6 +245,7 @@ class interpRZPotential(Potential):
                     for jj in range(len(self._zgrid)):
                         rforceGrid[ii,jj]= evaluateRforces(self._rgrid[ii],self._zgrid[jj],self._origPot)
                 self._rforceGrid= rforceGrid
+            cache['rforceGrid']= self._rforceGrid
             if self._logR:
                 self._rforceInterp= interpolate.RectBivariateSpline(self._logrgrid,
                                                                     self._zgrid,
@@ -207,10 +256,15 @@ class interpRZPotential(Potential):
                                                                     self._zgrid,
                                                                     self._rforceGrid,
                                                                     kx=3,ky=3,s=0.)
-            if enable_c*ext_loaded:
-                self._rforceGrid_splinecoeffs= calc_2dsplinecoeffs_c(self._rforceGrid)
+            if enable_c*ext_loaded and not adaptive:
+                if not 'rforceGrid_splinecoeffs' in cache:
+                    cache['rforceGrid_splinecoeffs']=\
+                        calc_2dsplinecoeffs_c(self._rforceGrid)
+                self._rforceGrid_splinecoeffs= cache['rforceGrid_splinecoeffs']
         if interpzforce:
-            if use_c*ext_loaded:
+            if 'zforceGrid' in cache:
+                self._zforceGrid= cache['zforceGrid']
+            elif use_c*ext_loaded:
                 self._zforceGrid, err= calc_potential_c(self._origPot,self._rgrid,self._zgrid,zforce=True)
             else:
                 from galpy.potential import evaluatezforces
@@ -219,6 +273,7 @@ class interpRZPotential(Potential):
                     for jj in range(len(self._zgrid)):
                         zforceGrid[ii,jj]= evaluatezforces(self._rgrid[ii],self._zgrid[jj],self._origPot)
                 self._zforceGrid= zforceGrid
+            cache['zforceGrid']= self._zforceGrid
             if self._logR:
                 self._zforceInterp= interpolate.RectBivariateSpline(self._logrgrid,
                                                                     self._zgrid,
@@ -229,15 +284,22 @@ class interpRZPotential(Potential):
                                                                     self._zgrid,
                                                                     self._zforceGrid,
                                                                     kx=3,ky=3,s=0.)
-            if enable_c*ext_loaded:
-                self._zforceGrid_splinecoeffs= calc_2dsplinecoeffs_c(self._zforceGrid)
+            if enable_c*ext_loaded and not adaptive:
+                if not 'zforceGrid_splinecoeffs' in cache:
+                    cache['zforceGrid_splinecoeffs']=\
+                        calc_2dsplinecoeffs_c(self._zforceGrid)
+                self._zforceGrid_splinecoeffs= cache['zforceGrid_splinecoeffs']
         if interpDens:
-            from galpy.potential import evaluateDensities
-            densGrid= numpy.zeros((len(self._rgrid),len(self._zgrid)))
-            for ii in range(len(self._rgrid)):
-                for jj in range(len(self._zgrid)):
-                    densGrid[ii,jj]= evaluateDensities(self._rgrid[ii],self._zgrid[jj],self._origPot)
-            self._densGrid= densGrid
+            if 'densGrid' in cache:
+                self._densGrid= cache['densGrid']
+            else:
+                from galpy.potential import evaluateDensities
+                densGrid= numpy.zeros((len(self._rgrid),len(self._zgrid)))
+                for ii in range(len(self._rgrid)):
+                    for jj in range(len(self._zgrid)):
+                        densGrid[ii,jj]= evaluateDensities(self._rgrid[ii],self._zgrid[jj],self._origPot)
+                self._densGrid= densGrid
+                cache['densGrid']= self._densGrid
             if self._logR:
                 self._densInterp= interpolate.RectBivariateSpline(self._logrgrid,
                                                                   self._zgrid,
@@ -250,33 +312,42 @@ class interpRZPotential(Potential):
                                                                   kx=3,ky=3,s=0.)
         if interpvcirc:
             from galpy.potential import vcirc
-            if not numcores is None:
+            if 'vcircGrid' in cache:
+                self._vcircGrid= cache['vcircGrid']
+            elif not numcores is None:
                 self._vcircGrid= multi.parallel_map((lambda x: vcirc(self._origPot,self._rgrid[x])),
                                                     range(len(self._rgrid)),numcores=numcores)
             else:
                 self._vcircGrid= numpy.array([vcirc(self._origPot,r) for r in self._rgrid])
+            cache['vcircGrid']= self._vcircGrid
             if self._logR:
                 self._vcircInterp= interpolate.InterpolatedUnivariateSpline(self._logrgrid,self._vcircGrid,k=3)
             else:
                 self._vcircInterp= interpolate.InterpolatedUnivariateSpline(self._rgrid,self._vcircGrid,k=3)
         if interpdvcircdr:
             from galpy.potential import dvcircdR
-            if not numcores is None:
+            if 'dvcircdrGrid' in cache:
+                self._dvcircdrGrid= cache['dvcircdrGrid']
+            elif not numcores is None:
                 self._dvcircdrGrid= multi.parallel_map((lambda x: dvcircdR(self._origPot,self._rgrid[x])),
                                                        range(len(self._rgrid)),numcores=numcores)
             else:
                 self._dvcircdrGrid= numpy.array([dvcircdR(self._origPot,r) for r in self._rgrid])
+            cache['dvcircdrGrid']= self._dvcircdrGrid
             if self._logR:
                 self._dvcircdrInterp= interpolate.InterpolatedUnivariateSpline(self._logrgrid,self._dvcircdrGrid,k=3)
             else:
                 self._dvcircdrInterp= interpolate.InterpolatedUnivariateSpline(self._rgrid,self._dvcircdrGrid,k=3)
         if interpepifreq:
             from galpy.potential import epifreq
-            if not numcores is None:
+            if 'epifreqGrid' in cache:
+                self._epifreqGrid= cache['epifreqGrid']
+            elif not numcores is None:
                 self._epifreqGrid= numpy.array(multi.parallel_map((lambda x: epifreq(self._origPot,self._rgrid[x])),
                                                       range(len(self._rgrid)),numcores=numcores))
             else:
                 self._epifreqGrid= numpy.array([epifreq(self._origPot,r) for r in self._rgrid])
+            cache['epifreqGrid']= self._epifreqGrid
             indx= True-numpy.isnan(self._epifreqGrid)
             if numpy.sum(indx) < 4:
                 if self._logR:
@@ -290,15 +361,19 @@ class interpRZPotential(Potential):
                     self._epifreqInterp= interpolate.InterpolatedUnivariateSpline(self._rgrid[indx],self._epifreqGrid[indx],k=3)
         if interpverticalfreq:
             from galpy.potential import verticalfreq
-            if not numcores is None:
+            if 'verticalfreqGrid' in cache:
+                self._verticalfreqGrid= cache['verticalfreqGrid']
+            elif not numcores is None:
                 self._verticalfreqGrid= multi.parallel_map((lambda x: verticalfreq(self._origPot,self._rgrid[x])),
                                                        range(len(self._rgrid)),numcores=numcores)
             else:
                 self._verticalfreqGrid= numpy.array([verticalfreq(self._origPot,r) for r in self._rgrid])
+            cache['verticalfreqGrid']= self._verticalfreqGrid
             if self._logR:
                 self._verticalfreqInterp= interpolate.InterpolatedUnivariateSpline(self._logrgrid,self._verticalfreqGrid,k=3)
             else:
                 self._verticalfreqInterp= interpolate.InterpolatedUnivariateSpline(self._rgrid,self._verticalfreqGrid,k=3)
+        cache.save()
         return None
                                                  
     @scalarVectorDecorator
@@ -684,7 +759,297 @@ def eval_force_c(pot,R,z,zforce=False):
 
     return (out,err.value)
 
+def eval_potential_batch_c(pot,R,z,phi,t,quantity='potential',nthreads=None):
+    """
+    NAME:
+       eval_potential_batch_c
+    PURPOSE:
+       Use C to evaluate a potential, one of its forces, or one of its second derivatives at many (R,z,phi,t) in a single call
+    INPUT:
+       pot - Potential or list of such instances
+       R, z, phi, t - arrays of the same length
+       quantity= ('potential') 'potential', 'Rforce', 'zforce', 'phiforce', 'R2deriv', 'z2deriv', 'Rzderiv', 'phi2deriv', or 'Rphideriv'
+       nthreads= (None) number of OpenMP threads to use (None: all available)
+    OUTPUT:
+       (quantity evaluated at (R,z,phi,t),err)
+    """
+    from galpy.orbit_src.integrateFullOrbit import _parse_pot #here bc otherwise there is an infinite loop
+    #Parse the potential
+    if quantity.lower() == 'potential':
+        npot, pot_type, pot_args= _parse_pot(pot,potforactions=True)
+        quantity_int= 0
+    else:
+        npot, pot_type, pot_args= _parse_pot(pot)
+        quantity_int= ['rforce','zforce','phiforce','r2deriv','z2deriv',
+                       'rzderiv','phi2deriv','rphideriv']\
+                       .index(quantity.lower())+1
+    if nthreads is None:
+        nthreads= 0
+
+    #Set up result arrays
+    out= numpy.empty((len(R)))
+    err= ctypes.c_int(0)
+
+    #Set up the C code
+    ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
+    interppotential_evalFunc= _lib.eval_potential_batch
+    interppotential_evalFunc.argtypes= [ctypes.c_int,
+                                        ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                                        ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                                        ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                                        ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                                        ctypes.c_int,
+                                        ndpointer(dtype=numpy.int32,flags=ndarrayFlags),
+                                        ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                                        ctypes.c_int,
+                                        ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                                        ctypes.POINTER(ctypes.c_int),
+                                        ctypes.c_int]
+
+    #Array requirements
+    R= numpy.require(R,dtype=numpy.float64,requirements=['C','W'])
+    z= numpy.require(z,dtype=numpy.float64,requirements=['C','W'])
+    phi= numpy.require(phi,dtype=numpy.float64,requirements=['C','W'])
+    t= numpy.require(t,dtype=numpy.float64,requirements=['C','W'])
+    out= numpy.require(out,dtype=numpy.float64,requirements=['C','W'])
+
+    #Run the C code
+    interppotential_evalFunc(len(R),
+                             R,
+                             z,
+                             phi,
+                             t,
+                             ctypes.c_int(npot),
+                             pot_type,
+                             pot_args,
+                             ctypes.c_int(quantity_int),
+                             out,
+                             ctypes.byref(err),
+                             ctypes.c_int(nthreads))
+
+    return (out,err.value)
+
+def calc_rl_c(pot,lz,nthreads=None):
+    """
+    NAME:
+       calc_rl_c
+    PURPOSE:
+       Use C to calculate the radii of circular orbits with angular momenta lz
+    INPUT:
+       pot - Potential or list of such instances
+       lz - array of angular momenta
+       nthreads= (None) number of OpenMP threads to use (None: all available)
+    OUTPUT:
+       (radii,err)
+    """
+    from galpy.orbit_src.integrateFullOrbit import _parse_pot #here bc otherwise there is an infinite loop
+    #Parse the potential
+    npot, pot_type, pot_args= _parse_pot(pot)
+    if nthreads is None:
+        nthreads= 0
+
+    #Set up result arrays
+    out= numpy.empty((len(lz)))
+    err= ctypes.c_int(0)
+
+    #Set up the C code
+    ndarrayFlags= ('C_CONTIGUOUS','WRITEABLE')
+    interppotential_rlFunc= _lib.calc_rl
+    interppotential_rlFunc.argtypes= [ctypes.c_int,
+                                      ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                                      ctypes.c_int,
+                                      ndpointer(dtype=numpy.int32,flags=ndarrayFlags),
+                                      ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                                      ndpointer(dtype=numpy.float64,flags=ndarrayFlags),
+                                      ctypes.POINTER(ctypes.c_int),
+                                      ctypes.c_int]
+
+    #Array requirements
+    lz= numpy.require(lz,dtype=numpy.float64,requirements=['C','W'])
+    out= numpy.require(out,dtype=numpy.float64,requirements=['C','W'])
+
+    #Run the C code
+    interppotential_rlFunc(len(lz),
+                           lz,
+                           ctypes.c_int(npot),
+                           pot_type,
+                           pot_args,
+                           out,
+                           ctypes.byref(err),
+                           ctypes.c_int(nthreads))
+
+    return (out,err.value)
+
+def _adaptive_grid(pot,xgrid,zgrid,logR,quantities,tol,maxn,use_c):
+    """
+    NAME:
+       _adaptive_grid
+    PURPOSE:
+       refine an (R,z) grid until the spline interpolation error is smaller than tol
+    INPUT:
+       pot - Potential or list of such instances
+       xgrid - initial grid in R (or log R)
+       zgrid - initial grid in z
+       logR - if True, xgrid is log R
+       quantities - list of 'potential', 'rforce', and/or 'zforce' to check the interpolation error of
+       tol - tolerance, relative to the maximum absolute value of each quantity on the grid
+       maxn - maximum number of grid points in each dimension
+       use_c - if True, use C to evaluate the potential and forces
+    OUTPUT:
+       (xgrid,zgrid)
+    """
+    while True:
+        xmid= 0.5*(xgrid[1:]+xgrid[:-1])
+        zmid= 0.5*(zgrid[1:]+zgrid[:-1])
+        if logR:
+            rgrid= numpy.exp(xgrid)
+            rmid= numpy.exp(xmid)
+        else:
+            rgrid= xgrid
+            rmid= xmid
+        xerr= numpy.zeros(len(xmid))
+        zerr= numpy.zeros(len(zmid))
+        for quantity in quantities:
+            grid= _eval_grid(pot,rgrid,zgrid,quantity,use_c)
+            interp= interpolate.RectBivariateSpline(xgrid,zgrid,grid,
+                                                    kx=3,ky=3,s=0.)
+            scale= numpy.amax(numpy.fabs(grid))
+            #Along R, at the z grid points, and vice versa, such that the 
+            #errors only come from the interpolation in one dimension
+            err= numpy.fabs(interp(xmid,zgrid)
+                            -_eval_grid(pot,rmid,zgrid,quantity,use_c))
+            xerr= numpy.maximum(xerr,numpy.amax(err,axis=1)/scale)
+            err= numpy.fabs(interp(xgrid,zmid)
+                            -_eval_grid(pot,rgrid,zmid,quantity,use_c))
+            zerr= numpy.maximum(zerr,numpy.amax(err,axis=0)/scale)
+        xrefine= xerr > tol
+        zrefine= zerr > tol
+        if numpy.sum(xrefine) == 0 and numpy.sum(zrefine) == 0: break
+        if len(xgrid)+numpy.sum(xrefine) > maxn \
+                or len(zgrid)+numpy.sum(zrefine) > maxn:
+            warnings.warn("interpRZPotential adaptive grid refinement reached the maximum number of grid points before reaching the requested tolerance",galpyWarning)
+            break
+        xgrid= numpy.sort(numpy.hstack((xgrid,xmid[xrefine])))
+        zgrid= numpy.sort(numpy.hstack((zgrid,zmid[zrefine])))
+    return (xgrid,zgrid)
+
+def _eval_grid(pot,R,z,quantity,use_c):
+    """Evaluate the potential, rforce, or zforce on the grid R x z"""
+    if use_c:
+        return calc_potential_c(pot,R,z,rforce=quantity=='rforce',
+                                zforce=quantity=='zforce')[0]
+    from galpy.potential import evaluatePotentials, evaluateRforces, \
+        evaluatezforces
+    if quantity == 'rforce': evalFunc= evaluateRforces
+    elif quantity == 'zforce': evalFunc= evaluatezforces
+    else: evalFunc= evaluatePotentials
+    out= numpy.zeros((len(R),len(z)))
+    for ii in range(len(R)):
+        for jj in range(len(z)):
+            out[ii,jj]= evalFunc(R[ii],z[jj],pot)
+    return out
+
 def sign(x):
     out= numpy.ones_like(x)
     out[(x < 0.)]= -1.
     return out
+
+# Version of the on-disk cache format; increase when the content of the 
+# grids changes, such that old cache files are no longer used
+_CACHE_VERSION= 1
+class _interpRZCache:
+    """Class that holds the grids of an interpRZPotential, loaded from and saved to an on-disk cache (if cachedir is set)"""
+    def __init__(self,pot,rgrid,zgrid,logR,cachedir,options=None):
+        self._grids= {}
+        self._dirty= False
+        if cachedir is None:
+            self._filename= None
+            return None
+        try:
+            keylist= [_CACHE_VERSION,pot,
+                      [float(x) for x in rgrid[:2]],int(rgrid[2]),
+                      [float(x) for x in zgrid[:2]],int(zgrid[2]),
+                      bool(logR)]
+            if not options is None: keylist.append(options)
+            key= _cache_signature(keylist)
+        except _UncacheableError, e:
+            warnings.warn("Not caching the interpRZPotential grids: %s" % e,
+                          galpyWarning)
+            self._filename= None
+            return None
+        self._filename= os.path.join(cachedir,'interpRZPotential-%s.npz'\
+                                         % hashlib.sha1(key).hexdigest())
+        if os.path.exists(self._filename):
+            try:
+                with numpy.load(self._filename) as cachefile:
+                    if int(cachefile['version']) == _CACHE_VERSION:
+                        for name in cachefile.files:
+                            if name == 'version': continue
+                            self._grids[name]= cachefile[name]
+            except (IOError,ValueError,KeyError): #pragma: no cover
+                warnings.warn("Could not read interpRZPotential cache file %s; recomputing the grids" % self._filename,galpyWarning)
+                self._grids= {}
+        return None
+
+    def __contains__(self,name):
+        return name in self._grids
+
+    def __getitem__(self,name):
+        return self._grids[name]
+
+    def __setitem__(self,name,grid):
+        if name in self._grids: return None
+        self._grids[name]= numpy.array(grid)
+        self._dirty= True
+        return None
+
+    def save(self):
+        """Write the grids to the cache file if any new grids were computed"""
+        if self._filename is None or not self._dirty: return None
+        cachedir= os.path.dirname(self._filename)
+        if not os.path.exists(cachedir):
+            try:
+                os.makedirs(cachedir)
+            except OSError: #pragma: no cover
+                pass #created by another process in the meantime
+        #Write to a temporary file first and rename, such that other 
+        #processes never see a partially-written cache file
+        fd, tmpfilename= tempfile.mkstemp(dir=cachedir,suffix='.npz')
+        try:
+            with os.fdopen(fd,'wb') as tmpfile:
+                numpy.savez(tmpfile,version=_CACHE_VERSION,**self._grids)
+            os.rename(tmpfilename,self._filename)
+        except: #pragma: no cover
+            if os.path.exists(tmpfilename): os.remove(tmpfilename)
+            raise
+        self._dirty= False
+        return None
+
+def _cache_signature(obj,_seen=None):
+    """Return a string that uniquely represents a potential (or list of potentials and other parameters) by its class and parameters"""
+    if _seen is None: _seen= set()
+    if isinstance(obj,(bool,int,long,float,str,unicode,
+                       numpy.number,numpy.bool_)) or obj is None:
+        return repr(obj)
+    if isinstance(obj,numpy.ndarray):
+        return 'ndarray(%s,%s,%s)' % (obj.dtype.str,obj.shape,
+                                      hashlib.sha1(numpy.ascontiguousarray(obj)).hexdigest())
+    if id(obj) in _seen: return repr(obj) #pragma: no cover
+    _seen.add(id(obj))
+    if isinstance(obj,(list,tuple)):
+        return '[%s]' % ','.join([_cache_signature(x,_seen) for x in obj])
+    if isinstance(obj,dict):
+        return '{%s}' % ','.join(['%r:%s' % (k,_cache_signature(obj[k],_seen))
+                                  for k in sorted(obj.keys())])
+    if hasattr(obj,'__dict__') \
+            and not isinstance(obj,(types.FunctionType,types.MethodType,
+                                    types.ClassType,type)):
+        if hasattr(obj,'__getstate__'): state= obj.__getstate__()
+        else: state= obj.__dict__
+        return '%s.%s(%s)' % (obj.__class__.__module__,obj.__class__.__name__,
+                              _cache_signature(state,_seen))
+    #Functions and other objects cannot be reliably represented
+    raise _UncacheableError("Cannot represent %r in the interpRZPotential cache key" % obj)
+
+class _UncacheableError(Exception):
+    pass
@@ -53,6 +53,7 @@ void calc_potential(int nR,
     put_row(out,ii,row+tid*nz,nz); 
   }
   for (ii=0; ii < npot; ii++) {
+    free_wrappedPotentialArgs(potentialArgs+ii);
     free((potentialArgs+ii)->args);
   }
   free(potentialArgs);
@@ -93,6 +94,7 @@ void calc_rforce(int nR,
     put_row(out,ii,row+tid*nz,nz); 
   }
   for (ii=0; ii < npot; ii++) {
+    free_wrappedPotentialArgs(potentialArgs+ii);
     free((potentialArgs+ii)->args);
   }
   free(potentialArgs);
@@ -133,6 +135,7 @@ void calc_zforce(int nR,
     put_row(out,ii,row+tid*nz,nz); 
   }
   for (ii=0; ii < npot; ii++) {
+    free_wrappedPotentialArgs(potentialArgs+ii);
     free((potentialArgs+ii)->args);
   }
   free(potentialArgs);
@@ -161,6 +164,7 @@ void eval_potential(int nR,
       gsl_interp_accel_free ((potentialArgs+ii)->accx);
     if ((potentialArgs+ii)->accy )
       gsl_interp_accel_free ((potentialArgs+ii)->accy);
+    free_wrappedPotentialArgs(potentialArgs+ii);
     free((potentialArgs+ii)->args);
   }
   free(potentialArgs);
@@ -194,6 +198,7 @@ void eval_rforce(int nR,
       gsl_interp_accel_free ((potentialArgs+ii)->accxzforce );
     if ((potentialArgs+ii)->accyzforce )
       gsl_interp_accel_free ((potentialArgs+ii)->accyzforce );
+    free_wrappedPotentialArgs(potentialArgs+ii);
     free((potentialArgs+ii)->args);
   }
   free(potentialArgs);
@@ -227,7 +232,192 @@ void eval_zforce(int nR,
       gsl_interp_accel_free ((potentialArgs+ii)->accxzforce );
     if ((potentialArgs+ii)->accyzforce )
       gsl_interp_accel_free ((potentialArgs+ii)->accyzforce );
+    free_wrappedPotentialArgs(potentialArgs+ii);
     free((potentialArgs+ii)->args);
   }
   free(potentialArgs);
 }
+void eval_potential_batch(int ndata,
+			  double *R,
+			  double *z,
+			  double *phi,
+			  double *t,
+			  int npot,
+			  int * pot_type,
+			  double * pot_args,
+			  int quantity,
+			  double *out,
+			  int * err,
+			  int nthreads){
+  //quantity: 0=potential, 1=Rforce, 2=zforce, 3=phiforce, 4=R2deriv,
+  //          5=z2deriv, 6=Rzderiv, 7=phi2deriv, 8=Rphideriv
+  int ii, jj, tid;
+  struct potentialArg * potentialArgs;
+#ifdef _OPENMP
+  if ( nthreads < 1 ) nthreads= omp_get_max_threads();
+  if ( nthreads > ndata ) nthreads= ndata;
+  if ( nthreads < 1 ) nthreads= 1;
+#else
+  nthreads= 1;
+#endif
+  //Set up the potentials, each thread gets its own copy
+  if ( quantity == 0 ) {
+    potentialArgs= (struct potentialArg *) malloc ( nthreads * npot * sizeof (struct potentialArg) );
+    for (tid=0; tid < nthreads; tid++)
+      parse_actionAngleArgs(npot,potentialArgs+tid*npot,pot_type,pot_args);
+  }
+  else
+    potentialArgs= compile_potentialArgs_Full(npot,pot_type,pot_args,
+					      &nthreads);
+  //Run through and evaluate
+#pragma omp parallel for schedule(static) private(ii,jj,tid)	\
+  shared(R,z,phi,t,npot,potentialArgs,quantity,out) num_threads(nthreads)
+  for (ii=0; ii < ndata; ii++){
+#ifdef _OPENMP
+    tid= omp_get_thread_num();
+#else
+    tid = 0;
+#endif
+    switch ( quantity ) {
+    case 0: //not evaluatePotentials, such that phi and t are passed on
+      *(out+ii)= 0.;
+      for (jj=0; jj < npot; jj++)
+	*(out+ii)+= (potentialArgs+tid*npot+jj)->potentialEval(*(R+ii),
+							       *(z+ii),
+							       *(phi+ii),
+							       *(t+ii),
+							       potentialArgs+tid*npot+jj);
+      break;
+    case 1:
+      *(out+ii)= calcRforce(*(R+ii),*(z+ii),*(phi+ii),*(t+ii),npot,
+			    potentialArgs+tid*npot);
+      break;
+    case 2:
+      *(out+ii)= calczforce(*(R+ii),*(z+ii),*(phi+ii),*(t+ii),npot,
+			    potentialArgs+tid*npot);
+      break;
+    case 3:
+      *(out+ii)= calcPhiforce(*(R+ii),*(z+ii),*(phi+ii),*(t+ii),npot,
+			      potentialArgs+tid*npot);
+      break;
+    case 4:
+      *(out+ii)= calcR2deriv(*(R+ii),*(z+ii),*(phi+ii),*(t+ii),npot,
+			    potentialArgs+tid*npot);
+      break;
+    case 5:
+      *(out+ii)= calcz2deriv(*(R+ii),*(z+ii),*(phi+ii),*(t+ii),npot,
+			    potentialArgs+tid*npot);
+      break;
+    case 6:
+      *(out+ii)= calcRzderiv(*(R+ii),*(z+ii),*(phi+ii),*(t+ii),npot,
+			    potentialArgs+tid*npot);
+      break;
+    case 7:
+      *(out+ii)= calcphi2deriv(*(R+ii),*(z+ii),*(phi+ii),*(t+ii),npot,
+			       potentialArgs+tid*npot);
+      break;
+    case 8:
+      *(out+ii)= calcRphideriv(*(R+ii),*(z+ii),*(phi+ii),*(t+ii),npot,
+			       potentialArgs+tid*npot);
+      break;
+    }
+  }
+  //Clean up
+  if ( quantity == 0 ) {
+    for (ii=0; ii < nthreads * npot; ii++) {
+      if ( (potentialArgs+ii)->i2d )
+	interp_2d_free((potentialArgs+ii)->i2d) ;
+      if ((potentialArgs+ii)->accx )
+	gsl_interp_accel_free ((potentialArgs+ii)->accx);
+      if ((potentialArgs+ii)->accy )
+	gsl_interp_accel_free ((potentialArgs+ii)->accy);
+      free_wrappedPotentialArgs(potentialArgs+ii);
+      free((potentialArgs+ii)->args);
+    }
+    free(potentialArgs);
+  }
+  else
+    free_potentialArgs_Full(npot,potentialArgs,nthreads);
+  *err= 0;
+}
+/*
+  Radius of a circular orbit with angular momentum lz, R vc(R) = |lz|, found
+  using the Illinois variant of regula falsi, after bracketing as in the 
+  Python code
+*/
+static inline double rl_func(double R, double lz, int npot,
+			     struct potentialArg * potentialArgs){
+  return R * sqrt( -R * calcRforce(R,0.,0.,0.,npot,potentialArgs) ) - lz;
+}
+static double rl_solve(double lz, int npot,
+		       struct potentialArg * potentialArgs, int * err){
+  int ii;
+  double a, b, c, fa, fb, fc;
+  lz= fabs(lz);
+  if ( lz == 0. ) return 0.;
+  //Bracket
+  b= 2. * lz;
+  fb= rl_func(b,lz,npot,potentialArgs);
+  for (ii=0; ii < 200 && fb <= 0.; ii++){
+    b*= 2.;
+    fb= rl_func(b,lz,npot,potentialArgs);
+  }
+  a= 0.00001;
+  fa= rl_func(a,lz,npot,potentialArgs);
+  for (ii=0; ii < 200 && fa > 0.; ii++){
+    a/= 2.;
+    fa= rl_func(a,lz,npot,potentialArgs);
+  }
+  if ( ! ( fa <= 0. && fb > 0. ) ) {
+    *err= -1;
+    return NAN;
+  }
+  //Illinois
+  for (ii=0; ii < 200; ii++){
+    if ( fb == 0. || fabs(b-a) < 2e-12 + 8.88e-16 * fabs(b) ) break;
+    c= ( a * fb - b * fa ) / ( fb - fa );
+    fc= rl_func(c,lz,npot,potentialArgs);
+    if ( fc * fb < 0. ) {
+      a= b;
+      fa= fb;
+    }
+    else
+      fa*= 0.5;
+    b= c;
+    fb= fc;
+  }
+  return b;
+}
+void calc_rl(int ndata,
+	     double *lz,
+	     int npot,
+	     int * pot_type,
+	     double * pot_args,
+	     double *out,
+	     int * err,
+	     int nthreads){
+  int ii, tid;
+  struct potentialArg * potentialArgs;
+#ifdef _OPENMP
+  if ( nthreads < 1 ) nthreads= omp_get_max_threads();
+  if ( nthreads > ndata ) nthreads= ndata;
+  if ( nthreads < 1 ) nthreads= 1;
+#else
+  nthreads= 1;
+#endif
+  //Set up the potentials, each thread gets its own copy
+  potentialArgs= compile_potentialArgs_Full(npot,pot_type,pot_args,
+					    &nthreads);
+  *err= 0;
+#pragma omp parallel for schedule(dynamic) private(ii,tid)	\
+  shared(lz,npot,potentialArgs,out,err) num_threads(nthreads)
+  for (ii=0; ii < ndata; ii++){
+#ifdef _OPENMP
+    tid= omp_get_thread_num();
+#else
+    tid = 0;
+#endif
+    *(out+ii)= rl_solve(*(lz+ii),npot,potentialArgs+tid*npot,err);
+  }
+  free_potentialArgs_Full(npot,potentialArgs,nthreads);
+}
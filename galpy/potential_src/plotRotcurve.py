@@ -132,7 +132,9 @@ def vcirc(Pot,R):
 
     """
     from planarPotential import evaluateplanarRforces
-    from Potential import PotentialError
+    from Potential import PotentialError, Potential
+    if isinstance(Pot,Potential) and not Pot._profileCache is None:
+        return Pot._profileCache('vcirc',R)
     try:
         return nu.sqrt(-R*evaluateplanarRforces(R,Pot))
     except PotentialError:
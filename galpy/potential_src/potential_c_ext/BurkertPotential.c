@@ -0,0 +1,111 @@
+#include <math.h>
+#include <galpy_potentials.h>
+#ifndef M_PI
+#define M_PI 3.14159265358979323846
+#endif
+//BurkertPotential
+//2 arguments: amp, a
+double BurkertPotentialEval(double R,double Z, double phi,
+			    double t,
+			    struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  double a= *args;
+  //Calculate potential
+  double x= sqrt( R * R + Z * Z ) / a;
+  return - amp * a * a * M_PI / x * ( -M_PI + 2. * ( 1. + x ) * atan( 1. / x )
+				      + 2. * ( 1. + x ) * log( 1. + x )
+				      + ( 1. - x ) * log( 1. + x * x ) );
+}
+double BurkertPotentialRforce(double R,double Z, double phi,
+			      double t,
+			      struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  double a= *args;
+  //Calculate Rforce
+  double r= sqrt( R * R + Z * Z );
+  double x= r / a;
+  return amp * a * M_PI / x / x * ( M_PI - 2. * atan( 1. / x )
+				    - 2. * log( 1. + x ) - log( 1. + x * x ) )
+    * R / r;
+}
+double BurkertPotentialPlanarRforce(double R,double phi,
+				    double t,
+				    struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  double a= *args;
+  //Calculate Rforce
+  double x= R / a;
+  return amp * a * M_PI / x / x * ( M_PI - 2. * atan( 1. / x )
+				    - 2. * log( 1. + x ) - log( 1. + x * x ) );
+}
+double BurkertPotentialzforce(double R,double Z,double phi,
+			      double t,
+			      struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  double a= *args;
+  //Calculate zforce
+  double r= sqrt( R * R + Z * Z );
+  double x= r / a;
+  return amp * a * M_PI / x / x * ( M_PI - 2. * atan( 1. / x )
+				    - 2. * log( 1. + x ) - log( 1. + x * x ) )
+    * Z / r;
+}
+double BurkertPotentialPlanarR2deriv(double R,double phi,
+				     double t,
+				     struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  double a= *args;
+  //Calculate R2deriv
+  double x= R / a;
+  return - amp * M_PI / x / x / x / R / R 
+    * ( -4. * R * R * R * R * R / ( a * a + R * R ) / ( a + R )
+	- 2. * R * R * ( M_PI - 2. * atan( 1. / x ) - 2. * log( 1. + x )
+			 - log( 1. + x * x ) ) );
+}
+/*
+  First and second derivative of the potential with respect to spherical r
+*/
+static inline void BurkertPotentialRadialDerivs(double R,double Z,double * args,
+			double * dphidr,double * d2phidr2){
+  double amp= *args++;
+  double a= *args;
+  double r= sqrt( R * R + Z * Z );
+  double x= r / a;
+  double brack= M_PI - 2. * atan( 1. / x ) - 2. * log( 1. + x ) 
+    - log( 1. + x * x );
+  *dphidr= - amp * a * M_PI / x / x * brack;
+  *d2phidr2= - amp * M_PI / x / x / x / r / r 
+    * ( -4. * r * r * r * r * r / ( a * a + r * r ) / ( a + r ) 
+	- 2. * r * r * brack );
+}
+double BurkertPotentialR2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  BurkertPotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalR2deriv(R,Z,dphidr,d2phidr2);
+}
+double BurkertPotentialz2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  BurkertPotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalz2deriv(R,Z,dphidr,d2phidr2);
+}
+double BurkertPotentialRzderiv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  BurkertPotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalRzderiv(R,Z,dphidr,d2phidr2);
+}
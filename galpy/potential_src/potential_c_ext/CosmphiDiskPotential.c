@@ -0,0 +1,110 @@
+#include <math.h>
+#include <galpy_potentials.h>
+//CosmphiDiskPotential
+//7 arguments: amp, tform, tsteady, mphio, p, phib, m
+static inline double CosmphiDiskSmooth(double t,double tform, double tsteady){
+  double smooth, xi,deltat;
+  if ( ! isnan(tform) )
+    if ( t < tform )
+      smooth= 0.;
+    else if ( t < tsteady ) {
+      deltat= t-tform;
+      xi= 2.*deltat/(tsteady-tform)-1.;
+      smooth= (3./16.*pow(xi,5.)-5./8.*pow(xi,3.)+15./16.*xi+.5);
+    }
+    else
+      smooth= 1.;
+  else
+    smooth=1.;
+  return smooth;
+}
+double CosmphiDiskPotentialRforce(double R,double phi,double t,
+				  struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //declare
+  double smooth;
+  //Get args
+  double amp= *args++;
+  double tform= *args++;
+  double tsteady= *args++;
+  double mphio= *args++;
+  double p= *args++;
+  double phib= *args++;
+  double m= *args;
+  //Calculate Rforce
+  smooth= CosmphiDiskSmooth(t,tform,tsteady);
+  return -amp * smooth * p * mphio / m * pow(R,p-1.)
+    * cos( m * ( phi - phib ) );
+}
+double CosmphiDiskPotentialphiforce(double R,double phi,double t,
+				    struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //declare
+  double smooth;
+  //Get args
+  double amp= *args++;
+  double tform= *args++;
+  double tsteady= *args++;
+  double mphio= *args++;
+  double p= *args++;
+  double phib= *args++;
+  double m= *args;
+  //Calculate phiforce
+  smooth= CosmphiDiskSmooth(t,tform,tsteady);
+  return amp * smooth * mphio * pow(R,p)
+    * sin( m * ( phi - phib ) );
+}
+double CosmphiDiskPotentialR2deriv(double R,double phi,double t,
+				   struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //declare
+  double smooth;
+  //Get args
+  double amp= *args++;
+  double tform= *args++;
+  double tsteady= *args++;
+  double mphio= *args++;
+  double p= *args++;
+  double phib= *args++;
+  double m= *args;
+  //Calculate R2deriv
+  smooth= CosmphiDiskSmooth(t,tform,tsteady);
+  return amp * smooth * p * ( p - 1. ) * mphio / m * pow(R,p-2.)
+    * cos( m * ( phi - phib ) );
+}
+double CosmphiDiskPotentialphi2deriv(double R,double phi,double t,
+				     struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //declare
+  double smooth;
+  //Get args
+  double amp= *args++;
+  double tform= *args++;
+  double tsteady= *args++;
+  double mphio= *args++;
+  double p= *args++;
+  double phib= *args++;
+  double m= *args;
+  //Calculate phi2deriv
+  smooth= CosmphiDiskSmooth(t,tform,tsteady);
+  return - amp * smooth * m * mphio * pow(R,p)
+    * cos( m * ( phi - phib ) );
+}
+double CosmphiDiskPotentialRphideriv(double R,double phi,double t,
+				     struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //declare
+  double smooth;
+  //Get args
+  double amp= *args++;
+  double tform= *args++;
+  double tsteady= *args++;
+  double mphio= *args++;
+  double p= *args++;
+  double phib= *args++;
+  double m= *args;
+  //Calculate Rphideriv
+  smooth= CosmphiDiskSmooth(t,tform,tsteady);
+  return - amp * smooth * p * mphio * pow(R,p-1.)
+    * sin( m * ( phi - phib ) );
+}
@@ -5,43 +5,41 @@
 #define M_PI 3.14159265358979323846
 #endif
 //Double exponential disk potential
+//arguments: amp, alpha, beta, kmaxFac, nzeros, glorder, glx[glorder],
+//           glw[glorder], j0zeros[nzeros+1], dj0zeros[nzeros+1],
+//           j1zeros[nzeros+1], dj1zeros[nzeros+1], Kepler amp, Kepler alpha,
+//           and tables of the quadrature nodes k and weights (including all
+//           factors of the integrand that only depend on k) between the
+//           zeros of J0 and J1, each of length nzeros*glorder
 double DoubleExponentialDiskPotentialEval(double R,double z, double phi,
 					  double t,
 					  struct potentialArg * potentialArgs){
   double * args= potentialArgs->args;
-  double amp, alpha;
-  int nzeros, glorder;
+  //Get args
+  double amp= *args;
+  double alpha= *(args+1);
+  double beta= *(args+2);
+  double kmax= *(args+3) * beta;
+  int nzeros= (int) *(args+4);
+  int glorder= (int) *(args+5);
   if ( R > 6. ) { //Approximate as Keplerian
-    nzeros= (int) *(args+4);
-    glorder= (int) *(args+5);
-    amp= *(args + 6 + 2 * glorder + 4 * (nzeros + 1));
+    amp*= *(args + 6 + 2 * glorder + 4 * (nzeros + 1));
     alpha= *(args + 7 + 2 * glorder + 4 * (nzeros + 1));
-    return - *args * amp * pow(R*R+z*z,1.-0.5*alpha) / (alpha - 2.);
+    return - amp * pow(R*R+z*z,1.-0.5*alpha) / (alpha - 2.);
   }
-  //Get args
-  amp= *args++;
-  alpha= *args++;
-  double beta= *args++;
-  double kmaxFac= *args++;
-  double kmax= kmaxFac * beta;
-  nzeros= (int) *args++;
-  glorder= (int) *args++;
-  double * glx= args;
-  double * glw= args + glorder;
-  double * j0zeros= args + 2 * glorder;
-  double * dj0zeros= args + 2 * glorder + nzeros + 1;
+  double * ks= args + 8 + 2 * glorder + 4 * (nzeros + 1);
+  double * weights= ks + nzeros * glorder;
   //Calculate potential
   double out= 0.;
-  double k;
+  double k= 0.;
+  double expbz= exp(-beta * fabs(z));
   int ii, jj;
   if ( R < 1. ) kmax= kmax/R;
-  for (ii=0; ii < ( nzeros + 1 ); ii++) {
+  for (ii=0; ii < nzeros; ii++) {
     for (jj=0; jj < glorder; jj++) {
-      k= 0.5 * ( *(glx+jj) + 1. ) * *(dj0zeros+ii+1) + *(j0zeros+ii);
-      out+= *(glw+jj) * *(dj0zeros+ii+1) * gsl_sf_bessel_J0(k*R) 
-	* pow(alpha * alpha + k * k,-1.5) 
-	* (beta * exp(-k * fabs(z) ) - k * exp(-beta * fabs(z) ))
-	/ (beta * beta - k * k);
+      k= *ks++;
+      out+= *weights++ * gsl_sf_bessel_J0(k*R)
+	* (beta * exp(-k * fabs(z) ) - k * expbz);
     }
     if ( k > kmax ) break;
   }
@@ -51,39 +49,32 @@ double DoubleExponentialDiskPotentialRforce(double R,double z, double phi,
 					    double t,
 					    struct potentialArg * potentialArgs){
   double * args= potentialArgs->args;
-  double amp, alpha;
-  int nzeros,glorder;
+  //Get args
+  double amp= *args;
+  double alpha= *(args+1);
+  double beta= *(args+2);
+  double kmax= 2. * *(args+3) * beta;
+  int nzeros= (int) *(args+4);
+  int glorder= (int) *(args+5);
   if ( R > 6. ) { //Approximate as Keplerian
-    nzeros= (int) *(args+4);
-    glorder= (int) *(args+5);
-    amp= *(args + 6 + 2 * glorder + 4 * (nzeros + 1));
+    amp*= *(args + 6 + 2 * glorder + 4 * (nzeros + 1));
     alpha= *(args + 7 + 2 * glorder + 4 * (nzeros + 1));
-    return - *args * amp * R * pow(R*R+z*z,-0.5*alpha);
+    return - amp * R * pow(R*R+z*z,-0.5*alpha);
   }
-  //Get args
-  amp= *args++;
-  alpha= *args++;
-  double beta= *args++;
-  double kmaxFac= *args++;
-  double kmax= 2. * kmaxFac * beta;
-  nzeros= (int) *args++;
-  glorder= (int) *args++;
-  double * glx= args;
-  double * glw= args + glorder;
-  double * j1zeros= args + 2 * glorder + 2 * (nzeros + 1);
-  double * dj1zeros= args + 2 * glorder + 3 * (nzeros + 1);
-  //Calculate potential
+  double * ks= args + 8 + 2 * glorder + 4 * (nzeros + 1)
+    + 2 * nzeros * glorder;
+  double * weights= ks + nzeros * glorder;
+  //Calculate radial force
   double out= 0.;
-  double k;
+  double k= 0.;
+  double expbz= exp(-beta * fabs(z));
   int ii, jj;
   if ( R < 1. ) kmax= kmax/R;
-  for (ii=0; ii < ( nzeros + 1 ); ii++) {
+  for (ii=0; ii < nzeros; ii++) {
     for (jj=0; jj < glorder; jj++) {
-      k= 0.5 * ( *(glx+jj) + 1. ) * *(dj1zeros+ii+1) + *(j1zeros+ii);
-      out+= *(glw+jj) * *(dj1zeros+ii+1) * k * gsl_sf_bessel_J1(k*R) 
-	* pow(alpha * alpha + k * k,-1.5) 
-	* (beta * exp(-k * fabs(z) ) - k * exp(-beta * fabs(z) ))
-	/ (beta * beta - k * k);
+      k= *ks++;
+      out+= *weights++ * gsl_sf_bessel_J1(k*R)
+	* (beta * exp(-k * fabs(z) ) - k * expbz);
     }
     if ( k > kmax ) break;
   }
@@ -93,38 +84,30 @@ double DoubleExponentialDiskPotentialPlanarRforce(double R,double phi,
 						  double t,
 						  struct potentialArg * potentialArgs){
   double * args= potentialArgs->args;
-  double amp, alpha;
-  int nzeros, glorder;
+  //Get args
+  double amp= *args;
+  double alpha= *(args+1);
+  double beta= *(args+2);
+  double kmax= 2. * *(args+3) * beta;
+  int nzeros= (int) *(args+4);
+  int glorder= (int) *(args+5);
   if ( R > 6. ) { //Approximate as Keplerian
-    nzeros= (int) *(args+4);
-    glorder= (int) *(args+5);
-    amp= *(args + 6 + 2 * glorder + 4 * (nzeros + 1));
+    amp*= *(args + 6 + 2 * glorder + 4 * (nzeros + 1));
     alpha= *(args + 7 + 2 * glorder + 4 * (nzeros + 1));
-    return - *args * amp * pow(R,-alpha + 1.);
+    return - amp * pow(R,-alpha + 1.);
   }
-  //Get args
-  amp= *args++;
-  alpha= *args++;
-  double beta= *args++;
-  double kmaxFac= *args++;
-  double kmax= 2. * kmaxFac * beta;
-  nzeros= (int) *args++;
-  glorder= (int) *args++;
-  double * glx= args;
-  double * glw= args + glorder;
-  double * j1zeros= args + 2 * glorder + 2 * (nzeros + 1);
-  double * dj1zeros= args + 2 * glorder + 3 * (nzeros + 1);
-  //Calculate potential
+  double * ks= args + 8 + 2 * glorder + 4 * (nzeros + 1)
+    + 2 * nzeros * glorder;
+  double * weights= ks + nzeros * glorder;
+  //Calculate radial force
   double out= 0.;
-  double k;
+  double k= 0.;
   int ii, jj;
   if ( R < 1. ) kmax= kmax/R;
-  for (ii=0; ii < ( nzeros + 1 ); ii++) {
+  for (ii=0; ii < nzeros; ii++) {
     for (jj=0; jj < glorder; jj++) {
-      k= 0.5 * ( *(glx+jj) + 1. ) * *(dj1zeros+ii+1) + *(j1zeros+ii);
-      out+= *(glw+jj) * *(dj1zeros+ii+1) * k * gsl_sf_bessel_J1(k*R) 
-	* pow(alpha * alpha + k * k,-1.5) 
-	/ (beta + k);
+      k= *ks++;
+      out+= *weights++ * gsl_sf_bessel_J1(k*R) * (beta - k);
     }
     if ( k > kmax ) break;
   }
@@ -134,39 +117,31 @@ double DoubleExponentialDiskPotentialzforce(double R,double z,double phi,
 					    double t,
 					    struct potentialArg * potentialArgs){
   double * args= potentialArgs->args;
-  double amp, alpha;
-  int nzeros, glorder;
+  //Get args
+  double amp= *args;
+  double alpha= *(args+1);
+  double beta= *(args+2);
+  double kmax= *(args+3) * beta;
+  int nzeros= (int) *(args+4);
+  int glorder= (int) *(args+5);
   if ( R > 6. ) { //Approximate as Keplerian
-    nzeros= (int) *(args+4);
-    glorder= (int) *(args+5);
-    amp= *(args + 6 + 2 * glorder + 4 * (nzeros + 1));
+    amp*= *(args + 6 + 2 * glorder + 4 * (nzeros + 1));
     alpha= *(args + 7 + 2 * glorder + 4 * (nzeros + 1));
-    return - *args * amp * z * pow(R*R+z*z,-0.5*alpha);
+    return - amp * z * pow(R*R+z*z,-0.5*alpha);
   }
-  //Get args
-  amp= *args++;
-  alpha= *args++;
-  double beta= *args++;
-  double kmaxFac= *args++;
-  double kmax= kmaxFac * beta;
-  nzeros= (int) *args++;
-  glorder= (int) *args++;
-  double * glx= args;
-  double * glw= args + glorder;
-  double * j0zeros= args + 2 * glorder;
-  double * dj0zeros= args + 2 * glorder + nzeros + 1;
-  //Calculate potential
+  double * ks= args + 8 + 2 * glorder + 4 * (nzeros + 1);
+  double * weights= ks + nzeros * glorder;
+  //Calculate vertical force
   double out= 0.;
-  double k;
+  double k= 0.;
+  double expbz= exp(-beta * fabs(z));
   int ii, jj;
   if ( R < 1. ) kmax= kmax/R;
-  for (ii=0; ii < ( nzeros + 1 ); ii++) {
+  for (ii=0; ii < nzeros; ii++) {
     for (jj=0; jj < glorder; jj++) {
-      k= 0.5 * ( *(glx+jj) + 1. ) * *(dj0zeros+ii+1) + *(j0zeros+ii);
-      out+= *(glw+jj) * *(dj0zeros+ii+1) * k * gsl_sf_bessel_J0(k*R) 
-	* pow(alpha * alpha + k * k,-1.5) 
-	* (exp(-k * fabs(z) ) - exp(-beta * fabs(z) ))
-	/ (beta * beta - k * k);
+      k= *ks++;
+      out+= *weights++ * k * gsl_sf_bessel_J0(k*R)
+	* (exp(-k * fabs(z) ) - expbz);
     }
     if ( k > kmax ) break;
   }
@@ -175,3 +150,155 @@ double DoubleExponentialDiskPotentialzforce(double R,double z,double phi,
   else
     return amp * 2 * M_PI * alpha * beta * out;
 }
+double DoubleExponentialDiskPotentialR2deriv(double R,double z, double phi,
+					     double t,
+					     struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double alpha= *(args+1);
+  double beta= *(args+2);
+  double kmax= 2. * *(args+3) * beta;
+  int nzeros= (int) *(args+4);
+  int glorder= (int) *(args+5);
+  double r;
+  if ( R > 6. ) { //Approximate as Keplerian
+    amp*= *(args + 6 + 2 * glorder + 4 * (nzeros + 1));
+    alpha= *(args + 7 + 2 * glorder + 4 * (nzeros + 1));
+    r= sqrt(R*R+z*z);
+    return sphericalR2deriv(R,z,amp * pow(r,1.-alpha),
+			    amp * (1. - alpha) * pow(r,-alpha));
+  }
+  double * ks= args + 8 + 2 * glorder + 4 * (nzeros + 1)
+    + 2 * nzeros * glorder;
+  double * weights= ks + nzeros * glorder;
+  //Calculate R2deriv, using dJ1(x)/dx = J0(x) - J1(x)/x
+  double out= 0.;
+  double k= 0.;
+  double expbz= exp(-beta * fabs(z));
+  int ii, jj;
+  if ( R < 1. ) kmax= kmax/R;
+  for (ii=0; ii < nzeros; ii++) {
+    for (jj=0; jj < glorder; jj++) {
+      k= *ks++;
+      out+= *weights++ * k 
+	* ( gsl_sf_bessel_J0(k*R) - gsl_sf_bessel_J1(k*R) / k / R )
+	* (beta * exp(-k * fabs(z) ) - k * expbz);
+    }
+    if ( k > kmax ) break;
+  }
+  return amp * 2 * M_PI * alpha * out;
+}
+double DoubleExponentialDiskPotentialPlanarR2deriv(double R,double phi,
+						   double t,
+						   struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double alpha= *(args+1);
+  double beta= *(args+2);
+  double kmax= 2. * *(args+3) * beta;
+  int nzeros= (int) *(args+4);
+  int glorder= (int) *(args+5);
+  if ( R > 6. ) { //Approximate as Keplerian
+    amp*= *(args + 6 + 2 * glorder + 4 * (nzeros + 1));
+    alpha= *(args + 7 + 2 * glorder + 4 * (nzeros + 1));
+    return amp * (1. - alpha) * pow(R,-alpha);
+  }
+  double * ks= args + 8 + 2 * glorder + 4 * (nzeros + 1)
+    + 2 * nzeros * glorder;
+  double * weights= ks + nzeros * glorder;
+  //Calculate R2deriv
+  double out= 0.;
+  double k= 0.;
+  int ii, jj;
+  if ( R < 1. ) kmax= kmax/R;
+  for (ii=0; ii < nzeros; ii++) {
+    for (jj=0; jj < glorder; jj++) {
+      k= *ks++;
+      out+= *weights++ * k 
+	* ( gsl_sf_bessel_J0(k*R) - gsl_sf_bessel_J1(k*R) / k / R )
+	* (beta - k);
+    }
+    if ( k > kmax ) break;
+  }
+  return amp * 2 * M_PI * alpha * out;
+}
+double DoubleExponentialDiskPotentialz2deriv(double R,double z, double phi,
+					     double t,
+					     struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double alpha= *(args+1);
+  double beta= *(args+2);
+  double kmax= *(args+3) * beta;
+  int nzeros= (int) *(args+4);
+  int glorder= (int) *(args+5);
+  double r;
+  if ( R > 6. ) { //Approximate as Keplerian
+    amp*= *(args + 6 + 2 * glorder + 4 * (nzeros + 1));
+    alpha= *(args + 7 + 2 * glorder + 4 * (nzeros + 1));
+    r= sqrt(R*R+z*z);
+    return sphericalz2deriv(R,z,amp * pow(r,1.-alpha),
+			    amp * (1. - alpha) * pow(r,-alpha));
+  }
+  double * ks= args + 8 + 2 * glorder + 4 * (nzeros + 1);
+  double * weights= ks + nzeros * glorder;
+  //Calculate z2deriv
+  double out= 0.;
+  double k= 0.;
+  double expbz= exp(-beta * fabs(z));
+  int ii, jj;
+  if ( R < 1. ) kmax= kmax/R;
+  for (ii=0; ii < nzeros; ii++) {
+    for (jj=0; jj < glorder; jj++) {
+      k= *ks++;
+      out+= *weights++ * k * gsl_sf_bessel_J0(k*R)
+	* (k * exp(-k * fabs(z) ) - beta * expbz);
+    }
+    if ( k > kmax ) break;
+  }
+  return - amp * 2 * M_PI * alpha * beta * out;
+}
+double DoubleExponentialDiskPotentialRzderiv(double R,double z, double phi,
+					     double t,
+					     struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double alpha= *(args+1);
+  double beta= *(args+2);
+  double kmax= 2. * *(args+3) * beta;
+  int nzeros= (int) *(args+4);
+  int glorder= (int) *(args+5);
+  double r;
+  if ( R > 6. ) { //Approximate as Keplerian
+    amp*= *(args + 6 + 2 * glorder + 4 * (nzeros + 1));
+    alpha= *(args + 7 + 2 * glorder + 4 * (nzeros + 1));
+    r= sqrt(R*R+z*z);
+    return sphericalRzderiv(R,z,amp * pow(r,1.-alpha),
+			    amp * (1. - alpha) * pow(r,-alpha));
+  }
+  double * ks= args + 8 + 2 * glorder + 4 * (nzeros + 1)
+    + 2 * nzeros * glorder;
+  double * weights= ks + nzeros * glorder;
+  //Calculate Rzderiv
+  double out= 0.;
+  double k= 0.;
+  double expbz= exp(-beta * fabs(z));
+  int ii, jj;
+  if ( R < 1. ) kmax= kmax/R;
+  for (ii=0; ii < nzeros; ii++) {
+    for (jj=0; jj < glorder; jj++) {
+      k= *ks++;
+      out+= *weights++ * k * gsl_sf_bessel_J1(k*R)
+	* (exp(-k * fabs(z) ) - expbz);
+    }
+    if ( k > kmax ) break;
+  }
+  if ( z >= 0. )
+    return - amp * 2 * M_PI * alpha * beta * out;
+  else
+    return amp * 2 * M_PI * alpha * beta * out;
+}
@@ -54,3 +54,35 @@ double HernquistPotentialPlanarR2deriv(double R,double phi,
   //Calculate R2deriv
   return -amp / a / a / a * pow(1. + R / a, -3. );
 }
+/*
+  First and second derivative of the potential with respect to spherical r
+*/
+static inline void HernquistPotentialRadialDerivs(double R,double Z,double * args,
+			double * dphidr,double * d2phidr2){
+  double amp= *args++;
+  double a= *args;
+  double ar= a + sqrt(R*R+Z*Z);
+  *dphidr= 0.5 * amp / ar / ar;
+  *d2phidr2= - amp / ar / ar / ar;
+}
+double HernquistPotentialR2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  HernquistPotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalR2deriv(R,Z,dphidr,d2phidr2);
+}
+double HernquistPotentialz2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  HernquistPotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalz2deriv(R,Z,dphidr,d2phidr2);
+}
+double HernquistPotentialRzderiv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  HernquistPotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalRzderiv(R,Z,dphidr,d2phidr2);
+}
@@ -61,3 +61,37 @@ double IsochronePotentialPlanarR2deriv(double R,double phi,
   double rb= sqrt(r2 + b * b);
   return - amp * ( -pow(b,3.) - b * b * rb + 2. * r2 * rb ) * pow(rb * ( b + rb ),-3.);
 }
+/*
+  First and second derivative of the potential with respect to spherical r
+*/
+static inline void IsochronePotentialRadialDerivs(double R,double Z,double * args,
+			double * dphidr,double * d2phidr2){
+  double amp= *args;
+  double b= *(args+1);
+  double r2= R*R+Z*Z;
+  double rb= sqrt(r2 + b * b);
+  *dphidr= amp * sqrt(r2) / rb * pow(b + rb,-2.);
+  *d2phidr2= - amp * ( -pow(b,3.) - b * b * rb + 2. * r2 * rb ) 
+    * pow(rb * ( b + rb ),-3.);
+}
+double IsochronePotentialR2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  IsochronePotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalR2deriv(R,Z,dphidr,d2phidr2);
+}
+double IsochronePotentialz2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  IsochronePotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalz2deriv(R,Z,dphidr,d2phidr2);
+}
+double IsochronePotentialRzderiv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  IsochronePotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalRzderiv(R,Z,dphidr,d2phidr2);
+}
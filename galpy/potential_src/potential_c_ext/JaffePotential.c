@@ -55,3 +55,36 @@ double JaffePotentialPlanarR2deriv(double R,double phi,
   //Calculate R2deriv
   return - amp * (a + 2. * R) * pow(R,-4.) * pow(1.+a/R,-2.);
 }
+/*
+  First and second derivative of the potential with respect to spherical r
+*/
+static inline void JaffePotentialRadialDerivs(double R,double Z,double * args,
+			double * dphidr,double * d2phidr2){
+  double amp= *args++;
+  double a= *args;
+  double r= sqrt(R*R+Z*Z);
+  double ar= a + r;
+  *dphidr= amp / r / ar;
+  *d2phidr2= - amp * ( a + 2. * r ) / r / r / ar / ar;
+}
+double JaffePotentialR2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  JaffePotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalR2deriv(R,Z,dphidr,d2phidr2);
+}
+double JaffePotentialz2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  JaffePotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalz2deriv(R,Z,dphidr,d2phidr2);
+}
+double JaffePotentialRzderiv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  JaffePotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalRzderiv(R,Z,dphidr,d2phidr2);
+}
@@ -64,3 +64,47 @@ double MiyamotoNagaiPotentialPlanarR2deriv(double R,double phi,
   return amp * (pow(denom,-1.5) - 3. * R * R * pow(denom,-2.5));
 }
 
+double MiyamotoNagaiPotentialR2deriv(double R,double z, double phi,
+				     double t,
+				     struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  double a= *args++;
+  double b= *args;
+  //calculate R2deriv
+  double asqrtbz= a+sqrt(z*z+b*b);
+  double denom= R*R+asqrtbz*asqrtbz;
+  return amp * (pow(denom,-1.5) - 3. * R * R * pow(denom,-2.5));
+}
+double MiyamotoNagaiPotentialz2deriv(double R,double z, double phi,
+				     double t,
+				     struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  double a= *args++;
+  double b= *args;
+  //calculate z2deriv
+  double sqrtbz= sqrt(z*z+b*b);
+  double asqrtbz= a+sqrtbz;
+  double denom= R*R+asqrtbz*asqrtbz;
+  //dPhi/dz= amp * dz * denom^-1.5
+  double dz= z * asqrtbz / sqrtbz;
+  return amp * ( ( z * z / sqrtbz / sqrtbz + asqrtbz * b * b / pow(sqrtbz,3.) )
+		 * pow(denom,-1.5) - 3. * dz * dz * pow(denom,-2.5) );
+}
+double MiyamotoNagaiPotentialRzderiv(double R,double z, double phi,
+				     double t,
+				     struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  double a= *args++;
+  double b= *args;
+  //calculate Rzderiv
+  double sqrtbz= sqrt(z*z+b*b);
+  double asqrtbz= a+sqrtbz;
+  double denom= R*R+asqrtbz*asqrtbz;
+  return - 3. * amp * R * z * asqrtbz / sqrtbz * pow(denom,-2.5);
+}
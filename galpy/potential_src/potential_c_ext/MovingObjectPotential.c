@@ -0,0 +1,200 @@
+#include <math.h>
+#include <galpy_potentials.h>
+//MovingObjectPotential
+//arguments: amp, GM, softening_length, nt, t[nt] (increasing), followed by
+//           the coefficients of the cubic splines of x, y, and z of the
+//           object's orbit, each of length 4*(nt-1) with
+//           x(t)= sum_k c[k*(nt-1)+i] (t-t_i)^(3-k) for t_i <= t < t_{i+1}
+/*
+  Position of the object at time t
+*/
+static void MovingObjectPosition(double t, double * args,
+				 double * x, double * y, double * z){
+  int nt= (int) *(args+3);
+  double * ts= args+4;
+  double * cx= ts + nt;
+  double * cy= cx + 4 * ( nt - 1 );
+  double * cz= cy + 4 * ( nt - 1 );
+  int lo= 0, hi= nt - 1, mid;
+  double dt;
+  //Find the interval, extrapolating using the first and last interval
+  while ( hi - lo > 1 ) {
+    mid= ( lo + hi ) / 2;
+    if ( t < *(ts+mid) ) hi= mid;
+    else lo= mid;
+  }
+  dt= t - *(ts+lo);
+  *x= ( ( *(cx+lo) * dt + *(cx+nt-1+lo) ) * dt + *(cx+2*(nt-1)+lo) ) * dt
+    + *(cx+3*(nt-1)+lo);
+  *y= ( ( *(cy+lo) * dt + *(cy+nt-1+lo) ) * dt + *(cy+2*(nt-1)+lo) ) * dt
+    + *(cy+3*(nt-1)+lo);
+  *z= ( ( *(cz+lo) * dt + *(cz+nt-1+lo) ) * dt + *(cz+2*(nt-1)+lo) ) * dt
+    + *(cz+3*(nt-1)+lo);
+}
+/*
+  Difference vector between the object and (R,z,phi) and the Plummer 
+  force factor 1/(d^2+b^2)^1.5
+*/
+static double MovingObjectDiff(double R, double z, double phi, double t,
+			       double * args,
+			       double * xd, double * yd, double * zd){
+  double b= *(args+2);
+  double xo, yo, zo;
+  MovingObjectPosition(t,args,&xo,&yo,&zo);
+  *xd= xo - R * cos(phi);
+  *yd= yo - R * sin(phi);
+  *zd= zo - z;
+  return pow(*xd * *xd + *yd * *yd + *zd * *zd + b * b,-1.5);
+}
+double MovingObjectPotentialEval(double R,double z, double phi,
+				 double t,
+				 struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double GM= *(args+1);
+  double b= *(args+2);
+  //Calculate potential
+  double xd, yd, zd;
+  MovingObjectDiff(R,z,phi,t,args,&xd,&yd,&zd);
+  return - amp * GM / sqrt( xd * xd + yd * yd + zd * zd + b * b );
+}
+double MovingObjectPotentialRforce(double R,double z, double phi,
+				   double t,
+				   struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double GM= *(args+1);
+  //Calculate Rforce
+  double xd, yd, zd;
+  double fac= MovingObjectDiff(R,z,phi,t,args,&xd,&yd,&zd);
+  return amp * GM * ( cos(phi) * xd + sin(phi) * yd ) * fac;
+}
+double MovingObjectPotentialzforce(double R,double z, double phi,
+				   double t,
+				   struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double GM= *(args+1);
+  //Calculate zforce
+  double xd, yd, zd;
+  double fac= MovingObjectDiff(R,z,phi,t,args,&xd,&yd,&zd);
+  return amp * GM * zd * fac;
+}
+double MovingObjectPotentialphiforce(double R,double z, double phi,
+				     double t,
+				     struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double GM= *(args+1);
+  //Calculate phiforce
+  double xd, yd, zd;
+  double fac= MovingObjectDiff(R,z,phi,t,args,&xd,&yd,&zd);
+  return amp * GM * R * ( cos(phi) * yd - sin(phi) * xd ) * fac;
+}
+double MovingObjectPotentialPlanarRforce(double R,double phi,
+					 double t,
+					 struct potentialArg * potentialArgs){
+  return MovingObjectPotentialRforce(R,0.,phi,t,potentialArgs);
+}
+double MovingObjectPotentialPlanarphiforce(double R,double phi,
+					   double t,
+					   struct potentialArg * potentialArgs){
+  return MovingObjectPotentialphiforce(R,0.,phi,t,potentialArgs);
+}
+/*
+  Second derivatives from the Cartesian Hessian 
+  GM [ delta_ij f - 3 d_i d_j g ] with f= 1/(d^2+b^2)^1.5 and g= f/(d^2+b^2),
+  projected onto the cylindrical unit vectors; dR and dphi are the components
+  of the difference vector along e_R and e_phi
+*/
+static double MovingObjectHessian(double R, double z, double phi, double t,
+				  double * args,
+				  double * dR, double * dphi, double * zd,
+				  double * g){
+  double b= *(args+2);
+  double xd, yd;
+  double fac= MovingObjectDiff(R,z,phi,t,args,&xd,&yd,zd);
+  *dR= cos(phi) * xd + sin(phi) * yd;
+  *dphi= cos(phi) * yd - sin(phi) * xd;
+  *g= fac / ( xd * xd + yd * yd + *zd * *zd + b * b );
+  return fac;
+}
+double MovingObjectPotentialR2deriv(double R,double z, double phi,
+				    double t,
+				    struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double GM= *(args+1);
+  //Calculate R2deriv
+  double dR, dphi, zd, g;
+  double fac= MovingObjectHessian(R,z,phi,t,args,&dR,&dphi,&zd,&g);
+  return amp * GM * ( fac - 3. * dR * dR * g );
+}
+double MovingObjectPotentialz2deriv(double R,double z, double phi,
+				    double t,
+				    struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double GM= *(args+1);
+  //Calculate z2deriv
+  double dR, dphi, zd, g;
+  double fac= MovingObjectHessian(R,z,phi,t,args,&dR,&dphi,&zd,&g);
+  return amp * GM * ( fac - 3. * zd * zd * g );
+}
+double MovingObjectPotentialRzderiv(double R,double z, double phi,
+				    double t,
+				    struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double GM= *(args+1);
+  //Calculate Rzderiv
+  double dR, dphi, zd, g;
+  MovingObjectHessian(R,z,phi,t,args,&dR,&dphi,&zd,&g);
+  return - 3. * amp * GM * dR * zd * g;
+}
+double MovingObjectPotentialphi2deriv(double R,double z, double phi,
+				      double t,
+				      struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double GM= *(args+1);
+  //Calculate phi2deriv
+  double dR, dphi, zd, g;
+  double fac= MovingObjectHessian(R,z,phi,t,args,&dR,&dphi,&zd,&g);
+  return amp * GM * ( R * R * ( fac - 3. * dphi * dphi * g ) + R * dR * fac );
+}
+double MovingObjectPotentialRphideriv(double R,double z, double phi,
+				      double t,
+				      struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args;
+  double GM= *(args+1);
+  //Calculate Rphideriv
+  double dR, dphi, zd, g;
+  double fac= MovingObjectHessian(R,z,phi,t,args,&dR,&dphi,&zd,&g);
+  return - amp * GM * dphi * ( 3. * R * dR * g + fac );
+}
+double MovingObjectPotentialPlanarR2deriv(double R,double phi,
+					  double t,
+					  struct potentialArg * potentialArgs){
+  return MovingObjectPotentialR2deriv(R,0.,phi,t,potentialArgs);
+}
+double MovingObjectPotentialPlanarphi2deriv(double R,double phi,
+					    double t,
+					    struct potentialArg * potentialArgs){
+  return MovingObjectPotentialphi2deriv(R,0.,phi,t,potentialArgs);
+}
+double MovingObjectPotentialPlanarRphideriv(double R,double phi,
+					    double t,
+					    struct potentialArg * potentialArgs){
+  return MovingObjectPotentialRphideriv(R,0.,phi,t,potentialArgs);
+}
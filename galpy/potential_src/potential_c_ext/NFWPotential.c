@@ -59,3 +59,38 @@ double NFWPotentialPlanarR2deriv(double R,double phi,
   double aR2= aR*aR;
   return amp * (((R*(2.*a+3.*R))-2.*aR2*log(1.+R/a))/R/R/R/aR2);
 }
+/*
+  First and second derivative of the potential with respect to spherical r
+*/
+static inline void NFWPotentialRadialDerivs(double R,double Z,double * args,
+			double * dphidr,double * d2phidr2){
+  double amp= *args++;
+  double a= *args;
+  double r= sqrt(R*R+Z*Z);
+  double ar= a + r;
+  double logar= log(1. + r / a);
+  *dphidr= amp * ( logar / r / r - 1. / r / ar );
+  *d2phidr2= amp * ( r * ( 2. * a + 3. * r ) - 2. * ar * ar * logar ) 
+    / r / r / r / ar / ar;
+}
+double NFWPotentialR2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  NFWPotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalR2deriv(R,Z,dphidr,d2phidr2);
+}
+double NFWPotentialz2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  NFWPotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalz2deriv(R,Z,dphidr,d2phidr2);
+}
+double NFWPotentialRzderiv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  NFWPotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalRzderiv(R,Z,dphidr,d2phidr2);
+}
@@ -0,0 +1,51 @@
+#include <math.h>
+#include <galpy_potentials.h>
+//Second derivatives computed as central finite differences of the forces,
+//for potentials for which they are not implemented analytically; these use
+//the Rforce, zforce, and phiforce of the potentialArg, which therefore need
+//to be set (also when parsing planar potentials)
+#define _NUMDERIV_STEP 1e-4
+double NumericalR2deriv(double R,double Z,double phi,double t,
+			struct potentialArg * potentialArgs){
+  double dR= _NUMDERIV_STEP * R;
+  return - 0.5 * ( potentialArgs->Rforce(R+dR,Z,phi,t,potentialArgs)
+		   - potentialArgs->Rforce(R-dR,Z,phi,t,potentialArgs) ) / dR;
+}
+double Numericalz2deriv(double R,double Z,double phi,double t,
+			struct potentialArg * potentialArgs){
+  double dz= _NUMDERIV_STEP * sqrt(R*R+Z*Z);
+  return - 0.5 * ( potentialArgs->zforce(R,Z+dz,phi,t,potentialArgs)
+		   - potentialArgs->zforce(R,Z-dz,phi,t,potentialArgs) ) / dz;
+}
+double NumericalRzderiv(double R,double Z,double phi,double t,
+			struct potentialArg * potentialArgs){
+  double dz= _NUMDERIV_STEP * sqrt(R*R+Z*Z);
+  return - 0.5 * ( potentialArgs->Rforce(R,Z+dz,phi,t,potentialArgs)
+		   - potentialArgs->Rforce(R,Z-dz,phi,t,potentialArgs) ) / dz;
+}
+double Numericalphi2deriv(double R,double Z,double phi,double t,
+			  struct potentialArg * potentialArgs){
+  return - 0.5 * ( potentialArgs->phiforce(R,Z,phi+_NUMDERIV_STEP,t,
+					   potentialArgs)
+		   - potentialArgs->phiforce(R,Z,phi-_NUMDERIV_STEP,t,
+					     potentialArgs) ) / _NUMDERIV_STEP;
+}
+double NumericalRphideriv(double R,double Z,double phi,double t,
+			  struct potentialArg * potentialArgs){
+  return - 0.5 * ( potentialArgs->Rforce(R,Z,phi+_NUMDERIV_STEP,t,
+					 potentialArgs)
+		   - potentialArgs->Rforce(R,Z,phi-_NUMDERIV_STEP,t,
+					   potentialArgs) ) / _NUMDERIV_STEP;
+}
+double NumericalPlanarR2deriv(double R,double phi,double t,
+			      struct potentialArg * potentialArgs){
+  return NumericalR2deriv(R,0.,phi,t,potentialArgs);
+}
+double NumericalPlanarphi2deriv(double R,double phi,double t,
+				struct potentialArg * potentialArgs){
+  return Numericalphi2deriv(R,0.,phi,t,potentialArgs);
+}
+double NumericalPlanarRphideriv(double R,double phi,double t,
+				struct potentialArg * potentialArgs){
+  return NumericalRphideriv(R,0.,phi,t,potentialArgs);
+}
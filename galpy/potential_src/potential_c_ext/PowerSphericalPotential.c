@@ -55,3 +55,35 @@ double PowerSphericalPotentialPlanarR2deriv(double R,double phi,
   //Calculate R2deriv
   return amp * (1. - alpha ) * pow(R,-alpha);
 }
+/*
+  First and second derivative of the potential with respect to spherical r
+*/
+static inline void PowerSphericalPotentialRadialDerivs(double R,double Z,double * args,
+			double * dphidr,double * d2phidr2){
+  double amp= *args++;
+  double alpha= *args;
+  double r= sqrt(R*R+Z*Z);
+  *dphidr= amp * pow(r,1.-alpha);
+  *d2phidr2= amp * (1. - alpha) * pow(r,-alpha);
+}
+double PowerSphericalPotentialR2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  PowerSphericalPotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalR2deriv(R,Z,dphidr,d2phidr2);
+}
+double PowerSphericalPotentialz2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  PowerSphericalPotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalz2deriv(R,Z,dphidr,d2phidr2);
+}
+double PowerSphericalPotentialRzderiv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  PowerSphericalPotentialRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalRzderiv(R,Z,dphidr,d2phidr2);
+}
@@ -74,3 +74,38 @@ double PowerSphericalPotentialwCutoffPlanarR2deriv(double R,double phi,
   //Calculate R2deriv
   return amp * ( 4. * M_PI * pow(r2,- 0.5 * alpha) * exp(-r2/rc/rc) - 2. * mass(r2,alpha,rc)/pow(r2,1.5) );
 }
+/*
+  First and second derivative of the potential with respect to spherical r
+*/
+static inline void PowerSphericalPotentialwCutoffRadialDerivs(double R,double Z,double * args,
+			double * dphidr,double * d2phidr2){
+  double amp= *args++;
+  double alpha= *args++;
+  double rc= *args;
+  double r2= R*R+Z*Z;
+  double m= mass(r2,alpha,rc);
+  *dphidr= amp * m / r2;
+  *d2phidr2= amp * ( 4. * M_PI * pow(r2,- 0.5 * alpha) * exp(-r2/rc/rc) 
+		     - 2. * m / pow(r2,1.5) );
+}
+double PowerSphericalPotentialwCutoffR2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  PowerSphericalPotentialwCutoffRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalR2deriv(R,Z,dphidr,d2phidr2);
+}
+double PowerSphericalPotentialwCutoffz2deriv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  PowerSphericalPotentialwCutoffRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalz2deriv(R,Z,dphidr,d2phidr2);
+}
+double PowerSphericalPotentialwCutoffRzderiv(double R,double Z,double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double dphidr, d2phidr2;
+  PowerSphericalPotentialwCutoffRadialDerivs(R,Z,potentialArgs->args,&dphidr,&d2phidr2);
+  return sphericalRzderiv(R,Z,dphidr,d2phidr2);
+}
@@ -0,0 +1,143 @@
+#include <math.h>
+#include <gsl/gsl_sf_bessel.h>
+#include <galpy_potentials.h>
+#ifndef M_PI
+#define M_PI 3.14159265358979323846
+#endif
+//RazorThinExponentialDiskPotential
+//arguments: amp, alpha, glorder, glx[glorder], glw[glorder]
+//Products of modified Bessel functions are computed using the scaled
+//functions, such that they do not overflow at large R
+/*
+  Integrand of the Rforce (deriv=0) or zforce/z (deriv=1) for z =/= 0,
+  integrated over [kmin,kmax] using Gauss-Legendre quadrature
+*/
+static double RazorThinExponentialDiskForceIntegral(double R, double z,
+						    double kmin, double kmax,
+						    int deriv,
+						    double alpha,
+						    int glorder,
+						    double * glx,
+						    double * glw){
+  int ii;
+  double k, sqrtp, sqrtm, fac, out= 0.;
+  for (ii=0; ii < glorder; ii++){
+    k= ( kmax - kmin ) * 0.5 * ( *(glx+ii) + 1. ) + kmin;
+    sqrtp= sqrt( z * z + ( k + R ) * ( k + R ) );
+    sqrtm= sqrt( z * z + ( k - R ) * ( k - R ) );
+    fac= ( deriv == 0 ) ? ( k + R ) / sqrtp - ( k - R ) / sqrtm 
+      : 1. / sqrtp + 1. / sqrtm;
+    out+= ( kmax - kmin ) * *(glw+ii) * k * k 
+      * gsl_sf_bessel_K0_scaled(k * alpha) * exp( -k * alpha ) * fac
+      / sqrt( R * R + z * z - k * k + sqrtp * sqrtm ) / ( sqrtp + sqrtm );
+  }
+  return out;
+}
+double RazorThinExponentialDiskPotentialEval(double R,double z, double phi,
+					     double t,
+					     struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  double alpha= *args++;
+  int glorder= (int) *args++;
+  double * glx= args;
+  double * glw= args + glorder;
+  //Calculate potential
+  int ii;
+  double y, k, sqrtp, sqrtm, out= 0.;
+  if ( fabs(z) < 1e-6 ) {
+    y= 0.5 * alpha * R;
+    return - amp * M_PI * R * ( gsl_sf_bessel_I0_scaled(y) 
+				* gsl_sf_bessel_K1_scaled(y)
+				- gsl_sf_bessel_I1_scaled(y)
+				* gsl_sf_bessel_K0_scaled(y) );
+  }
+  for (ii=0; ii < glorder; ii++){
+    k= 5. * ( *(glx+ii) + 1. );
+    sqrtp= sqrt( z * z + ( k + R ) * ( k + R ) );
+    sqrtm= sqrt( z * z + ( k - R ) * ( k - R ) );
+    out+= 10. * *(glw+ii) * asin( 2. * k / ( sqrtp + sqrtm ) ) * k
+      * gsl_sf_bessel_K0_scaled(alpha * k) * exp( -alpha * k );
+  }
+  return - amp * 2. * alpha * out;
+}
+double RazorThinExponentialDiskPotentialRforce(double R,double z, double phi,
+					       double t,
+					       struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  double alpha= *args++;
+  int glorder= (int) *args++;
+  double * glx= args;
+  double * glw= args + glorder;
+  //Calculate Rforce
+  double y, out;
+  if ( fabs(z) < 1e-6 ) {
+    y= 0.5 * alpha * R;
+    return - amp * 2. * M_PI * y * ( gsl_sf_bessel_I0_scaled(y)
+				     * gsl_sf_bessel_K0_scaled(y)
+				     - gsl_sf_bessel_I1_scaled(y)
+				     * gsl_sf_bessel_K1_scaled(y) );
+  }
+  out= RazorThinExponentialDiskForceIntegral(R,z,0.,R,0,alpha,
+					     glorder,glx,glw);
+  if ( R < 10. )
+    out+= RazorThinExponentialDiskForceIntegral(R,z,R,10.,0,alpha,
+						glorder,glx,glw);
+  return - amp * 2. * M_SQRT2 * alpha * out;
+}
+double RazorThinExponentialDiskPotentialPlanarRforce(double R,double phi,
+						     double t,
+						     struct potentialArg * potentialArgs){
+  return RazorThinExponentialDiskPotentialRforce(R,0.,phi,t,potentialArgs);
+}
+double RazorThinExponentialDiskPotentialzforce(double R,double z,double phi,
+					       double t,
+					       struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  double alpha= *args++;
+  int glorder= (int) *args++;
+  double * glx= args;
+  double * glw= args + glorder;
+  //Calculate zforce
+  double out;
+  if ( fabs(z) < 1e-6 ) return 0.;
+  out= RazorThinExponentialDiskForceIntegral(R,z,0.,R,1,alpha,
+					     glorder,glx,glw);
+  if ( R < 10. )
+    out+= RazorThinExponentialDiskForceIntegral(R,z,R,10.,1,alpha,
+						glorder,glx,glw);
+  return - amp * z * 2. * M_SQRT2 * alpha * out;
+}
+double RazorThinExponentialDiskPotentialPlanarR2deriv(double R,double phi,
+						      double t,
+						      struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  double alpha= *args;
+  //Calculate R2deriv
+  double y= 0.5 * alpha * R;
+  double i0= gsl_sf_bessel_I0_scaled(y);
+  double i1= gsl_sf_bessel_I1_scaled(y);
+  double k0= gsl_sf_bessel_K0_scaled(y);
+  double k1= gsl_sf_bessel_K1_scaled(y);
+  return amp * ( M_PI * alpha * ( i0 * k0 - i1 * k1 )
+		 + M_PI / 4. * alpha * alpha * R 
+		 * ( i1 * ( 3. * k0 + gsl_sf_bessel_Kn_scaled(2,y) )
+		     - k1 * ( 3. * i0 + gsl_sf_bessel_In_scaled(2,y) ) ) );
+}
+double RazorThinExponentialDiskPotentialR2deriv(double R,double z, double phi,
+						double t,
+						struct potentialArg * potentialArgs){
+  //Analytic in the plane, finite difference of the Rforce elsewhere
+  if ( fabs(z) < 1e-6 )
+    return RazorThinExponentialDiskPotentialPlanarR2deriv(R,phi,t,
+							  potentialArgs);
+  else
+    return NumericalR2deriv(R,z,phi,t,potentialArgs);
+}
@@ -0,0 +1,174 @@
+#include <math.h>
+#include <galpy_potentials.h>
+#ifndef M_PI
+#define M_PI 3.14159265358979323846
+#endif
+//SCFPotential
+//arguments: amp, a, N, L, Acos (N*L*L, C order [n,l,m]), Asin (same)
+/*
+  Gegenbauer polynomials C_n^alpha(x) for n < nmax
+*/
+static inline void scf_gegenbauer(int nmax, double alpha, double x,
+				  double * C){
+  int n;
+  if ( nmax > 0 ) C[0]= 1.;
+  if ( nmax > 1 ) C[1]= 2. * alpha * x;
+  for (n=2; n < nmax; n++)
+    C[n]= ( 2. * ( n - 1. + alpha ) * x * C[n-1]
+	    - ( n + 2. * alpha - 2. ) * C[n-2] ) / n;
+}
+/*
+  Compute the potential (deriv=0) or the potential's derivatives wrt
+  r, theta, and phi (deriv=1) in out
+*/
+static void SCFPotentialSums(double R, double z, double phi, double * args,
+			     int deriv, double * out){
+  double amp= *args++;
+  double a= *args++;
+  int N= (int) *args++;
+  int L= (int) *args++;
+  double * Acos= args;
+  double * Asin= args + N * L * L;
+  double r, s, xi, costheta, sintheta, pref, dpref, alpha;
+  double Bc, Bs, dBc, dBs, cosmphi, sinmphi, NP, dNP, Nlm;
+  double phinl[N*L], dphinl[N*L], C[N], dC[N], P[(L+1)*(L+1)];
+  int n, l, m, indx;
+  r= sqrt( R * R + z * z );
+  s= r / a;
+  if ( r == 0. ) {
+    costheta= 1.;
+    sintheta= 0.;
+  }
+  else {
+    costheta= z / r;
+    sintheta= R / r;
+  }
+  xi= ( s - 1. ) / ( s + 1. );
+  //Radial basis functions
+  for (l=0; l < L; l++){
+    alpha= 2. * l + 1.5;
+    pref= pow(s,l) / pow(1.+s,2.*l+1.);
+    scf_gegenbauer(N,alpha,xi,C);
+    for (n=0; n < N; n++)
+      phinl[n*L+l]= -pref * C[n];
+    if ( deriv ) {
+      dpref= -( 2. * l + 1. ) * pref / ( 1. + s );
+      if ( l > 0 ) dpref+= l * pow(s,l-1.) / pow(1.+s,2.*l+1.);
+      scf_gegenbauer(N-1,alpha+1.,xi,dC);
+      for (n=0; n < N; n++)
+	dphinl[n*L+l]= -dpref * C[n]
+	  - ( ( n > 0 ) ? pref * 2. * alpha * dC[n-1] * 2. / ( 1. + s ) / ( 1. + s ): 0.);
+    }
+  }
+  //Associated Legendre functions, without the Condon-Shortley phase
+  for (indx=0; indx < (L+1)*(L+1); indx++) P[indx]= 0.;
+  for (m=0; m < L; m++){
+    if ( m == 0 ) P[0]= 1.;
+    else P[m*(L+1)+m]= ( 2. * m - 1. ) * sintheta * P[(m-1)*(L+1)+m-1];
+    P[(m+1)*(L+1)+m]= ( 2. * m + 1. ) * costheta * P[m*(L+1)+m];
+    for (l=m+2; l < L; l++)
+      P[l*(L+1)+m]= ( ( 2. * l - 1. ) * costheta * P[(l-1)*(L+1)+m]
+		      - ( l + m - 1. ) * P[(l-2)*(L+1)+m] ) / ( l - m );
+  }
+  //Sum
+  for (indx=0; indx < 3; indx++) out[indx]= 0.;
+  for (l=0; l < L; l++){
+    for (m=0; m <= l; m++){
+      Bc= 0.;
+      Bs= 0.;
+      dBc= 0.;
+      dBs= 0.;
+      for (n=0; n < N; n++){
+	indx= ( n * L + l ) * L + m;
+	Bc+= Acos[indx] * phinl[n*L+l];
+	Bs+= Asin[indx] * phinl[n*L+l];
+	if ( deriv ) {
+	  dBc+= Acos[indx] * dphinl[n*L+l];
+	  dBs+= Asin[indx] * dphinl[n*L+l];
+	}
+      }
+      Nlm= sqrt( ( 2. * l + 1. ) / 4. / M_PI
+		 * exp( lgamma(l-m+1.) - lgamma(l+m+1.) ) );
+      NP= Nlm * P[l*(L+1)+m];
+      cosmphi= cos( m * phi );
+      sinmphi= sin( m * phi );
+      if ( ! deriv ) {
+	out[0]+= NP * ( Bc * cosmphi + Bs * sinmphi );
+	continue;
+      }
+      if ( m == 0 )
+	dNP= -Nlm * P[l*(L+1)+1];
+      else
+	dNP= 0.5 * Nlm * ( ( l + m ) * ( l - m + 1. ) * P[l*(L+1)+m-1]
+			   - P[l*(L+1)+m+1] );
+      out[0]+= NP * ( dBc * cosmphi + dBs * sinmphi );
+      out[1]+= dNP * ( Bc * cosmphi + Bs * sinmphi );
+      out[2]+= NP * m * ( Bs * cosmphi - Bc * sinmphi );
+    }
+  }
+  out[0]*= amp / a;
+  if ( deriv ) {
+    out[0]/= a;
+    out[1]*= amp / a;
+    out[2]*= amp / a;
+  }
+}
+/*
+  Compute the forces (FR,Fz,Fphi) in out
+*/
+static void SCFPotentialForces(double R, double z, double phi,
+			       double * args, double * out){
+  double derivs[3];
+  double r;
+  SCFPotentialSums(R,z,phi,args,1,derivs);
+  r= sqrt( R * R + z * z );
+  if ( r == 0. ) {
+    out[0]= 0.;
+    out[1]= 0.;
+  }
+  else {
+    out[0]= -derivs[0] * R / r - derivs[1] * z / r / r;
+    out[1]= -derivs[0] * z / r + derivs[1] * R / r / r;
+  }
+  out[2]= -derivs[2];
+}
+double SCFPotentialEval(double R,double z, double phi,
+			double t,
+			struct potentialArg * potentialArgs){
+  double out[3];
+  SCFPotentialSums(R,z,phi,potentialArgs->args,0,out);
+  return out[0];
+}
+double SCFPotentialRforce(double R,double z, double phi,
+			  double t,
+			  struct potentialArg * potentialArgs){
+  double out[3];
+  SCFPotentialForces(R,z,phi,potentialArgs->args,out);
+  return out[0];
+}
+double SCFPotentialzforce(double R,double z, double phi,
+			  double t,
+			  struct potentialArg * potentialArgs){
+  double out[3];
+  SCFPotentialForces(R,z,phi,potentialArgs->args,out);
+  return out[1];
+}
+double SCFPotentialphiforce(double R,double z, double phi,
+			    double t,
+			    struct potentialArg * potentialArgs){
+  double out[3];
+  SCFPotentialForces(R,z,phi,potentialArgs->args,out);
+  return out[2];
+}
+double SCFPotentialPlanarRforce(double R,double phi,double t,
+				struct potentialArg * potentialArgs){
+  double out[3];
+  SCFPotentialForces(R,0.,phi,potentialArgs->args,out);
+  return out[0];
+}
+double SCFPotentialPlanarphiforce(double R,double phi,double t,
+				  struct potentialArg * potentialArgs){
+  double out[3];
+  SCFPotentialForces(R,0.,phi,potentialArgs->args,out);
+  return out[2];
+}
@@ -0,0 +1,260 @@
+#include <stdlib.h>
+#include <math.h>
+#include <galpy_potentials.h>
+//TimeDependentWrapperPotential
+//arguments: amp, tform, tsteady, omegab, pa; the wrapped potentials are
+//           parsed into wrappedPotentialArg
+//           (tform is NaN if the amplitude does not grow)
+/*
+  Amplitude at time t, including the smooth growth
+*/
+static inline double TimeDependentWrapperAmp(double t,double * args){
+  double xi;
+  double amp= *args;
+  double tform= *(args+1);
+  double tsteady= *(args+2);
+  if ( isnan(tform) || t >= tsteady )
+    return amp;
+  else if ( t < tform )
+    return 0.;
+  xi= 2.*(t-tform)/(tsteady-tform)-1.;
+  return amp*(3./16.*pow(xi,5.)-5./8.*pow(xi,3.)+15./16.*xi+.5);
+}
+/*
+  Azimuth in the rotating frame of the wrapped potentials
+*/
+static inline double TimeDependentWrapperPhi(double phi,double t,
+					     double * args){
+  return phi - *(args+3) * t - *(args+4);
+}
+double TimeDependentWrapperPotentialEval(double R,double Z, double phi,
+					 double t,
+					 struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->potentialEval(R,Z,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialRforce(double R,double Z, double phi,
+					   double t,
+					   struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->Rforce(R,Z,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialzforce(double R,double Z, double phi,
+					   double t,
+					   struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->zforce(R,Z,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialphiforce(double R,double Z, double phi,
+					     double t,
+					     struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->phiforce(R,Z,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialPlanarRforce(double R,double phi,
+						 double t,
+						 struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->planarRforce(R,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialPlanarphiforce(double R,double phi,
+						   double t,
+						   struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->planarphiforce(R,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialPlanarR2deriv(double R,double phi,
+						  double t,
+						  struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->planarR2deriv(R,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialPlanarphi2deriv(double R,double phi,
+						    double t,
+						    struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->planarphi2deriv(R,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialPlanarRphideriv(double R,double phi,
+						    double t,
+						    struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->planarRphideriv(R,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialR2deriv(double R,double Z, double phi,
+						 double t,
+						 struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->R2deriv(R,Z,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialz2deriv(double R,double Z, double phi,
+						 double t,
+						 struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->z2deriv(R,Z,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialRzderiv(double R,double Z, double phi,
+						 double t,
+						 struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->Rzderiv(R,Z,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialphi2deriv(double R,double Z, double phi,
+						 double t,
+						 struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->phi2deriv(R,Z,phi,t,wrapped+ii);
+  return amp * out;
+}
+double TimeDependentWrapperPotentialRphideriv(double R,double Z, double phi,
+						 double t,
+						 struct potentialArg * potentialArgs){
+  int ii;
+  double * args= potentialArgs->args;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  double amp= TimeDependentWrapperAmp(t,args);
+  double out= 0.;
+  if ( amp == 0. ) return 0.;
+  phi= TimeDependentWrapperPhi(phi,t,args);
+  for (ii=0; ii < potentialArgs->nwrapped; ii++)
+    out+= (wrapped+ii)->Rphideriv(R,Z,phi,t,wrapped+ii);
+  return amp * out;
+}
+/*
+  Free the wrapped potentials of a potentialArg (does nothing for potentials
+  that do not wrap other potentials); the wrapped potentialArgs are allocated
+  with calloc, such that all unused pointers are NULL
+*/
+void free_wrappedPotentialArgs(struct potentialArg * potentialArgs){
+  int ii;
+  struct potentialArg * wrapped= potentialArgs->wrappedPotentialArg;
+  if ( ! potentialArgs->nwrapped || ! wrapped ) return;
+  for (ii=0; ii < potentialArgs->nwrapped; ii++) {
+    if ( (wrapped+ii)->i2d )
+      interp_2d_free((wrapped+ii)->i2d);
+    if ( (wrapped+ii)->accx )
+      gsl_interp_accel_free((wrapped+ii)->accx);
+    if ( (wrapped+ii)->accy )
+      gsl_interp_accel_free((wrapped+ii)->accy);
+    if ( (wrapped+ii)->i2drforce )
+      interp_2d_free((wrapped+ii)->i2drforce);
+    if ( (wrapped+ii)->accxrforce )
+      gsl_interp_accel_free((wrapped+ii)->accxrforce);
+    if ( (wrapped+ii)->accyrforce )
+      gsl_interp_accel_free((wrapped+ii)->accyrforce);
+    if ( (wrapped+ii)->i2dzforce )
+      interp_2d_free((wrapped+ii)->i2dzforce);
+    if ( (wrapped+ii)->accxzforce )
+      gsl_interp_accel_free((wrapped+ii)->accxzforce);
+    if ( (wrapped+ii)->accyzforce )
+      gsl_interp_accel_free((wrapped+ii)->accyzforce);
+    free_wrappedPotentialArgs(wrapped+ii);
+    free((wrapped+ii)->args);
+  }
+  free(wrapped);
+  potentialArgs->wrappedPotentialArg= NULL;
+  potentialArgs->nwrapped= 0;
+}
@@ -4,7 +4,22 @@
 */
 #ifndef __GALPY_POTENTIALS_H__
 #define __GALPY_POTENTIALS_H__
+#include <math.h>
 #include <interp_2d.h>
+/*
+  Macro for dealing with potentially unused variables due to OpenMP
+ */
+/* If we're not using GNU C, elide __attribute__ if it doesn't exist*/
+#ifndef UNUSED
+#ifndef __has_attribute      // Compatibility with non-clang compilers. 
+#define __has_attribute(x) 0  
+#endif
+#if defined(__GNUC__) || __has_attribute(unused)
+#  define UNUSED __attribute__((unused))
+#else
+#  define UNUSED /*NOTHING*/
+#endif
+#endif
 struct potentialArg{
   double (*potentialEval)(double R, double Z, double phi, double t,
 			  struct potentialArg *);
@@ -24,6 +39,10 @@ struct potentialArg{
 		      struct potentialArg *);
   double (*Rphideriv)(double R,double Z,double phi, double t,
 		      struct potentialArg *);
+  double (*z2deriv)(double R,double Z,double phi, double t,
+		    struct potentialArg *);
+  double (*Rzderiv)(double R,double Z,double phi, double t,
+		    struct potentialArg *);
   double (*planarR2deriv)(double R,double phi, double t,
 			  struct potentialArg *);
   double (*planarphi2deriv)(double R,double phi, double t,
@@ -41,7 +60,28 @@ struct potentialArg{
   interp_2d * i2dzforce;
   gsl_interp_accel * accxzforce;
   gsl_interp_accel * accyzforce;
+  int nwrapped;
+  struct potentialArg * wrappedPotentialArg;
 };
+/*
+  Second derivatives of a spherical potential in cylindrical coordinates,
+  given dPhi/dr and d2Phi/dr2
+*/
+static inline double sphericalR2deriv(double R,double Z,
+				      double dphidr,double d2phidr2){
+  double r2= R*R+Z*Z;
+  return d2phidr2 * R * R / r2 + dphidr * Z * Z / r2 / sqrt(r2);
+}
+static inline double sphericalz2deriv(double R,double Z,
+				      double dphidr,double d2phidr2){
+  double r2= R*R+Z*Z;
+  return d2phidr2 * Z * Z / r2 + dphidr * R * R / r2 / sqrt(r2);
+}
+static inline double sphericalRzderiv(double R,double Z,
+				      double dphidr,double d2phidr2){
+  double r2= R*R+Z*Z;
+  return ( d2phidr2 - dphidr / sqrt(r2) ) * R * Z / r2;
+}
 /*
   Function declarations
 */
@@ -50,6 +90,23 @@ double ZeroPlanarForce(double,double,double,
 		       struct potentialArg *);
 double ZeroForce(double,double,double,double,
 		 struct potentialArg *);
+//Numerical second derivatives from the forces
+double NumericalR2deriv(double ,double , double, double,
+			struct potentialArg *);
+double Numericalz2deriv(double ,double , double, double,
+			struct potentialArg *);
+double NumericalRzderiv(double ,double , double, double,
+			struct potentialArg *);
+double Numericalphi2deriv(double ,double , double, double,
+			  struct potentialArg *);
+double NumericalRphideriv(double ,double , double, double,
+			  struct potentialArg *);
+double NumericalPlanarR2deriv(double ,double, double,
+			      struct potentialArg *);
+double NumericalPlanarphi2deriv(double ,double, double,
+				struct potentialArg *);
+double NumericalPlanarRphideriv(double ,double, double,
+				struct potentialArg *);
 //LogarithmicHaloPotential
 double LogarithmicHaloPotentialEval(double ,double , double, double,
 				    struct potentialArg *);
@@ -61,6 +118,12 @@ double LogarithmicHaloPotentialzforce(double,double,double,double,
 				    struct potentialArg *);
 double LogarithmicHaloPotentialPlanarR2deriv(double ,double, double,
 				    struct potentialArg *);
+double LogarithmicHaloPotentialR2deriv(double ,double , double, double,
+				    struct potentialArg *);
+double LogarithmicHaloPotentialz2deriv(double ,double , double, double,
+				    struct potentialArg *);
+double LogarithmicHaloPotentialRzderiv(double ,double , double, double,
+				    struct potentialArg *);
 //DehnenBarPotential
 double DehnenBarPotentialRforce(double,double,double,
 				struct potentialArg *);
@@ -104,6 +167,12 @@ double MiyamotoNagaiPotentialzforce(double,double,double,double,
 				    struct potentialArg *);
 double MiyamotoNagaiPotentialPlanarR2deriv(double ,double, double,
 					   struct potentialArg *);
+double MiyamotoNagaiPotentialR2deriv(double ,double , double, double,
+				    struct potentialArg *);
+double MiyamotoNagaiPotentialz2deriv(double ,double , double, double,
+				    struct potentialArg *);
+double MiyamotoNagaiPotentialRzderiv(double ,double , double, double,
+				    struct potentialArg *);
 //LopsidedDiskPotential
 double LopsidedDiskPotentialRforce(double,double,double,
 					   struct potentialArg *);
@@ -126,6 +195,12 @@ double PowerSphericalPotentialzforce(double,double,double,double,
 				     struct potentialArg *);
 double PowerSphericalPotentialPlanarR2deriv(double ,double, double,
 					    struct potentialArg *);
+double PowerSphericalPotentialR2deriv(double ,double , double, double,
+				     struct potentialArg *);
+double PowerSphericalPotentialz2deriv(double ,double , double, double,
+				     struct potentialArg *);
+double PowerSphericalPotentialRzderiv(double ,double , double, double,
+				     struct potentialArg *);
 //HernquistPotential
 double HernquistPotentialEval(double ,double , double, double,
 			      struct potentialArg *);
@@ -137,6 +212,12 @@ double HernquistPotentialzforce(double,double,double,double,
 				struct potentialArg *);
 double HernquistPotentialPlanarR2deriv(double ,double, double,
 				       struct potentialArg *);
+double HernquistPotentialR2deriv(double ,double , double, double,
+				struct potentialArg *);
+double HernquistPotentialz2deriv(double ,double , double, double,
+				struct potentialArg *);
+double HernquistPotentialRzderiv(double ,double , double, double,
+				struct potentialArg *);
 //NFWPotential
 double NFWPotentialEval(double ,double , double, double,
 			struct potentialArg *);
@@ -148,6 +229,12 @@ double NFWPotentialzforce(double,double,double,double,
 			  struct potentialArg *);
 double NFWPotentialPlanarR2deriv(double ,double, double,
 				 struct potentialArg *);
+double NFWPotentialR2deriv(double ,double , double, double,
+			  struct potentialArg *);
+double NFWPotentialz2deriv(double ,double , double, double,
+			  struct potentialArg *);
+double NFWPotentialRzderiv(double ,double , double, double,
+			  struct potentialArg *);
 //JaffePotential
 double JaffePotentialEval(double ,double , double, double,
 			  struct potentialArg *);
@@ -159,6 +246,12 @@ double JaffePotentialzforce(double,double,double,double,
 			    struct potentialArg *);
 double JaffePotentialPlanarR2deriv(double ,double, double,
 				   struct potentialArg *);
+double JaffePotentialR2deriv(double ,double , double, double,
+			    struct potentialArg *);
+double JaffePotentialz2deriv(double ,double , double, double,
+			    struct potentialArg *);
+double JaffePotentialRzderiv(double ,double , double, double,
+			    struct potentialArg *);
 //DoubleExponentialDiskPotential
 double DoubleExponentialDiskPotentialEval(double ,double , double, double,
 					  struct potentialArg *);
@@ -168,6 +261,14 @@ double DoubleExponentialDiskPotentialPlanarRforce(double,double,double,
 						  struct potentialArg *);
 double DoubleExponentialDiskPotentialzforce(double,double, double,double,
 					    struct potentialArg *);
+double DoubleExponentialDiskPotentialR2deriv(double ,double , double, double,
+					     struct potentialArg *);
+double DoubleExponentialDiskPotentialz2deriv(double ,double , double, double,
+					     struct potentialArg *);
+double DoubleExponentialDiskPotentialRzderiv(double ,double , double, double,
+					     struct potentialArg *);
+double DoubleExponentialDiskPotentialPlanarR2deriv(double,double,double,
+						   struct potentialArg *);
 //FlattenedPowerPotential
 double FlattenedPowerPotentialEval(double,double,double,double,
 				   struct potentialArg *);
@@ -179,6 +280,12 @@ double FlattenedPowerPotentialzforce(double,double,double,double,
 				     struct potentialArg *);
 double FlattenedPowerPotentialPlanarR2deriv(double,double,double,
 					    struct potentialArg *);
+double FlattenedPowerPotentialR2deriv(double ,double , double, double,
+				      struct potentialArg *);
+double FlattenedPowerPotentialz2deriv(double ,double , double, double,
+				      struct potentialArg *);
+double FlattenedPowerPotentialRzderiv(double ,double , double, double,
+				      struct potentialArg *);
 //interpRZPotential
 double interpRZPotentialEval(double ,double , double, double,
 			     struct potentialArg *);
@@ -186,6 +293,102 @@ double interpRZPotentialRforce(double ,double , double, double,
 			       struct potentialArg *);
 double interpRZPotentialzforce(double ,double , double, double,
 			       struct potentialArg *);
+//interp3DPotential
+double interp3DPotentialEval(double ,double , double, double,
+			     struct potentialArg *);
+double interp3DPotentialRforce(double ,double , double, double,
+			       struct potentialArg *);
+double interp3DPotentialzforce(double ,double , double, double,
+			       struct potentialArg *);
+double interp3DPotentialphiforce(double ,double , double, double,
+				 struct potentialArg *);
+double interp3DPotentialPlanarRforce(double ,double, double,
+				     struct potentialArg *);
+double interp3DPotentialPlanarphiforce(double ,double, double,
+				       struct potentialArg *);
+//SCFPotential
+double SCFPotentialEval(double ,double , double, double,
+			struct potentialArg *);
+double SCFPotentialRforce(double ,double , double, double,
+			  struct potentialArg *);
+double SCFPotentialzforce(double ,double , double, double,
+			  struct potentialArg *);
+double SCFPotentialphiforce(double ,double , double, double,
+			    struct potentialArg *);
+double SCFPotentialPlanarRforce(double ,double, double,
+				struct potentialArg *);
+double SCFPotentialPlanarphiforce(double ,double, double,
+				  struct potentialArg *);
+//BurkertPotential
+double BurkertPotentialEval(double ,double , double, double,
+			    struct potentialArg *);
+double BurkertPotentialRforce(double ,double , double, double,
+			      struct potentialArg *);
+double BurkertPotentialPlanarRforce(double ,double, double,
+				    struct potentialArg *);
+double BurkertPotentialzforce(double,double,double,double,
+			      struct potentialArg *);
+double BurkertPotentialPlanarR2deriv(double ,double, double,
+				     struct potentialArg *);
+double BurkertPotentialR2deriv(double ,double , double, double,
+			      struct potentialArg *);
+double BurkertPotentialz2deriv(double ,double , double, double,
+			      struct potentialArg *);
+double BurkertPotentialRzderiv(double ,double , double, double,
+			      struct potentialArg *);
+//RazorThinExponentialDiskPotential
+double RazorThinExponentialDiskPotentialEval(double ,double , double, double,
+					     struct potentialArg *);
+double RazorThinExponentialDiskPotentialRforce(double ,double , double, double,
+					       struct potentialArg *);
+double RazorThinExponentialDiskPotentialPlanarRforce(double ,double, double,
+						     struct potentialArg *);
+double RazorThinExponentialDiskPotentialzforce(double,double,double,double,
+					       struct potentialArg *);
+double RazorThinExponentialDiskPotentialPlanarR2deriv(double ,double, double,
+						      struct potentialArg *);
+double RazorThinExponentialDiskPotentialR2deriv(double ,double , double, double,
+						struct potentialArg *);
+//MovingObjectPotential
+double MovingObjectPotentialEval(double ,double , double, double,
+				 struct potentialArg *);
+double MovingObjectPotentialRforce(double ,double , double, double,
+				   struct potentialArg *);
+double MovingObjectPotentialzforce(double ,double , double, double,
+				   struct potentialArg *);
+double MovingObjectPotentialphiforce(double ,double , double, double,
+				     struct potentialArg *);
+double MovingObjectPotentialPlanarRforce(double ,double, double,
+					 struct potentialArg *);
+double MovingObjectPotentialPlanarphiforce(double ,double, double,
+					   struct potentialArg *);
+double MovingObjectPotentialR2deriv(double ,double , double, double,
+				    struct potentialArg *);
+double MovingObjectPotentialz2deriv(double ,double , double, double,
+				    struct potentialArg *);
+double MovingObjectPotentialRzderiv(double ,double , double, double,
+				    struct potentialArg *);
+double MovingObjectPotentialphi2deriv(double ,double , double, double,
+				      struct potentialArg *);
+double MovingObjectPotentialRphideriv(double ,double , double, double,
+				      struct potentialArg *);
+double MovingObjectPotentialPlanarR2deriv(double ,double, double,
+					    struct potentialArg *);
+double MovingObjectPotentialPlanarphi2deriv(double ,double, double,
+					    struct potentialArg *);
+double MovingObjectPotentialPlanarRphideriv(double ,double, double,
+					    struct potentialArg *);
+//CosmphiDiskPotential
+double CosmphiDiskPotentialRforce(double ,double, double,
+				  struct potentialArg *);
+double CosmphiDiskPotentialphiforce(double ,double, double,
+				    struct potentialArg *);
+double CosmphiDiskPotentialR2deriv(double ,double, double,
+				   struct potentialArg *);
+double CosmphiDiskPotentialphi2deriv(double ,double, double,
+				     struct potentialArg *);
+double CosmphiDiskPotentialRphideriv(double ,double, double,
+				     struct potentialArg *);
 //IsochronePotential
 double IsochronePotentialEval(double ,double , double, double,
 			      struct potentialArg *);
@@ -197,6 +400,12 @@ double IsochronePotentialzforce(double,double,double,double,
 				struct potentialArg *);
 double IsochronePotentialPlanarR2deriv(double ,double, double,
 				       struct potentialArg *);
+double IsochronePotentialR2deriv(double ,double , double, double,
+				struct potentialArg *);
+double IsochronePotentialz2deriv(double ,double , double, double,
+				struct potentialArg *);
+double IsochronePotentialRzderiv(double ,double , double, double,
+				struct potentialArg *);
 //PowerSphericalPotentialwCutoff
 double PowerSphericalPotentialwCutoffEval(double ,double , double, double,
 					  struct potentialArg *);
@@ -208,4 +417,40 @@ double PowerSphericalPotentialwCutoffzforce(double,double,double,double,
 					    struct potentialArg *);
 double PowerSphericalPotentialwCutoffPlanarR2deriv(double ,double, double,
 						   struct potentialArg *);
+double PowerSphericalPotentialwCutoffR2deriv(double ,double , double, double,
+					     struct potentialArg *);
+double PowerSphericalPotentialwCutoffz2deriv(double ,double , double, double,
+					     struct potentialArg *);
+double PowerSphericalPotentialwCutoffRzderiv(double ,double , double, double,
+					     struct potentialArg *);
+//TimeDependentWrapperPotential
+double TimeDependentWrapperPotentialEval(double ,double , double, double,
+					 struct potentialArg *);
+double TimeDependentWrapperPotentialRforce(double ,double , double, double,
+					   struct potentialArg *);
+double TimeDependentWrapperPotentialzforce(double ,double , double, double,
+					   struct potentialArg *);
+double TimeDependentWrapperPotentialphiforce(double ,double , double, double,
+					     struct potentialArg *);
+double TimeDependentWrapperPotentialR2deriv(double ,double , double, double,
+					    struct potentialArg *);
+double TimeDependentWrapperPotentialz2deriv(double ,double , double, double,
+					    struct potentialArg *);
+double TimeDependentWrapperPotentialRzderiv(double ,double , double, double,
+					    struct potentialArg *);
+double TimeDependentWrapperPotentialphi2deriv(double ,double , double, double,
+					    struct potentialArg *);
+double TimeDependentWrapperPotentialRphideriv(double ,double , double, double,
+					    struct potentialArg *);
+double TimeDependentWrapperPotentialPlanarRforce(double ,double, double,
+						 struct potentialArg *);
+double TimeDependentWrapperPotentialPlanarphiforce(double ,double, double,
+						   struct potentialArg *);
+double TimeDependentWrapperPotentialPlanarR2deriv(double ,double, double,
+						  struct potentialArg *);
+double TimeDependentWrapperPotentialPlanarphi2deriv(double ,double, double,
+						    struct potentialArg *);
+double TimeDependentWrapperPotentialPlanarRphideriv(double ,double, double,
+						    struct potentialArg *);
+void free_wrappedPotentialArgs(struct potentialArg *);
 #endif /* galpy_potentials.h */
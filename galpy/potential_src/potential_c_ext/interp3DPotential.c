@@ -0,0 +1,151 @@
+#include <math.h>
+#include <galpy_potentials.h>
+#ifndef M_PI
+#define M_PI 3.14159265358979323846
+#endif
+//interp3DPotential
+//arguments: amp, logR, zsym, omegab, t0, nx, nz, nphi, x0, dx, z0, dz,
+//           coefficients of the 3D cubic B-spline (nx*nz*nphi, C order) on a
+//           grid that is padded in R and z by the Python code
+/*
+  Cubic B-spline basis functions (and their derivatives) in index coordinates
+  for the four coefficients that contribute at fractional position t
+*/
+static inline void cubic_bspline_weights(double t, double * w, double * dw){
+  double omt= 1.-t;
+  w[0]= omt * omt * omt / 6.;
+  w[1]= (3. * t * t * t - 6. * t * t + 4.) / 6.;
+  w[2]= (-3. * t * t * t + 3. * t * t + 3. * t + 1.) / 6.;
+  w[3]= t * t * t / 6.;
+  dw[0]= -0.5 * omt * omt;
+  dw[1]= 0.5 * t * ( 3. * t - 4. );
+  dw[2]= 0.5 * ( -3. * t * t + 2. * t + 1. );
+  dw[3]= 0.5 * t * t;
+}
+/*
+  Indices of the four coefficients that contribute at index coordinate u,
+  using mirror boundary conditions (non-periodic, requires n >= 3) or
+  wrapping (periodic)
+*/
+static inline double bspline_indices(double u, int n, int periodic,
+				     int * indx){
+  int ii, jj;
+  double t;
+  if ( periodic ) {
+    u= fmod(u,(double) n);
+    if ( u < 0. ) u+= n;
+  }
+  else {
+    if ( u < 0. ) u= 0.;
+    else if ( u > n - 1 ) u= n - 1;
+  }
+  ii= (int) floor(u);
+  t= u - ii;
+  for (jj=0; jj < 4; jj++){
+    indx[jj]= ii - 1 + jj;
+    if ( periodic ) {
+      if ( indx[jj] < 0 ) indx[jj]+= n;
+      else if ( indx[jj] >= n ) indx[jj]-= n;
+    }
+    else {
+      if ( indx[jj] < 0 ) indx[jj]= -indx[jj];
+      if ( indx[jj] > n - 1 ) indx[jj]= 2 * ( n - 1 ) - indx[jj];
+    }
+  }
+  return t;
+}
+/*
+  Evaluate the interpolated potential (deriv=-1) or its derivative with
+  respect to R (deriv=0), z (deriv=1), or phi (deriv=2)
+*/
+static double interp3DPotentialDeriv(double R, double z, double phi, double t,
+				     int deriv,
+				     struct potentialArg * potentialArgs){
+  double * args= potentialArgs->args;
+  //Get args
+  double amp= *args++;
+  int logR= (int) *args++;
+  int zsym= (int) *args++;
+  double omegab= *args++;
+  double t0= *args++;
+  int nx= (int) *args++;
+  int nz= (int) *args++;
+  int nphi= (int) *args++;
+  double x0= *args++;
+  double dx= *args++;
+  double z0= *args++;
+  double dz= *args++;
+  double * coeffs= args;
+  double x, zz, tx, tz, tphi, out, zsign= 1.;
+  double wx[4], dwx[4], wz[4], dwz[4], wphi[4], dwphi[4];
+  double * ux, * uz, * uphi;
+  int ix[4], iz[4], iphi[4];
+  int ii, jj, kk;
+  if ( logR == 1 )
+    x= ( R > 0. ) ? log(R): -20.72326583694641;
+  else
+    x= R;
+  if ( zsym == 1 && z < 0. ) {
+    zz= -z;
+    zsign= -1.;
+  }
+  else
+    zz= z;
+  phi-= omegab * ( t - t0 );
+  tx= bspline_indices(( x - x0 ) / dx,nx,0,ix);
+  tz= bspline_indices(( zz - z0 ) / dz,nz,0,iz);
+  tphi= bspline_indices(phi / 2. / M_PI * nphi,nphi,1,iphi);
+  cubic_bspline_weights(tx,wx,dwx);
+  cubic_bspline_weights(tz,wz,dwz);
+  cubic_bspline_weights(tphi,wphi,dwphi);
+  ux= ( deriv == 0 ) ? dwx: wx;
+  uz= ( deriv == 1 ) ? dwz: wz;
+  uphi= ( deriv == 2 ) ? dwphi: wphi;
+  out= 0.;
+  for (ii=0; ii < 4; ii++)
+    for (jj=0; jj < 4; jj++)
+      for (kk=0; kk < 4; kk++)
+	out+= ux[ii] * uz[jj] * uphi[kk]
+	  * *(coeffs + ( ix[ii] * nz + iz[jj] ) * nphi + iphi[kk]);
+  switch ( deriv ) {
+  case 0:
+    out/= dx;
+    if ( logR == 1 ) out/= R;
+    break;
+  case 1:
+    out*= zsign / dz;
+    break;
+  case 2:
+    out*= nphi / 2. / M_PI;
+    break;
+  }
+  return amp * out;
+}
+double interp3DPotentialEval(double R,double z, double phi,
+			     double t,
+			     struct potentialArg * potentialArgs){
+  return interp3DPotentialDeriv(R,z,phi,t,-1,potentialArgs);
+}
+double interp3DPotentialRforce(double R,double z, double phi,
+			       double t,
+			       struct potentialArg * potentialArgs){
+  return -interp3DPotentialDeriv(R,z,phi,t,0,potentialArgs);
+}
+double interp3DPotentialzforce(double R,double z, double phi,
+			       double t,
+			       struct potentialArg * potentialArgs){
+  return -interp3DPotentialDeriv(R,z,phi,t,1,potentialArgs);
+}
+double interp3DPotentialphiforce(double R,double z, double phi,
+				 double t,
+				 struct potentialArg * potentialArgs){
+  return -interp3DPotentialDeriv(R,z,phi,t,2,potentialArgs);
+}
+double interp3DPotentialPlanarRforce(double R,double phi,double t,
+				     struct potentialArg * potentialArgs){
+  return -interp3DPotentialDeriv(R,0.,phi,t,0,potentialArgs);
+}
+double interp3DPotentialPlanarphiforce(double R,double phi,double t,
+				       struct potentialArg * potentialArgs){
+  return -interp3DPotentialDeriv(R,0.,phi,t,2,potentialArgs);
+}
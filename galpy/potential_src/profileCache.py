@@ -0,0 +1,127 @@
+###############################################################################
+#   profileCache.py: tabulate radial profiles of a potential (enclosed mass,
+#                    circular velocity, frequencies, guiding-center radius)
+#                    on a log grid and interpolate them
+###############################################################################
+import warnings
+import numpy
+from scipy import interpolate
+from galpy.util import galpyWarning
+class _profileCache:
+    """Class that lazily tabulates and interpolates the radial profiles of a Potential instance"""
+    def __init__(self,pot,rgrid,tol,maxn):
+        """
+        NAME:
+           __init__
+        PURPOSE:
+           initialize a _profileCache instance
+        INPUT:
+           pot - Potential instance
+           rgrid - initial grid in log R, as in logrs= linspace(*rgrid)
+           tol - relative tolerance of the interpolation
+           maxn - maximum number of grid points
+        OUTPUT:
+           instance
+        """
+        self._pot= pot
+        self._xgrid= numpy.linspace(*rgrid)
+        self._tol= tol
+        self._maxn= maxn
+        self.reset()
+        return None
+
+    def reset(self):
+        """Remove all tabulated profiles, such that they are re-computed when they are next needed"""
+        self._splines= {}
+        return None
+
+    def __call__(self,quantity,R):
+        """
+        NAME:
+           __call__
+        PURPOSE:
+           evaluate a profile, interpolating its tabulation within the grid and calculating it directly outside of the grid
+        INPUT:
+           quantity - 'mass', 'vcirc', 'omegac', 'epifreq', 'verticalfreq', or 'rl'
+           R - Galactocentric radius (angular momentum for 'rl'; float or array)
+        OUTPUT:
+           profile at R
+        """
+        scalarOut= numpy.array(R).shape == ()
+        R= numpy.atleast_1d(numpy.array(R,dtype='float'))
+        if quantity == 'rl': R= numpy.fabs(R)
+        if not quantity in self._splines:
+            self._splines[quantity]= self._tabulate(quantity)
+        if self._splines[quantity] is None:
+            out= self._exact(quantity,R)
+        else:
+            spline, xmin, xmax= self._splines[quantity]
+            out= numpy.empty(R.shape)
+            with numpy.errstate(divide='ignore'):
+                x= numpy.log(R)
+            indx= (x >= xmin)*(x <= xmax)
+            if numpy.sum(indx) > 0:
+                out[indx]= numpy.exp(spline(x[indx]))
+            if numpy.sum(True-indx) > 0:
+                out[True-indx]= self._exact(quantity,R[True-indx])
+        if scalarOut: return out[0]
+        else: return out
+
+    def _exact(self,quantity,R):
+        """Calculate a profile directly, without using the cache"""
+        from galpy.potential_src.Potential import rl
+        cache= self._pot._profileCache
+        self._pot._profileCache= None
+        try:
+            out= numpy.empty(R.shape)
+            for ii,r in enumerate(R.flat):
+                if quantity == 'rl':
+                    out.flat[ii]= rl(self._pot,r)
+                else:
+                    out.flat[ii]= getattr(self._pot,quantity)(r)
+        finally:
+            self._pot._profileCache= cache
+        return out
+
+    def _tabulate(self,quantity):
+        """Tabulate a profile, refining the grid until the interpolation error is smaller than tol; returns None if the profile cannot be tabulated"""
+        #Profiles are interpolated as log(quantity) vs. log R, except for
+        #rl, which is interpolated as log R vs. log(Lz= R vc)
+        inverse= quantity == 'rl'
+        if inverse:
+            func= lambda x: x+numpy.log(self._exact('vcirc',numpy.exp(x)))
+        else:
+            func= lambda x: numpy.log(self._exact(quantity,numpy.exp(x)))
+        xgrid= self._xgrid
+        with numpy.errstate(invalid='ignore',divide='ignore'):
+            ygrid= func(xgrid)
+        while True:
+            if numpy.any(True-numpy.isfinite(ygrid)) \
+                    or (inverse and numpy.any(numpy.diff(ygrid) <= 0.)):
+                return None
+            if inverse:
+                spline= interpolate.InterpolatedUnivariateSpline(ygrid,xgrid,
+                                                                 k=3)
+            else:
+                spline= interpolate.InterpolatedUnivariateSpline(xgrid,ygrid,
+                                                                 k=3)
+            xmid= 0.5*(xgrid[1:]+xgrid[:-1])
+            with numpy.errstate(invalid='ignore',divide='ignore'):
+                ymid= func(xmid)
+            if numpy.any(True-numpy.isfinite(ymid)): return None
+            if inverse: err= numpy.fabs(spline(ymid)-xmid)
+            else: err= numpy.fabs(spline(xmid)-ymid)
+            refine= err > self._tol
+            if numpy.sum(refine) == 0: break
+            if len(xgrid)+numpy.sum(refine) > self._maxn:
+                warnings.warn("Profile tabulation of %s reached the maximum number of grid points before reaching the requested tolerance" % quantity,galpyWarning)
+                break
+            xgrid= numpy.hstack((xgrid,xmid[refine]))
+            ygrid= numpy.hstack((ygrid,ymid[refine]))
+            sindx= numpy.argsort(xgrid)
+            xgrid= xgrid[sindx]
+            ygrid= ygrid[sindx]
+        if inverse:
+            return (spline,ygrid[0],ygrid[-1])
+        else:
+            return (spline,xgrid[0],xgrid[-1])
@@ -36,6 +36,8 @@ POSSIBILITY OF SUCH DAMAGE.
 #define _MAX_STEPCHANGE_POWERTWO 3.
 #define _MIN_STEPCHANGE_POWERTWO -3.
 #define _MAX_STEPREDUCE 10000.
+#define _MAX_EVENT_ITER 100
+#define _EVENT_THETA_TOL 1e-14
 /*
 Runge-Kutta 4 integrator
 Usage:
@@ -664,3 +666,278 @@ double bovy_dopr54_actualstep(void (*func)(double t, double *y, double *a,int na
   dt_one= dt*pow(2.,powertwo);
   return dt_one;
 }
+/*
+Runge-Kutta Dormand-Prince 5/4 integrator with dense output
+Usage:
+   Same as bovy_dopr54, except that rather than returning the solution at
+   a set of output times, the integration is run from to to tf and the 
+   continuous extension of each accepted step is stored, such that the
+   solution can be evaluated at any time in [to,tf] afterwards 
+   (Hairer, Norsett, & Wanner 1993, Sec. II.6)
+  Arguments are:
+       int dim: dimension
+       double *yo: initial value, dimension: dim
+       double to: initial time
+       double tf: final time
+       double dt: typical time step used to estimate the initial step
+       int nargs: see above
+       double *args: see above
+       double rtol, double atol: relative and absolute tolerance levels desired
+  Output:
+       int * nsteps: number of accepted steps
+       double ** dense: for each accepted step, 2+5dim values 
+                        [t_step,h_step,rcont1,...,rcont5]; the solution at
+                        theta= (t-t_step)/h_step in [0,1] is given by
+                        rcont1+theta(rcont2+(1-theta)(rcont3+theta(rcont4+(1-theta)rcont5)))
+                        (allocated here, free with bovy_dopr54_dense_free)
+       int * err: if non-zero, something bad happened (1: maximum step reduction happened)
+*/
+void bovy_dopr54_dense(void (*func)(double t, double *q, double *a,
+				    int nargs, struct potentialArg * potentialArgs),
+		       int dim,
+		       double * yo,
+		       double to, double tf, double dt,
+		       int nargs, struct potentialArg * potentialArgs,
+		       double rtol, double atol,
+		       int * nsteps, double ** dense, int * err){
+  int nfound;
+  double tend;
+  double * events;
+  bovy_dopr54_events(func,dim,yo,to,tf,dt,nargs,potentialArgs,rtol,atol,
+		     NULL,0,NULL,NULL,NULL,NULL,
+		     nsteps,dense,&nfound,&events,&tend,err);
+}
+/*
+Evaluate the continuous extension of a single step at theta in [0,1]
+*/
+static inline void dopr54_dense_eval(int dim, double theta, double * rcont,
+				     double * y){
+  int ii;
+  double theta1= 1.-theta;
+  for (ii=0; ii < dim; ii++)
+    *(y+ii)= *(rcont+ii)
+      +theta*(*(rcont+dim+ii)
+	      +theta1*(*(rcont+2*dim+ii)
+		       +theta*(*(rcont+3*dim+ii)
+			       +theta1 * *(rcont+4*dim+ii))));
+}
+/*
+Find the root of an event function within a single step using the 
+Illinois variant of regula falsi on the continuous extension; ga and gb are 
+the values of the event function at the start and the end of the step; 
+returns theta of the root and the solution at the root in y
+*/
+static double dopr54_event_root(double (*eventfunc)(int type, double par,
+						    double *y),
+				int type, double par,
+				int dim, double * rcont,
+				double ga, double gb, double * y){
+  int iter, side= 0;
+  double a= 0., b= 1., c= 0., cold= -1., gc;
+  for (iter=0; iter < _MAX_EVENT_ITER; iter++) {
+    c= (a*gb-b*ga)/(gb-ga);
+    if ( fabs(c-cold) < _EVENT_THETA_TOL ) break;
+    cold= c;
+    dopr54_dense_eval(dim,c,rcont,y);
+    gc= eventfunc(type,par,y);
+    if ( gc == 0. ) break;
+    if ( gc*gb > 0. ) {
+      b= c;
+      gb= gc;
+      if ( side == -1 ) ga/= 2.;
+      side= -1;
+    }
+    else {
+      a= c;
+      ga= gc;
+      if ( side == 1 ) gb/= 2.;
+      side= 1;
+    }
+  }
+  dopr54_dense_eval(dim,c,rcont,y);
+  return c;
+}
+/*
+Runge-Kutta Dormand-Prince 5/4 integrator with dense output and event 
+detection
+Usage:
+   Same as bovy_dopr54_dense, but in addition to the dense output, the 
+   zero crossings of a set of event functions are located to the precision of
+   the continuous extension; integration stops at the first terminal event
+  Arguments are as for bovy_dopr54_dense, plus:
+       double (*eventfunc)(int type, double par, double *y): event function,
+                           evaluates event 'type' with parameter 'par' for the 
+			   solution y
+       int nevent: number of events
+       int * event_type: type of each event (passed to eventfunc)
+       double * event_par: parameter of each event (passed to eventfunc)
+       int * event_dir: direction of the zero crossing to detect: 1: from 
+                        negative to positive, -1: positive to negative, 0: both
+       int * event_terminal: if 1, stop the integration at this event
+  Output, in addition to that of bovy_dopr54_dense:
+       int * nfound: number of events found
+       double ** events: for each event found, 2+dim values [ievent,t,y] 
+                         (allocated here if nevent > 0, free with 
+			 bovy_dopr54_dense_free)
+       double * tend: time at which the integration ended (tf, unless a 
+                      terminal event occurred)
+*/
+void bovy_dopr54_events(void (*func)(double t, double *q, double *a,
+				     int nargs, struct potentialArg * potentialArgs),
+			int dim,
+			double * yo,
+			double to, double tf, double dt,
+			int nargs, struct potentialArg * potentialArgs,
+			double rtol, double atol,
+			double (*eventfunc)(int type, double par, double *y),
+			int nevent, int * event_type, double * event_par,
+			int * event_dir, int * event_terminal,
+			int * nsteps, double ** dense, 
+			int * nfound, double ** events,
+			double * tend, int * err){
+  //coefficients of the continuous extension
+  static const double d1= -12715105075./11282082432.;
+  static const double d3= 87487479700./32700410799.;
+  static const double d4= -10690763975./1880347072.;
+  static const double d5= 701980252875./199316789632.;
+  static const double d6= -1453857185./822651844.;
+  static const double d7= 69997945./29380423.;
+  //Declare and initialize
+  double *a= (double *) malloc ( dim * sizeof(double) );
+  double *a1= (double *) malloc ( dim * sizeof(double) );
+  double *k1= (double *) malloc ( dim * sizeof(double) );
+  double *k2= (double *) malloc ( dim * sizeof(double) );
+  double *k3= (double *) malloc ( dim * sizeof(double) );
+  double *k4= (double *) malloc ( dim * sizeof(double) );
+  double *k5= (double *) malloc ( dim * sizeof(double) );
+  double *k6= (double *) malloc ( dim * sizeof(double) );
+  double *yn= (double *) malloc ( dim * sizeof(double) );
+  double *yn1= (double *) malloc ( dim * sizeof(double) );
+  double *yerr= (double *) malloc ( dim * sizeof(double) );
+  double *ynk= (double *) malloc ( dim * sizeof(double) );
+  double *yold= (double *) malloc ( dim * sizeof(double) );
+  double *yevent= (double *) malloc ( dim * sizeof(double) );
+  double *gold= (double *) malloc ( nevent * sizeof(double) );
+  double *gnew= (double *) malloc ( nevent * sizeof(double) );
+  double *thetas= (double *) malloc ( nevent * sizeof(double) );
+  int ii, jj, nalloc= 64, nevalloc= 16;
+  int stride= 2+5*dim, evstride= 2+dim;
+  int terminal;
+  double told, h, ydiff, bspl, thetaterm;
+  double * thisdense, * thisevent;
+  unsigned char accept;
+  *dense= (double *) malloc ( nalloc * stride * sizeof(double) );
+  if ( nevent > 0 )
+    *events= (double *) malloc ( nevalloc * evstride * sizeof(double) );
+  else
+    *events= NULL;
+  *nsteps= 0;
+  *nfound= 0;
+  *tend= tf;
+  *err= 0;
+  for (ii=0; ii < dim; ii++) *(yn+ii)= *(yo+ii);
+  for (jj=0; jj < nevent; jj++)
+    *(gold+jj)= eventfunc(*(event_type+jj),*(event_par+jj),yn);
+  double dt_one= rk4_estimate_step(*func,dim,yo,dt,&to,nargs,potentialArgs,
+				   rtol,atol);
+  double init_dt_one= dt_one;
+  //set up a1
+  func(to,yn,a1,nargs,potentialArgs);
+  //Integrate the system
+  while ( ( tf >= to && to < tf ) || ( tf < to && to > tf ) ) {
+    accept= 0;
+    if ( init_dt_one/dt_one > _MAX_STEPREDUCE) {
+      dt_one= init_dt_one/_MAX_STEPREDUCE;
+      accept= 1;
+      if ( *err % 2 ==  0) *err+= 1;
+    }
+    if ( tf >= to && dt_one > (tf - to) )
+      dt_one= tf - to;
+    if ( tf < to && dt_one < (tf - to) )
+      dt_one= tf - to;
+    told= to;
+    h= dt_one;
+    for (ii=0; ii < dim; ii++) *(yold+ii)= *(yn+ii);
+    dt_one= bovy_dopr54_actualstep(func,dim,yn,dt_one,&to,nargs,potentialArgs,
+				   rtol,atol,
+				   a1,a,k1,k2,k3,k4,k5,k6,yn1,yerr,ynk,
+				   accept);
+    if ( to == told ) continue; //step was rejected
+    //Store the continuous extension of the accepted step; a1 now contains
+    //the derivative at the end of the step
+    if ( *nsteps == nalloc ) {
+      nalloc*= 2;
+      *dense= (double *) realloc ( *dense, nalloc * stride * sizeof(double) );
+    }
+    thisdense= *dense + *nsteps * stride;
+    *thisdense++= told;
+    *thisdense++= h;
+    for (ii=0; ii < dim; ii++) {
+      ydiff= *(yn+ii) - *(yold+ii);
+      bspl= *(k1+ii) - ydiff;
+      *(thisdense+ii)= *(yold+ii);
+      *(thisdense+dim+ii)= ydiff;
+      *(thisdense+2*dim+ii)= bspl;
+      *(thisdense+3*dim+ii)= ydiff - h * *(a1+ii) - bspl;
+      *(thisdense+4*dim+ii)= d1 * *(k1+ii) + d3 * *(k3+ii) + d4 * *(k4+ii)
+	+ d5 * *(k5+ii) + d6 * *(k6+ii) + d7 * h * *(a1+ii);
+    }
+    *nsteps+= 1;
+    if ( nevent == 0 ) continue;
+    //Locate the events that occurred during this step
+    terminal= 0;
+    thetaterm= 2.;
+    for (jj=0; jj < nevent; jj++) {
+      *(gnew+jj)= eventfunc(*(event_type+jj),*(event_par+jj),yn);
+      *(thetas+jj)= -1.;
+      if ( ( *(event_dir+jj) >= 0 && *(gold+jj) < 0. && *(gnew+jj) >= 0. )
+	   || ( *(event_dir+jj) <= 0 && *(gold+jj) > 0. && *(gnew+jj) <= 0. ) ) {
+	*(thetas+jj)= dopr54_event_root(eventfunc,*(event_type+jj),
+					*(event_par+jj),dim,thisdense,
+					*(gold+jj),*(gnew+jj),yevent);
+	if ( *(event_terminal+jj) && *(thetas+jj) < thetaterm ) {
+	  terminal= 1;
+	  thetaterm= *(thetas+jj);
+	}
+      }
+      *(gold+jj)= *(gnew+jj);
+    }
+    for (jj=0; jj < nevent; jj++) {
+      if ( *(thetas+jj) < 0. || *(thetas+jj) > thetaterm ) continue;
+      if ( *nfound == nevalloc ) {
+	nevalloc*= 2;
+	*events= (double *) realloc ( *events, 
+				      nevalloc * evstride * sizeof(double) );
+      }
+      thisevent= *events + *nfound * evstride;
+      *thisevent++= (double) jj;
+      *thisevent++= told + *(thetas+jj) * h;
+      dopr54_dense_eval(dim,*(thetas+jj),thisdense,thisevent);
+      *nfound+= 1;
+    }
+    if ( terminal ) {
+      *tend= told + thetaterm * h;
+      break;
+    }
+  }
+  free(a);
+  free(a1);
+  free(k1);
+  free(k2);
+  free(k3);
+  free(k4);
+  free(k5);
+  free(k6);
+  free(yn);
+  free(yn1);
+  free(yerr);
+  free(ynk);
+  free(yold);
+  free(yevent);
+  free(gold);
+  free(gnew);
+  free(thetas);
+}
+void bovy_dopr54_dense_free(double * dense){
+  free(dense);
+}
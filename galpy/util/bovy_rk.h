@@ -114,4 +114,23 @@ double bovy_dopr54_actualstep(void (*func)(double, double *, double *,int, struc
 			      double *, double *,
 			      double *, double *,
 			      double *,unsigned char);
+void bovy_dopr54_dense(void (*func)(double, double *, double *,
+				    int, struct potentialArg *),
+		       int,
+		       double *,
+		       double, double, double,
+		       int, struct potentialArg *,
+		       double, double,
+		       int *, double **, int *);
+void bovy_dopr54_events(void (*func)(double, double *, double *,
+				     int, struct potentialArg *),
+			int,
+			double *,
+			double, double, double,
+			int, struct potentialArg *,
+			double, double,
+			double (*eventfunc)(int, double, double *),
+			int, int *, double *, int *, int *,
+			int *, double **, int *, double **, double *, int *);
+void bovy_dopr54_dense_free(double *);
 #endif /* bovy_rk.h */
@@ -9,6 +9,8 @@ interp_2d * interp_2d_alloc(int size1, int size2)
     i2d->xa = (double *)malloc(size1*sizeof(double));
     i2d->ya = (double *)malloc(size2*sizeof(double));
     i2d->za = (double *)malloc(size1*size2*sizeof(double));
+    i2d->tx = NULL;
+    i2d->ty = NULL;
     
     return i2d;
 }
@@ -18,6 +20,8 @@ void interp_2d_free(interp_2d * i2d)
     free(i2d->xa);
     free(i2d->ya);
     free(i2d->za);
+    free(i2d->tx);
+    free(i2d->ty);
     free(i2d);
 }
 
@@ -35,6 +39,22 @@ void interp_2d_init(interp_2d * i2d, const double * xa, const double * ya, const
     }
 // LCOV_EXCL_STOP
 }
+
+void interp_2d_init_knots(interp_2d * i2d, const double * tx, const double * ty, const double * c)
+{
+    //Set up a tensor-product cubic B-spline on a non-uniform grid, with 
+    //size1+4 knots tx, size2+4 knots ty, and coefficients c[size1,size2] 
+    //(e.g., those of scipy's RectBivariateSpline)
+    i2d->type = INTERP_2D_CUBIC_BSPLINE_KNOTS;
+    i2d->tx = (double *)malloc((i2d->size1+4)*sizeof(double));
+    i2d->ty = (double *)malloc((i2d->size2+4)*sizeof(double));
+    memcpy(i2d->tx,tx,(i2d->size1+4)*sizeof(double));
+    memcpy(i2d->ty,ty,(i2d->size2+4)*sizeof(double));
+    memcpy(i2d->za,c,(i2d->size1)*(i2d->size2)*sizeof(double));
+    //The grid is the range of the knots, without multiplicity at the ends
+    memcpy(i2d->xa,tx+3,(i2d->size1-2)*sizeof(double));
+    memcpy(i2d->ya,ty+3,(i2d->size2-2)*sizeof(double));
+}
 // LCOV_EXCL_START
 double interp_2d_eval_linear(interp_2d * i2d, double x, double y, 
 			     gsl_interp_accel * accx, gsl_interp_accel * accy)
@@ -99,6 +119,9 @@ double interp_2d_eval_cubic_bspline(interp_2d * i2d, double x, double y,
     double * ya = i2d->ya;
     double * za = i2d->za;
     
+    if(i2d->type == INTERP_2D_CUBIC_BSPLINE_KNOTS)
+      return interp_2d_eval_cubic_bspline_knots(i2d,x,y,accx,accy);
+
     x = (x > xa[size1-1]) ? xa[size1-1] : x;
     x = (x < xa[0]) ? xa[0] : x;
     y = (y > ya[size2-1]) ? ya[size2-1] : y;
@@ -112,6 +135,58 @@ double interp_2d_eval_cubic_bspline(interp_2d * i2d, double x, double y,
     
     return cubic_bspline_2d_interpol(za,size1,size2,x_norm,y_norm);
 }
+static void cubic_bspline_basis(const double * t, int k, double x, double * N)
+{
+    //Non-zero cubic B-spline basis functions N[0..3] (those of knots 
+    //k-3..k) at x, with t[k] <= x < t[k+1] (Cox-de Boor recursion)
+    int j, r;
+    double left[4], right[4], saved, temp;
+    N[0] = 1.;
+    for (j=1; j < 4; j++) {
+        left[j] = x-t[k+1-j];
+        right[j] = t[k+j]-x;
+        saved = 0.;
+        for (r=0; r < j; r++) {
+            temp = N[r]/(right[r+1]+left[j-r]);
+            N[r] = saved+right[r+1]*temp;
+            saved = left[j-r]*temp;
+        }
+        N[j] = saved;
+    }
+}
+
+double interp_2d_eval_cubic_bspline_knots(interp_2d * i2d, double x, double y, 
+					  gsl_interp_accel * accx, 
+					  gsl_interp_accel * accy)
+{
+    int size1 = i2d->size1;
+    int size2 = i2d->size2;
+    double * xa = i2d->xa;
+    double * ya = i2d->ya;
+    double * za = i2d->za;
+    int ii, jj;
+    double Nx[4], Ny[4], out, row;
+
+    x = (x > xa[size1-3]) ? xa[size1-3] : x;
+    x = (x < xa[0]) ? xa[0] : x;
+    y = (y > ya[size2-3]) ? ya[size2-3] : y;
+    y = (y < ya[0]) ? ya[0] : y;
+
+    //knot intervals (in the full knot arrays, the grid starts at index 3)
+    int ix = gsl_interp_accel_find(accx, xa, size1-2, x)+3;
+    int iy = gsl_interp_accel_find(accy, ya, size2-2, y)+3;
+
+    cubic_bspline_basis(i2d->tx,ix,x,Nx);
+    cubic_bspline_basis(i2d->ty,iy,y,Ny);
+    out = 0.;
+    for (ii=0; ii < 4; ii++) {
+        row = 0.;
+        for (jj=0; jj < 4; jj++)
+            row += Ny[jj]*za[(ix-3+ii)*size2+iy-3+jj];
+        out += Nx[ii]*row;
+    }
+    return out;
+}
 // LCOV_EXCL_START
 void interp_2d_eval_grad_cubic_bspline(interp_2d * i2d, double x, double y, 
 				       double * grad, 
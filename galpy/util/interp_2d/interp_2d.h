@@ -13,7 +13,8 @@
 enum
 {
     INTERP_2D_LINEAR=0,
-    INTERP_2D_CUBIC_BSPLINE=1
+    INTERP_2D_CUBIC_BSPLINE=1,
+    INTERP_2D_CUBIC_BSPLINE_KNOTS=2
 };
 
 typedef struct
@@ -23,6 +24,8 @@ typedef struct
     double * xa;
     double * ya;
     double * za;
+    double * tx;
+    double * ty;
     int type;        
 }interp_2d;
 
@@ -30,10 +33,12 @@ interp_2d * interp_2d_alloc(int size1, int size2);
 void interp_2d_free(interp_2d * i2d);
 
 void interp_2d_init(interp_2d * i2d, const double * xa, const double * ya, const double * za, int type);
+void interp_2d_init_knots(interp_2d * i2d, const double * tx, const double * ty, const double * c);
 
 double interp_2d_eval(interp_2d  * i2d, double x, double y, gsl_interp_accel * accx, gsl_interp_accel * accy);
 void interp_2d_eval_grad(interp_2d * i2d, double x, double y, double * grad, gsl_interp_accel * accx, gsl_interp_accel * accy);
 double interp_2d_eval_cubic_bspline(interp_2d * i2d, double x, double y, gsl_interp_accel * accx,gsl_interp_accel * accy);
+double interp_2d_eval_cubic_bspline_knots(interp_2d * i2d, double x, double y, gsl_interp_accel * accx,gsl_interp_accel * accy);
 
 #endif
 
@@ -30,9 +30,19 @@
 #THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
 #(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 #OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import sys
+import types
+import marshal
+import traceback
+import cPickle as pickle
+import Queue
 import numpy
 _multi=False
 _ncpus=1
+_default_pool=None
+# protocol 2 'succeeds' in pickling some objects that cannot be restored
+# (e.g., open files), so use the binary protocol 1
+_PICKLE_PROTOCOL=1
 
 try:
   # May raise ImportError
@@ -45,7 +55,7 @@ except:
   pass
 
 
-__all__ = ('parallel_map',)
+__all__ = ('parallel_map','Pool','set_default_pool','get_default_pool')
 
 
 def worker(f, ii, chunk, out_q, err_q, lock):
@@ -124,7 +134,7 @@ def run_tasks(procs, err_q, out_q, num):
   return list(numpy.concatenate(results))
 
 
-def parallel_map(function, sequence, numcores=None):
+def parallel_map(function, sequence, numcores=None, pool=None):
   """
   A parallelized version of the native Python map function that
   utilizes the Python multiprocessing module to divide and 
@@ -132,9 +142,14 @@ def parallel_map(function, sequence, numcores=None):
 
   parallel_map does not yet support multiple argument sequences.
 
+  If a persistent Pool is given (or has been set as the default pool 
+  using set_default_pool), the work is handed to its worker processes 
+  rather than to freshly forked processes; numcores is then ignored.
+
   :param function: callable function that accepts argument from iterable
   :param sequence: iterable sequence 
   :param numcores: number of cores to use
+  :param pool: Pool instance to use (default: the default pool, if set)
   """
   if not callable(function):
     raise TypeError("input function '%s' is not callable" %
@@ -149,6 +164,11 @@ def parallel_map(function, sequence, numcores=None):
   if not _multi or size == 1:
     return map(function, sequence)
 
+  if pool is None:
+    pool = _default_pool
+  if pool and pool.is_alive():
+    return pool.map(function, sequence)
+
   if numcores is None:
     numcores = _ncpus
 
@@ -180,6 +200,281 @@ def parallel_map(function, sequence, numcores=None):
   return run_tasks(procs, err_q, out_q, numcores)
 
 
+def _dumps_function(function):
+  """
+  Serialize a function such that it can be sent to a running worker
+  process. Module-level functions are pickled by reference; lambdas and
+  closures are serialized through their code object, defaults, and the
+  contents of their closure cells (which need to be picklable).
+
+  :param function: function to serialize
+  """
+  try:
+    return pickle.dumps(function, _PICKLE_PROTOCOL)
+  except Exception:
+    pass
+  if not isinstance(function, types.FunctionType):
+    raise TypeError("function '%s' cannot be serialized" % repr(function))
+  if function.func_closure is None:
+    closure = None
+  else:
+    closure = tuple([cell.cell_contents for cell in function.func_closure])
+  # Also send the (non-module) globals that the function uses, as they
+  # might have been created after the workers were started
+  glbls = {}
+  for name in _code_names(function.func_code):
+    if name in function.func_globals \
+          and not isinstance(function.func_globals[name], types.ModuleType):
+      glbls[name] = function.func_globals[name]
+  return pickle.dumps(('_galpy_multi_function',
+                       marshal.dumps(function.func_code),
+                       function.func_globals.get('__name__','__main__'),
+                       glbls,
+                       function.func_name,
+                       function.func_defaults,
+                       closure), _PICKLE_PROTOCOL)
+
+
+def _code_names(code):
+  """Names used by a code object and the code objects nested in it"""
+  names = set(code.co_names)
+  for const in code.co_consts:
+    if isinstance(const, types.CodeType):
+      names.update(_code_names(const))
+  return names
+
+
+def _make_cell(val):
+  return (lambda: val).func_closure[0]
+
+
+def _loads_function(sfunction):
+  """
+  Inverse of _dumps_function
+
+  :param sfunction: serialized function
+  """
+  function = pickle.loads(sfunction)
+  if not isinstance(function, tuple) \
+        or not function[0] == '_galpy_multi_function':
+    return function
+  dummy, code, modname, glbls, name, defaults, closure = function
+  __import__(modname)
+  if not closure is None:
+    closure = tuple([_make_cell(val) for val in closure])
+  thisglobals = sys.modules[modname].__dict__.copy()
+  thisglobals.update(glbls)
+  return types.FunctionType(marshal.loads(code), thisglobals,
+                            name, defaults, closure)
+
+
+def pool_worker(task_q, func_q, out_q):
+  """
+  Worker function of a persistent Pool: repeatedly takes a chunk of
+  work from the task queue, maps the requested function over it, and 
+  puts the result (or the exception raised) on the output queue. The 
+  function of each task is sent once on the worker's own function 
+  queue and is cached for all of the task's chunks.
+
+  :param task_q: thread-safe queue of (taskID, chunkID, chunk)
+  :param func_q: thread-safe queue of (taskID, serialized function)
+  :param out_q : thread-safe queue of (taskID, chunkID, success, result)
+  """
+  global _default_pool
+  _default_pool = None # no nested use of the parent's pool
+  taskid, function = None, None
+  while True:
+    task = task_q.get()
+    if task is None: # sentinel: shut down
+      break
+    thistaskid, chunkid, chunk = task
+    try:
+      if not thistaskid == taskid:
+        function = None
+        # skip the functions of tasks that this worker did not work on
+        while not taskid == thistaskid:
+          taskid, sfunction = func_q.get()
+      if function is None:
+        function = _loads_function(sfunction)
+      vals = [function(val) for val in chunk]
+    except Exception, e:
+      tb = traceback.format_exc()
+      try:
+        pickle.dumps(e, _PICKLE_PROTOCOL)
+      except Exception:
+        e = RuntimeError("%s\n%s" % (str(e),tb))
+      out_q.put((thistaskid, chunkid, False, (e, tb)))
+    else:
+      out_q.put((thistaskid, chunkid, True, vals))
+
+
+class Pool(object):
+  """
+  A persistent pool of worker processes that can be reused across many
+  parallel_map calls, such that the process start-up cost is only paid
+  once. Work is split into small chunks that are pulled from a shared
+  queue by whichever worker is free, results are returned in order, and
+  exceptions raised in a worker are re-raised in the calling process.
+
+  Functions that cannot be sent to the workers (e.g., closures over
+  unpicklable objects) are run using the fork-per-call parallel_map.
+
+  Example:
+
+     pool = Pool(numcores=4)
+     set_default_pool(pool) # all galpy multi=/numcores= code uses pool
+     ...
+     pool.close()
+  """
+  def __init__(self, numcores=None):
+    """
+    :param numcores: number of worker processes (default: all cores)
+    """
+    if not _multi:
+      raise RuntimeError("multiprocessing is not available")
+    if numcores is None:
+      numcores = _ncpus
+    self.numcores = numcores
+    self._task_q = multiprocessing.Queue()
+    self._func_qs = [multiprocessing.Queue() for ii in range(numcores)]
+    self._out_q = multiprocessing.Queue()
+    self._taskid = 0
+    self._procs = [multiprocessing.Process(target=pool_worker,
+                                           args=(self._task_q, func_q,
+                                                 self._out_q))
+                   for func_q in self._func_qs]
+    for proc in self._procs:
+      proc.daemon = True
+      proc.start()
+    self._alive = True
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, tb):
+    self.close()
+
+  def is_alive(self):
+    return self._alive
+
+  def map(self, function, sequence, chunksize=None):
+    """
+    Map function over sequence using the pool's workers
+
+    :param function: callable function that accepts argument from iterable
+    :param sequence: iterable sequence
+    :param chunksize: number of elements per chunk of work (default: 
+                      such that each worker gets ~4 chunks)
+
+    An exception raised in a worker is re-raised with the worker's 
+    formatted traceback as its worker_traceback attribute
+    """
+    if not self._alive:
+      raise RuntimeError("Pool has been closed")
+    if not callable(function):
+      raise TypeError("input function '%s' is not callable" %
+                      repr(function))
+    if not numpy.iterable(sequence):
+      raise TypeError("input '%s' is not iterable" %
+                      repr(sequence))
+    try:
+      sfunction = _dumps_function(function)
+    except Exception:
+      return parallel_map(function, sequence, numcores=self.numcores,
+                          pool=False)
+    sequence = list(sequence)
+    size = len(sequence)
+    if size == 0:
+      return []
+    if chunksize is None:
+      chunksize = int(numpy.ceil(size/(4.*self.numcores)))
+    self._taskid += 1
+    # send the function once to each worker, then only the data
+    for func_q in self._func_qs:
+      func_q.put((self._taskid, sfunction))
+    nchunks = 0
+    for ii in range(0, size, chunksize):
+      self._task_q.put((self._taskid, nchunks, sequence[ii:ii+chunksize]))
+      nchunks += 1
+    results = [None]*nchunks
+    err = None
+    ndone = 0
+    while ndone < nchunks:
+      try:
+        taskid, chunkid, success, vals = self._out_q.get(timeout=1.)
+      except Queue.Empty:
+        if not all([proc.is_alive() for proc in self._procs]):
+          self.terminate()
+          raise RuntimeError("A worker process of the Pool died unexpectedly")
+        continue
+      if not taskid == self._taskid: # pragma: no cover
+        continue
+      ndone += 1
+      if success:
+        results[chunkid] = vals
+      elif err is None:
+        err = vals
+    if not err is None:
+      # re-raise the first exception, after all chunks are accounted for,
+      # with the worker's traceback attached
+      err[0].worker_traceback = err[1]
+      raise err[0]
+    # Remove extra dimension, as in parallel_map
+    return list(numpy.concatenate(results))
+
+  def close(self):
+    """
+    Shut down the worker processes after they finish their current work
+    """
+    if not self._alive:
+      return None
+    for proc in self._procs:
+      self._task_q.put(None)
+    for proc in self._procs:
+      proc.join()
+    self._drop_func_qs()
+    self._alive = False
+    if _default_pool is self:
+      set_default_pool(None)
+
+  def terminate(self):
+    """
+    Immediately stop the worker processes
+    """
+    for proc in self._procs:
+      if proc.exitcode is None:
+        proc.terminate()
+    self._drop_func_qs()
+    self._alive = False
+    if _default_pool is self:
+      set_default_pool(None)
+
+  def _drop_func_qs(self):
+    # functions of tasks that a worker never worked on may not have been
+    # read, don't wait for them to be flushed when exiting
+    for func_q in self._func_qs:
+      func_q.cancel_join_thread()
+
+
+def set_default_pool(pool):
+  """
+  Set the Pool that parallel_map uses when no pool is given, such that
+  all of galpy's multi=/numcores= code shares the same workers.
+
+  :param pool: Pool instance or None (to go back to fork-per-call)
+  """
+  global _default_pool
+  _default_pool = pool
+
+
+def get_default_pool():
+  """
+  Return the default Pool used by parallel_map (or None)
+  """
+  return _default_pool
+
+
+
 if __name__ == "__main__":
   """
   Unit test of parallel_map()
@@ -294,6 +294,36 @@ def test_actionAngleSpherical_otherIsochrone_angles():
     assert daz < 10.**-6., 'actionAngleSpherical applied to isochrone potential fails for az at %g%%' % (daz*100.)
     return None
 
+#Test that the C and Python implementations of actionAngleSpherical agree
+def test_actionAngleSpherical_c_vs_python():
+    from galpy.potential import LogarithmicHaloPotential
+    from galpy.actionAngle import actionAngleSpherical
+    lp= LogarithmicHaloPotential(normalize=1.,q=1.)
+    aAS= actionAngleSpherical(pot=lp,c=True)
+    #Array of orbits, the last one circular to test the Python fallback
+    R= numpy.array([1.1,0.9,1.2,0.8,1.])
+    vR= numpy.array([0.3,-0.2,0.,0.1,0.])
+    vT= numpy.array([1.1,-0.9,0.8,1.2,0.8])
+    z= numpy.array([0.2,-0.1,0.3,0.,0.])
+    vz= numpy.array([0.1,0.3,-0.2,0.2,0.6])
+    phi= numpy.array([2.,0.1,4.,1.,0.5])
+    jc= aAS(R,vR,vT,z,vz)
+    jp= aAS(R,vR,vT,z,vz,c=False)
+    for ii in range(3):
+        assert numpy.all(numpy.fabs(jc[ii]-jp[ii]) < 10.**-8.), 'C and Python actionAngleSpherical actions do not agree'
+    jc= aAS.actionsFreqsAngles(R,vR,vT,z,vz,phi)
+    jp= aAS.actionsFreqsAngles(R,vR,vT,z,vz,phi,c=False)
+    for ii in range(6):
+        assert numpy.all(numpy.fabs(jc[ii]-jp[ii]) < 10.**-6.), 'C and Python actionAngleSpherical actions or frequencies do not agree'
+    for ii in range(6,9): #angles of the circular orbit are undefined
+        da= numpy.fabs(jc[ii][:4]-jp[ii][:4])
+        da[da > numpy.pi]-= 2.*numpy.pi
+        assert numpy.all(numpy.fabs(da) < 10.**-6.), 'C and Python actionAngleSpherical angles do not agree'
+    jc= aAS.actionsFreqs(R,vR,vT,z,vz)
+    for ii in range(6):
+        assert numpy.all(numpy.fabs(jc[ii]-jp[ii]) < 10.**-6.), 'C and Python actionAngleSpherical actionsFreqs do not agree'
+    return None
+
 #Basic sanity checking of the actionAngleAdiabatic actions
 def test_actionAngleAdiabatic_basic_actions():
     from galpy.actionAngle import actionAngleAdiabatic
@@ -573,6 +603,32 @@ def test_actionAngleAdiabaticGrid_Isochrone_actions():
     assert djz < 10.**-1.2, 'actionAngleAdiabatic applied to isochrone potential fails for Jz at %f%%' % (djz*100.)
     return None
 
+#Test that the tables of an actionAngleAdiabaticGrid are cached on disk and can be loaded (memory-mapped) from the cache
+def test_actionAngleAdiabaticGrid_cache_c():
+    import tempfile, shutil
+    from galpy.potential import MWPotential
+    from galpy.actionAngle import actionAngleAdiabaticGrid
+    tmpdir= tempfile.mkdtemp()
+    try:
+        aAA= actionAngleAdiabaticGrid(pot=MWPotential,c=True,cachedir=tmpdir)
+        assert len(os.listdir(tmpdir)) == 1, 'actionAngleAdiabaticGrid with cachedir= does not write its tables to the cache'
+        aAAc= actionAngleAdiabaticGrid(pot=MWPotential,c=True,
+                                       cachedir=tmpdir,mmap_mode='r')
+        assert isinstance(aAAc._jr,numpy.memmap), 'actionAngleAdiabaticGrid tables loaded from the cache with mmap_mode= are not memory-mapped'
+        R,vR,vT,z,vz= 1.01, 0.05, 1.05, 0.05,0.1
+        js= aAA(R,vR,vT,z,vz)
+        jsc= aAAc(R,vR,vT,z,vz)
+        for ii in range(3):
+            assert numpy.fabs(js[ii]-jsc[ii]) < 10.**-10., 'actionAngleAdiabaticGrid loaded from the cache does not give the same actions'
+        #Different grid should not use the cached tables
+        aAAo= actionAngleAdiabaticGrid(pot=MWPotential,c=True,
+                                       cachedir=tmpdir,nLz=20)
+        assert len(os.listdir(tmpdir)) == 2, 'actionAngleAdiabaticGrid with a different grid does not write its tables to a different cache'
+        del aAAc
+    finally:
+        shutil.rmtree(tmpdir)
+    return None
+
 #Basic sanity checking of the actionAngleStaeckel actions
 def test_actionAngleStaeckel_basic_actions():
     from galpy.actionAngle import actionAngleStaeckel
@@ -737,6 +793,54 @@ def test_actionAngleStaeckel_basic_freqs_c():
     assert numpy.fabs((jos[5]-verticalfreq(MWPotential,1.))/verticalfreq(MWPotential,1.)) < 10.**-0.9, 'Close-to-circular orbit in the MWPotential does not have Oz=nu at %g%%' % (100.*numpy.fabs((jos[5]-verticalfreq(MWPotential,1.))/verticalfreq(MWPotential,1.)))
     return None
 
+#Test that chunked evaluation of the Staeckel actions, frequencies, and angles gives the same result as unchunked evaluation, also for memory-mapped input and output
+def test_actionAngleStaeckel_chunked_c():
+    import tempfile
+    from galpy.actionAngle import actionAngleStaeckel
+    from galpy.actionAngle_src.actionAngleStaeckel_c import \
+        actionAngleFreqAngleStaeckel_c
+    from galpy.potential import MWPotential
+    aAS= actionAngleStaeckel(pot=MWPotential,delta=0.71,c=True)
+    numpy.random.seed(1)
+    nobj= 101
+    R= 1.+0.1*numpy.random.normal(size=nobj)
+    vR= 0.1*numpy.random.normal(size=nobj)
+    vT= 1.+0.1*numpy.random.normal(size=nobj)
+    z= 0.1*numpy.random.normal(size=nobj)
+    vz= 0.1*numpy.random.normal(size=nobj)
+    phi= 2.*numpy.pi*numpy.random.uniform(size=nobj)
+    js= aAS(R,vR,vT,z,vz)
+    jsc= aAS(R,vR,vT,z,vz,chunksize=10)
+    for ii in range(3):
+        assert numpy.all(numpy.fabs(js[ii]-jsc[ii]) < 10.**-10.), 'Chunked actionAngleStaeckel actions do not agree with unchunked actions'
+    jos= aAS.actionsFreqsAngles(R,vR,vT,z,vz,phi)
+    josc= aAS.actionsFreqsAngles(R,vR,vT,z,vz,phi,chunksize=7)
+    for ii in range(9):
+        assert numpy.all(numpy.fabs(jos[ii]-josc[ii]) < 10.**-10.), 'Chunked actionAngleStaeckel actionsFreqsAngles do not agree with unchunked evaluation'
+    #Memory-mapped, Fortran-ordered input and memory-mapped output
+    tmpdir= tempfile.mkdtemp()
+    try:
+        vxvv= numpy.memmap(os.path.join(tmpdir,'in.dat'),dtype=numpy.float64,
+                           mode='w+',shape=(nobj,6),order='F')
+        vxvv[:]= numpy.array([R,vR,vT,z,vz,phi]).T
+        out= tuple([numpy.memmap(os.path.join(tmpdir,'out%i.dat' % ii),
+                                 dtype=numpy.float64,mode='w+',shape=(nobj,))
+                    for ii in range(8)])
+        res= actionAngleFreqAngleStaeckel_c(MWPotential,0.71,
+                                            vxvv[:,0],vxvv[:,1],vxvv[:,2],
+                                            vxvv[:,3],vxvv[:,4],vxvv[:,5],
+                                            chunksize=13,out=out)
+        assert res[-1] == 0, 'actionAngleFreqAngleStaeckel_c with memory-mapped input returned an error'
+        for ii in range(8):
+            assert res[ii] is out[ii], 'actionAngleFreqAngleStaeckel_c does not return the out= arrays'
+        for ii,jj in zip(range(8),[0,2,3,4,5,6,7,8]):
+            assert numpy.all(numpy.fabs(out[ii]-jos[jj])[~numpy.isnan(jos[jj])] < 10.**-10.), 'actionAngleFreqAngleStaeckel_c with memory-mapped output does not agree with the standard evaluation'
+        del vxvv, out, res
+    finally:
+        import shutil
+        shutil.rmtree(tmpdir)
+    return None
+
 #Basic sanity checking of the actionAngleStaeckel actions
 def test_actionAngleStaeckel_basic_freqsAngles():
     from galpy.actionAngle import actionAngleStaeckel
@@ -1179,6 +1283,134 @@ def test_actionAngleStaeckelGrid_Isochrone_actions():
     assert djz < 10.**-1.2, 'actionAngleStaeckel applied to isochrone potential fails for Jz at %f%%' % (djz*100.)
     return None
 
+#Test that the tables of an actionAngleStaeckelGrid are cached on disk and can be loaded (memory-mapped) from the cache
+def test_actionAngleStaeckelGrid_cache_c():
+    import tempfile, shutil
+    from galpy.potential import MWPotential
+    from galpy.actionAngle import actionAngleStaeckelGrid
+    tmpdir= tempfile.mkdtemp()
+    try:
+        aAA= actionAngleStaeckelGrid(pot=MWPotential,delta=0.71,c=True,cachedir=tmpdir)
+        assert len(os.listdir(tmpdir)) == 1, 'actionAngleStaeckelGrid with cachedir= does not write its tables to the cache'
+        aAAc= actionAngleStaeckelGrid(pot=MWPotential,delta=0.71,c=True,
+                                      cachedir=tmpdir,mmap_mode='r')
+        assert isinstance(aAAc._jrFiltered,numpy.memmap), 'actionAngleStaeckelGrid tables loaded from the cache with mmap_mode= are not memory-mapped'
+        R,vR,vT,z,vz= 1.01, 0.05, 1.05, 0.05,0.1
+        js= aAA(R,vR,vT,z,vz)
+        jsc= aAAc(R,vR,vT,z,vz)
+        for ii in range(3):
+            assert numpy.fabs(js[ii]-jsc[ii]) < 10.**-10., 'actionAngleStaeckelGrid loaded from the cache does not give the same actions'
+        #Different grid should not use the cached tables
+        aAAo= actionAngleStaeckelGrid(pot=MWPotential,delta=0.71,c=True,
+                                      cachedir=tmpdir,nLz=20)
+        assert len(os.listdir(tmpdir)) == 2, 'actionAngleStaeckelGrid with a different grid does not write its tables to a different cache'
+        #Tables computed with and without C should not share the cache
+        aAAp= actionAngleStaeckelGrid(pot=MWPotential,delta=0.71,c=False,
+                                      cachedir=tmpdir,nE=5,npsi=5,nLz=5)
+        aAAc= actionAngleStaeckelGrid(pot=MWPotential,delta=0.71,c=True,
+                                      cachedir=tmpdir,nE=5,npsi=5,nLz=5)
+        assert len(os.listdir(tmpdir)) == 4, 'actionAngleStaeckelGrid with c=True uses the tables cached with c=False'
+        del aAAc
+    finally:
+        shutil.rmtree(tmpdir)
+    return None
+
+#Test that the C interpolation of actionAngleStaeckelGrid agrees with the Python interpolation, also for objects off the grid
+def test_actionAngleStaeckelGrid_c_vs_python():
+    from galpy.potential import MWPotential
+    from galpy.actionAngle import actionAngleStaeckelGrid
+    aAA= actionAngleStaeckelGrid(pot=MWPotential,delta=0.71,c=True)
+    numpy.random.seed(1)
+    nobj= 1001
+    R= 1.+0.2*numpy.random.normal(size=nobj)
+    vR= 0.2*numpy.random.normal(size=nobj)
+    vT= 1.+0.2*numpy.random.normal(size=nobj)
+    z= 0.2*numpy.random.normal(size=nobj)
+    vz= 0.2*numpy.random.normal(size=nobj)
+    #Some objects off the grid
+    vT[:3]= [0.001,7.,1.]
+    vR[2]= 3.
+    js= aAA(R,vR,vT,z,vz)
+    jsp= aAA(R,vR,vT,z,vz,c=False)
+    for ii in range(3):
+        assert numpy.all(numpy.fabs(js[ii]-jsp[ii]) < 10.**-10.), 'actionAngleStaeckelGrid C interpolation does not agree with the Python interpolation'
+    #Single object
+    js= aAA(R[5],vR[5],vT[5],z[5],vz[5])
+    for ii in range(3):
+        assert numpy.fabs(js[ii]-jsp[ii][5]) < 10.**-10., 'actionAngleStaeckelGrid C interpolation does not agree with the Python interpolation'
+    return None
+
+#Test that the frequencies and angles interpolated on the grid agree with those of actionAngleStaeckel
+def test_actionAngleStaeckelGrid_freqsAngles_c():
+    from galpy.potential import MWPotential
+    from galpy.actionAngle import actionAngleStaeckelGrid, actionAngleStaeckel
+    aAA= actionAngleStaeckelGrid(pot=MWPotential,delta=0.71,c=True)
+    aAS= actionAngleStaeckel(pot=MWPotential,delta=0.71,c=True)
+    numpy.random.seed(1)
+    nobj= 1001
+    R= 1.+0.1*numpy.random.normal(size=nobj)
+    vR= 0.1*numpy.random.normal(size=nobj)
+    vT= 1.+0.1*numpy.random.normal(size=nobj)
+    z= 0.1*numpy.random.normal(size=nobj)
+    vz= 0.1*numpy.random.normal(size=nobj)
+    phi= 2.*numpy.pi*numpy.random.uniform(size=nobj)
+    #Some objects off the grid
+    vT[:2]= [0.001,7.]
+    fs= aAA.actionsFreqs(R,vR,vT,z,vz)
+    fsp= aAS.actionsFreqs(R,vR,vT,z,vz)
+    for ii in range(3,6):
+        assert numpy.median(numpy.fabs(fs[ii]/fsp[ii]-1.)) < 0.02, 'actionAngleStaeckelGrid frequencies do not agree with actionAngleStaeckel'
+        assert numpy.all(numpy.fabs(fs[ii][:2]/fsp[ii][:2]-1.) < 10.**-10.), 'actionAngleStaeckelGrid frequencies off the grid do not agree with actionAngleStaeckel'
+    fas= aAA.actionsFreqsAngles(R,vR,vT,z,vz,phi)
+    fasp= aAS.actionsFreqsAngles(R,vR,vT,z,vz,phi)
+    for ii in range(6):
+        assert numpy.all(numpy.fabs(fas[ii]-fs[ii]) < 10.**-10.), 'actionAngleStaeckelGrid actionsFreqsAngles does not agree with actionsFreqs'
+    for ii in range(6,9):
+        da= numpy.fabs((fas[ii]-fasp[ii]+numpy.pi) % (2.*numpy.pi)-numpy.pi)
+        assert numpy.median(da) < 0.02, 'actionAngleStaeckelGrid angles do not agree with actionAngleStaeckel'
+    #c=False falls back onto actionAngleStaeckel
+    aAA= actionAngleStaeckelGrid(pot=MWPotential,delta=0.71,c=False,
+                                 nE=5,npsi=5,nLz=5)
+    fs= aAA.actionsFreqs(R[:5],vR[:5],vT[:5],z[:5],vz[:5],c=True)
+    fas= aAA.actionsFreqsAngles(R[:5],vR[:5],vT[:5],z[:5],vz[:5],phi[:5],
+                                c=True)
+    for ii in range(6):
+        assert numpy.all(numpy.fabs(fs[ii]-fsp[ii][:5]) < 10.**-10.), 'actionAngleStaeckelGrid actionsFreqs with c=False does not agree with actionAngleStaeckel'
+    for ii in range(9):
+        assert numpy.all(numpy.fabs(fas[ii]-fasp[ii][:5]) < 10.**-10.), 'actionAngleStaeckelGrid actionsFreqsAngles with c=False does not agree with actionAngleStaeckel'
+    return None
+
+#Test that the C actionAngle code gives the same results for a compiledPotential, re-using its C structures
+def test_actionAngle_compiledPotential_c():
+    from galpy.potential import MWPotential, compiledPotential, \
+        IsochronePotential
+    from galpy.actionAngle import actionAngleStaeckel, actionAngleAdiabatic, \
+        actionAngleSpherical
+    cp= compiledPotential(MWPotential)
+    R,vR,vT,z,vz,phi= numpy.array([1.01,0.9]), numpy.array([0.05,0.1]), \
+        numpy.array([1.05,0.95]), numpy.array([0.05,-0.1]), \
+        numpy.array([0.1,0.05]), numpy.array([0.1,2.])
+    for aA, aAc in [(actionAngleStaeckel(pot=MWPotential,delta=0.71,c=True),
+                     actionAngleStaeckel(pot=cp,delta=0.71,c=True)),
+                    (actionAngleAdiabatic(pot=MWPotential,c=True),
+                     actionAngleAdiabatic(pot=cp,c=True))]:
+        js= aA(R,vR,vT,z,vz)
+        for ii in range(2): #twice to re-use the C structures
+            jsc= aAc(R,vR,vT,z,vz)
+            for jj in range(3):
+                assert numpy.all(numpy.fabs(js[jj]-jsc[jj]) < 10.**-10.), 'Actions in a compiledPotential do not agree with those in the original potential'
+    assert len([key for key in cp._c_handles if key[0] == 'actions']) == 1, 'compiledPotential does not re-use its C structures for the actionAngle code'
+    fs= actionAngleStaeckel(pot=MWPotential,delta=0.71,c=True).actionsFreqsAngles(R,vR,vT,z,vz,phi)
+    fsc= actionAngleStaeckel(pot=cp,delta=0.71,c=True).actionsFreqsAngles(R,vR,vT,z,vz,phi)
+    for jj in range(9):
+        assert numpy.all(numpy.fabs(fs[jj]-fsc[jj]) < 10.**-10.), 'Frequencies and angles in a compiledPotential do not agree with those in the original potential'
+    ip= IsochronePotential(normalize=1.,b=1.2)
+    fs= actionAngleSpherical(pot=ip).actionsFreqsAngles(R,vR,vT,z,vz,phi)
+    fsc= actionAngleSpherical(pot=compiledPotential(ip)).actionsFreqsAngles(R,vR,vT,z,vz,phi)
+    for jj in range(9):
+        assert numpy.all(numpy.fabs(fs[jj]-fsc[jj]) < 10.**-10.), 'Spherical actions, frequencies, and angles in a compiledPotential do not agree with those in the original potential'
+    return None
+
 #Test the actionAngleIsochroneApprox against an isochrone potential: actions
 def test_actionAngleIsochroneApprox_otherIsochrone_actions():
     from galpy.potential import IsochronePotential
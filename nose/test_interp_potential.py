@@ -948,3 +948,189 @@ def test_interpolation_potential_verticalfreq_notinterpolated():
         assert vfdiff < 10.**-10., 'RZPot interpolation w/ interpRZPotential fails when the potential was not interpolated at R = %g by %g' % (r,vfdiff)
     return None
 
+
+def test_interpolation_potential_cache():
+    #Test that the grids are cached on disk and re-used
+    import os, glob, shutil, tempfile
+    cachedir= tempfile.mkdtemp()
+    try:
+        rzpot= potential.interpRZPotential(RZPot=potential.MWPotential,
+                                           rgrid=(0.01,2.,51),
+                                           zgrid=(0.,0.2,51),
+                                           logR=False,
+                                           interpPot=True,
+                                           interpRforce=True,
+                                           interpvcirc=True,
+                                           use_c=True,enable_c=True,
+                                           zsym=True,cachedir=cachedir)
+        cachefiles= glob.glob(os.path.join(cachedir,'*.npz'))
+        assert len(cachefiles) == 1, 'interpRZPotential did not write exactly one cache file'
+        #Tamper with the cache file to check that the grids are loaded from it
+        cache= dict(numpy.load(cachefiles[0]))
+        cache['vcircGrid']= 2.*cache['vcircGrid']
+        numpy.savez(cachefiles[0],**cache)
+        rzpot2= potential.interpRZPotential(RZPot=potential.MWPotential,
+                                            rgrid=(0.01,2.,51),
+                                            zgrid=(0.,0.2,51),
+                                            logR=False,
+                                            interpPot=True,
+                                            interpRforce=True,
+                                            interpvcirc=True,
+                                            use_c=True,enable_c=True,
+                                            zsym=True,cachedir=cachedir)
+        assert numpy.all(rzpot2._potGrid == rzpot._potGrid), 'interpRZPotential grid loaded from the cache does not agree with the computed grid'
+        assert numpy.all(rzpot2._rforceGrid_splinecoeffs == rzpot._rforceGrid_splinecoeffs), 'interpRZPotential spline coefficients loaded from the cache do not agree with the computed coefficients'
+        assert numpy.fabs(rzpot2.vcirc(1.)-2.*rzpot.vcirc(1.)) < 10.**-10., 'interpRZPotential grid was not loaded from the cache'
+        assert numpy.fabs(rzpot2(1.,0.1)-rzpot(1.,0.1)) < 10.**-14., 'interpRZPotential with cached grids does not agree with the original'
+        #Additional grids are added to the same cache file
+        rzpot3= potential.interpRZPotential(RZPot=potential.MWPotential,
+                                            rgrid=(0.01,2.,51),
+                                            zgrid=(0.,0.2,51),
+                                            logR=False,
+                                            interpzforce=True,
+                                            zsym=True,cachedir=cachedir)
+        assert len(glob.glob(os.path.join(cachedir,'*.npz'))) == 1, 'interpRZPotential with the same potential and grid did not use the same cache file'
+        assert 'zforceGrid' in numpy.load(cachefiles[0]).files, 'New grid was not added to the cache file'
+        #Different potential parameters or grids use a different cache file
+        potential.interpRZPotential(RZPot=potential.MiyamotoNagaiPotential(a=0.5,b=0.0375,normalize=1.),
+                                    rgrid=(0.01,2.,51),zgrid=(0.,0.2,51),
+                                    logR=False,interpPot=True,
+                                    cachedir=cachedir)
+        potential.interpRZPotential(RZPot=potential.MiyamotoNagaiPotential(a=0.5,b=0.04,normalize=1.),
+                                    rgrid=(0.01,2.,51),zgrid=(0.,0.2,51),
+                                    logR=False,interpPot=True,
+                                    cachedir=cachedir)
+        potential.interpRZPotential(RZPot=potential.MiyamotoNagaiPotential(a=0.5,b=0.04,normalize=1.),
+                                    rgrid=(0.01,2.,41),zgrid=(0.,0.2,51),
+                                    logR=False,interpPot=True,
+                                    cachedir=cachedir)
+        assert len(glob.glob(os.path.join(cachedir,'*.npz'))) == 4, 'interpRZPotentials with different potentials or grids did not use different cache files'
+    finally:
+        shutil.rmtree(cachedir)
+    return None
+
+def test_interpolation_potential_adaptive():
+    #Test the adaptive grid refinement
+    rzpot= potential.interpRZPotential(RZPot=potential.MWPotential,
+                                       rgrid=(numpy.log(0.01),numpy.log(20.),11),
+                                       zgrid=(0.,1.,11),
+                                       logR=True,
+                                       interpPot=True,
+                                       interpRforce=True,
+                                       interpzforce=True,
+                                       use_c=True,enable_c=True,
+                                       zsym=True,adaptive=True,tol=10.**-6.)
+    assert len(rzpot._rgrid) > 11 and len(rzpot._zgrid) > 11, 'Adaptive grid refinement did not refine the grid'
+    assert numpy.any(numpy.fabs(numpy.diff(numpy.diff(rzpot._logrgrid))) > 10.**-10.), 'Adaptive grid refinement did not create a non-uniform grid'
+    rs= numpy.exp(numpy.linspace(numpy.log(0.02),numpy.log(15.),23))
+    zs= numpy.linspace(0.,0.9,17)
+    mRs, mzs= numpy.meshgrid(rs,zs,indexing='ij')
+    mRs= mRs.flatten()
+    mzs= mzs.flatten()
+    for func, evalFunc in [(rzpot,potential.evaluatePotentials),
+                           (rzpot.Rforce,potential.evaluateRforces),
+                           (rzpot.zforce,potential.evaluatezforces)]:
+        true= numpy.array([evalFunc(r,z,potential.MWPotential)
+                           for r,z in zip(mRs,mzs)])
+        assert numpy.all(numpy.fabs(func(mRs,mzs)-true) < 10.**-4.*numpy.amax(numpy.fabs(true))), 'interpRZPotential with adaptive grid does not agree with the original potential'
+    #C and python implementations of the non-uniform spline should agree
+    cpot= rzpot(mRs,mzs)
+    rzpot._enable_c= False
+    assert numpy.all(numpy.fabs(rzpot(mRs,mzs)-cpot) < 10.**-10.), 'C and Python evaluation of interpRZPotential with adaptive grid do not agree'
+    crforce= rzpot.Rforce(mRs,mzs)
+    rzpot._enable_c= True
+    assert numpy.all(numpy.fabs(rzpot.Rforce(mRs,mzs)-crforce) < 10.**-10.), 'C and Python evaluation of interpRZPotential with adaptive grid do not agree'
+    #Orbit integration in C with the non-uniform grid
+    from galpy.orbit import Orbit
+    times= numpy.linspace(0.,10.,101)
+    o= Orbit([1.,0.1,1.1,0.1,0.02,0.])
+    o.integrate(times,rzpot,method='dopr54_c')
+    oo= Orbit([1.,0.1,1.1,0.1,0.02,0.])
+    oo.integrate(times,potential.MWPotential,method='dopr54_c')
+    assert numpy.all(numpy.fabs(o.getOrbit()[:,:5]-oo.getOrbit()[:,:5]) < 10.**-4.), 'Orbit integration in interpRZPotential with adaptive grid does not agree with that in the original potential'
+    #The cached adaptive grid depends on the quantities that were refined
+    import tempfile, shutil, glob, os
+    cachedir= tempfile.mkdtemp()
+    try:
+        kwargs= {'RZPot':potential.MWPotential,
+                 'rgrid':(numpy.log(0.01),numpy.log(20.),11),
+                 'zgrid':(0.,1.,11),'logR':True,'use_c':True,
+                 'zsym':True,'adaptive':True,'tol':10.**-6.,
+                 'cachedir':cachedir}
+        potential.interpRZPotential(interpPot=True,**kwargs)
+        frzpot= potential.interpRZPotential(interpRforce=True,
+                                            interpzforce=True,**kwargs)
+        assert len(glob.glob(os.path.join(cachedir,'*.npz'))) == 2, 'Adaptive interpRZPotentials refined on different quantities did not use different cache files'
+        nrzpot= potential.interpRZPotential(interpRforce=True,
+                                            interpzforce=True,
+                                            **dict(kwargs,cachedir=None))
+        assert len(frzpot._rgrid) == len(nrzpot._rgrid) \
+            and len(frzpot._zgrid) == len(nrzpot._zgrid), 'Adaptive interpRZPotential grid loaded from the cache does not agree with the one computed without cache'
+    finally:
+        shutil.rmtree(cachedir)
+    return None
+
+def test_interp3D_potential():
+    #Test the 3D interpolated potential for a flattened halo + rotating bar
+    lp= potential.LogarithmicHaloPotential(normalize=1.,q=0.9)
+    bp= potential.DehnenBarPotential(tform=-100.,tsteady=1.)
+    ip= potential.interp3DPotential([lp,bp],
+                                    rgrid=(numpy.log(0.1),numpy.log(3.),41),
+                                    zgrid=(0.,0.5,21),nphi=32,
+                                    omegab=bp._omegab,t0=0.)
+    rs= numpy.linspace(0.3,2.5,7)
+    zs= numpy.linspace(-0.4,0.4,5)
+    phis= numpy.linspace(0.,2.*numpy.pi,9)
+    mRs, mzs, mphis= numpy.meshgrid(rs,zs,phis,indexing='ij')
+    mRs= mRs.flatten()
+    mzs= mzs.flatten()
+    mphis= mphis.flatten()
+    for t in [0.,1.3]:
+        for func, lpfunc, bpfunc in [(ip,lp,bp),
+                                     (ip.Rforce,lp.Rforce,bp.Rforce),
+                                     (ip.zforce,lp.zforce,None),
+                                     (ip.phiforce,None,bp.phiforce)]:
+            true= numpy.zeros(len(mRs))
+            if not lpfunc is None:
+                true+= numpy.array([lpfunc(r,z,phi=phi,t=t)
+                                    for r,z,phi in zip(mRs,mzs,mphis)])
+            if not bpfunc is None:
+                true+= numpy.array([bpfunc(r,phi=phi,t=t)
+                                    for r,phi in zip(mRs,mphis)])
+            assert numpy.all(numpy.fabs(func(mRs,mzs,phi=mphis,t=t)-true) < 10.**-3.*numpy.amax(numpy.fabs(true))), 'interp3DPotential does not agree with the original potential'
+    #Forces are derivatives of the interpolated potential
+    dx= 10.**-6.
+    for r,z,phi in zip(mRs[::7],mzs[::7],mphis[::7]):
+        assert numpy.fabs((ip(r+dx,z,phi=phi)-ip(r-dx,z,phi=phi))/2./dx
+                          +ip.Rforce(r,z,phi=phi)) < 10.**-6., 'Radial force of interp3DPotential is not the derivative of its potential'
+        assert numpy.fabs((ip(r,z+dx,phi=phi)-ip(r,z-dx,phi=phi))/2./dx
+                          +ip.zforce(r,z,phi=phi)) < 10.**-6., 'Vertical force of interp3DPotential is not the derivative of its potential'
+        assert numpy.fabs((ip(r,z,phi=phi+dx)-ip(r,z,phi=phi-dx))/2./dx
+                          +ip.phiforce(r,z,phi=phi)) < 10.**-6., 'Azimuthal force of interp3DPotential is not the derivative of its potential'
+    #C and Python orbit integration should agree
+    from galpy.orbit import Orbit
+    times= numpy.linspace(0.,20.,1001)
+    o= Orbit([1.,0.1,1.1,0.05,0.02,0.3])
+    o.integrate(times,ip,method='dopr54_c')
+    oo= Orbit([1.,0.1,1.1,0.05,0.02,0.3])
+    oo.integrate(times,ip,method='odeint')
+    for xfunc in ['x','y','z','vx','vy','vz']:
+        assert numpy.all(numpy.fabs(getattr(o,xfunc)(times)-getattr(oo,xfunc)(times)) < 10.**-5.), 'C and Python orbit integration in interp3DPotential do not agree'
+    #Off the grid, C (array input) and Python (scalar input) should agree
+    rs= numpy.array([0.05,0.11,2.8,3.5,10.])
+    zs= numpy.array([0.1,-0.7,0.55,2.,-5.])
+    phis= numpy.linspace(0.,2.*numpy.pi,5)
+    for func in [potential.evaluatePotentials,potential.evaluateRforces,
+                 potential.evaluatezforces,potential.evaluatephiforces]:
+        cout= func(rs,zs,ip,phi=phis,t=1.3)
+        pyout= numpy.array([func(r,z,ip,phi=phi,t=1.3)
+                            for r,z,phi in zip(rs,zs,phis)])
+        assert numpy.all(numpy.fabs(cout-pyout) < 10.**-10.), 'C and Python evaluation of interp3DPotential do not agree off the grid'
+    #Planar C orbit integration should agree with 3D integration in the plane
+    o= Orbit([1.,0.1,1.1,0.,0.,0.3])
+    o.integrate(times,ip,method='dopr54_c')
+    op= Orbit([1.,0.1,1.1,0.3])
+    op.integrate(times,ip,method='dopr54_c')
+    for xfunc in ['x','y','vx','vy']:
+        assert numpy.all(numpy.fabs(getattr(o,xfunc)(times)-getattr(op,xfunc)(times)) < 10.**-8.), 'Planar and 3D C orbit integration in interp3DPotential do not agree'
+    return None
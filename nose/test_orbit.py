@@ -60,7 +60,9 @@ def test_energy_jacobi_conservation():
     pots.append('mockSimpleLinearPotential')
     pots.append('mockMovingObjectLongIntPotential')
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -386,7 +388,9 @@ def test_liouville_planar():
     #pots.append('mockFlatSteadyLogSpiralPotential')
     #pots.append('mockFlatTransientLogSpiralPotential')
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     #rmpots.append('BurkertPotential')
@@ -396,6 +400,7 @@ def test_liouville_planar():
     #rmpots.append('PowerSphericalPotentialwCutoff')
     #Doesn't have the R2deriv
     rmpots.append('TwoPowerSphericalPotential')
+    rmpots.append('SCFPotential')
     for p in rmpots:
         pots.remove(p)
     #tolerances in log10
@@ -486,7 +491,9 @@ def test_eccentricity():
     pots.append('testMWPotential')
     pots.append('testplanarMWPotential')
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -601,7 +608,9 @@ def test_pericenter():
     pots.append('testMWPotential')
     pots.append('testplanarMWPotential')
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -716,7 +725,9 @@ def test_apocenter():
     pots.append('testMWPotential')
     pots.append('testplanarMWPotential')
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -831,7 +842,9 @@ def test_zmax():
                and not 'evaluate' in p)]
     pots.append('testMWPotential')
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -932,7 +945,9 @@ def test_analytic_ecc_rperi_rap():
     pots.append('testMWPotential')
     pots.append('testplanarMWPotential')
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -1127,7 +1142,9 @@ def test_analytic_zmax():
                and not 'evaluate' in p)]
     pots.append('testMWPotential')
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -1147,6 +1164,7 @@ def test_analytic_zmax():
     tol['KeplerPotential']= -7. #these are more difficult
     tol['PowerSphericalPotentialwCutoff']= -8. #these are more difficult
     tol['FlattenedPowerPotential']= -8. #these are more difficult
+    tol['SCFPotential']= -8. #these are more difficult
     tol['testMWPotential']= -6. #these are more difficult
     for p in pots:
         #Setup instance of potential
@@ -2193,6 +2211,421 @@ def comp_orbfit(of,vxvv,ts,pot,lb=False,radec=False,ro=None,vo=None):
         out.append(numpy.amin(numpy.sum((allvxvv-vxvv[ii])**2.,axis=1)))
     return numpy.array(out)
 
+# Test that integrating multiple orbits at once gives the same result as integrating them one by one
+def test_orbits_integrate():
+    from galpy.orbit import Orbit, Orbits
+    from galpy.potential import MWPotential
+    vxvv= numpy.array([[1.,0.1,1.1,0.1,0.02,0.5],
+                       [0.9,-0.1,0.9,0.2,-0.1,2.5],
+                       [1.2,0.3,0.8,-0.1,0.1,4.]])
+    times= numpy.linspace(0.,10.,201)
+    for method in ['leapfrog_c','dopr54_c','odeint']:
+        for indx in [[0,1,2,3,4,5],[0,1,2,3,4],[0,1,2,5]]:
+            os= Orbits(vxvv[:,indx])
+            os.integrate(times,MWPotential,method=method)
+            orbs= os.getOrbit()
+            assert orbs.shape == (3,len(times),len(indx)), \
+                'Orbits.getOrbit does not return an array of the expected shape'
+            for ii in range(len(os)):
+                o= Orbit(vxvv[ii,indx])
+                o.integrate(times,MWPotential,method=method)
+                assert numpy.all(numpy.fabs(o.getOrbit()-orbs[ii]) < 10.**-10.), \
+                    'Orbits.integrate does not agree with Orbit.integrate for method %s and dim %i' % (method,len(indx))
+                assert numpy.all(numpy.fabs(os[ii].R(times)-orbs[ii,:,0]) < 10.**-10.), \
+                    'Orbit returned by Orbits.__getitem__ does not hold the integrated orbit'
+    return None
+
+# Test that integrating orbits in blocks and streaming them to a file or a
+# callback gives the same result as integrating them in memory
+def test_orbits_integrate_out():
+    import os as pyos
+    import tempfile
+    from galpy.orbit import Orbits
+    from galpy.potential import MWPotential
+    vxvv= numpy.array([[1.,0.1,1.1,0.1,0.02,0.5],
+                       [0.9,-0.1,0.9,0.2,-0.1,2.5],
+                       [1.2,0.3,0.8,-0.1,0.1,4.]])
+    times= numpy.linspace(0.,10.,201)
+    #Restarting the integration at the end of each block causes small
+    #differences at the level of the integration error
+    for method in ['symplec4_c','dopr54_c','leapfrog']:
+        for indx in [[0,1,2,3,4,5],[0,1,2,5]]:
+            os= Orbits(vxvv[:,indx])
+            os.integrate(times,MWPotential,method=method)
+            orbs= os.getOrbit()
+            #Blocks in memory
+            os.integrate(times,MWPotential,method=method,
+                         nobj_block=2,nt_block=47,output_every=3)
+            assert numpy.all(numpy.fabs(os.getOrbit()-orbs[:,::3]) < 10.**-5.), \
+                'Orbits integrated in blocks do not agree with those integrated at once for method %s' % method
+            assert numpy.all(os.t == times[::3]), \
+                'Output times are not those expected'
+            #To a memory-mapped file
+            tmp_savefile= tempfile.mktemp(suffix='.npy')
+            try:
+                os.integrate(times,MWPotential,method=method,
+                             out=tmp_savefile,nobj_block=2,nt_block=47,
+                             output_every=3)
+                assert isinstance(os.getOrbit(),numpy.memmap), \
+                    'Orbits integrated to a file are not memory-mapped'
+                assert numpy.all(numpy.fabs(os.getOrbit()-orbs[:,::3]) < 10.**-5.), \
+                    'Orbits integrated to a file do not agree with those integrated at once for method %s' % method
+                assert numpy.all(numpy.fabs(os[1].R(times[::3])-orbs[1,::3,0]) < 10.**-5.), \
+                    'Orbit returned by Orbits.__getitem__ does not hold the memory-mapped orbit'
+                assert numpy.all(numpy.fabs(numpy.load(tmp_savefile)-orbs[:,::3]) < 10.**-5.), \
+                    'Orbits written to a file do not agree with those integrated at once'
+                del os
+            finally:
+                pyos.remove(tmp_savefile)
+            #To a callback
+            stored= numpy.zeros_like(orbs[:,::3])+numpy.nan
+            def store(objslice,tindx,orbit):
+                stored[objslice,tindx]= orbit
+            os= Orbits(vxvv[:,indx])
+            os.integrate(times,MWPotential,method=method,out=store,
+                         nobj_block=2,nt_block=47,output_every=3)
+            assert numpy.all(numpy.fabs(stored-orbs[:,::3]) < 10.**-5.), \
+                'Orbits streamed to a callback do not agree with those integrated at once for method %s' % method
+            try: os.getOrbit()
+            except AttributeError: pass
+            else: raise AssertionError('Orbits streamed to a callback are stored')
+    return None
+
+# Test that storing orbits every few steps and in single precision gives the
+# same result as storing them at every step in double precision
+def test_orbits_integrate_output_every_float32():
+    from galpy.orbit import Orbits
+    from galpy.potential import MWPotential
+    vxvv= numpy.array([[1.,0.1,1.1,0.1,0.02,0.5],
+                       [0.9,-0.1,0.9,0.2,-0.1,2.5],
+                       [1.2,0.3,0.8,-0.1,0.1,4.]])
+    times= numpy.linspace(0.,10.,201)
+    for method in ['symplec4_c','dopr54_c','odeint']:
+        for indx in [[0,1,2,3,4,5],[0,1,2,3,4],[0,1,2,5]]:
+            os= Orbits(vxvv[:,indx])
+            os.integrate(times,MWPotential,method=method)
+            orbs= os.getOrbit()
+            os.integrate(times,MWPotential,method=method,output_every=7)
+            assert numpy.all(numpy.fabs(os.getOrbit()-orbs[:,::7]) < 10.**-10.), \
+                'Orbits output every 7 steps do not agree with those output at every step for method %s' % method
+            assert numpy.all(os.t == times[::7]), \
+                'Output times are not those expected'
+            os.integrate(times,MWPotential,method=method,output_every=5,
+                         float32=True)
+            assert os.getOrbit().dtype == numpy.float32, \
+                'Orbits stored in single precision are not float32'
+            #Only the storage is in single precision, so all phase-space
+            #coordinates should agree to within float32 rounding
+            tol= numpy.finfo(numpy.float32).eps*numpy.fabs(orbs[:,::5])\
+                +10.**-10.
+            for ii in range(len(indx)):
+                assert numpy.all(numpy.fabs(os.getOrbit()[:,:,ii]-orbs[:,::5,ii]) <= tol[:,:,ii]), \
+                    'Orbits stored in single precision do not agree with those in double precision to within float32 rounding for method %s and phase-space coordinate %i' % (method,ii)
+            assert numpy.fabs(os[1].R(times[10])-orbs[1,10,0]) < 10.**-5., \
+                'Orbit returned by Orbits.__getitem__ does not hold the single-precision orbit'
+    return None
+
+def test_orbits_nthreads():
+    from galpy.orbit import Orbits
+    from galpy.potential import MWPotential
+    numpy.random.seed(1)
+    nobj= 20
+    vxvv= numpy.array([1.+0.1*numpy.random.normal(size=nobj),
+                       0.1*numpy.random.normal(size=nobj),
+                       1.+0.1*numpy.random.normal(size=nobj),
+                       0.1*numpy.random.normal(size=nobj),
+                       0.1*numpy.random.normal(size=nobj),
+                       numpy.random.uniform(size=nobj)*2.*numpy.pi]).T
+    times= numpy.linspace(0.,10.,201)
+    for method in ['symplec4_c','dopr54_c']:
+        os= Orbits(vxvv)
+        os.integrate(times,MWPotential,method=method,nthreads=1)
+        orbs1= os.getOrbit()
+        os.integrate(times,MWPotential,method=method,nthreads=4)
+        assert numpy.all(numpy.fabs(os.getOrbit()-orbs1) < 10.**-14.), \
+            'Orbits.integrate with multiple threads does not agree with a single thread for method %s' % method
+    return None
+
+def test_orbits_badinput():
+    from galpy.orbit import Orbits
+    try:
+        Orbits(numpy.array([1.,0.1,1.1,0.1,0.02,0.5]))
+    except ValueError: pass
+    else: raise AssertionError('Orbits with 1D input did not raise ValueError')
+    try:
+        Orbits(numpy.array([[1.,0.1,1.1]]))
+    except ValueError: pass
+    else: raise AssertionError('Orbits with 3D phase-space input did not raise ValueError')
+    return None
+
+# Test that orbits integrated in a compiledPotential agree with those in the
+# original potential
+def test_compiledPotential_integrate():
+    from galpy.orbit import Orbit
+    from galpy.potential import MWPotential, compiledPotential
+    cp= compiledPotential(MWPotential)
+    times= numpy.linspace(0.,10.,101)
+    for vxvv in [[1.,0.1,1.1,0.1,0.02,0.5],[1.,0.1,1.1,0.1,0.02],
+                 [1.,0.1,1.1,0.5]]:
+        for method in ['leapfrog','symplec4_c','dopr54_c']:
+            o= Orbit(vxvv)
+            o.integrate(times,MWPotential,method=method)
+            oc= Orbit(vxvv)
+            oc.integrate(times,cp,method=method)
+            assert numpy.all(numpy.fabs(o.getOrbit()-oc.getOrbit()) < 10.**-10.), \
+                'Orbit integrated in compiledPotential does not agree with that in the original potential for method %s' % method
+            #Integrate again to re-use the compiled potential
+            oc.integrate(times,cp,method=method)
+            assert numpy.all(numpy.fabs(o.getOrbit()-oc.getOrbit()) < 10.**-10.), \
+                'Orbit integrated in compiledPotential does not agree with that in the original potential for method %s' % method
+    #Each thread should use its own C structures
+    import threading
+    o= Orbit([1.,0.1,1.1,0.1,0.02,0.5])
+    o.integrate(times,MWPotential,method='dopr54_c')
+    ocs= [Orbit([1.,0.1,1.1,0.1,0.02,0.5]) for ii in range(4)]
+    threads= [threading.Thread(target=oc.integrate,args=(times,cp),
+                               kwargs={'method':'dopr54_c'}) for oc in ocs]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    for oc in ocs:
+        assert numpy.all(numpy.fabs(o.getOrbit()-oc.getOrbit()) < 10.**-10.), \
+            'Orbit integrated in compiledPotential in a separate thread does not agree with that in the original potential'
+    assert len([key for key in cp._c_handles if key[0] == 'full']) > 1, \
+        'compiledPotential does not set up separate C structures for different threads'
+    return None
+
+# Test that the dense output of the dopr54_c integrator agrees with a
+# finely-sampled integration
+def test_integrate_dense():
+    from galpy.orbit import Orbit
+    from galpy.potential import MWPotential
+    ts= numpy.linspace(0.,10.,1001)
+    for vxvv in [[1.,0.1,1.1,0.1,0.02,0.5],[1.,0.1,1.1,0.1,0.02],
+                 [1.,0.1,1.1,0.5]]:
+        o= Orbit(vxvv)
+        o.integrate(ts,MWPotential,method='dopr54_c')
+        od= Orbit(vxvv)
+        od.integrate([0.,10.],MWPotential,method='dopr54_c',dense=True)
+        assert numpy.all(numpy.fabs(od.R(ts)-o.R(ts)) < 10.**-6.), \
+            'Dense output does not agree with finely-sampled orbit integration'
+        assert numpy.all(numpy.fabs(od.vT(ts)-o.vT(ts)) < 10.**-6.), \
+            'Dense output does not agree with finely-sampled orbit integration'
+        if len(vxvv) != 5:
+            assert numpy.all(numpy.fabs(numpy.sin(od.phi(ts)-o.phi(ts))) < 10.**-6.), \
+                'Dense output does not agree with finely-sampled orbit integration'
+        assert numpy.fabs(od.R(3.3)-o.R(3.3)) < 10.**-6., \
+            'Dense output does not agree with finely-sampled orbit integration'
+        try: od.R(11.)
+        except LookupError: pass
+        else: raise AssertionError('Dense output outside of the integrated range did not raise LookupError')
+        #The orbit is not stored, but evaluated from the dense output
+        assert not 'orbit' in od._orb.__dict__, 'Orbit integrated with dense output stores the orbit'
+        assert numpy.all(numpy.fabs(od.getOrbit()[:,0]-od.R([0.,10.])) < 10.**-10.), 'getOrbit for an orbit integrated with dense output does not return the orbit at the integration times'
+        od.integrate(ts,MWPotential,method='dopr54_c')
+        assert numpy.all(numpy.fabs(od.getOrbit()-o.getOrbit()) < 10.**-10.), 'Orbit integrated without dense output after one with dense output does not return the new orbit'
+        #Backward integration
+        odb= Orbit(vxvv)
+        odb.integrate([0.,-10.],MWPotential,method='dopr54_c',dense=True)
+        ob= Orbit(vxvv)
+        ob.integrate(-ts,MWPotential,method='dopr54_c')
+        assert numpy.all(numpy.fabs(odb.R(-ts)-ob.getOrbit()[:,0]) < 10.**-6.), \
+            'Dense output does not agree with finely-sampled orbit integration for backward integration'
+    #Only dopr54_c supports dense output
+    o= Orbit([1.,0.1,1.1,0.1,0.02,0.5])
+    try: o.integrate(ts,MWPotential,method='leapfrog',dense=True)
+    except NotImplementedError: pass
+    else: raise AssertionError('Dense output with method other than dopr54_c did not raise NotImplementedError')
+    return None
+
+# Test that events located during the integration are accurate and that
+# rap, rperi, and zmax use them
+def test_integrate_events():
+    from galpy.orbit import Orbit
+    from galpy.potential import MWPotential
+    times= numpy.linspace(0.,100.,101)
+    for vxvv in [[1.,0.1,1.1,0.1,0.02,0.5],[1.,0.1,1.1,0.1,0.02]]:
+        o= Orbit(vxvv)
+        o.integrate(times,MWPotential,method='dopr54_c',
+                    events=['pericenter','apocenter','zcross','zmax'])
+        of= Orbit(vxvv)
+        of.integrate(numpy.linspace(0.,100.,100001),MWPotential,
+                     method='dopr54_c')
+        assert numpy.fabs(o.rperi()-of.rperi()) < 10.**-6., \
+            'rperi computed using events does not agree with that from a finely-sampled orbit'
+        assert numpy.fabs(o.rap()-of.rap()) < 10.**-6., \
+            'rap computed using events does not agree with that from a finely-sampled orbit'
+        assert numpy.fabs(o.zmax()-of.zmax()) < 10.**-6., \
+            'zmax computed using events does not agree with that from a finely-sampled orbit'
+        assert numpy.fabs(o.e()-of.e()) < 10.**-6., \
+            'e computed using events does not agree with that from a finely-sampled orbit'
+        #Check the state at the events
+        t,vxvvs= o.getEvents('pericenter')
+        assert len(t) > 10, 'Not all pericenters were found'
+        assert numpy.all(numpy.fabs(vxvvs[:,0]*vxvvs[:,1]+vxvvs[:,3]*vxvvs[:,4]) < 10.**-10.), \
+            'Radial velocity is not zero at pericenter'
+        assert numpy.all(numpy.diff(t) > 0.), 'Events are not sorted in time'
+        t,vxvvs= o.getEvents('zcross')
+        assert numpy.all(numpy.fabs(vxvvs[:,3]) < 10.**-10.), \
+            'z is not zero at disk crossing'
+        assert numpy.all(numpy.fabs(vxvvs[:,0]-of.R(t)) < 10.**-6.), \
+            'R at disk crossing does not agree with that of the orbit'
+        t,vxvvs= o.getEvents('zmax')
+        assert numpy.all(numpy.fabs(vxvvs[:,4]) < 10.**-10.), \
+            'vz is not zero at zmax'
+    #Planar orbit
+    o= Orbit([1.,0.1,1.1,0.5])
+    o.integrate(times,MWPotential,method='dopr54_c',
+                events=['pericenter','apocenter'])
+    of= Orbit([1.,0.1,1.1,0.5])
+    of.integrate(numpy.linspace(0.,100.,100001),MWPotential,method='dopr54_c')
+    assert numpy.fabs(o.rperi()-of.rperi()) < 10.**-6., \
+        'rperi computed using events does not agree with that from a finely-sampled orbit'
+    assert numpy.fabs(o.rap()-of.rap()) < 10.**-6., \
+        'rap computed using events does not agree with that from a finely-sampled orbit'
+    try: o.integrate(times,MWPotential,method='dopr54_c',events=['zmax'])
+    except ValueError: pass
+    else: raise AssertionError('zmax event for planar orbit did not raise ValueError')
+    #Terminal event
+    o= Orbit([1.,0.1,3.,0.1,0.02,0.5])
+    o.integrate(times,MWPotential,method='dopr54_c',events=[('escape',2.5)])
+    t,vxvvs= o.getEvents('escape')
+    assert len(t) == 1, 'Escape event not found'
+    assert numpy.fabs(numpy.sqrt(vxvvs[0,0]**2.+vxvvs[0,3]**2.)-2.5) < 10.**-10., \
+        'Escape event not located at the escape radius'
+    assert numpy.all(o._orb.t <= t[0]), \
+        'Orbit integration did not stop at terminal event'
+    assert len(o._orb.t) < len(times), \
+        'Orbit integration did not stop at terminal event'
+    #Events require dopr54_c
+    try: o.integrate(times,MWPotential,method='leapfrog',events=['pericenter'])
+    except NotImplementedError: pass
+    else: raise AssertionError('Events with method other than dopr54_c did not raise NotImplementedError')
+    return None
+
+# Test that backward integrations with dense output or terminal events keep all times
+def test_integrate_dense_backward():
+    from galpy.orbit import Orbit
+    from galpy.potential import MWPotential
+    times= numpy.linspace(0.,-10.,101)
+    for vxvv in [[1.,0.1,1.1,0.1,0.02,0.],[1.,0.1,1.1,0.1,0.02],
+                 [1.,0.1,1.1,0.]]:
+        o= Orbit(vxvv)
+        o.integrate(times,MWPotential,method='dopr54_c',dense=True)
+        of= Orbit(vxvv)
+        of.integrate(times,MWPotential,method='dopr54_c')
+        assert o.getOrbit().shape == of.getOrbit().shape, \
+            'Backward integration with dense output does not return the orbit at all times'
+        assert numpy.all(numpy.fabs(o.getOrbit()-of.getOrbit()) < 10.**-6.), \
+            'Backward integration with dense output does not agree with that without dense output'
+    #Terminal event
+    o= Orbit([1.,0.1,3.,0.1,0.02,0.5])
+    o.integrate(times,MWPotential,method='dopr54_c',events=[('escape',2.5)])
+    t,vxvvs= o.getEvents('escape')
+    assert len(t) == 1, 'Escape event not found in backward integration'
+    assert t[0] < 0. and t[0] > times[-1], 'Escape event in backward integration not at a time within the integration range'
+    assert numpy.all(o._orb.t >= t[0]), \
+        'Backward orbit integration did not stop at terminal event'
+    nt= numpy.sum(times >= t[0])
+    assert o.getOrbit().shape == (nt,6), \
+        'Backward orbit integration with a terminal event does not return the orbit at all times before the event'
+    of= Orbit([1.,0.1,3.,0.1,0.02,0.5])
+    of.integrate(times,MWPotential,method='dopr54_c')
+    assert numpy.all(numpy.fabs(o.getOrbit()-of.getOrbit()[:nt]) < 10.**-6.), \
+        'Backward orbit integration with a terminal event does not agree with that without events'
+    return None
+
+def test_integrate_dxdv_full():
+    from galpy.orbit import Orbit, Orbits
+    from galpy.potential import MWPotential
+    times= numpy.linspace(0.,10.,101)
+    vxvv= [1.,0.1,1.1,0.1,0.02,0.5]
+    dxdv= numpy.array([1.,-1.,0.5,0.5,-1.,1.])*10.**-6.
+    #Compare to the difference between two nearby orbits
+    o= Orbit(vxvv)
+    o.integrate(times,MWPotential,method='dopr54_c')
+    od= Orbit(list(numpy.array(vxvv)+dxdv))
+    od.integrate(times,MWPotential,method='dopr54_c')
+    fd= od.getOrbit()-o.getOrbit()
+    for method in ['dopr54_c','rk4_c','rk6_c','odeint']:
+        o.integrate_dxdv(dxdv,times,MWPotential,method=method)
+        assert numpy.all(numpy.fabs(o.getOrbit_dxdv()-fd) < 10.**-9.), \
+            'integrate_dxdv for a FullOrbit does not agree with the difference between two nearby orbits for method %s' % method
+        #Renormalized integration
+        d= o.getOrbit_dxdv()
+        o.integrate_dxdv(dxdv,times,MWPotential,method=method,renorm_every=7)
+        dr, lnnorm= o.getOrbit_dxdv(lnnorm=True)
+        #odeint's absolute tolerance limits the accuracy of the small dxdv
+        if method == 'odeint': tol= 10.**-9.
+        else: tol= 10.**-11.
+        assert numpy.all(numpy.fabs(dr*numpy.exp(lnnorm)[:,None]-d) < tol), \
+            'Renormalized integrate_dxdv for a FullOrbit does not agree with the non-renormalized one for method %s' % method
+    #Mixture of potentials with analytic (MWPotential) and finite-difference
+    #(the time-dependent wrapper) Hessians in C should agree with Python
+    from galpy.potential import MiyamotoNagaiPotential, \
+        TimeDependentWrapperPotential
+    mp= MiyamotoNagaiPotential(a=0.5,b=0.1,normalize=0.2)
+    for pot in [MWPotential+[mp],
+                MWPotential+[TimeDependentWrapperPotential(pot=mp,tform=1.,
+                                                           tsteady=3.)]]:
+        ow= Orbit(vxvv)
+        ow.integrate_dxdv(dxdv,times,pot,method='dopr54_c')
+        dc= ow.getOrbit_dxdv()
+        ow.integrate_dxdv(dxdv,times,pot,method='odeint')
+        assert numpy.all(numpy.fabs(dc-ow.getOrbit_dxdv()) < 10.**-9.), \
+            'integrate_dxdv for a FullOrbit in a mixture of potentials with analytic and numerical second derivatives does not agree between C and Python'
+    #Rectangular input and output
+    o.integrate_dxdv(dxdv,times,MWPotential,method='dopr54_c',rectOut=True)
+    dr= o.getOrbit_dxdv()
+    o.integrate_dxdv(dr[0],times,MWPotential,method='dopr54_c',rectIn=True)
+    assert numpy.all(numpy.fabs(o.getOrbit_dxdv()-fd) < 10.**-9.), \
+        'integrate_dxdv with rectIn does not agree with cylindrical input'
+    #Batched integration
+    vxvvs= numpy.array([vxvv,[0.9,-0.1,0.9,0.2,-0.1,2.5]])
+    os= Orbits(vxvvs)
+    os.integrate_dxdv(numpy.tile(dxdv,(2,1)),times,MWPotential,
+                      method='dopr54_c',renorm_every=7)
+    dr, lnnorm= os.getOrbit_dxdv(lnnorm=True)
+    for ii in range(2):
+        o= Orbit(vxvvs[ii])
+        o.integrate_dxdv(dxdv,times,MWPotential,method='dopr54_c',
+                         renorm_every=7)
+        assert numpy.all(numpy.fabs(dr[ii]-o.getOrbit_dxdv()) < 10.**-12.), \
+            'Orbits.integrate_dxdv does not agree with Orbit.integrate_dxdv'
+        assert numpy.all(numpy.fabs(os.getOrbit()[ii]-o.getOrbit()) < 10.**-12.), \
+            'Orbits.integrate_dxdv does not agree with Orbit.integrate_dxdv'
+    #Radial orbit through the center, where the finite-difference step
+    #cannot scale with r alone
+    from galpy.potential import LogarithmicHaloPotential
+    from galpy.orbit_src.FullOrbit import _EOM_dxdv
+    lp= LogarithmicHaloPotential(normalize=1.,core=0.1)
+    eom= _EOM_dxdv(numpy.array([0.,0.,0.,0.,0.,1.,0.01,0.,0.,0.,0.,0.]),
+                   0.,lp)
+    assert numpy.all(numpy.isfinite(eom[9:])), \
+        'dxdv equations of motion are not finite at the center'
+    d= []
+    for method in ['dopr54_c','odeint']:
+        o= Orbit([1.,-1.,0.,0.,0.,0.])
+        o.integrate_dxdv([0.,0.,0.,0.,0.01,0.],times,lp,method=method,
+                         rectIn=True,rectOut=True)
+        d.append(o.getOrbit_dxdv())
+        assert numpy.all(numpy.isfinite(d[-1])), \
+            'integrate_dxdv for a radial orbit through the center is not finite for method %s' % method
+    assert numpy.all(numpy.fabs(d[0]-d[1]) < 10.**-5.), \
+        'integrate_dxdv for a radial orbit through the center does not agree between C and Python'
+    #Symplectic integrators are not allowed
+    try:
+        o.integrate_dxdv(dxdv,times,MWPotential,method='symplec4_c')
+    except TypeError: pass
+    else: raise AssertionError("integrate_dxdv with symplectic integrator should have raised TypeError, but didn't")
+    #Renormalization is not implemented for planar orbits
+    o= Orbit([1.,0.1,1.1,0.5])
+    try:
+        o.integrate_dxdv(dxdv[:4],times,MWPotential,method='dopr54_c',
+                         renorm_every=7)
+    except NotImplementedError: pass
+    else: raise AssertionError("integrate_dxdv with renorm_every for a planar orbit should have raised NotImplementedError, but didn't")
+    return None
+
 # Check plotting routines
 def test_linear_plotting():
     from galpy.orbit import Orbit
@@ -20,7 +20,9 @@ def test_normalize_potential():
     pots.append('specialPowerSphericalPotential')
     pots.append('specialFlattenedPowerPotential')
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -83,7 +85,9 @@ def test_forceAsDeriv_potential():
     pots.append('mockMovingObjectPotential')
     pots.append('mockMovingObjectExplSoftPotential')
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -215,7 +219,9 @@ def test_2ndDeriv_potential():
     pots.append('mockTransientLogSpiralPotential')
     pots.append('mockFlatEllipticalDiskPotential') #for evaluate w/ nonaxi lists
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -404,7 +410,9 @@ def test_poisson_potential():
     pots.append('testplanarMWPotential')
     pots.append('testlinearMWPotential')
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -485,7 +493,9 @@ def test_evaluateAndDerivs_potential():
     pots.append('mockTransientLogSpiralPotential')
     pots.append('mockMovingObjectPotential')
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -718,7 +728,9 @@ def test_toVertical_toPlanar():
            if ('Potential' in p and not 'plot' in p and not 'RZTo' in p 
                and not 'evaluate' in p)]
     rmpots= ['Potential','MWPotential','MWPotential2014',
-             'MovingObjectPotential',
+             'MovingObjectPotential', 'compiledPotential',
+             'TimeDependentWrapperPotential',
+             'interp3DPotential',
              'interpRZPotential', 'linearPotential', 'planarAxiPotential',
              'planarPotential', 'verticalPotential','PotentialError']
     if False: #_TRAVIS: #travis CI
@@ -1025,6 +1037,101 @@ def test_ExpDisk_special():
     else: raise AssertionError("RazorThinExponentialDiskPotential's R2deriv did not raise AttributeError for z=/= 0 input")
     return None
 
+def test_ExpDisk_batched_tabulated():
+    #Test the batched evaluation and the tabulation of the 
+    #DoubleExponentialDiskPotential
+    dp= potential.DoubleExponentialDiskPotential(normalize=1.,hr=0.3,hz=0.05)
+    rs= numpy.array([0.01,0.2,0.5,0.99,1.,1.5,3.,4.9,5.5,7.])
+    zs= numpy.array([0.,0.01,-0.02,0.1,-0.3,0.5,0.05,-0.05,1.,0.2])
+    #Batched evaluation of points that need different numbers of zeros
+    for func in [dp,dp.Rforce,dp.zforce,dp.R2deriv,dp.z2deriv,dp.Rzderiv]:
+        dpevals= numpy.array([func(r,z) for (r,z) in zip(rs,zs)])
+        assert numpy.all(numpy.fabs(func(rs,zs)-dpevals) < 10.**-10.), \
+            'DoubleExponentialDiskPotential batched evaluation does not agree with the evaluation for individual points'
+    #Tabulated potential and forces, within the estimated errors
+    dpevals= [dp(rs[:8],zs[:8]),dp.Rforce(rs[:8],zs[:8]),
+              dp.zforce(rs[:8],zs[:8])]
+    err= dp.tabulate(rgrid=(numpy.log(0.005),numpy.log(6.),201),
+                     zgrid=(0.,1.,201))
+    for key,func,dpeval in zip(['potential','Rforce','zforce'],
+                               [dp,dp.Rforce,dp.zforce],dpevals):
+        assert err[key] < 10.**-3.*numpy.amax(numpy.fabs(dpeval)), \
+            'DoubleExponentialDiskPotential tabulation error estimate is larger than expected'
+        assert numpy.all(numpy.fabs(func(rs[:8],zs[:8])-dpeval) < 3.*err[key]*numpy.fabs(dp._amp)), \
+            'Tabulated DoubleExponentialDiskPotential does not agree with the direct evaluation within the error estimate'
+    #Evaluation outside of the grid
+    assert numpy.fabs(dp(0.001,0.1)-potential.DoubleExponentialDiskPotential(normalize=1.,hr=0.3,hz=0.05)(0.001,0.1)) < 10.**-10., 'Tabulated DoubleExponentialDiskPotential evaluation outside of the grid does not agree with the direct evaluation'
+    return None
+
+def test_SCFPotential():
+    #Test the SCF expansion: coefficients of a Hernquist density, forces as
+    #derivatives of the potential, Poisson, and C vs. Python
+    hp= potential.HernquistPotential(amp=2.,a=1.5)
+    Acos, Asin= potential.scf_compute_coeffs(hp,5,4,a=1.5)
+    sp= potential.SCFPotential(Acos=Acos,Asin=Asin,a=1.5)
+    assert not sp.isNonAxi, 'SCF expansion of a spherical density is not axisymmetric'
+    rs= numpy.array([0.01,0.5,1.,2.,5.])
+    zs= numpy.array([0.1,-0.3,1.,0.,-2.])
+    for func,hfunc in [(sp,hp),(sp.Rforce,hp.Rforce),(sp.zforce,hp.zforce),
+                       (sp.dens,hp.dens)]:
+        assert numpy.all(numpy.fabs(func(rs,zs)-hfunc(rs,zs)) < 10.**-10.), \
+            'SCF expansion of the Hernquist density does not reproduce the Hernquist potential'
+    #N-body expansion of a sampled Hernquist profile
+    numpy.random.seed(1)
+    nsamples= 100000
+    mr= numpy.random.uniform(size=nsamples)
+    r= 1.5*numpy.sqrt(mr)/(1.-numpy.sqrt(mr))
+    costheta= numpy.random.uniform(-1.,1.,size=nsamples)
+    phi= numpy.random.uniform(0.,2.*numpy.pi,size=nsamples)
+    Acos, Asin= potential.scf_compute_coeffs_nbody(r*numpy.sqrt(1.-costheta**2.),
+                                                   r*costheta,phi,
+                                                   1./nsamples,5,4,a=1.5)
+    assert numpy.fabs(Acos[0,0,0]-numpy.sqrt(4.*numpy.pi)) < 10.**-2., 'N-body SCF expansion of a Hernquist profile does not give the expected leading coefficient'
+    assert numpy.all(numpy.fabs(Acos[1:,0,0]) < 10.**-2.), 'N-body SCF expansion of a Hernquist profile does not give the expected radial coefficients'
+    #Non-axisymmetric expansion
+    Acos= numpy.random.normal(size=(4,5,5))*0.05
+    Asin= numpy.random.normal(size=(4,5,5))*0.05
+    Acos[0,0,0]= 3.
+    sp= potential.SCFPotential(Acos=Acos,Asin=Asin,a=0.8)
+    assert sp.isNonAxi, 'Non-axisymmetric SCF expansion is not recognized as such'
+    dx= 10.**-6.
+    for R,z,phi in [(0.7,0.3,0.4),(1.5,-0.8,2.),(0.2,1.1,-1.)]:
+        assert numpy.fabs((sp(R+dx,z,phi=phi)-sp(R-dx,z,phi=phi))/2./dx
+                          +sp.Rforce(R,z,phi=phi)) < 10.**-8., 'Radial force of SCFPotential is not the derivative of its potential'
+        assert numpy.fabs((sp(R,z+dx,phi=phi)-sp(R,z-dx,phi=phi))/2./dx
+                          +sp.zforce(R,z,phi=phi)) < 10.**-8., 'Vertical force of SCFPotential is not the derivative of its potential'
+        assert numpy.fabs((sp(R,z,phi=phi+dx)-sp(R,z,phi=phi-dx))/2./dx
+                          +sp.phiforce(R,z,phi=phi)) < 10.**-8., 'Azimuthal force of SCFPotential is not the derivative of its potential'
+        dx2= 10.**-3.
+        lap= (sp(R+dx2,z,phi=phi)-2.*sp(R,z,phi=phi)+sp(R-dx2,z,phi=phi))/dx2**2.\
+            +(sp(R+dx2,z,phi=phi)-sp(R-dx2,z,phi=phi))/2./dx2/R\
+            +(sp(R,z+dx2,phi=phi)-2.*sp(R,z,phi=phi)+sp(R,z-dx2,phi=phi))/dx2**2.\
+            +(sp(R,z,phi=phi+dx2)-2.*sp(R,z,phi=phi)+sp(R,z,phi=phi-dx2))/dx2**2./R**2.
+        assert numpy.fabs(lap/4./numpy.pi-sp.dens(R,z,phi=phi)) < 10.**-5., 'Poisson equation is not satisfied for SCFPotential'
+    #Coefficients of the density of an SCF expansion are the input coefficients
+    tAcos, tAsin= potential.scf_compute_coeffs(sp,4,5,a=0.8)
+    assert numpy.all(numpy.fabs(tAcos-sp._Acos) < 10.**-10.) \
+        and numpy.all(numpy.fabs(tAsin-sp._Asin) < 10.**-10.), 'SCF expansion of the density of an SCFPotential does not return its coefficients'
+    #Batched C evaluation
+    Rs= numpy.random.uniform(0.1,2.,size=20)
+    zs= numpy.random.uniform(-1.,1.,size=20)
+    phis= numpy.random.uniform(0.,2.*numpy.pi,size=20)
+    for cfunc,pyfunc in [(potential.evaluatePotentials,sp._evaluate),
+                         (potential.evaluateRforces,sp._Rforce),
+                         (potential.evaluatezforces,sp._zforce),
+                         (potential.evaluatephiforces,sp._phiforce)]:
+        assert numpy.all(numpy.fabs(cfunc(Rs,zs,sp,phi=phis)-pyfunc(Rs,zs,phi=phis)) < 10.**-10.), 'Batched C evaluation of SCFPotential does not agree with the Python evaluation'
+    #C and Python orbit integration should agree
+    from galpy.orbit import Orbit
+    times= numpy.linspace(0.,20.,1001)
+    o= Orbit([1.,0.1,1.1,0.05,0.02,0.3])
+    o.integrate(times,sp,method='dopr54_c')
+    oo= Orbit([1.,0.1,1.1,0.05,0.02,0.3])
+    oo.integrate(times,sp,method='odeint')
+    for xfunc in ['x','y','z','vx','vy','vz']:
+        assert numpy.all(numpy.fabs(getattr(o,xfunc)(times)-getattr(oo,xfunc)(times)) < 10.**-5.), 'C and Python orbit integration in SCFPotential do not agree'
+    return None
+
 def test_MovingObject_density():
     mp= mockMovingObjectPotential()
     #Just test that the density far away from the object is close to zero
@@ -1095,6 +1202,293 @@ def test_mvir_attributeerror():
     else: raise AssertionError('mvir function for potential w/o rvir did not raise AttributeError')
     return None
 
+def test_compiledPotential_evaluate():
+    #Test that a compiledPotential evaluates to the same as the original
+    from galpy.potential import MWPotential, compiledPotential
+    cp= compiledPotential(MWPotential)
+    Rs= numpy.linspace(0.1,2.,11)
+    zs= numpy.linspace(-0.5,0.5,11)
+    for R,z in zip(Rs,zs):
+        for func in [potential.evaluatePotentials,potential.evaluateRforces,
+                     potential.evaluatezforces,potential.evaluateDensities,
+                     potential.evaluateR2derivs,potential.evaluatez2derivs,
+                     potential.evaluateRzderivs]:
+            assert numpy.fabs(func(R,z,MWPotential)-func(R,z,cp)) < 10.**-10., 'compiledPotential does not agree with the original potential for %s' % func.__name__
+    #Bad input
+    try: compiledPotential([MWPotential[0],'a'])
+    except potential.PotentialError: pass
+    else: raise AssertionError('compiledPotential with non-Potential input did not raise PotentialError')
+    return None
+
+def test_evaluate_c_array():
+    #Test that the batched C evaluation for array input agrees with the 
+    #Python evaluation
+    from galpy.potential_src.Potential import _check_c_eval
+    pots= [potential.MWPotential,
+           potential.LogarithmicHaloPotential(normalize=1.,q=0.9),
+           potential.MiyamotoNagaiPotential(normalize=1.),
+           potential.PowerSphericalPotential(normalize=1.),
+           potential.HernquistPotential(normalize=1.),
+           potential.NFWPotential(normalize=1.),
+           potential.JaffePotential(normalize=1.),
+           potential.FlattenedPowerPotential(normalize=1.,q=0.8),
+           potential.IsochronePotential(normalize=1.),
+           potential.PowerSphericalPotentialwCutoff(normalize=1.),
+           potential.BurkertPotential(normalize=1.),
+           potential.RazorThinExponentialDiskPotential(normalize=1.),
+           potential.compiledPotential(potential.MWPotential)]
+    Rs= numpy.linspace(0.1,2.,11)
+    zs= numpy.linspace(-0.5,0.5,11)
+    for pot in pots:
+        assert _check_c_eval(pot,Rs,zs), 'Batched C evaluation not used for array input for potential %s' % pot
+        for func in [potential.evaluatePotentials,potential.evaluateRforces,
+                     potential.evaluatezforces,potential.evaluatephiforces]:
+            cout= func(Rs,zs,pot)
+            pyout= numpy.array([func(R,z,pot) for R,z in zip(Rs,zs)])
+            assert numpy.all(numpy.fabs(cout-pyout) < 10.**-10.), 'Batched C evaluation of %s does not agree with the Python evaluation for potential %s' % (func.__name__,pot)
+    #Broadcasting of array and scalar input
+    assert numpy.all(numpy.fabs(potential.evaluateRforces(1.,zs,potential.MWPotential)-numpy.array([potential.evaluateRforces(1.,z,potential.MWPotential) for z in zs])) < 10.**-10.), 'Batched C evaluation does not broadcast scalar and array input correctly'
+    assert potential.evaluatezforces(numpy.ones((3,2)),0.1,potential.MWPotential).shape == (3,2), 'Batched C evaluation does not return the shape of the input'
+    #Scalar input and potentials without C do not use the batched C code
+    assert not _check_c_eval(potential.MWPotential,1.,0.), 'Batched C evaluation used for scalar input'
+    assert not _check_c_eval(potential.TwoPowerSphericalPotential(alpha=1.5,beta=3.5),Rs,zs), 'Batched C evaluation used for potential without C implementation'
+    return None
+
+def test_c_potentials_moving_cosmphi():
+    #Test that the C implementations of MovingObjectPotential and 
+    #CosmphiDiskPotential agree with the Python implementations
+    from galpy.orbit import Orbit
+    lp= potential.LogarithmicHaloPotential(normalize=1.)
+    ts= numpy.linspace(0.,10.,501)
+    oc= Orbit([1.2,0.,1.,0.1,0.,0.])
+    oc.integrate(ts,lp)
+    mp= potential.MovingObjectPotential(oc,GM=0.01,softening_length=0.05)
+    assert mp.hasC, 'MovingObjectPotential with Plummer softening does not have a C implementation'
+    Rs= numpy.array([0.5,1.,2.,1.2])
+    zs= numpy.array([0.,0.2,-0.5,0.1])
+    phis= numpy.array([0.,1.,2.,3.])
+    tts= numpy.array([0.,0.33,5.5,9.9])
+    for func in [potential.evaluatePotentials,potential.evaluateRforces,
+                 potential.evaluatezforces,potential.evaluatephiforces]:
+        cout= func(Rs,zs,mp,phi=phis,t=tts)
+        pyout= numpy.array([func(R,z,mp,phi=phi,t=t) 
+                            for R,z,phi,t in zip(Rs,zs,phis,tts)])
+        assert numpy.all(numpy.fabs(cout-pyout) < 10.**-8.), 'Batched C evaluation of %s does not agree with the Python evaluation for MovingObjectPotential' % func.__name__
+    o= Orbit([1.,0.1,1.1,0.05,0.02,0.3])
+    o.integrate(ts,[lp,mp],method='dopr54_c')
+    oo= Orbit([1.,0.1,1.1,0.05,0.02,0.3])
+    oo.integrate(ts,[lp,mp],method='odeint')
+    assert numpy.all(numpy.fabs(o.x(ts)-oo.x(ts)) < 10.**-4.), 'C orbit integration in MovingObjectPotential does not agree with Python orbit integration'
+    cp= potential.CosmphiDiskPotential(m=3.,phio=0.01,p=-1.,
+                                       tform=-5.,tsteady=2.)
+    assert cp.hasC, 'CosmphiDiskPotential does not have a C implementation'
+    o= Orbit([1.,0.1,1.1,0.3])
+    o.integrate_dxdv([1.,0.,0.,0.],ts,[lp,cp],method='dopr54_c')
+    oo= Orbit([1.,0.1,1.1,0.3])
+    oo.integrate_dxdv([1.,0.,0.,0.],ts,[lp,cp],method='odeint')
+    assert numpy.all(numpy.fabs(o.x(ts)-oo.x(ts)) < 10.**-4.), 'C orbit integration in CosmphiDiskPotential does not agree with Python orbit integration'
+    assert numpy.all(numpy.fabs(o.getOrbit_dxdv()-oo.getOrbit_dxdv()) < 10.**-4.), 'C phase-space volume integration in CosmphiDiskPotential does not agree with Python integration'
+    return None
+
+def test_evaluate_c_secondderivs():
+    #Test that the C second derivatives agree with finite differences of the
+    #Python forces and that array input uses the batched C evaluation
+    from galpy.orbit import Orbit
+    from galpy.potential_src.interpRZPotential import eval_potential_batch_c
+    from galpy.potential_src.Potential import _check_c_eval
+    lp= potential.LogarithmicHaloPotential(normalize=1.)
+    ts= numpy.linspace(0.,10.,501)
+    oc= Orbit([1.2,0.,1.,0.1,0.,0.])
+    oc.integrate(ts,lp)
+    Acos= numpy.zeros((2,3,3))
+    Acos[0,0,0]= 1.
+    Acos[0,2,2]= 0.3
+    Acos[1,2,2]= 0.1
+    pots= [potential.LogarithmicHaloPotential(normalize=1.,q=0.9,core=0.1),
+           potential.MiyamotoNagaiPotential(normalize=1.),
+           potential.PowerSphericalPotential(normalize=1.),
+           potential.HernquistPotential(normalize=1.),
+           potential.NFWPotential(normalize=1.),
+           potential.JaffePotential(normalize=1.),
+           potential.FlattenedPowerPotential(normalize=1.,q=0.8),
+           potential.FlattenedPowerPotential(normalize=1.,alpha=0.,q=0.8,
+                                             core=0.1),
+           potential.IsochronePotential(normalize=1.),
+           potential.PowerSphericalPotentialwCutoff(normalize=1.),
+           potential.BurkertPotential(normalize=1.),
+           potential.RazorThinExponentialDiskPotential(normalize=1.),
+           potential.SCFPotential(amp=0.2,Acos=Acos,a=0.5),
+           potential.MovingObjectPotential(oc,GM=0.01,softening_length=0.05),
+           potential.TimeDependentWrapperPotential(\
+            pot=potential.SCFPotential(amp=0.2,Acos=Acos,a=0.5),
+            tform=1.,tsteady=2.,omegab=1.3)]
+    Rs= numpy.array([0.3,0.9,1.4,2.3,7.])
+    zs= numpy.array([0.1,-0.2,0.35,-0.05,0.4])
+    phis= numpy.array([0.1,1.2,2.,-0.5,3.])
+    tts= numpy.array([0.,0.33,5.5,9.9,3.])
+    dx= 10.**-6.
+    for pot in pots:
+        #Python potentials do not all take array input
+        fd= lambda f,dR,dz,dphi: -numpy.array([f(R+dR,z+dz,phi=phi+dphi,t=t)
+                                               -f(R-dR,z-dz,phi=phi-dphi,t=t)
+                                               for R,z,phi,t
+                                               in zip(Rs,zs,phis,tts)])/2./dx
+        fdout= {'R2deriv':fd(pot.Rforce,dx,0.,0.),
+                'z2deriv':fd(pot.zforce,0.,dx,0.),
+                'Rzderiv':fd(pot.Rforce,0.,dx,0.),
+                'phi2deriv':fd(pot.phiforce,0.,0.,dx),
+                'Rphideriv':fd(pot.Rforce,0.,0.,dx)}
+        for quantity in fdout:
+            cout= eval_potential_batch_c(pot,Rs,zs,phis,tts,
+                                         quantity=quantity)[0]
+            assert numpy.all(numpy.fabs(cout-fdout[quantity]) < 10.**-6.), 'C %s does not agree with the finite difference of the Python forces for potential %s' % (quantity,pot)
+    #Array input uses the batched C evaluation
+    for func in [potential.evaluateR2derivs,potential.evaluatez2derivs,
+                 potential.evaluateRzderivs]:
+        cout= func(Rs,zs,potential.MWPotential2014)
+        pyout= numpy.array([func(R,z,potential.MWPotential2014) 
+                            for R,z in zip(Rs,zs)])
+        assert numpy.all(numpy.fabs(cout-pyout) < 10.**-10.), 'Batched C evaluation of %s does not agree with the Python evaluation' % func.__name__
+    #The Python and C DoubleExponentialDisk use different quadratures, so
+    #array input is evaluated in Python and agrees with scalar input
+    dp= potential.DoubleExponentialDiskPotential(normalize=1.)
+    assert not _check_c_eval(dp,Rs,zs), 'Batched C evaluation used for DoubleExponentialDiskPotential'
+    for func in [potential.evaluatePotentials,potential.evaluateRforces,
+                 potential.evaluatezforces,potential.evaluateR2derivs,
+                 potential.evaluatez2derivs,potential.evaluateRzderivs]:
+        aout= func(Rs,zs,dp)
+        pyout= numpy.array([func(R,z,dp) for R,z in zip(Rs,zs)])
+        assert numpy.all(numpy.fabs(aout-pyout) < 10.**-10.), 'Array evaluation of %s does not agree with the scalar evaluation for DoubleExponentialDiskPotential' % func.__name__
+    #Phase-space volume integration, differences between the quadratures 
+    #grow along the orbit
+    ts= ts[:251]
+    o= Orbit([1.,0.1,1.1,0.3])
+    o.integrate_dxdv([1.,0.,0.,0.],ts,[lp,dp],method='dopr54_c')
+    oo= Orbit([1.,0.1,1.1,0.3])
+    oo.integrate_dxdv([1.,0.,0.,0.],ts,[lp,dp],method='odeint')
+    assert numpy.all(numpy.fabs(o.getOrbit_dxdv()-oo.getOrbit_dxdv()) < 5.*10.**-2.), 'C phase-space volume integration in DoubleExponentialDiskPotential does not agree with Python integration'
+    return None
+
+def test_TimeDependentWrapperPotential():
+    #Test that the wrapper grows and rotates the wrapped potentials and that
+    #its C implementation agrees with the Python implementation
+    from galpy.orbit import Orbit
+    Acos= numpy.zeros((2,3,3))
+    Acos[0,0,0]= 1.
+    Acos[0,2,2]= 0.3
+    Acos[1,2,2]= 0.1
+    sp= potential.SCFPotential(amp=0.2,Acos=Acos,a=0.5)
+    mp= potential.MiyamotoNagaiPotential(amp=0.1,a=0.5,b=0.1)
+    wp= potential.TimeDependentWrapperPotential(amp=0.8,pot=[sp,mp],tform=1.,
+                                                tsteady=2.,omegab=1.3,pa=0.2)
+    assert wp.isNonAxi, 'TimeDependentWrapperPotential of a non-axisymmetric potential is not recognized as such'
+    assert wp.hasC, 'TimeDependentWrapperPotential of C potentials does not have a C implementation'
+    assert numpy.fabs(wp(1.,0.1,phi=0.5,t=0.5)) < 10.**-14., 'TimeDependentWrapperPotential is not zero before tform'
+    assert numpy.fabs(wp(1.,0.1,phi=0.5,t=4.)
+                      -0.8*potential.evaluatePotentials(1.,0.1,[sp,mp],
+                                                        phi=0.5-1.3*4.-0.2)) < 10.**-14., 'TimeDependentWrapperPotential is not the rotated wrapped potential after it has fully grown'
+    try: potential.TimeDependentWrapperPotential(pot=1.)
+    except potential.PotentialError: pass
+    else: raise AssertionError('TimeDependentWrapperPotential of a non-Potential did not raise PotentialError')
+    #Batched C evaluation
+    Rs= numpy.array([0.5,1.,2.,1.2,0.8])
+    zs= numpy.array([0.,0.2,-0.5,0.1,0.3])
+    phis= numpy.array([0.,1.,2.,3.,4.])
+    tts= numpy.array([0.,1.5,2.5,9.9,3.])
+    for func in [potential.evaluatePotentials,potential.evaluateRforces,
+                 potential.evaluatezforces,potential.evaluatephiforces]:
+        cout= func(Rs,zs,wp,phi=phis,t=tts)
+        pyout= numpy.array([func(R,z,wp,phi=phi,t=t) 
+                            for R,z,phi,t in zip(Rs,zs,phis,tts)])
+        assert numpy.all(numpy.fabs(cout-pyout) < 10.**-10.), 'Batched C evaluation of %s does not agree with the Python evaluation for TimeDependentWrapperPotential' % func.__name__
+    #Orbit integration
+    lp= potential.LogarithmicHaloPotential(normalize=1.)
+    ts= numpy.linspace(0.,10.,501)
+    o= Orbit([1.,0.1,1.1,0.05,0.02,0.3])
+    o.integrate(ts,[lp,wp],method='dopr54_c')
+    oo= Orbit([1.,0.1,1.1,0.05,0.02,0.3])
+    oo.integrate(ts,[lp,wp],method='odeint')
+    assert numpy.all(numpy.fabs(o.x(ts)-oo.x(ts)) < 10.**-4.), 'C orbit integration in TimeDependentWrapperPotential does not agree with Python orbit integration'
+    wp= potential.TimeDependentWrapperPotential(pot=mp,tform=1.,tsteady=2.)
+    o= Orbit([1.,0.1,1.1,0.3])
+    o.integrate_dxdv([1.,0.,0.,0.],ts,[lp,wp],method='dopr54_c')
+    oo= Orbit([1.,0.1,1.1,0.3])
+    oo.integrate_dxdv([1.,0.,0.,0.],ts,[lp,wp],method='odeint')
+    assert numpy.all(numpy.fabs(o.x(ts)-oo.x(ts)) < 10.**-4.), 'C planar orbit integration in TimeDependentWrapperPotential does not agree with Python orbit integration'
+    assert numpy.all(numpy.fabs(o.getOrbit_dxdv()-oo.getOrbit_dxdv()) < 10.**-4.), 'C phase-space volume integration in TimeDependentWrapperPotential does not agree with Python integration'
+    return None
+
+def test_cacheProfiles():
+    #Test that the cached profiles agree with the direct calculation
+    pots= [potential.NFWPotential(normalize=1.),
+           potential.BurkertPotential(normalize=1.),
+           potential.MiyamotoNagaiPotential(normalize=1.)]
+    Rs= numpy.linspace(0.05,15.,7)
+    for pot in pots:
+        direct= {}
+        for quantity in ['vcirc','omegac','epifreq','verticalfreq','rl']:
+            direct[quantity]= numpy.array([getattr(pot,quantity)(R) 
+                                           for R in Rs])
+        direct['mass']= numpy.array([pot.mass(R) for R in Rs[:3]])
+        lr= potential.lindbladR(pot,0.5,m='corotation')
+        vt= pot.vterm(30.)
+        pot.cacheProfiles()
+        for quantity in direct:
+            cached= getattr(pot,quantity)(Rs[:len(direct[quantity])])
+            assert numpy.all(numpy.fabs(cached/direct[quantity]-1.) < 10.**-7.), 'Cached %s does not agree with the direct calculation for potential %s' % (quantity,pot.__class__.__name__)
+            assert numpy.fabs(getattr(pot,quantity)(Rs[1])/direct[quantity][1]-1.) < 10.**-7., 'Cached %s does not agree with the direct calculation for scalar input for potential %s' % (quantity,pot.__class__.__name__)
+        assert numpy.fabs(potential.rl(pot,-Rs[2])/direct['rl'][2]-1.) < 10.**-7., 'Cached rl does not agree with the direct calculation for negative Lz'
+        assert numpy.fabs(potential.lindbladR(pot,0.5,m='corotation')-lr) < 10.**-7., 'lindbladR using cached profiles does not agree with the direct calculation'
+        assert numpy.fabs(pot.vterm(30.)-vt) < 10.**-7., 'vterm using cached profiles does not agree with the direct calculation'
+        #Outside of the grid, profiles are calculated directly
+        assert numpy.fabs(pot.vcirc(30.)-numpy.sqrt(-30.*pot.Rforce(30.,0.))) < 10.**-14., 'vcirc outside of the cached grid is not calculated directly'
+        #Normalizing resets the cache
+        pot.normalize(0.5)
+        assert numpy.fabs(pot.vcirc(1.)-numpy.sqrt(0.5)) < 10.**-7., 'Cached vcirc not updated after normalizing the potential'
+        pot.cacheProfiles(cache=False)
+        assert pot._profileCache is None, 'Disabling the profile cache did not work'
+    #Non-axisymmetric potentials cannot be cached
+    try: potential.SCFPotential(Acos=numpy.ones((1,2,2))).cacheProfiles()
+    except potential.PotentialError: pass
+    else: raise AssertionError('cacheProfiles for a non-axisymmetric potential did not raise PotentialError')
+    return None
+
+def test_rl_lindbladR_vterm_array():
+    #Test that rl, lindbladR, and vterm for array input agree with the scalar
+    #calculation
+    from galpy.potential_src.interpRZPotential import calc_rl_c
+    pots= [potential.MWPotential,
+           potential.LogarithmicHaloPotential(normalize=1.),
+           potential.MiyamotoNagaiPotential(normalize=1.),
+           potential.TwoPowerSphericalPotential(alpha=1.5,beta=3.5,
+                                                normalize=1.)]
+    lzs= numpy.array([0.,0.01,0.3,1.,-1.5,4.,20.])
+    ops= numpy.array([0.2,0.5,1.,3.,50.])
+    ls= numpy.array([10.,30.,60.,120.,300.])
+    for pot in pots:
+        rls= potential.rl(pot,lzs)
+        assert rls[0] == 0., 'rl for Lz=0 is not zero'
+        for lz,trl in zip(lzs[1:],rls[1:]):
+            assert numpy.fabs(trl/potential.rl(pot,lz)-1.) < 10.**-10., 'rl for array input does not agree with rl for scalar input for potential %s' % pot
+        #TwoPowerSphericalPotential does not implement R2deriv
+        if isinstance(pot,potential.TwoPowerSphericalPotential): 
+            ms= ['corotation']
+        else: ms= [2,-2,'corotation']
+        for m in ms:
+            lrs= potential.lindbladR(pot,ops,m=m)
+            for op,lr in zip(ops,lrs):
+                slr= potential.lindbladR(pot,op,m=m)
+                if slr is None:
+                    assert numpy.isnan(lr), 'lindbladR for array input does not return NaN when there is no resonance'
+                else:
+                    assert numpy.fabs(lr-slr) < 10.**-10., 'lindbladR for array input does not agree with lindbladR for scalar input for potential %s' % pot
+        assert numpy.all(numpy.fabs(potential.vterm(pot,ls)-numpy.array([potential.vterm(pot,l) for l in ls])) < 10.**-10.), 'vterm for array input does not agree with vterm for scalar input for potential %s' % pot
+    #The C code is used for potentials with a C implementation
+    out, err= calc_rl_c(potential.MWPotential,lzs)
+    assert err == 0, 'calc_rl_c returned an error'
+    assert numpy.all(numpy.fabs(out-potential.rl(potential.MWPotential,lzs)) < 10.**-14.), 'rl for C potentials does not use calc_rl_c'
+    return None
+
 def test_LinShuReductionFactor():
     #Test that the LinShuReductionFactor is implemented correctly, by comparing to figure 1 in Lin & Shu (1966)
     from galpy.potential import LinShuReductionFactor, \
@@ -63,3 +63,35 @@ def test_quadpack():
     int= dblquad(lambda y,x: 4.*x*y,0.,1.,lambda z: 0.,lambda z: 1.)
     assert numpy.fabs(int[0]-1.) < int[1], 'bovy_quadpack.dblquad did not work as expected'
     return None
+
+def test_multi_pool():
+    from galpy.util import multi
+    xs= numpy.linspace(0.,1.,101)
+    pool= multi.Pool(numcores=2)
+    try:
+        #closure, results should come back in order
+        out= pool.map(lambda x: xs[x]**2.,range(len(xs)),chunksize=7)
+        assert numpy.all(numpy.fabs(numpy.array(out)-xs**2.) < 10.**-10.), 'multi.Pool.map does not return the expected results in order'
+        #parallel_map should use the default pool
+        multi.set_default_pool(pool)
+        assert multi.get_default_pool() is pool, 'multi.set_default_pool did not set the default pool'
+        out= multi.parallel_map(lambda x: 2.*xs[x],range(len(xs)),numcores=2)
+        assert numpy.all(numpy.fabs(numpy.array(out)-2.*xs) < 10.**-10.), 'multi.parallel_map using the default Pool does not return the expected results'
+        #exceptions in the workers should be raised
+        try:
+            pool.map(lambda x: 1./(x-3),range(10))
+        except ZeroDivisionError, e:
+            assert 'ZeroDivisionError' in e.worker_traceback, 'multi.Pool.map does not attach the traceback of the worker to the exception'
+        else: raise AssertionError('multi.Pool.map did not raise an exception raised in a worker')
+        #many tasks, each worker should pick up the function of each task
+        for ii in range(20):
+            out= pool.map(lambda x: x+ii,range(3),chunksize=1)
+            assert out == [ii,ii+1,ii+2], 'multi.Pool.map does not use the function of the current task'
+        #the pool should still work afterwards
+        out= pool.map(lambda x: x+1,range(5))
+        assert out == [1,2,3,4,5], 'multi.Pool.map does not work after a worker raised an exception'
+    finally:
+        pool.close()
+    assert not pool.is_alive(), 'multi.Pool.close did not shut down the pool'
+    assert multi.get_default_pool() is None, 'multi.Pool.close did not unset the default pool'
+    return None